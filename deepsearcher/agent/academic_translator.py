@@ -11,13 +11,11 @@ import os
 import re
 from typing import Dict, List, Optional, Tuple
 
-import jieba
-import jieba.posseg as pseg
-
 from deepsearcher.agent.base import BaseAgent, describe_class
+from deepsearcher.agent.term_dictionary import get_term_dictionary
 from deepsearcher.llm.base import BaseLLM
-from deepsearcher.tools.log import debug, error, warning
-from deepsearcher.db.mysql_connection import get_mysql_connection
+from deepsearcher.tools.log import error
+from deepsearcher.db.mysql_connection import mysql_connection
 
 @describe_class(
     "This Agent is used to translate academic texts into specified languages, with special focus on accurate translation of professional terminology."
@@ -35,7 +33,8 @@ class AcademicTranslator(BaseAgent):
         """
         Initialize the AcademicTranslator class.
 
-        Load configuration, initialize LLM, connect to database, and load jieba user dictionary.
+        Load configuration, initialize LLM and locate the jieba user dictionary, which is
+        loaded on first use.
         """
         super().__init__(**kwargs)
 
@@ -45,9 +44,8 @@ class AcademicTranslator(BaseAgent):
         # Get database configuration and connect to database
         self.db_config = rbase_settings["database"]
         self.dict_config = rbase_settings["dict_path"]
-        self.db_connection = None
 
-        # Load jieba user dictionary
+        # Locate jieba user dictionary
         self._load_jieba_dict()
 
         # Cache previously queried term translations to avoid duplicate database queries
@@ -55,10 +53,11 @@ class AcademicTranslator(BaseAgent):
 
     def _load_jieba_dict(self) -> None:
         """
-        Load jieba user dictionary.
+        Locate the user dictionaries.
 
-        Find and load rbase_dict_cn.txt for jieba segmentation.
-        For rbase_dict_en.txt, store the words in a sorted list for English to Chinese translation.
+        rbase_dict_cn.txt is loaded into jieba for segmentation, and the words of
+        rbase_dict_en.txt are kept in a sorted list for English to Chinese translation.
+        Both are loaded on first use, from the snapshot file when it is up to date.
         """
         # Possible dictionary paths
         possible_cn_paths = [
@@ -69,65 +68,27 @@ class AcademicTranslator(BaseAgent):
             self.dict_config.get("en", "rbase_dict_en.txt"),
             os.path.join(os.getcwd(), "rbase_dict_en.txt"),
         ]
-
-        # Initialize English terms dictionary
-        self.en_terms = {}
-        # Initialize sorted English terms list (multi-word terms first, sorted by length)
-        self.sorted_en_terms = []
-
-        # Find Chinese dictionary
-        cn_dict_path = None
-        for path in possible_cn_paths:
-            if os.path.exists(path):
-                cn_dict_path = path
-                break
-
-        # Find English dictionary
-        en_dict_path = None
-        for path in possible_en_paths:
-            if os.path.exists(path):
-                en_dict_path = path
-                break
-
-        # Load Chinese dictionary into jieba
-        if cn_dict_path:
-            jieba.load_userdict(cn_dict_path)
-            debug(f"Loaded Chinese user dictionary: {cn_dict_path}")
-        else:
-            warning("Chinese user dictionary file rbase_dict_cn.txt not found")
-
-        # Load English dictionary into a sorted list
-        if en_dict_path:
-            try:
-                with open(en_dict_path, "r", encoding="utf-8") as f:
-                    for line in f:
-                        parts = line.strip().split()
-                        if len(parts) >= 3:
-                            # Format: [phrase] [freq] [part-of-speech]
-                            # The phrase might contain spaces, so we need to handle it carefully
-                            pos = parts[-1]
-                            phrase = " ".join(parts[:-2])
-
-                            # Store the English term with its part of speech
-                            self.en_terms[phrase] = pos
-
-                # Pre-sort English terms: multi-word terms first (sorted by length), then single words
-                multi_word_terms = [term for term in self.en_terms.keys() if " " in term]
-                single_word_terms = [term for term in self.en_terms.keys() if " " not in term]
-
-                # Sort multi-word terms by length (longest first)
-                multi_word_terms.sort(key=len, reverse=True)
-                # Sort single word terms alphabetically
-                single_word_terms.sort()
-
-                # Combine the sorted lists
-                self.sorted_en_terms = multi_word_terms + single_word_terms
-
-                debug(f"Loaded {len(self.en_terms)} English terms from: {en_dict_path}")
-            except Exception as e:
-                error(f"Failed to load English dictionary: {e}")
-        else:
-            warning("English user dictionary file rbase_dict_en.txt not found")
+        cn_dict_path = next((path for path in possible_cn_paths if os.path.exists(path)), None)
+        en_dict_path = next((path for path in possible_en_paths if os.path.exists(path)), None)
+
+        snapshot_path = self.dict_config.get("snapshot")
+        if snapshot_path is None and (cn_dict_path or en_dict_path):
+            snapshot_path = os.path.join(
+                os.path.dirname(cn_dict_path or en_dict_path), "rbase_dict.snapshot"
+            )
+        self.term_dictionary = get_term_dictionary(cn_dict_path, en_dict_path, snapshot_path)
+
+    @property
+    def en_terms(self) -> Dict[str, str]:
+        """English terms with their part of speech."""
+        self.term_dictionary.load()
+        return self.term_dictionary.en_terms
+
+    @property
+    def sorted_en_terms(self) -> List[str]:
+        """English terms, multi-word terms first (sorted by length), then single words."""
+        self.term_dictionary.load()
+        return self.term_dictionary.sorted_en_terms
 
     def _detect_language(self, text: str, target_lang: str) -> str:
         """
@@ -165,8 +126,7 @@ class AcademicTranslator(BaseAgent):
             List of tuples, each containing a word and its POS tag
         """
         # Use jieba for POS tagging segmentation
-        words = pseg.cut(text)
-        return [(word, flag) for word, flag in words]
+        return self.term_dictionary.segment(text)
 
     def _query_term_translation(
         self, term: str, source_lang: str, target_lang: str
@@ -188,8 +148,7 @@ class AcademicTranslator(BaseAgent):
             return self.term_cache[cache_key]
 
         try:
-            self.db_connection = get_mysql_connection(self.db_config)
-            with self.db_connection.cursor() as cursor:
+            with mysql_connection(self.db_config) as conn, conn.cursor() as cursor:
                 if source_lang == "zh" and target_lang == "en":
                     # Chinese -> English
                     sql = "SELECT name FROM concept WHERE cname = %s AND name IS NOT NULL AND name != '' AND intro is NOT NULL AND intro != '' LIMIT 1"
@@ -1,5 +1,7 @@
+import queue
+import threading
 from abc import ABC
-from typing import Any, List, Tuple
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple
 
 from deepsearcher.vector_db import RetrievalResult
 
@@ -12,6 +14,20 @@ def describe_class(description):
     return decorator
 
 
+def no_answer(query: str) -> str:
+    return f"No relevant information found for query '{query}'."
+
+
+def pop_progress(kwargs: dict) -> Callable[..., None]:
+    """
+    Pop the progress callback passed by `RAGAgent.query_stream` from the retrieve kwargs.
+
+    The callback is called as `progress(stage, message, **data)`, it is a no-op when the
+    retrieval is not streamed.
+    """
+    return kwargs.pop("progress", None) or (lambda stage, message, **data: None)
+
+
 class BaseAgent(ABC):
     def __init__(self, **kwargs):
         pass
@@ -56,3 +72,80 @@ class RAGAgent(BaseAgent):
                 - the retrieved document results
                 - the total number of token usages of the LLM
         """
+
+    def answer_messages(
+        self, query: str, retrieved_results: List[RetrievalResult], additional_info: dict
+    ) -> Optional[List[Dict]]:
+        """
+        Build the messages asking the LLM for the final answer.
+
+        Args:
+            query: The query string.
+            retrieved_results: The results returned by `retrieve`.
+            additional_info: The additional metadata returned by `retrieve`.
+
+        Returns:
+            The chat messages, or None when there is nothing to answer from.
+        """
+        raise NotImplementedError(f"{self.__class__.__name__} does not support streaming")
+
+    def query_stream(self, query: str, **kwargs) -> Generator[dict, None, None]:
+        """
+        Query the agent, yielding the retrieval progress and then the answer as it is generated.
+
+        The retrieval runs in a worker thread, which reports its steps through the
+        `progress` callback popped with `pop_progress`. Each event is a dictionary with a
+        "type":
+            - "progress": a retrieval step, with its "stage", a "message" and step data
+            - "retrieved": the retrieval is done, with its "results" and "tokens"
+            - "token": a piece of the answer, in "content"
+            - "done": the "answer", its "results" and the total "tokens"
+
+        Args:
+            query: The query string.
+        """
+        events = queue.Queue()
+        retrieval = {}
+
+        def run_retrieval():
+            try:
+                retrieval["output"] = self.retrieve(
+                    query,
+                    progress=lambda stage, message, **data: events.put(
+                        {"type": "progress", "stage": stage, "message": message, **data}
+                    ),
+                    **kwargs,
+                )
+            except Exception as e:
+                retrieval["error"] = e
+            finally:
+                events.put(None)
+
+        worker = threading.Thread(target=run_retrieval, daemon=True)
+        worker.start()
+        while (event := events.get()) is not None:
+            yield event
+        worker.join()
+        if "error" in retrieval:
+            raise retrieval["error"]
+        retrieved_results, n_token_retrieval, additional_info = retrieval["output"]
+        yield {"type": "retrieved", "results": retrieved_results, "tokens": n_token_retrieval}
+
+        messages = self.answer_messages(query, retrieved_results, additional_info)
+        if messages is None:
+            answer, n_token_answer = no_answer(query), 0
+            yield {"type": "token", "content": answer}
+        else:
+            stream = self.llm.chat_stream(messages)
+            while True:
+                try:
+                    yield {"type": "token", "content": next(stream)}
+                except StopIteration as stop:
+                    answer, n_token_answer = stop.value.content, stop.value.total_tokens
+                    break
+        yield {
+            "type": "done",
+            "answer": answer,
+            "results": retrieved_results,
+            "tokens": n_token_retrieval + n_token_answer,
+        }
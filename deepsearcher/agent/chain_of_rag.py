@@ -1,7 +1,14 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from deepsearcher.agent.base import RAGAgent, describe_class
+from deepsearcher.agent.base import RAGAgent, describe_class, pop_progress
 from deepsearcher.agent.collection_router import CollectionRouter
+from deepsearcher.agent.retrieval_executor import RetrievalExecutor
+from deepsearcher.agent.stop_policy import (
+    NO_ANSWER,
+    ChainState,
+    StopPolicy,
+    evaluate_stop_policies,
+)
 from deepsearcher.embedding.base import BaseEmbedding
 from deepsearcher.llm.base import BaseLLM
 from deepsearcher.tools import log
@@ -44,18 +51,28 @@ FINAL_ANSWER_PROMPT = """Given the following intermediate queries and answers, g
 Respond with an appropriate answer only, do not explain yourself or output anything else.
 """
 
-# TODO: will be used for early stop, will develop it recently
-REFLECTION_PROMPT = """Given the following intermediate queries and answers, judge whether you have enough information to answer the main query. If you believe you have enough information, respond with “Yes”, otherwise respond with “No”.
+ANSWER_WITH_SUPPORTED_DOCS_PROMPT = """Given the following documents, generate an appropriate answer for the query and select the documents that support the answer. DO NOT hallucinate any information, only use the provided documents to generate the answer. Answer “No relevant information found” and select no documents if the documents do not contain useful information.
 
-## Intermediate queries and answers
-{intermediate_context}
+## Documents
+{retrieved_documents}
 
-## Main query
-{query}
+## Query
+{sub_query}
 
-Respond with “Yes” or “No” only, do not explain yourself or output anything else.
+Respond with a JSON object only, do not explain yourself or output anything else:
+{{"answer": "<concise answer>", "supporting_docs": [<indices of the documents supporting the answer>]}}
 """
 
+ANSWER_WITH_SUPPORTED_DOCS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "supporting_docs": {"type": "array", "items": {"type": "integer"}},
+    },
+    "required": ["answer", "supporting_docs"],
+    "additionalProperties": False,
+}
+
 GET_SUPPORTED_DOCS_PROMPT = """Given the following documents, select the ones that are support the Q-A pair.
 
 ## Documents
@@ -84,16 +101,27 @@ class ChainOfRAG(RAGAgent):
         max_iter: int = 4,
         route_collection: bool = True,
         text_window_splitter: bool = True,
+        stop_policies: Optional[List[StopPolicy]] = None,
+        fuse_supported_docs: bool = True,
         **kwargs,
     ):
         self.llm = llm
+        # Answer each follow-up query and select its supporting documents in one JSON call,
+        # instead of sending the retrieved documents to the LLM twice
+        self.fuse_supported_docs = fuse_supported_docs
+        # Evaluated in order after each round, the first one that fires stops the retrieval
+        self.stop_policies = stop_policies or []
         self.embedding_model = embedding_model
         self.vector_db = vector_db
         self.max_iter = max_iter
         self.route_collection = route_collection
-        if self.route_collection:
-            self.collection_router = CollectionRouter(llm=self.llm, vector_db=self.vector_db)
+        self.collection_router = kwargs.get("collection_router") or CollectionRouter(
+            llm=self.llm, vector_db=self.vector_db, embedding_model=self.embedding_model
+        )
         self.text_window_splitter = text_window_splitter
+        self.retrieval_executor = kwargs.get("retrieval_executor") or RetrievalExecutor(
+            self.vector_db
+        )
 
     def _reflect_get_subquery(self, query: str, intermediate_context: List[str]) -> Tuple[str, int]:
         chat_response = self.llm.chat(
@@ -109,24 +137,28 @@ class ChainOfRAG(RAGAgent):
         )
         return chat_response.content, chat_response.total_tokens
 
-    def _retrieve_and_answer(self, query: str) -> Tuple[str, List[RetrievalResult], int]:
+    def _retrieve(self, query: str) -> Tuple[List[RetrievalResult], int]:
         consume_tokens = 0
+        query_vector = self.embedding_model.embed_query(query)
         if self.route_collection:
-            selected_collections, n_token_route = self.collection_router.invoke(query=query)
+            selected_collections, n_token_route = self.collection_router.invoke(
+                query=query, query_vector=query_vector
+            )
         else:
             selected_collections = self.collection_router.all_collections
             n_token_route = 0
         consume_tokens += n_token_route
-        all_retrieved_results = []
         for collection in selected_collections:
             log.color_print(f"<search> Search [{query}] in [{collection}]...  </search>\n")
-            query_vector = self.embedding_model.embed_query(query)
-            retrieved_results = self.vector_db.search_data(
-                collection=collection,
-                vector=query_vector,
+        all_retrieved_results = []
+        if selected_collections:
+            all_retrieved_results = self.retrieval_executor.search(
+                selected_collections, vector=query_vector, query_text=query
             )
-            all_retrieved_results.extend(retrieved_results)
-        all_retrieved_results = deduplicate_results(all_retrieved_results)
+        return all_retrieved_results, consume_tokens
+
+    def _retrieve_and_answer(self, query: str) -> Tuple[str, List[RetrievalResult], int]:
+        all_retrieved_results, consume_tokens = self._retrieve(query)
         chat_response = self.llm.chat(
             [
                 {
@@ -144,12 +176,52 @@ class ChainOfRAG(RAGAgent):
             consume_tokens + chat_response.total_tokens,
         )
 
+    def _answer_with_supported_docs(
+        self, query: str, retrieved_results: List[RetrievalResult]
+    ) -> Tuple[str, List[RetrievalResult], int]:
+        """Answer the query and select the documents supporting the answer in one LLM call."""
+        chat_response = self.llm.chat_json(
+            [
+                {
+                    "role": "user",
+                    "content": ANSWER_WITH_SUPPORTED_DOCS_PROMPT.format(
+                        retrieved_documents=self._format_retrieved_results(retrieved_results),
+                        sub_query=query,
+                    ),
+                }
+            ],
+            schema=ANSWER_WITH_SUPPORTED_DOCS_SCHEMA,
+            name="answer_with_supporting_docs",
+        )
+        try:
+            response = self.llm.parse_json(chat_response.content)
+            intermediate_answer = str(response["answer"])
+            supported_doc_indices = list(response.get("supporting_docs") or [])
+        except (ValueError, KeyError, TypeError) as e:
+            log.warning(f"Failed to parse the answer, selecting its documents separately: {e}")
+            supported_retrieved_results, n_token = self._get_supported_docs(
+                retrieved_results, query, chat_response.content
+            )
+            return (
+                chat_response.content,
+                supported_retrieved_results,
+                chat_response.total_tokens + n_token,
+            )
+        supported_retrieved_results = []
+        if NO_ANSWER not in intermediate_answer:
+            supported_retrieved_results = [
+                retrieved_results[i]
+                for i in dict.fromkeys(supported_doc_indices)
+                if isinstance(i, int) and 0 <= i < len(retrieved_results)
+            ]
+        return intermediate_answer, supported_retrieved_results, chat_response.total_tokens
+
     def _get_supported_docs(
         self, retrieved_results: List[RetrievalResult], query: str, intermediate_answer: str
     ) -> Tuple[List[RetrievalResult], int]:
         supported_retrieved_results = []
         token_usage = 0
-        if "No relevant information found" not in intermediate_answer:
+        if NO_ANSWER not in intermediate_answer:
             chat_response = self.llm.chat(
                 [
                     {
@@ -169,18 +241,28 @@ class ChainOfRAG(RAGAgent):
 
     def retrieve(self, query: str, **kwargs) -> Tuple[List[RetrievalResult], int, dict]:
         max_iter = kwargs.pop("max_iter", self.max_iter)
-        intermediate_contexts = []
+        stop_policies = kwargs.pop("stop_policies", self.stop_policies)
+        progress = pop_progress(kwargs)
+        state = ChainState(query=query)
+        intermediate_contexts = state.intermediate_contexts
         all_retrieved_results = []
         token_usage = 0
+        stop_reason = "max_iter"
         for iter in range(max_iter):
             log.color_print(f">> Iteration: {iter + 1}\n")
             followup_query, n_token0 = self._reflect_get_subquery(query, intermediate_contexts)
-            intermediate_answer, retrieved_results, n_token1 = self._retrieve_and_answer(
-                followup_query
-            )
-            supported_retrieved_results, n_token2 = self._get_supported_docs(
-                retrieved_results, followup_query, intermediate_answer
-            )
+            if self.fuse_supported_docs:
+                retrieved_results, n_token1 = self._retrieve(followup_query)
+                intermediate_answer, supported_retrieved_results, n_token2 = (
+                    self._answer_with_supported_docs(followup_query, retrieved_results)
+                )
+            else:
+                intermediate_answer, retrieved_results, n_token1 = self._retrieve_and_answer(
+                    followup_query
+                )
+                supported_retrieved_results, n_token2 = self._get_supported_docs(
+                    retrieved_results, followup_query, intermediate_answer
+                )
 
             all_retrieved_results.extend(supported_retrieved_results)
             intermediate_idx = len(intermediate_contexts) + 1
@@ -188,27 +270,60 @@ class ChainOfRAG(RAGAgent):
                 f"Intermediate query{intermediate_idx}: {followup_query}\nIntermediate answer{intermediate_idx}: {intermediate_answer}"
             )
             token_usage += n_token0 + n_token1 + n_token2
+            progress(
+                "hop",
+                f"Iteration {iter + 1}: {followup_query}",
+                iteration=iter + 1,
+                query=followup_query,
+                answer=intermediate_answer,
+                supported=len(supported_retrieved_results),
+            )
+            state.add_round(
+                intermediate_answer,
+                retrieved_results,
+                supported_retrieved_results,
+                n_token0 + n_token1 + n_token2,
+            )
+            if iter + 1 < max_iter and stop_policies:
+                reason, n_token3 = evaluate_stop_policies(stop_policies, state)
+                token_usage += n_token3
+                state.token_usage += n_token3
+                if reason:
+                    stop_reason = reason
+                    log.color_print(
+                        f"<think> Stop early after {iter + 1} rounds, {reason} </think>\n"
+                    )
+                    break
         all_retrieved_results = deduplicate_results(all_retrieved_results)
-        additional_info = {"intermediate_context": intermediate_contexts}
+        additional_info = {
+            "intermediate_context": intermediate_contexts,
+            "iterations": state.iteration,
+            "stop_reason": stop_reason,
+        }
         return all_retrieved_results, token_usage, additional_info
 
-    def query(self, query: str, **kwargs) -> Tuple[str, List[RetrievalResult], int]:
-        all_retrieved_results, n_token_retrieval, additional_info = self.retrieve(query, **kwargs)
+    def answer_messages(
+        self, query: str, all_retrieved_results: List[RetrievalResult], additional_info: dict
+    ) -> Optional[List[Dict]]:
         intermediate_context = additional_info["intermediate_context"]
         log.color_print(
             f"<think> Summarize answer from all {len(all_retrieved_results)} retrieved chunks... </think>\n"
         )
+        return [
+            {
+                "role": "user",
+                "content": FINAL_ANSWER_PROMPT.format(
+                    retrieved_documents=self._format_retrieved_results(all_retrieved_results),
+                    intermediate_context="\n".join(intermediate_context),
+                    query=query,
+                ),
+            }
+        ]
+
+    def query(self, query: str, **kwargs) -> Tuple[str, List[RetrievalResult], int]:
+        all_retrieved_results, n_token_retrieval, additional_info = self.retrieve(query, **kwargs)
         chat_response = self.llm.chat(
-            [
-                {
-                    "role": "user",
-                    "content": FINAL_ANSWER_PROMPT.format(
-                        retrieved_documents=self._format_retrieved_results(all_retrieved_results),
-                        intermediate_context="\n".join(intermediate_context),
-                        query=query,
-                    ),
-                }
-            ]
+            self.answer_messages(query, all_retrieved_results, additional_info)
         )
         log.color_print("\n==== FINAL ANSWER====\n")
         log.color_print(chat_response.content)
@@ -0,0 +1,172 @@
+"""
+Citation resolution for generated reviews.
+
+Generated texts cite articles by database id, e.g. `[123]` or `[123, 456]`. The resolver
+renumbers the citations in order of first appearance in a single substitution pass and
+looks the cited articles up in chunked `IN` queries, through a bounded LRU cache of article
+metadata shared by the agents of a process.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from deepsearcher.db.mysql_connection import mysql_connection
+from deepsearcher.tools import log
+
+# A bracket with one or more comma separated article ids
+CITATION_PATTERN = re.compile(r"\[\s*(\d+(?:\s*,\s*\d+)*)\s*\]")
+ARTICLE_FIELDS = ("id", "title", "journal_name", "authors", "doi", "pubdate")
+
+
+def renumber_citations(text: str) -> Tuple[str, List[int]]:
+    """
+    Replace article id citations with sequential numbers in order of first appearance.
+
+    `[123, 456]` becomes `[1][2]`, and later citations of 123 become `[1]`.
+
+    Args:
+        text: Text citing articles by id
+
+    Returns:
+        Tuple of (renumbered text, cited article ids in citation number order)
+    """
+    numbers: Dict[int, int] = {}
+
+    def replace(match: re.Match) -> str:
+        parts = []
+        for ref_id in match.group(1).split(","):
+            number = numbers.setdefault(int(ref_id), len(numbers) + 1)
+            parts.append(f"[{number}]")
+        return "".join(parts)
+
+    return CITATION_PATTERN.sub(replace, text), list(numbers)
+
+
+def format_authors(authors: Optional[str], max_authors: int = 5) -> str:
+    """Join the first `max_authors` of a comma separated author list, adding "et al"."""
+    names = [name.strip() for name in (authors or "").split(",") if name.strip()]
+    if len(names) > max_authors:
+        names = names[:max_authors] + ["et al"]
+    return ", ".join(names)
+
+
+def format_reference(number: int, article_id: int, article: Optional[dict]) -> str:
+    """Format one entry of a reference list, a placeholder if the article was not found."""
+    if not article:
+        return f"[{number}] some authors, some title, some journal, some year, some doi for some article {article_id}"
+    pubdate = article.get("pubdate")
+    year = pubdate.year if pubdate else "n.d."
+    return (
+        f"[{number}] {format_authors(article.get('authors'))}. {article['title']}. "
+        f"{article['journal_name']}. {year};{article['doi']}"
+    )
+
+
+class CitationResolver:
+    """Looks up cited articles and builds reference lists."""
+
+    def __init__(self, rbase_db_config: dict, cache_size: int = 10000, batch_size: int = 500):
+        """
+        Initialize the resolver.
+
+        Args:
+            rbase_db_config: Database configuration dictionary
+            cache_size: Maximum number of articles kept in the metadata cache
+            batch_size: Maximum number of ids per `IN` query
+        """
+        self.rbase_db_config = rbase_db_config
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, article_ids: List[int]) -> Tuple[Dict[int, dict], List[int]]:
+        found, missing = {}, []
+        with self._lock:
+            for article_id in article_ids:
+                article = self._cache.get(article_id)
+                if article is None:
+                    missing.append(article_id)
+                else:
+                    self._cache.move_to_end(article_id)
+                    found[article_id] = article
+        return found, missing
+
+    def _remember(self, articles: Dict[int, dict]) -> None:
+        with self._lock:
+            for article_id, article in articles.items():
+                self._cache[article_id] = article
+                self._cache.move_to_end(article_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def fetch_articles(self, article_ids: Iterable[int]) -> Dict[int, dict]:
+        """
+        Get the metadata of articles, from the cache or the database.
+
+        Args:
+            article_ids: Article ids, articles that do not exist are left out of the result
+
+        Returns:
+            Dictionary of article id to a row with the fields in ARTICLE_FIELDS
+        """
+        article_ids = list(dict.fromkeys(int(article_id) for article_id in article_ids))
+        articles, missing = self._cached(article_ids)
+        if not missing:
+            return articles
+
+        fetched = {}
+        try:
+            with mysql_connection(self.rbase_db_config) as conn, conn.cursor() as cursor:
+                for start in range(0, len(missing), self.batch_size):
+                    batch = missing[start : start + self.batch_size]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute(
+                        f"SELECT {', '.join(ARTICLE_FIELDS)} FROM article WHERE id IN ({placeholders})",
+                        batch,
+                    )
+                    for row in cursor.fetchall():
+                        fetched[int(row["id"])] = row
+        except Exception as e:
+            log.critical(f"Failed to get reference information from database: {e}")
+            return articles
+        self._remember(fetched)
+        articles.update(fetched)
+        return articles
+
+    def reorganize(self, text: str) -> Tuple[str, str]:
+        """
+        Renumber the citations of a text and build its reference list.
+
+        Args:
+            text: Text citing articles by id
+
+        Returns:
+            Tuple of (renumbered text, reference list), the list is empty if nothing is cited
+        """
+        new_text, cited_ids = renumber_citations(text)
+        if not cited_ids:
+            return text, ""
+        articles = self.fetch_articles(cited_ids)
+        references = [
+            format_reference(number, article_id, articles.get(article_id))
+            for number, article_id in enumerate(cited_ids, start=1)
+        ]
+        return new_text, "\n\n".join(references)
+
+
+# Resolvers by database, so that agents created per request share the metadata cache
+_resolvers: Dict[Tuple, CitationResolver] = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_citation_resolver(rbase_db_config: dict) -> CitationResolver:
+    """Get the shared citation resolver of a database configuration."""
+    config = rbase_db_config.get("config", {})
+    key = tuple(str(config.get(name, "")) for name in ("host", "port", "database"))
+    with _resolvers_lock:
+        if key not in _resolvers:
+            _resolvers[key] = CitationResolver(rbase_db_config)
+        return _resolvers[key]
@@ -1,9 +1,13 @@
-from typing import List, Tuple
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
 
 from deepsearcher.agent.base import BaseAgent
-from deepsearcher.llm.base import BaseLLM
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, cached_prompt
 from deepsearcher.tools import log
-from deepsearcher.vector_db.base import BaseVectorDB
+from deepsearcher.vector_db.base import BaseVectorDB, CollectionInfo
 
 COLLECTION_ROUTE_PROMPT = """
 I provide you with collection_name(s) and corresponding collection_description(s). Please select the collection names that may be related to the question and return a python list of str. If there is no collection related to the question, you can return an empty list.
@@ -16,17 +20,69 @@ When you return, you can ONLY return a python list of str, WITHOUT any other add
 
 
 class CollectionRouter(BaseAgent):
-    def __init__(self, llm: BaseLLM, vector_db: BaseVectorDB, **kwargs):
+    """
+    Select the collections a query should be searched in.
+
+    When an embedding model is given, collection descriptions are embedded once and a query
+    is routed by the cosine similarity between its vector and the description vectors.
+    Collections above `select_threshold` are selected and collections below
+    `reject_threshold` are dropped; the LLM is only asked about the collections in between.
+    Without an embedding model every query is routed by the LLM.
+    """
+
+    def __init__(
+        self,
+        llm: BaseLLM,
+        vector_db: BaseVectorDB,
+        embedding_model: Optional[BaseEmbedding] = None,
+        select_threshold: float = 0.6,
+        reject_threshold: float = 0.3,
+        **kwargs,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            llm: Language model used for ambiguous routing decisions
+            vector_db: Vector database whose collections are routed to
+            embedding_model: Model used to embed queries and collection descriptions
+            select_threshold: Similarity above which a collection is selected without the LLM
+            reject_threshold: Similarity below which a collection is dropped without the LLM
+        """
         self.llm = llm
         self.vector_db = vector_db
-        self.all_collections = [
-            collection_info.collection_name for collection_info in self.vector_db.list_collections()
+        self.embedding_model = embedding_model
+        self.select_threshold = select_threshold
+        self.reject_threshold = reject_threshold
+        self._description_vectors: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def all_collections(self) -> List[str]:
+        return [
+            collection_info.collection_name
+            for collection_info in self.vector_db.get_collection_infos()
         ]
 
-    def invoke(self, query: str, **kwargs) -> Tuple[List[str], int]:
-        consume_tokens = 0
-        collection_infos = self.vector_db.list_collections()
-        vector_db_search_prompt = COLLECTION_ROUTE_PROMPT.format(
+    def _get_description_vectors(self, collection_infos: List[CollectionInfo]) -> np.ndarray:
+        """Return one normalized description vector per collection, embedding new ones."""
+        keys = [(info.collection_name, info.description) for info in collection_infos]
+        with self._lock:
+            missing = [key for key in keys if key not in self._description_vectors]
+            if missing:
+                vectors = self.embedding_model.embed_documents(
+                    [description for _, description in missing]
+                )
+                for key, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    self._description_vectors[key] = vector / (np.linalg.norm(vector) or 1.0)
+            return np.stack([self._description_vectors[key] for key in keys])
+
+    def _llm_route(
+        self, query: str, collection_infos: List[CollectionInfo]
+    ) -> Tuple[List[str], int]:
+        messages = cached_prompt(
+            COLLECTION_ROUTE_PROMPT,
             question=query,
             collection_info=[
                 {
@@ -36,20 +92,60 @@ class CollectionRouter(BaseAgent):
                 for collection_info in collection_infos
             ],
         )
-        chat_response = self.llm.chat(
-            messages=[{"role": "user", "content": vector_db_search_prompt}]
-        )
-        selected_collections = self.llm.literal_eval(chat_response.content)
-        consume_tokens += chat_response.total_tokens
-
-        for collection_info in collection_infos:
-            # If a collection description is not provided, use the query as the search query
-            if not collection_info.description:
-                selected_collections.append(collection_info.collection_name)
-            # If the default collection exists, use the query as the search query
-            if self.vector_db.default_collection == collection_info.collection_name:
-                selected_collections.append(collection_info.collection_name)
-        selected_collections = list(set(selected_collections))
+        chat_response = self.llm.cached_chat(messages=messages, prompt_type="collection_route")
+        return self.llm.literal_eval(chat_response.content), chat_response.total_tokens
+
+    def invoke(
+        self, query: str, query_vector: Optional[List[float]] = None, **kwargs
+    ) -> Tuple[List[str], int]:
+        """
+        Select the collections related to a query.
+
+        Args:
+            query: User query
+            query_vector: Embedding of the query, computed here when it is not given
+
+        Returns:
+            Selected collection names and the number of tokens consumed
+        """
+        consume_tokens = 0
+        collection_infos = self.vector_db.get_collection_infos()
+        # Collections without a description and the default collection are always searched
+        selected_collections = [
+            collection_info.collection_name
+            for collection_info in collection_infos
+            if not collection_info.description
+            or collection_info.collection_name == self.vector_db.default_collection
+        ]
+        candidates = [
+            collection_info
+            for collection_info in collection_infos
+            if collection_info.collection_name not in selected_collections
+        ]
+
+        if candidates and self.embedding_model is not None:
+            if query_vector is None:
+                query_vector = self.embedding_model.embed_query(query)
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            similarities = self._get_description_vectors(candidates) @ (
+                query_vector / (np.linalg.norm(query_vector) or 1.0)
+            )
+            ambiguous = []
+            for collection_info, similarity in zip(candidates, similarities):
+                if similarity >= self.select_threshold:
+                    selected_collections.append(collection_info.collection_name)
+                elif similarity >= self.reject_threshold:
+                    ambiguous.append(collection_info)
+            candidates = ambiguous
+
+        if candidates:
+            llm_collections, consume_tokens = self._llm_route(query, candidates)
+            candidate_names = {collection_info.collection_name for collection_info in candidates}
+            selected_collections.extend(
+                collection for collection in llm_collections if collection in candidate_names
+            )
+
+        selected_collections = list(dict.fromkeys(selected_collections))
         log.color_print(
             f"<think> Perform search [{query}] on the vector DB collections: {selected_collections} </think>\n"
         )
@@ -1,10 +1,12 @@
 import asyncio
-from typing import List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Optional, Set, Tuple
 
-from deepsearcher.agent.base import RAGAgent, describe_class
+from deepsearcher.agent.base import RAGAgent, describe_class, no_answer, pop_progress
 from deepsearcher.agent.collection_router import CollectionRouter
+from deepsearcher.agent.retrieval_executor import RetrievalExecutor
 from deepsearcher.embedding.base import BaseEmbedding
-from deepsearcher.llm.base import BaseLLM
+from deepsearcher.llm.base import BaseLLM, cached_prompt
 from deepsearcher.tools import log
 from deepsearcher.vector_db import RetrievalResult
 from deepsearcher.vector_db.base import BaseVectorDB, deduplicate_results
@@ -65,6 +67,63 @@ Related Chunks:
 """
 
 
+def chunk_key(result: RetrievalResult) -> Hashable:
+    """Identify a chunk by its primary key in its source, or by its text when it has none."""
+    chunk_id = result.metadata.get("id")
+    if chunk_id is None:
+        return result.text
+    return (result.reference, chunk_id)
+
+
+@dataclass
+class RetrievalState:
+    """
+    Chunks seen by a deep search request and the rerank verdicts given to them.
+
+    Sub-queries of later iterations retrieve many of the chunks already judged in earlier
+    ones, their verdict is reused instead of asking the LLM again. The novelty of an
+    iteration is the number of chunks not retrieved before it per query it searched.
+    """
+
+    # Maximum number of LLM rerank calls of the request, 0 for no limit
+    max_rerank_calls: int = 0
+    verdicts: Dict[Hashable, bool] = field(default_factory=dict)
+    rerank_calls: int = 0
+    reused_verdicts: int = 0
+    # Chunks left unjudged, and so not accepted, once the rerank budget was spent
+    unranked_chunks: int = 0
+    novelty: List[float] = field(default_factory=list)
+    _seen: Set[Hashable] = field(default_factory=set, repr=False)
+    _new_chunks: int = 0
+
+    @property
+    def budget_exhausted(self) -> bool:
+        return bool(self.max_rerank_calls) and self.rerank_calls >= self.max_rerank_calls
+
+    def observe(self, results: List[RetrievalResult]) -> None:
+        """Count the retrieved chunks not seen earlier in the request."""
+        for result in results:
+            key = chunk_key(result)
+            if key not in self._seen:
+                self._seen.add(key)
+                self._new_chunks += 1
+
+    def end_iteration(self, n_queries: int) -> float:
+        """Close an iteration that searched `n_queries` queries and return its novelty."""
+        novelty = self._new_chunks / max(n_queries, 1)
+        self.novelty.append(novelty)
+        self._new_chunks = 0
+        return novelty
+
+    def info(self) -> dict:
+        return {
+            "rerank_calls": self.rerank_calls,
+            "reused_verdicts": self.reused_verdicts,
+            "unranked_chunks": self.unranked_chunks,
+            "novelty": [round(novelty, 2) for novelty in self.novelty],
+        }
+
+
 @describe_class(
     "This agent is suitable for handling general and simple queries, such as given a topic and then writing a report, survey, or article."
 )
@@ -77,16 +136,38 @@ class DeepSearch(RAGAgent):
         max_iter: int = 3,
         route_collection: bool = True,
         text_window_splitter: bool = True,
+        max_rerank_calls: int = 0,
+        min_novelty: float = 0.0,
         **kwargs,
     ):
+        """
+        Initialize the DeepSearch agent.
+
+        Args:
+            llm: Language model for sub-queries, reranking, reflection and the answer
+            embedding_model: Model used to embed the queries
+            vector_db: Vector database searched for chunks
+            max_iter: Maximum number of search iterations
+            route_collection: Whether to let the collection router choose the collections
+            text_window_splitter: Whether to answer from the wider text around the chunks
+            max_rerank_calls: Maximum number of LLM rerank calls per request, 0 for no limit
+            min_novelty: Stop after an iteration retrieving fewer new chunks per query than
+                this, 0 to only stop when the LLM proposes no further queries
+        """
         self.llm = llm
         self.embedding_model = embedding_model
         self.vector_db = vector_db
         self.max_iter = max_iter
         self.route_collection = route_collection
-        if self.route_collection:
-            self.collection_router = CollectionRouter(llm=self.llm, vector_db=self.vector_db)
+        self.max_rerank_calls = max_rerank_calls
+        self.min_novelty = min_novelty
+        self.collection_router = kwargs.get("collection_router") or CollectionRouter(
+            llm=self.llm, vector_db=self.vector_db, embedding_model=self.embedding_model
+        )
         self.text_window_splitter = text_window_splitter
+        self.retrieval_executor = kwargs.get("retrieval_executor") or RetrievalExecutor(
+            self.vector_db
+        )
 
     def _generate_sub_queries(self, original_query: str) -> Tuple[List[str], int]:
         chat_response = self.llm.chat(
@@ -97,48 +178,68 @@ class DeepSearch(RAGAgent):
         response_content = chat_response.content
         return self.llm.literal_eval(response_content), chat_response.total_tokens
 
-    async def _search_chunks_from_vectordb(self, query: str, sub_queries: List[str]):
+    def _rerank(self, query: str, sub_queries: List[str], retrieved_result: RetrievalResult):
+        chat_response = self.llm.cached_chat(
+            messages=cached_prompt(
+                RERANK_PROMPT,
+                query=[query] + sub_queries,
+                retrieved_chunk=f"<chunk>{retrieved_result.text}</chunk>",
+            ),
+            prompt_type="rerank",
+        )
+        response_content = chat_response.content.strip()
+        # strip the reasoning text if exists
+        if "<think>" in response_content and "</think>" in response_content:
+            end_of_think = response_content.find("</think>") + len("</think>")
+            response_content = response_content[end_of_think:].strip()
+        accepted = "YES" in response_content and "NO" not in response_content
+        return accepted, chat_response.total_tokens
+
+    async def _search_chunks_from_vectordb(
+        self, query: str, sub_queries: List[str], state: Optional[RetrievalState] = None
+    ):
+        state = state or RetrievalState(max_rerank_calls=self.max_rerank_calls)
         consume_tokens = 0
+        query_vector = self.embedding_model.embed_query(query)
         if self.route_collection:
-            selected_collections, n_token_route = self.collection_router.invoke(query=query)
+            selected_collections, n_token_route = self.collection_router.invoke(
+                query=query, query_vector=query_vector
+            )
         else:
             selected_collections = self.collection_router.all_collections
             n_token_route = 0
         consume_tokens += n_token_route
 
         all_retrieved_results = []
-        query_vector = self.embedding_model.embed_query(query)
-        for collection in selected_collections:
+        if not selected_collections:
+            return all_retrieved_results, consume_tokens
+        results_by_collection = self.retrieval_executor.search_collections(
+            selected_collections, vector=query_vector, query_text=query
+        )
+        for collection, retrieved_results in results_by_collection.items():
             log.color_print(f"<search> Search [{query}] in [{collection}]...  </search>\n")
-            retrieved_results = self.vector_db.search_data(
-                collection=collection, vector=query_vector
-            )
             if not retrieved_results or len(retrieved_results) == 0:
                 log.color_print(
                     f"<search> No relevant document chunks found in '{collection}'! </search>\n"
                 )
                 continue
+            state.observe(retrieved_results)
             accepted_chunk_num = 0
             references = set()
             for retrieved_result in retrieved_results:
-                chat_response = self.llm.chat(
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": RERANK_PROMPT.format(
-                                query=[query] + sub_queries,
-                                retrieved_chunk=f"<chunk>{retrieved_result.text}</chunk>",
-                            ),
-                        }
-                    ]
-                )
-                consume_tokens += chat_response.total_tokens
-                response_content = chat_response.content.strip()
-                # strip the reasoning text if exists
-                if "<think>" in response_content and "</think>" in response_content:
-                    end_of_think = response_content.find("</think>") + len("</think>")
-                    response_content = response_content[end_of_think:].strip()
-                if "YES" in response_content and "NO" not in response_content:
+                key = chunk_key(retrieved_result)
+                if key in state.verdicts:
+                    state.reused_verdicts += 1
+                    accepted = state.verdicts[key]
+                elif state.budget_exhausted:
+                    state.unranked_chunks += 1
+                    continue
+                else:
+                    state.rerank_calls += 1
+                    accepted, n_token = self._rerank(query, sub_queries, retrieved_result)
+                    consume_tokens += n_token
+                    state.verdicts[key] = accepted
+                if accepted:
                     all_retrieved_results.append(retrieved_result)
                     accepted_chunk_num += 1
                     references.add(retrieved_result.reference)
@@ -173,6 +274,9 @@ class DeepSearch(RAGAgent):
         self, original_query: str, **kwargs
     ) -> Tuple[List[RetrievalResult], int, dict]:
         max_iter = kwargs.pop("max_iter", self.max_iter)
+        progress = pop_progress(kwargs)
+        state = RetrievalState(max_rerank_calls=self.max_rerank_calls)
+        stop_reason = "max_iter"
         ### SUB QUERIES ###
         log.color_print(f"<query> {original_query} </query>\n")
         all_search_res = []
@@ -188,6 +292,7 @@ class DeepSearch(RAGAgent):
             log.color_print(
                 f"<think> Break down the original query into new sub queries: {sub_queries}</think>\n"
             )
+            progress("sub_queries", f"Break down the query into {sub_queries}", queries=sub_queries)
         all_sub_queries.extend(sub_queries)
         sub_gap_queries = sub_queries
 
@@ -198,7 +303,7 @@ class DeepSearch(RAGAgent):
 
             # Create all search tasks
             search_tasks = [
-                self._search_chunks_from_vectordb(query, sub_gap_queries)
+                self._search_chunks_from_vectordb(query, sub_gap_queries, state)
                 for query in sub_gap_queries
             ]
             # Execute all tasks in parallel and wait for results
@@ -212,9 +317,25 @@ class DeepSearch(RAGAgent):
             search_res_from_vectordb = deduplicate_results(search_res_from_vectordb)
             # search_res_from_internet = deduplicate_results(search_res_from_internet)
             all_search_res.extend(search_res_from_vectordb + search_res_from_internet)
+            novelty = state.end_iteration(len(sub_gap_queries))
+            progress(
+                "search",
+                f"Iteration {iter + 1}: accepted {len(search_res_from_vectordb)} chunks",
+                iteration=iter + 1,
+                queries=sub_gap_queries,
+                accepted=len(search_res_from_vectordb),
+            )
             if iter == max_iter - 1:
                 log.color_print("<think> Exceeded maximum iterations. Exiting. </think>\n")
                 break
+            if state.budget_exhausted:
+                stop_reason = f"rerank_budget: {state.rerank_calls} calls"
+                log.color_print("<think> Rerank budget exhausted. Exiting. </think>\n")
+                break
+            if iter > 0 and novelty < self.min_novelty:
+                stop_reason = f"novelty: {novelty:.2f} < {self.min_novelty} new chunks per query"
+                log.color_print(f"<think> Diminishing returns, {stop_reason}. Exiting. </think>\n")
+                break
             ### REFLECTION & GET GAP QUERIES ###
             log.color_print("<think> Reflecting on the search results... </think>\n")
             sub_gap_queries, consumed_token = self._generate_gap_queries(
@@ -222,22 +343,32 @@ class DeepSearch(RAGAgent):
             )
             total_tokens += consumed_token
             if not sub_gap_queries or len(sub_gap_queries) == 0:
+                stop_reason = "no_gap_queries"
                 log.color_print("<think> No new search queries were generated. Exiting. </think>\n")
                 break
             else:
                 log.color_print(
                     f"<think> New search queries for next iteration: {sub_gap_queries} </think>\n"
                 )
+                progress(
+                    "gap_queries", f"New search queries: {sub_gap_queries}", queries=sub_gap_queries
+                )
                 all_sub_queries.extend(sub_gap_queries)
 
         all_search_res = deduplicate_results(all_search_res)
-        additional_info = {"all_sub_queries": all_sub_queries}
+        additional_info = {
+            "all_sub_queries": all_sub_queries,
+            "iterations": len(state.novelty),
+            "stop_reason": stop_reason,
+            **state.info(),
+        }
         return all_search_res, total_tokens, additional_info
 
-    def query(self, query: str, **kwargs) -> Tuple[str, List[RetrievalResult], int]:
-        all_retrieved_results, n_token_retrieval, additional_info = self.retrieve(query, **kwargs)
+    def answer_messages(
+        self, query: str, all_retrieved_results: List[RetrievalResult], additional_info: dict
+    ) -> Optional[List[Dict]]:
         if not all_retrieved_results or len(all_retrieved_results) == 0:
-            return f"No relevant information found for query '{query}'.", [], n_token_retrieval
+            return None
         all_sub_queries = additional_info["all_sub_queries"]
         chunk_texts = []
         for chunk in all_retrieved_results:
@@ -253,7 +384,14 @@ class DeepSearch(RAGAgent):
             mini_questions=all_sub_queries,
             mini_chunk_str=self._format_chunk_texts(chunk_texts),
         )
-        chat_response = self.llm.chat([{"role": "user", "content": summary_prompt}])
+        return [{"role": "user", "content": summary_prompt}]
+
+    def query(self, query: str, **kwargs) -> Tuple[str, List[RetrievalResult], int]:
+        all_retrieved_results, n_token_retrieval, additional_info = self.retrieve(query, **kwargs)
+        messages = self.answer_messages(query, all_retrieved_results, additional_info)
+        if messages is None:
+            return no_answer(query), [], n_token_retrieval
+        chat_response = self.llm.chat(messages)
         log.color_print("\n==== FINAL ANSWER====\n")
         log.color_print(chat_response.content)
         return (
@@ -1,6 +1,8 @@
-from typing import Tuple, List, Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Tuple, List, Generator, Optional
+import numpy as np
 from deepsearcher import configuration
-from deepsearcher.llm.base import BaseLLM
+from deepsearcher.llm.base import BaseLLM, cached_prompt, message_text
 from deepsearcher.embedding.base import BaseEmbedding
 from deepsearcher.agent import AcademicTranslator
 from deepsearcher.vector_db.base import BaseVectorDB
@@ -10,16 +12,7 @@ import json
 
 
 DISCUSS_ACTION_PROMPT = """
-你是AI学术助理，有一个用户正在跟你对话，客户当前正在{user_action}，请判断用户的问题的意图以及本次对话是否需要查询文献。
-
-对话背景信息：
-{background}
-
-对话历史：
-{history}
-
-用户的问题：
-{query}
+你是AI学术助理，有一个用户正在跟你对话，请根据最后给出的对话背景信息、用户当前的行为、对话历史和用户的问题，判断用户的问题的意图以及本次对话是否需要查询文献。
 
 首先，请判断用户的问题实际上表达的是什么意图：
 1. 如果用户正在咨询学术方面的问题，或对历史对话内容进行进一步的追问，那么用户的意图是"提问"
@@ -41,27 +34,21 @@ DISCUSS_ACTION_PROMPT = """
 }}
 
 请直接输出JSON数据，不要输出任何解释。
-"""
 
-DISCUSS_ANSWER_PROMPT = """
-你是AI学术助理，有一个用户正在跟你对话，客户当前正在{user_action}，请根据用户的问题给出回答。
-
-背景信息：
+对话背景信息：
 {background}
 
-文献内容检索结果：
-{retrieval_results}
+用户当前正在：{user_action}
 
 对话历史：
 {history}
 
 用户的问题：
 {query}
+"""
 
-用户提问的意图是：
-{intention}
-
-回复用户的语言是：{target_lang}
+DISCUSS_ANSWER_PROMPT = """
+你是AI学术助理，有一个用户正在跟你对话，请根据最后给出的背景信息、文献内容检索结果和对话历史，回答用户的问题。
 
 根据用户的不同意图进行回复：
 1. "提问"：请用专业、准确、友好的语言回答用户的问题，充分结合背景信息和查询到的文献内容。
@@ -77,8 +64,104 @@ DISCUSS_ANSWER_PROMPT = """
 3. 不要使用背景信息或者文献内容检索中没有的文献材料作为回答的依据。
 4. 回答应当简洁明了，并且针对用户的具体问题提供有用的信息，在实在没有回答思路时，可以回复用户"抱歉，这方面问题我暂时还没有一个清晰的回答思路"，用你的语言表达类似的含义。
 5. 引用参考文献时，请使用格式：[X]（X为文章列表中的article_id），遇到参考文章ID请无论在任何位置都使用这种格式，不要直接陈列文章ID，也不要对这一格式做任何变体。
+
+背景信息：
+{background}
+
+用户当前正在：{user_action}
+
+文献内容检索结果：
+{retrieval_results}
+
+对话历史：
+{history}
+
+用户的问题：
+{query}
+
+用户提问的意图是：
+{intention}
+
+回复用户的语言是：{target_lang}
 """
 
+DISCUSS_SUMMARY_PROMPT = """
+你是AI学术助理，请把你与用户的学术讨论整理为一段简洁的对话摘要，供后续对话参考。
+
+请在最后给出的已有摘要的基础上合并新增的对话，保留用户关注的问题、讨论得出的主要结论与分歧、引用过的参考文献（格式[X]）以及尚未解决的问题，删除寒暄和重复的内容。
+请直接输出摘要，不要输出任何解释。
+
+摘要字数上限：{max_length}字
+
+已有的对话摘要：
+{summary}
+
+新增的对话：
+{history}
+"""
+
+# 意图的描述与示例，用于向量分类器判断用户意图
+DISCUSS_INTENTS = {
+    "提问": ["用户在咨询学术方面的问题，或对历史对话内容进行进一步的追问", "这个结论的依据是什么？", "能详细解释一下其中的机制吗？"],
+    "发表观点": ["用户发表了一个学术观点", "我认为这种方法在临床上更有应用前景"],
+    "质疑且需要回复": ["用户对之前的回答表示质疑，并且提出了他的看法", "我不同意，最新的研究表明情况正好相反"],
+    "质疑": ["用户只是表达质疑", "真的是这样吗？", "我不太相信"],
+    "肯定": ["用户只是表达肯定", "说得对", "明白了，谢谢", "好的，很有帮助"],
+    "无需回复": ["用户的表达没有特定意图，或者只是发表了感叹", "哇", "哈哈", "嗯"],
+}
+
+# 不需要检索文献的意图，向量分类器有把握时不再调用语言模型判断意图
+NO_SEARCH_INTENTIONS = ("肯定", "无需回复")
+
+# 推测检索共用的线程池，与意图判断并行执行向量化和检索
+_speculation_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="discuss-speculation")
+
+# 短于该长度的追问（如"为什么？"）单独检索意义不大，推测检索时拼接上一轮的用户问题
+SHORT_QUERY_LENGTH = 8
+
+
+def format_history(history: List[dict], summary: str = "") -> str:
+    """
+    格式化对话历史，有对话摘要时放在最近几轮原始对话之前
+
+    Args:
+        history: 对话记录列表，格式为[{"role": "user|assistant", "content": "内容"}]
+        summary: 更早对话的摘要
+
+    Returns:
+        格式化后的对话历史
+    """
+    formatted_history = ""
+    for item in history:
+        if item.get("role") == "user":
+            formatted_history += f"用户: {item.get('content', '')}\n"
+        else:
+            formatted_history += f"AI助理: {item.get('content', '')}\n\n"
+    if summary:
+        return f"此前对话的摘要：\n{summary}\n\n最近的对话：\n{formatted_history}"
+    return formatted_history
+
+
+def recent_history(history: List[dict], summarized_id: int, raw_turns: int = 2) -> List[dict]:
+    """
+    选取与对话摘要一起放入提示词的原始对话
+
+    保留最近raw_turns轮（每轮包含用户与AI各一条）对话，以及摘要尚未覆盖的全部对话，
+    摘要异步更新尚未完成时不会丢失最近的对话内容。
+
+    Args:
+        history: 按时间升序排列、带有id的对话记录列表
+        summarized_id: 摘要已覆盖的最后一条对话的id
+        raw_turns: 保留的原始对话轮数
+
+    Returns:
+        对话记录列表
+    """
+    recent = history[-raw_turns * 2 :] if raw_turns > 0 else []
+    unsummarized = [item for item in history if item.get("id", 0) > summarized_id]
+    return unsummarized if len(unsummarized) > len(recent) else recent
+
+
 class DiscussAgent:
     """
     讨论代理类，用于处理用户与AI之间的学术讨论。
@@ -95,12 +178,27 @@ class DiscussAgent:
             translator: 学术翻译器
             embedding_model: 向量模型
             vector_db: 向量数据库
+            intent_llm: 判断意图使用的语言模型，可使用响应更快的小模型，默认为reasoning_llm
+            speculative_search: 是否在判断意图的同时，用用户原始问题进行推测检索
+            speculation_threshold: 推测检索的查询与最终查询语句向量的余弦相似度不低于该值时，
+                直接使用推测检索的结果
+            classifier: 向量分类器，有把握判断用户意图无需检索时，跳过意图判断的语言模型调用
+            summary_llm: 更新对话摘要使用的语言模型，默认为llm
+            summary_max_length: 对话摘要的最大字数
         """
         self.llm = llm
         self.reasoning_llm = reasoning_llm
         self.translator = translator
         self.embedding_model = embedding_model
         self.vector_db = vector_db
+        self.intent_llm = kwargs.get("intent_llm") or reasoning_llm
+        self.speculative_search = kwargs.get("speculative_search", False)
+        self.speculation_threshold = kwargs.get("speculation_threshold", 0.85)
+        self.classifier = kwargs.get("classifier")
+        self.summary_llm = kwargs.get("summary_llm") or llm
+        self.summary_max_length = kwargs.get("summary_max_length", 500)
+        # 最近一次推测检索的结果：hit（使用）、miss（重新检索）、unused（无需检索）
+        self.speculation_status = ""
         
         # 设置默认检索参数
         self.top_k_per_section = kwargs.get("top_k_per_section", 5)
@@ -141,7 +239,8 @@ class DiscussAgent:
         
         Args:
             query: 用户查询
-            **kwargs: 其他参数，包括user_action, background, history, target_lang, request_params等
+            **kwargs: 其他参数，包括user_action, background, history, summary, target_lang,
+                request_params等，summary为history之前对话的摘要
             
         Returns:
             Tuple(回复文本, 检索结果列表, 其他元数据)
@@ -151,47 +250,76 @@ class DiscussAgent:
         user_action = kwargs.get("user_action", "")
         background = kwargs.get("background", "")
         history = kwargs.get("history", [])
+        summary = kwargs.get("summary", "")
         target_lang = kwargs.get("target_lang", "zh")
         request_params = kwargs.get("request_params", {})
         self.top_k_per_section = kwargs.get("top_k_per_section", self.top_k_per_section)
         self.vector_db_collection = kwargs.get("vector_db_collection", self.vector_db_collection)
         self.verbose = kwargs.get("verbose", self.verbose)
+        speculative_search = kwargs.get("speculative_search", self.speculative_search)
         
+        # 准备过滤条件
+        filter_str = self._query_filter(request_params)
+
+        # 向量分类器判断用户意图，有把握为无需检索的意图时不再调用语言模型
+        intent_vector = None
+        classified_intention = None
+        if self.classifier is not None:
+            intent_vector = self.classifier.embed(query)
+            label, _ = self.classifier.classify("discuss_intent", DISCUSS_INTENTS, query, intent_vector)
+            if label in NO_SEARCH_INTENTIONS:
+                classified_intention = label
+                self._verbose(f"<判断意图> 向量分类判断用户意图为: {label} </判断意图>")
+        if classified_intention == "无需回复":
+            return ()
+
+        # 推测检索：判断意图的同时，先用用户问题检索
+        speculation = None
+        self.speculation_status = ""
+        if speculative_search and classified_intention is None:
+            speculative_query = self._speculative_query(query, history)
+            speculation = _speculation_pool.submit(self._search, speculative_query, filter_str)
+
         # 格式化对话历史
-        formatted_history = ""
-        for item in history:
-            if item.get("role") == "user":
-                formatted_history += f"用户: {item.get('content', '')}\n"
-            else:
-                formatted_history += f"AI助理: {item.get('content', '')}\n\n"
-            
+        formatted_history = format_history(history, summary)
+
         # 第一步：判断用户意图和是否需要检索
-        prompt = DISCUSS_ACTION_PROMPT.format(
-            user_action=user_action,
-            background=background,
-            history=formatted_history,
-            query=query
-        )
-        
-        self._verbose(f"<判断意图> 分析用户问题意图... </判断意图>", debug_msg=f"prompt: {prompt}")
-        response = self.reasoning_llm.chat([{"role": "user", "content": prompt}])
-        self.usage = response.usage()
-        try:
-            # 解析LLM返回的JSON响应
-            content = response.content.strip()
-            # 处理可能的markdown代码块格式
-            if content.startswith("```json"):
-                content = content[7:]
-            if content.endswith("```"):
-                content = content[:-3]
-            content = content.strip()
+        if classified_intention is None:
+            messages = cached_prompt(
+                DISCUSS_ACTION_PROMPT,
+                user_action=user_action,
+                background=background,
+                history=formatted_history,
+                query=query
+            )
             
-            action_result = json.loads(content)
+            self._verbose(f"<判断意图> 分析用户问题意图... </判断意图>", debug_msg=f"prompt: {message_text(messages[0])}")
+            response = self.intent_llm.chat(messages)
+            self.usage = response.usage()
+        try:
+            if classified_intention is not None:
+                action_result = {"intention": classified_intention, "need_search": False}
+            else:
+                # 解析LLM返回的JSON响应
+                content = response.content.strip()
+                # 处理可能的markdown代码块格式
+                if content.startswith("```json"):
+                    content = content[7:]
+                if content.endswith("```"):
+                    content = content[:-3]
+                content = content.strip()
+                
+                action_result = json.loads(content)
+                # 记录语言模型的判断，用于修正向量分类器
+                if self.classifier is not None and action_result.get("intention") in DISCUSS_INTENTS:
+                    self.classifier.record("discuss_intent", action_result["intention"], query, intent_vector)
             intention = action_result.get("intention")
             need_search = action_result.get("need_search", False)
             search_query = action_result.get("search_query", "")
             
             # 检查是否需要回复
+            if intention == "无需回复" or not (need_search and search_query):
+                self._discard_speculation(speculation)
             if intention == "无需回复":
                 return ()
                 
@@ -199,18 +327,10 @@ class DiscussAgent:
             retrieval_results = []
             if need_search and search_query:
                 self._verbose(f"<检索> 正在检索文献，查询语句: '{search_query}' </检索>")
-                
-                # 准备过滤条件
-                filter_str = self._query_filter(request_params)
-                
-                # 执行检索
-                query_vector = self.embedding_model.embed_query(search_query)
-                retrieval_results = self.vector_db.search_data(
-                    collection=self.vector_db_collection,
-                    vector=query_vector,
-                    top_k=self.top_k_per_section,
-                    filter=filter_str
-                )
+                if speculation is not None:
+                    retrieval_results = self._resolve_speculation(speculation, search_query, filter_str)
+                else:
+                    _, _, retrieval_results = self._search(search_query, filter_str)
                 
                 self._verbose(f"<检索> 检索到 {len(retrieval_results)} 条文献")
             
@@ -220,7 +340,8 @@ class DiscussAgent:
                 formatted_results += f"[{result.metadata.get('reference_id', i+1)}] \n{result.text}\n\n"
             
             # 生成回复
-            answer_prompt = DISCUSS_ANSWER_PROMPT.format(
+            answer_messages = cached_prompt(
+                DISCUSS_ANSWER_PROMPT,
                 user_action=user_action,
                 background=background,
                 retrieval_results=formatted_results,
@@ -230,12 +351,100 @@ class DiscussAgent:
                 target_lang=target_lang
             )
             
-            self._verbose(f"<生成回复> 正在生成回复... </生成回复>", debug_msg=f"answer_prompt: {answer_prompt}")
-            return  self.llm.stream_generator([{"role": "user", "content": answer_prompt}])
+            self._verbose(f"<生成回复> 正在生成回复... </生成回复>", debug_msg=f"answer_prompt: {message_text(answer_messages[0])}")
+            return  self.llm.stream_generator(answer_messages)
             
         except json.JSONDecodeError as e:
+            self._discard_speculation(speculation)
             log.error(f"解析LLM响应失败: {e}")
             return 
+
+    def summarize_history(self, summary: str, history: List[dict]) -> Tuple[str, dict]:
+        """
+        将新增的对话合并到已有的对话摘要中
+
+        Args:
+            summary: 已有的对话摘要，没有时为空字符串
+            history: 摘要尚未覆盖的对话记录列表
+
+        Returns:
+            Tuple(新的对话摘要, token用量)
+        """
+        if not history:
+            return summary, {}
+        messages = cached_prompt(
+            DISCUSS_SUMMARY_PROMPT,
+            summary=summary or "无",
+            history=format_history(history),
+            max_length=self.summary_max_length,
+        )
+        response = self.summary_llm.chat(messages)
+        return response.content.strip(), response.usage()
+
+    def _speculative_query(self, query: str, history: List[dict]) -> str:
+        """推测检索使用的查询：用户问题过短时拼接上一轮的用户问题"""
+        if len(query.strip()) < SHORT_QUERY_LENGTH:
+            previous = [item.get("content", "") for item in history if item.get("role") == "user"]
+            if previous and previous[-1]:
+                return f"{previous[-1]} {query}"
+        return query
+
+    def _search(
+        self, search_query: str, filter_str: str, query_vector: Optional[List[float]] = None
+    ) -> Tuple[str, List[float], List[RetrievalResult]]:
+        """向量化查询语句并检索，返回(查询语句, 查询向量, 检索结果)"""
+        if query_vector is None:
+            query_vector = self.embedding_model.embed_query(search_query)
+        retrieval_results = self.vector_db.search_data(
+            collection=self.vector_db_collection,
+            vector=query_vector,
+            top_k=self.top_k_per_section,
+            filter=filter_str
+        )
+        return search_query, query_vector, retrieval_results
+
+    def _resolve_speculation(
+        self, speculation: Future, search_query: str, filter_str: str
+    ) -> List[RetrievalResult]:
+        """
+        查询语句与推测检索的查询足够相似时使用推测检索的结果，否则重新检索
+
+        Args:
+            speculation: 推测检索任务
+            search_query: 意图判断给出的查询语句
+            filter_str: 过滤条件
+
+        Returns:
+            检索结果列表
+        """
+        try:
+            speculative_query, speculative_vector, speculative_results = speculation.result()
+        except Exception as e:
+            log.warning(f"推测检索失败: {e}")
+            speculative_query = None
+        if speculative_query is not None and speculative_query.strip() == search_query.strip():
+            self.speculation_status = "hit"
+            return speculative_results
+
+        query_vector = self.embedding_model.embed_query(search_query)
+        if speculative_query is not None:
+            a = np.asarray(speculative_vector, dtype=np.float32)
+            b = np.asarray(query_vector, dtype=np.float32)
+            similarity = float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b) + 1e-12))
+            if similarity >= self.speculation_threshold:
+                self.speculation_status = "hit"
+                self._verbose(f"<检索> 使用推测检索结果，相似度: {similarity:.3f}")
+                return speculative_results
+            self._verbose(f"<检索> 推测检索查询相似度 {similarity:.3f} 过低，重新检索")
+        self.speculation_status = "miss"
+        _, _, retrieval_results = self._search(search_query, filter_str, query_vector)
+        return retrieval_results
+
+    def _discard_speculation(self, speculation: Optional[Future]):
+        """不需要检索时丢弃推测检索，未开始的任务直接取消"""
+        if speculation is not None:
+            speculation.cancel()
+            self.speculation_status = "unused"
     
     def _query_filter(self, request_params: dict) -> str:
         # 准备过滤条件
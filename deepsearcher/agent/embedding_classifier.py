@@ -0,0 +1,176 @@
+"""
+Embedding classifier for small routing decisions.
+
+Choosing an agent, a prompt template or the intent of a discussion reply each cost an LLM
+round trip. The classifier answers these decisions from embeddings instead: every label
+has a centroid computed from the embeddings of its descriptions and of the texts the LLM
+previously assigned to it, and a text is given the label of the nearest centroid. When the
+nearest centroid is not similar enough, or not clearly nearer than the second one, the
+caller escalates to the LLM and records the LLM's decision, which moves the centroids
+towards the texts seen in production.
+
+Decisions are appended to a JSON lines file, so they survive restarts.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.tools import log
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+
+class EmbeddingClassifier:
+    """Nearest-centroid classifier over text embeddings, shared by the agents of a process."""
+
+    def __init__(
+        self,
+        embedding_model: BaseEmbedding,
+        min_similarity: float = 0.6,
+        margin: float = 0.05,
+        decisions_path: Optional[str] = None,
+        max_examples: int = 200,
+        **kwargs,
+    ):
+        """
+        Initialize the classifier.
+
+        Args:
+            embedding_model: Model used to embed texts and label descriptions
+            min_similarity: Minimum cosine similarity between a text and the nearest centroid
+            margin: Minimum similarity gap between the nearest and the second nearest centroid
+            decisions_path: JSON lines file the recorded decisions are kept in, None to keep
+                them in memory only
+            max_examples: Maximum number of recorded decisions per label, older ones are dropped
+        """
+        self.embedding_model = embedding_model
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.decisions_path = decisions_path
+        self.max_examples = max_examples
+        self.stats = {"classified": 0, "escalated": 0, "recorded": 0}
+        self._lock = threading.Lock()
+        self._description_vectors: Dict[str, np.ndarray] = {}
+        # task -> label -> recent (text, vector) decisions, vectors are embedded on first use
+        self._examples: Dict[str, Dict[str, deque]] = defaultdict(dict)
+        self._load_decisions()
+
+    def _load_decisions(self) -> None:
+        if not self.decisions_path or not os.path.exists(self.decisions_path):
+            return
+        try:
+            with open(self.decisions_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        decision = json.loads(line)
+                        self._add_example(decision["task"], decision["label"], decision["text"])
+        except Exception as e:
+            log.warning(f"Failed to load classifier decisions {self.decisions_path}: {e}")
+
+    def _add_example(self, task: str, label: str, text: str, vector=None) -> None:
+        examples = self._examples[task].setdefault(label, deque(maxlen=self.max_examples))
+        examples.append([text, None if vector is None else _normalize(vector)])
+
+    def _description_vector(self, descriptions: List[str]) -> List[np.ndarray]:
+        missing = [text for text in descriptions if text not in self._description_vectors]
+        if missing:
+            for text, vector in zip(missing, self.embedding_model.embed_documents(missing)):
+                self._description_vectors[text] = _normalize(vector)
+        return [self._description_vectors[text] for text in descriptions]
+
+    def _centroids(self, task: str, labels: Dict[str, List[str]]) -> np.ndarray:
+        """One normalized centroid per label, from its descriptions and recorded decisions."""
+        with self._lock:
+            examples = self._examples.get(task, {})
+            pending = [
+                example
+                for label in labels
+                for example in examples.get(label, ())
+                if example[1] is None
+            ]
+            if pending:
+                vectors = self.embedding_model.embed_documents([text for text, _ in pending])
+                for example, vector in zip(pending, vectors):
+                    example[1] = _normalize(vector)
+            centroids = []
+            for label, descriptions in labels.items():
+                vectors = self._description_vector(list(descriptions))
+                vectors += [vector for _, vector in examples.get(label, ())]
+                centroids.append(_normalize(np.mean(vectors, axis=0)))
+            return np.stack(centroids)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed a text, to pass the same vector to `classify` and `record`."""
+        return _normalize(self.embedding_model.embed_query(text))
+
+    def classify(
+        self,
+        task: str,
+        labels: Dict[str, List[str]],
+        text: str,
+        vector: Optional[Sequence[float]] = None,
+    ) -> Tuple[Optional[str], float]:
+        """
+        Classify a text among the labels of a task.
+
+        Args:
+            task: Name of the decision, recorded decisions are kept per task
+            labels: Descriptions of each label, each label needs at least one description
+            text: Text to classify
+            vector: Embedding of the text, embedded when None
+
+        Returns:
+            Tuple of (label, similarity to its centroid), the label is None when the
+            classifier is not confident and the decision should be escalated
+        """
+        if len(labels) < 2:
+            return next(iter(labels), None), 1.0
+        centroids = self._centroids(task, labels)
+        if vector is None:
+            vector = self.embed(text)
+        similarities = centroids @ _normalize(vector)
+        second, best = np.argsort(similarities)[-2:]
+        similarity = float(similarities[best])
+        confident = (
+            similarity >= self.min_similarity
+            and similarity - float(similarities[second]) >= self.margin
+        )
+        with self._lock:
+            self.stats["classified" if confident else "escalated"] += 1
+        label = list(labels)[best]
+        log.debug(f"classifier {task}: {label} ({similarity:.3f}, confident={confident})")
+        return (label if confident else None), similarity
+
+    def record(
+        self, task: str, label: str, text: str, vector: Optional[Sequence[float]] = None
+    ) -> None:
+        """
+        Record the decision the LLM made for an escalated text.
+
+        Args:
+            task: Name of the decision
+            label: Label chosen by the LLM
+            text: Classified text
+            vector: Embedding of the text, embedded on next use when None
+        """
+        with self._lock:
+            self._add_example(task, label, text, vector)
+            self.stats["recorded"] += 1
+            if not self.decisions_path:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.decisions_path)), exist_ok=True)
+                with open(self.decisions_path, "a", encoding="utf-8") as f:
+                    decision = {"task": task, "label": label, "text": text}
+                    f.write(json.dumps(decision, ensure_ascii=False) + "\n")
+            except Exception as e:
+                log.warning(f"Failed to save classifier decision: {e}")
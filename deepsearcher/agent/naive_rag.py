@@ -1,11 +1,12 @@
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from deepsearcher.agent.base import RAGAgent
+from deepsearcher.agent.base import RAGAgent, pop_progress
 from deepsearcher.agent.collection_router import CollectionRouter
+from deepsearcher.agent.retrieval_executor import RetrievalExecutor
 from deepsearcher.embedding.base import BaseEmbedding
 from deepsearcher.llm.base import BaseLLM
 from deepsearcher.tools import log
-from deepsearcher.vector_db.base import BaseVectorDB, RetrievalResult, deduplicate_results
+from deepsearcher.vector_db.base import BaseVectorDB, RetrievalResult
 
 SUMMARY_PROMPT = """You are a AI content analysis expert, good at summarizing content. Please summarize a specific and detailed answer or report based on the previous queries and the retrieved document chunks.
 
@@ -32,31 +33,45 @@ class NaiveRAG(RAGAgent):
         self.vector_db = vector_db
         self.top_k = top_k
         self.route_collection = route_collection
-        if self.route_collection:
-            self.collection_router = CollectionRouter(llm=self.llm, vector_db=self.vector_db)
+        self.collection_router = kwargs.get("collection_router") or CollectionRouter(
+            llm=self.llm, vector_db=self.vector_db, embedding_model=self.embedding_model
+        )
         self.text_window_splitter = text_window_splitter
+        self.retrieval_executor = kwargs.get("retrieval_executor") or RetrievalExecutor(
+            self.vector_db
+        )
 
     def retrieve(self, query: str, **kwargs) -> Tuple[List[RetrievalResult], int, dict]:
+        progress = pop_progress(kwargs)
         consume_tokens = 0
+        query_vector = self.embedding_model.embed_query(query)
         if self.route_collection:
-            selected_collections, n_token_route = self.collection_router.invoke(query=query)
+            selected_collections, n_token_route = self.collection_router.invoke(
+                query=query, query_vector=query_vector
+            )
         else:
             selected_collections = self.collection_router.all_collections
             n_token_route = 0
         consume_tokens += n_token_route
-        all_retrieved_results = []
-        for collection in selected_collections:
-            retrieval_res = self.vector_db.search_data(
-                collection=collection,
-                vector=self.embedding_model.embed_query(query),
-                top_k=max(self.top_k // len(selected_collections), 1),
-            )
-            all_retrieved_results.extend(retrieval_res)
-        all_retrieved_results = deduplicate_results(all_retrieved_results)
+        if not selected_collections:
+            return [], consume_tokens, {}
+        all_retrieved_results = self.retrieval_executor.search(
+            selected_collections,
+            vector=query_vector,
+            top_k=max(self.top_k // len(selected_collections), 1),
+            query_text=query,
+        )
+        progress(
+            "search",
+            f"Retrieved {len(all_retrieved_results)} chunks from {selected_collections}",
+            collections=selected_collections,
+            results=len(all_retrieved_results),
+        )
         return all_retrieved_results, consume_tokens, {}
 
-    def query(self, query: str, **kwargs) -> Tuple[str, List[RetrievalResult], int]:
-        all_retrieved_results, n_token_retrieval, _ = self.retrieve(query)
+    def answer_messages(
+        self, query: str, all_retrieved_results: List[RetrievalResult], additional_info: dict
+    ) -> Optional[List[Dict]]:
         chunk_texts = []
         for chunk in all_retrieved_results:
             if self.text_window_splitter and "wider_text" in chunk.metadata:
@@ -68,7 +83,13 @@ class NaiveRAG(RAGAgent):
             mini_chunk_str += f"""<chunk_{i}>\n{chunk}\n</chunk_{i}>\n"""
 
         summary_prompt = SUMMARY_PROMPT.format(query=query, mini_chunk_str=mini_chunk_str)
-        char_response = self.llm.chat([{"role": "user", "content": summary_prompt}])
+        return [{"role": "user", "content": summary_prompt}]
+
+    def query(self, query: str, **kwargs) -> Tuple[str, List[RetrievalResult], int]:
+        all_retrieved_results, n_token_retrieval, additional_info = self.retrieve(query)
+        char_response = self.llm.chat(
+            self.answer_messages(query, all_retrieved_results, additional_info)
+        )
         final_answer = char_response.content
         log.color_print("\n==== FINAL ANSWER====\n")
         log.color_print(final_answer)
@@ -14,10 +14,11 @@ from tqdm import tqdm
 
 from deepsearcher.agent.academic_translator import AcademicTranslator
 from deepsearcher.agent.base import RAGAgent, describe_class
+from deepsearcher.agent.citation_resolver import get_citation_resolver
 from deepsearcher.agent.collection_router import CollectionRouter
-from deepsearcher.db.mysql_connection import get_mysql_connection
+from deepsearcher.agent.retrieval_executor import RetrievalExecutor
 from deepsearcher.embedding.base import BaseEmbedding
-from deepsearcher.llm.base import BaseLLM
+from deepsearcher.llm.base import BaseLLM, cached_messages, cached_prompt
 from deepsearcher.tools import log
 from deepsearcher.vector_db import RetrievalResult
 from deepsearcher.vector_db.base import BaseVectorDB, deduplicate_results
@@ -27,8 +28,7 @@ STRUCTURE_PROMPT = """
 You are an academic research assistant tasked with planning a comprehensive literature review on a specific topic.
 
 Generate appropriate search queries for each section of the literature review structure below. The goal is to retrieve relevant academic content from our knowledge base for each section.
-
-Research Topic: <topic>
+The research topic is given at the end.
 
 For each section, please provide:
 1. A focused search query that will help retrieve the most relevant content from our academic database
@@ -78,6 +78,8 @@ Condition Syntax:
 
 Ensure your queries are specific, academic in nature, and designed to retrieve comprehensive information for each section.
 Output the JSON response directly without any comments or explanations.
+
+Research Topic: <topic>
 """
 
 REWRITE_SEARCH_QUERY_PROMPT = """
@@ -97,13 +99,7 @@ Please output the rewritten search query directly.
 
 # Section content generation prompt
 SECTION_GENERATION_PROMPT = """
-You are an academic writer specializing in creating comprehensive literature reviews. Based on the retrieved academic content, write a detailed section for a literature review.
-
-Section: {section_name}
-Topic: {topic}
-
-Retrieved Content:
-{retrieved_content}
+You are an academic writer specializing in creating comprehensive literature reviews. Based on the retrieved academic content given below, write a detailed section for a literature review.
 
 Guidelines:
 1. Write a cohesive, well-structured section that thoroughly covers the topic based on the retrieved content
@@ -115,6 +111,12 @@ Guidelines:
 7. Ensure logical flow within the section
 
 Your response should be a polished section ready for inclusion in the final literature review.
+
+Section: {section_name}
+Topic: {topic}
+
+Retrieved Content:
+{retrieved_content}
 """
 
 # Complete the final paper prompt
@@ -200,11 +202,6 @@ Based on the provided literature review content, please generate two distinct se
 - Discuss potential future research directions
 - Maintain academic tone and style
 
-Research Topic: {topic}
-
-Literature Review Content:
-{review_content}
-
 Please format your response as follows:
 
 ABSTRACT:
@@ -212,6 +209,11 @@ ABSTRACT:
 
 CONCLUSION:
 [Your conclusion text here]
+
+Research Topic: {topic}
+
+Literature Review Content:
+{review_content}
 """
 
 
@@ -258,10 +260,16 @@ class OverviewRAG(RAGAgent):
         self.vector_db = vector_db
         self.route_collection = route_collection
         self.rbase_settings = rbase_settings
+        self.citation_resolver = get_citation_resolver(rbase_settings.get("database", {}))
         if route_collection:
-            self.collection_router = CollectionRouter(llm=self.llm, vector_db=self.vector_db)
+            self.collection_router = kwargs.get("collection_router") or CollectionRouter(
+                llm=self.llm, vector_db=self.vector_db, embedding_model=self.embedding_model
+            )
         else:
             self.collection_router = None
+        self.retrieval_executor = kwargs.get("retrieval_executor") or RetrievalExecutor(
+            self.vector_db
+        )
 
         if kwargs.get("top_k_per_section"):
             self.top_k_per_section = kwargs.get("top_k_per_section")
@@ -303,8 +311,9 @@ class OverviewRAG(RAGAgent):
         Returns:
             Language code: 'en', 'zh', or 'mixed'
         """
-        prompt = LANGUAGE_DETECT_PROMPT.format(text=text)
-        response = self.llm.chat([{"role": "user", "content": prompt}])
+        response = self.llm.cached_chat(
+            cached_prompt(LANGUAGE_DETECT_PROMPT, text=text), prompt_type="language_detect"
+        )
         language = response.content.strip().lower()
 
         # Validate the response
@@ -324,9 +333,9 @@ class OverviewRAG(RAGAgent):
         Returns:
             Tuple of (cleaned text, tokens used)
         """
-        prompt = CLEAN_TEXT_PROMPT.format(text=text)
-
-        response = self.llm.chat([{"role": "user", "content": prompt}])
+        response = self.llm.cached_chat(
+            cached_prompt(CLEAN_TEXT_PROMPT, text=text), prompt_type="clean_text"
+        )
         cleaned_text = response.content.strip()
 
         return cleaned_text, response.total_tokens
@@ -365,8 +374,8 @@ class OverviewRAG(RAGAgent):
         Returns:
             Dictionary mapping section names to search queries and conditions
         """
-        prompt = STRUCTURE_PROMPT.replace("<topic>", topic)
-        response = self.reasoning_llm.chat([{"role": "user", "content": prompt}])
+        prefix, _, suffix = STRUCTURE_PROMPT.partition("<topic>")
+        response = self.reasoning_llm.chat(cached_messages(prefix, topic + suffix))
 
         # Parse the response to get the dictionary
         try:
@@ -443,7 +452,9 @@ class OverviewRAG(RAGAgent):
         # Determine which collections to search
         if self.route_collection:
             # Use CollectionRouter to select appropriate collections
-            selected_collections, n_token_route = self.collection_router.invoke(query=query)
+            selected_collections, n_token_route = self.collection_router.invoke(
+                query=query, query_vector=query_vector
+            )
             consumed_tokens += n_token_route
             log.color_print(
                 f"<search> Collection router selected: {selected_collections} </search>"
@@ -454,15 +465,17 @@ class OverviewRAG(RAGAgent):
 
         accepted_results = []
 
-        for collection in selected_collections:
-            # Retrieve results from vector database
-            retrieved_results = self.vector_db.search_data(
-                collection=collection,
-                vector=query_vector,
-                top_k=self.top_k_per_section,
-                filter=filter,
-            )
+        # Retrieve results from all selected collections concurrently
+        results_by_collection = self.retrieval_executor.search_collections(
+            selected_collections,
+            vector=query_vector,
+            top_k=self.top_k_per_section,
+            filter=filter,
+            query_text=query,
+            plan_filter=True,
+        )
 
+        for collection, retrieved_results in results_by_collection.items():
             if self.verbose:
                 log.debug(
                     f"{len(retrieved_results)} chunks retrived in '{collection}' for query: '{query}'"
@@ -476,11 +489,14 @@ class OverviewRAG(RAGAgent):
 
             # Rerank results based on query relevance
             for retrieved_result in tqdm(retrieved_results, desc="Reranking results"):
-                rerank_prompt = RERANK_PROMPT.format(
-                    query=query, retrieved_chunk=f"<chunk>{retrieved_result.text}</chunk>"
+                chat_response = self.llm.cached_chat(
+                    messages=cached_prompt(
+                        RERANK_PROMPT,
+                        query=query,
+                        retrieved_chunk=f"<chunk>{retrieved_result.text}</chunk>",
+                    ),
+                    prompt_type="rerank",
                 )
-
-                chat_response = self.llm.chat(messages=[{"role": "user", "content": rerank_prompt}])
                 consumed_tokens += chat_response.total_tokens
                 response_content = chat_response.content.strip()
 
@@ -543,11 +559,14 @@ class OverviewRAG(RAGAgent):
         retrieved_content = "\n\n".join(chunk_texts)
 
         # Generate section content
-        prompt = SECTION_GENERATION_PROMPT.format(
-            section_name=section, topic=topic, retrieved_content=retrieved_content
+        messages = cached_prompt(
+            SECTION_GENERATION_PROMPT,
+            section_name=section,
+            topic=topic,
+            retrieved_content=retrieved_content,
         )
 
-        response = self.writing_llm.chat([{"role": "user", "content": prompt}])
+        response = self.writing_llm.chat(messages)
 
         return response.content, response.total_tokens
 
@@ -567,9 +586,9 @@ class OverviewRAG(RAGAgent):
         Returns:
             Tuple of (compiled final review, tokens used)
         """
-        prompt = COMPILE_REVIEW_PROMPT.format(topic=topic, draft_text=draft_text)
+        messages = cached_prompt(COMPILE_REVIEW_PROMPT, topic=topic, draft_text=draft_text)
 
-        response = self.writing_llm.chat([{"role": "user", "content": prompt}])
+        response = self.writing_llm.chat(messages)
 
         return response.content, response.total_tokens
 
@@ -586,9 +605,11 @@ class OverviewRAG(RAGAgent):
         Returns:
             Tuple of (abstract text, conclusion text, tokens used)
         """
-        prompt = ABSTRACT_CONCLUSION_PROMPT.format(topic=topic, review_content=review_content)
+        messages = cached_prompt(
+            ABSTRACT_CONCLUSION_PROMPT, topic=topic, review_content=review_content
+        )
 
-        response = self.reasoning_llm.chat([{"role": "user", "content": prompt}])
+        response = self.reasoning_llm.chat(messages)
 
         # Parse the response to extract abstract and conclusion
         content = response.content.strip()
@@ -616,71 +637,7 @@ class OverviewRAG(RAGAgent):
         Returns:
             Tuple of (reorganized text, reference list, tokens used)
         """
-        import re
-
-        # First, convert multiple citations in a single bracket to separate citations
-        # e.g., [123, 456] -> [123][456]
-        text = re.sub(
-            r"\[(\d+)\s*,\s*(\d+)\s*(?:,\s*\d+\s*)*\]",
-            lambda m: "".join(f"[{id}]" for id in m.group(1).split(",") + m.group(2).split(",")),
-            text,
-        )
-
-        # Extract all citation IDs
-        reference_pattern = r"\[(\d+)\]"
-        reference_ids = re.findall(reference_pattern, text)
-
-        if not reference_ids:
-            return text, "", 0
-
-        # Deduplicate while maintaining order
-        unique_ids = []
-        seen = set()
-        for ref_id in reference_ids:
-            if ref_id not in seen:
-                unique_ids.append(ref_id)
-                seen.add(ref_id)
-
-        conn = get_mysql_connection(self.rbase_settings.get("database", {}))
-        # Get reference information from database
-        references = []
-        try:
-            with conn.cursor() as cursor:
-                for ref_id in unique_ids:
-                    # Query article information from database
-                    query = f"SELECT title, journal_name, authors, doi, pubdate FROM article WHERE id = {ref_id}"
-                    cursor.execute(query)
-                    article = cursor.fetchone()
-
-                    if not article:
-                        references.append(
-                            f"some authors, some title, some journal, some year, some doi for some article {ref_id}"
-                        )
-                        continue
-
-                    # Process author list
-                    authors = article["authors"].split(",")
-                    if len(authors) > 5:
-                        authors = authors[:5] + ["et al"]
-                    authors_str = ", ".join(authors)
-
-                    # Process publication year
-                    year = article["pubdate"].year
-
-                    # Generate citation description
-                    reference = f"[{len(references) + 1}] {authors_str}. {article['title']}. {article['journal_name']}. {year};{article['doi']}"
-                    references.append(reference)
-        except Exception as e:
-            log.critical(f"Failed to get reference information from database: {e}")
-            return text, "", 0
-
-        # Replace citations in text
-        new_text = text
-        for i, ref_id in enumerate(unique_ids):
-            new_text = new_text.replace(f"[{ref_id}]", f"[{i + 1}]")
-
-        # Generate references list
-        references_text = "\n\n".join(references)
+        new_text, references_text = self.citation_resolver.reorganize(text)
 
         if self.verbose:
             log.debug(f"References list: {references_text}")
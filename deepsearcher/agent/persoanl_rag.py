@@ -14,10 +14,11 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from deepsearcher.agent.academic_translator import AcademicTranslator
 from deepsearcher.agent.base import describe_class
+from deepsearcher.agent.citation_resolver import format_authors
 from deepsearcher.agent.overview_rag import OverviewRAG
+from deepsearcher.db.mysql_connection import mysql_connection
 from deepsearcher.embedding.base import BaseEmbedding
-from deepsearcher.llm.base import BaseLLM
-from deepsearcher.rbase_db_loading import get_mysql_connection
+from deepsearcher.llm.base import BaseLLM, cached_prompt
 from deepsearcher.tools import log
 from deepsearcher.vector_db import RetrievalResult
 from deepsearcher.vector_db.base import BaseVectorDB, deduplicate_results
@@ -589,9 +590,11 @@ class PersonalRAG(OverviewRAG):
         Returns:
             Author ID if found, None otherwise
         """
-        conn = get_mysql_connection(self.rbase_settings.get("database", {}))
         try:
-            with conn.cursor() as cursor:
+            with (
+                mysql_connection(self.rbase_settings.get("database", {})) as conn,
+                conn.cursor() as cursor,
+            ):
                 if author_info["language"] == "en":
                     query = "SELECT id, ename, cname FROM author WHERE ename = %s"
                     cursor.execute(query, (author_info["name"],))
@@ -617,9 +620,11 @@ class PersonalRAG(OverviewRAG):
         Returns:
             List of article dictionaries
         """
-        conn = get_mysql_connection(self.rbase_settings.get("database", {}))
         try:
-            with conn.cursor() as cursor:
+            with (
+                mysql_connection(self.rbase_settings.get("database", {})) as conn,
+                conn.cursor() as cursor,
+            ):
                 # Get articles ordered by impact factor and pubdate
                 query = """
                     SELECT a.id, a.title, a.journal_name, a.pubdate, a.doi, a.summary, a.impact_factor
@@ -736,8 +741,16 @@ Summary: {article["summary"]}
         """
         log.color_print("<optimizing> Generating references from articles... </optimizing>")
         references = []
+        # Author articles are queried without their author lists
+        try:
+            metadata = self.citation_resolver.fetch_articles(
+                article["id"] for article in articles if article.get("id")
+            )
+        except RuntimeError:
+            metadata = {}
 
         for i, article in enumerate(articles):
+            article = {**article, **metadata.get(article.get("id"), {})}
             # Process publication year
             try:
                 year = article["pubdate"].year
@@ -746,10 +759,7 @@ Summary: {article["summary"]}
 
             # Generate reference entry
             try:
-                authors = article.get("authors", "").split(",")
-                if len(authors) > 5:
-                    authors = authors[:5] + ["et al"]
-                authors_str = ", ".join([a.strip() for a in authors if a.strip()])
+                authors_str = format_authors(article.get("authors"))
                 if not authors_str:
                     authors_str = "Author(s)"
 
@@ -1113,9 +1123,12 @@ Summary: {article["summary"]}
             return ""
 
         consumed_tokens = 0
+        query_vectors = [self.embedding_model.embed_query(question) for question in questions]
         if self.route_collection:
             # Use CollectionRouter to select appropriate collections
-            selected_collections, n_token_route = self.collection_router.invoke(query=questions[0])
+            selected_collections, n_token_route = self.collection_router.invoke(
+                query=questions[0], query_vector=query_vectors[0]
+            )
             consumed_tokens += n_token_route
             if self.verbose:
                 log.debug(f"<search> Collection router selected: {selected_collections} </search>")
@@ -1126,8 +1139,7 @@ Summary: {article["summary"]}
                 log.debug(f"<search> Using provided collection: {self.vector_db_collection} </search>")
 
         all_results = []
-        for question in questions:
-            query_vector = self.embedding_model.embed_query(question)
+        for question, query_vector in zip(questions, query_vectors):
             for collection in selected_collections:
                 try:
                     # 搜索向量数据库
@@ -1136,6 +1148,8 @@ Summary: {article["summary"]}
                         vector=query_vector,
                         filter=f"ARRAY_CONTAINS(author_ids, {author_id})",
                         top_k=self.top_k_per_section,
+                        query_text=question,
+                        plan_filter=True,
                     )
 
                     # 过滤并提取文本
@@ -1167,10 +1181,11 @@ Summary: {article["summary"]}
         Returns:
             如果相关则返回True，否则返回False
         """
-        prompt = RERANK_PROMPT.format(query=query, retrieved_chunk=chunk)
-
         try:
-            response = self.llm.chat([{"role": "user", "content": prompt}])
+            response = self.llm.cached_chat(
+                cached_prompt(RERANK_PROMPT, query=query, retrieved_chunk=chunk),
+                prompt_type="rerank",
+            )
             return "YES" in response.content.upper()
         except Exception as e:
             log.error(f"Error in relevance check: {e}")
@@ -1,7 +1,8 @@
-from typing import List, Optional, Tuple
+from typing import Generator, List, Optional, Tuple
 
 from deepsearcher.agent import RAGAgent
-from deepsearcher.llm.base import BaseLLM
+from deepsearcher.agent.embedding_classifier import EmbeddingClassifier
+from deepsearcher.llm.base import BaseLLM, cached_prompt
 from deepsearcher.tools import log
 from deepsearcher.vector_db import RetrievalResult
 
@@ -24,8 +25,19 @@ class RAGRouter(RAGAgent):
         llm: BaseLLM,
         rag_agents: List[RAGAgent],
         agent_descriptions: Optional[List[str]] = None,
+        classifier: Optional[EmbeddingClassifier] = None,
     ):
+        """
+        Initialize the router.
+
+        Args:
+            llm: Language model used to select the agent
+            rag_agents: Agents to route between
+            agent_descriptions: Description of each agent, the class descriptions when None
+            classifier: Classifier that selects the agent without the LLM when it is confident
+        """
         self.llm = llm
+        self.classifier = classifier
         self.rag_agents = rag_agents
         self.agent_descriptions = agent_descriptions
         if not self.agent_descriptions:
@@ -39,11 +51,27 @@ class RAGRouter(RAGAgent):
                 )
 
     def _route(self, query: str) -> Tuple[RAGAgent, int]:
+        vector = None
+        if self.classifier is not None:
+            labels = {
+                str(i): [description] for i, description in enumerate(self.agent_descriptions)
+            }
+            vector = self.classifier.embed(query)
+            label, _ = self.classifier.classify("rag_route", labels, query, vector)
+            if label is not None:
+                selected_agent = self.rag_agents[int(label)]
+                log.color_print(
+                    f"<think> Select agent [{selected_agent.__class__.__name__}] to answer the query [{query}] </think>\n"
+                )
+                return selected_agent, 0
+
         description_str = "\n".join(
             [f"[{i + 1}]: {description}" for i, description in enumerate(self.agent_descriptions)]
         )
-        prompt = RAG_ROUTER_PROMPT.format(query=query, description_str=description_str)
-        chat_response = self.llm.chat(messages=[{"role": "user", "content": prompt}])
+        chat_response = self.llm.cached_chat(
+            messages=cached_prompt(RAG_ROUTER_PROMPT, query=query, description_str=description_str),
+            prompt_type="rag_route",
+        )
         try:
             selected_agent_index = int(chat_response.content) - 1
         except ValueError:
@@ -54,6 +82,8 @@ class RAGRouter(RAGAgent):
             selected_agent_index = int(self.find_last_digit(chat_response.content)) - 1
 
         selected_agent = self.rag_agents[selected_agent_index]
+        if self.classifier is not None:
+            self.classifier.record("rag_route", str(selected_agent_index), query, vector)
         log.color_print(
             f"<think> Select agent [{selected_agent.__class__.__name__}] to answer the query [{query}] </think>\n"
         )
@@ -69,6 +99,19 @@ class RAGRouter(RAGAgent):
         answer, retrieved_results, n_token_retrieval = agent.query(query, **kwargs)
         return answer, retrieved_results, n_token_router + n_token_retrieval
 
+    def query_stream(self, query: str, **kwargs) -> Generator[dict, None, None]:
+        agent, n_token_router = self._route(query)
+        yield {
+            "type": "progress",
+            "stage": "route",
+            "message": f"Select agent [{agent.__class__.__name__}]",
+            "agent": agent.__class__.__name__,
+        }
+        for event in agent.query_stream(query, **kwargs):
+            if event["type"] == "done":
+                event["tokens"] += n_token_router
+            yield event
+
     def find_last_digit(self, string):
         for char in reversed(string):
             if char.isdigit():
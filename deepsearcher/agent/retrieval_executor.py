@@ -0,0 +1,154 @@
+"""
+Concurrent multi-collection retrieval.
+
+Agents that route a query to several collections search all of them with the same
+query vector. The RetrievalExecutor fans these searches out on a thread pool, bounds
+each collection search and the whole fan-out by a timeout, and merges the results.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from deepsearcher.tools import log
+from deepsearcher.vector_db.base import BaseVectorDB, RetrievalResult, deduplicate_results
+
+
+class RetrievalExecutor:
+    """
+    Search several collections of a vector database concurrently.
+
+    A single executor can be shared by several agents, its thread pool is created once.
+    """
+
+    def __init__(
+        self,
+        vector_db: BaseVectorDB,
+        max_workers: int = 8,
+        collection_timeout: float = 10.0,
+        deadline: float = 30.0,
+        larger_score_first: bool = False,
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            vector_db: Vector database to search
+            max_workers: Maximum number of concurrent collection searches
+            collection_timeout: Seconds allowed for the search of one collection
+            deadline: Seconds allowed for the whole fan-out
+            larger_score_first: Whether a larger score means a closer match. Milvus
+                collections use the L2 metric by default, where smaller distances are closer.
+        """
+        self.vector_db = vector_db
+        self.collection_timeout = collection_timeout
+        self.deadline = deadline
+        self.larger_score_first = larger_score_first
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="retrieval")
+
+    def search_collections(
+        self,
+        collections: List[str],
+        vector: Union[np.array, List[float]],
+        top_k: int = 5,
+        filter: Optional[str] = "",
+        **kwargs,
+    ) -> Dict[str, List[RetrievalResult]]:
+        """
+        Search every collection with the same vector.
+
+        Collections that fail or time out contribute an empty result list.
+
+        Args:
+            collections: Collection names
+            vector: Query vector
+            top_k: Number of results per collection
+            filter: Filter expression applied in every collection
+            **kwargs: Extra arguments passed to `search_data`
+
+        Returns:
+            Mapping from collection name to its results, in the order of `collections`
+        """
+        if len(collections) == 1:
+            collection = collections[0]
+            return {collection: self._search_one(collection, vector, top_k, filter, **kwargs)}
+
+        start = time.monotonic()
+        futures = {
+            collection: self.pool.submit(
+                self._search_one, collection, vector, top_k, filter, **kwargs
+            )
+            for collection in collections
+        }
+        results = {}
+        for collection, future in futures.items():
+            timeout = min(self.collection_timeout, self.deadline) - (time.monotonic() - start)
+            try:
+                results[collection] = future.result(timeout=max(timeout, 0))
+            except FutureTimeoutError:
+                future.cancel()
+                log.warning(f"search in collection '{collection}' timed out, skip it")
+                results[collection] = []
+        return results
+
+    def search(
+        self,
+        collections: List[str],
+        vector: Union[np.array, List[float]],
+        top_k: int = 5,
+        filter: Optional[str] = "",
+        limit: Optional[int] = None,
+        **kwargs,
+    ) -> List[RetrievalResult]:
+        """
+        Search every collection and merge the results by score.
+
+        Args:
+            collections: Collection names
+            vector: Query vector
+            top_k: Number of results per collection
+            filter: Filter expression applied in every collection
+            limit: Maximum number of merged results, unlimited by default
+            **kwargs: Extra arguments passed to `search_data`
+
+        Returns:
+            Deduplicated results, best match first
+        """
+        results_by_collection = self.search_collections(
+            collections, vector, top_k=top_k, filter=filter, **kwargs
+        )
+        return self.merge(list(results_by_collection.values()), limit=limit)
+
+    def merge(
+        self, result_lists: List[List[RetrievalResult]], limit: Optional[int] = None
+    ) -> List[RetrievalResult]:
+        merged = [result for results in result_lists for result in results]
+        if merged and all("rrf_score" in result.metadata for result in merged):
+            # Hybrid results are ranked by their fused score rather than the vector distance
+            merged.sort(key=lambda result: result.metadata["rrf_score"], reverse=True)
+        else:
+            merged.sort(key=lambda result: result.score, reverse=self.larger_score_first)
+        merged = deduplicate_results(merged)
+        return merged[:limit] if limit else merged
+
+    def _search_one(
+        self,
+        collection: str,
+        vector: Union[np.array, List[float]],
+        top_k: int,
+        filter: Optional[str],
+        **kwargs,
+    ) -> List[RetrievalResult]:
+        try:
+            return self.vector_db.search_data(
+                collection=collection, vector=vector, top_k=top_k, filter=filter, **kwargs
+            )
+        except Exception as e:
+            log.warning(f"fail to search collection '{collection}', error info: {e}")
+            return []
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
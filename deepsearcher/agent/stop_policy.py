@@ -0,0 +1,213 @@
+"""
+Early stopping policies of the iterative agents.
+
+`ChainOfRAG` runs rounds of follow-up query, retrieval, intermediate answer and supporting
+document selection. After each round its stop policies are evaluated in order, and the
+first policy that fires ends the retrieval early. Policies that only look at the state of
+the chain cost nothing, so they should come before `LLMSufficiencyPolicy`, which asks the
+LLM whether the main query can already be answered.
+"""
+
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+from deepsearcher.llm.base import BaseLLM
+from deepsearcher.tools import log
+from deepsearcher.vector_db import RetrievalResult
+
+REFLECTION_PROMPT = """Given the following intermediate queries and answers, judge whether you have enough information to answer the main query. If you believe you have enough information, respond with “Yes”, otherwise respond with “No”.
+
+## Intermediate queries and answers
+{intermediate_context}
+
+## Main query
+{query}
+
+Respond with “Yes” or “No” only, do not explain yourself or output anything else.
+"""
+
+NO_ANSWER = "No relevant information found"
+
+
+@dataclass
+class ChainState:
+    """State of an iterative retrieval after a round."""
+
+    query: str
+    iteration: int = 0
+    intermediate_contexts: List[str] = field(default_factory=list)
+    intermediate_answer: str = ""
+    # Results retrieved in the last round, and those of them supporting its answer
+    retrieved_results: List[RetrievalResult] = field(default_factory=list)
+    supported_results: List[RetrievalResult] = field(default_factory=list)
+    # Share of the results of the last round that had not been retrieved in earlier rounds
+    novelty: float = 1.0
+    token_usage: int = 0
+    started: float = field(default_factory=time.monotonic)
+    _seen_texts: Set[str] = field(default_factory=set, repr=False)
+
+    def add_round(
+        self,
+        intermediate_answer: str,
+        retrieved_results: List[RetrievalResult],
+        supported_results: List[RetrievalResult],
+        token_usage: int,
+    ) -> None:
+        """Update the state with the outcome of a round."""
+        self.iteration += 1
+        self.intermediate_answer = intermediate_answer
+        self.retrieved_results = retrieved_results
+        self.supported_results = supported_results
+        self.token_usage += token_usage
+        texts = {result.text for result in retrieved_results}
+        self.novelty = len(texts - self._seen_texts) / len(texts) if texts else 0.0
+        self._seen_texts |= texts
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+
+class StopPolicy(ABC):
+    """Decides after a round whether an iterative retrieval should stop."""
+
+    name = ""
+
+    @abstractmethod
+    def should_stop(self, state: ChainState) -> Tuple[Optional[str], int]:
+        """
+        Evaluate the policy.
+
+        Args:
+            state: State of the retrieval after the last round
+
+        Returns:
+            Tuple of (reason to stop or None to continue, tokens used by the evaluation)
+        """
+
+
+class LLMSufficiencyPolicy(StopPolicy):
+    """Stop when the LLM judges the intermediate answers sufficient for the main query."""
+
+    name = "llm"
+
+    def __init__(self, llm: BaseLLM, **kwargs):
+        self.llm = llm
+
+    def should_stop(self, state: ChainState) -> Tuple[Optional[str], int]:
+        chat_response = self.llm.chat(
+            [
+                {
+                    "role": "user",
+                    "content": REFLECTION_PROMPT.format(
+                        intermediate_context="\n".join(state.intermediate_contexts),
+                        query=state.query,
+                    ),
+                }
+            ]
+        )
+        sufficient = chat_response.content.strip().strip("“”\"'").lower().startswith("yes")
+        reason = "llm: enough information to answer" if sufficient else None
+        return reason, chat_response.total_tokens
+
+
+class AnswerConfidencePolicy(StopPolicy):
+    """
+    Stop when the last intermediate answer is well supported.
+
+    The confidence of an answer is the share of the documents retrieved for it that were
+    selected as supporting it, an answer without relevant information has no confidence.
+    """
+
+    name = "confidence"
+
+    def __init__(self, threshold: float = 0.8, **kwargs):
+        self.threshold = threshold
+
+    def should_stop(self, state: ChainState) -> Tuple[Optional[str], int]:
+        if not state.retrieved_results or NO_ANSWER in state.intermediate_answer:
+            return None, 0
+        confidence = len(state.supported_results) / len(state.retrieved_results)
+        if confidence >= self.threshold:
+            return f"confidence: {confidence:.2f} >= {self.threshold}", 0
+        return None, 0
+
+
+class RetrievalNoveltyPolicy(StopPolicy):
+    """Stop when a round retrieves few documents that earlier rounds had not found."""
+
+    name = "novelty"
+
+    def __init__(self, min_novelty: float = 0.1, **kwargs):
+        self.min_novelty = min_novelty
+
+    def should_stop(self, state: ChainState) -> Tuple[Optional[str], int]:
+        if state.iteration > 1 and state.novelty < self.min_novelty:
+            return f"novelty: {state.novelty:.2f} < {self.min_novelty}", 0
+        return None, 0
+
+
+class BudgetPolicy(StopPolicy):
+    """Stop when the tokens or the time spent reach a budget, 0 disables a limit."""
+
+    name = "budget"
+
+    def __init__(self, max_tokens: int = 0, max_seconds: float = 0, **kwargs):
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+
+    def should_stop(self, state: ChainState) -> Tuple[Optional[str], int]:
+        if self.max_tokens and state.token_usage >= self.max_tokens:
+            return f"budget: {state.token_usage} tokens >= {self.max_tokens}", 0
+        if self.max_seconds and state.elapsed >= self.max_seconds:
+            return f"budget: {state.elapsed:.1f}s >= {self.max_seconds}s", 0
+        return None, 0
+
+
+STOP_POLICIES: Dict[str, Type[StopPolicy]] = {
+    policy.name: policy
+    for policy in (
+        LLMSufficiencyPolicy,
+        AnswerConfidencePolicy,
+        RetrievalNoveltyPolicy,
+        BudgetPolicy,
+    )
+}
+
+
+def build_stop_policies(policy_configs: List[dict], llm: BaseLLM) -> List[StopPolicy]:
+    """
+    Create stop policies from configuration.
+
+    Args:
+        policy_configs: One dictionary per policy, with the policy name as `type` and the
+            arguments of the policy, e.g. `{"type": "novelty", "min_novelty": 0.1}`
+        llm: Language model of the LLM sufficiency check
+
+    Returns:
+        The policies in configuration order
+    """
+    policies = []
+    for policy_config in policy_configs or []:
+        policy_config = dict(policy_config)
+        name = policy_config.pop("type", "")
+        if name not in STOP_POLICIES:
+            log.warning(f"Unknown stop policy: {name}")
+            continue
+        policies.append(STOP_POLICIES[name](llm=llm, **policy_config))
+    return policies
+
+
+def evaluate_stop_policies(
+    policies: List[StopPolicy], state: ChainState
+) -> Tuple[Optional[str], int]:
+    """Evaluate policies in order until one fires, returning its reason and the tokens used."""
+    token_usage = 0
+    for policy in policies:
+        reason, n_token = policy.should_stop(state)
+        token_usage += n_token
+        if reason:
+            return reason, token_usage
+    return None, token_usage
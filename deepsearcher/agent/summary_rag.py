@@ -7,7 +7,7 @@
 from typing import List, Tuple, Generator, Dict
 from deepsearcher.agent.base import RAGAgent, describe_class
 from deepsearcher.rbase.rbase_article import RbaseArticle
-from deepsearcher.llm.base import BaseLLM
+from deepsearcher.llm.base import BaseLLM, cached_prompt, message_text
 from deepsearcher.vector_db import RetrievalResult
 from deepsearcher.tools.log import debug
 from deepsearcher import configuration
@@ -23,6 +23,9 @@ PROMPT_MATCHES = {
     "opportunity_zh":  "opportunity_01",
 }
 
+# 目标语言对应的模板语言
+TEMPLATE_LANGS = {"zh": "Chinense", "en": "English"}
+
 class SummaryPromptTemplate:
     id = ""
     lang = "zh"
@@ -45,6 +48,12 @@ class SummaryPromptTemplate:
         """
         return self.prompt.format(**user_params)
 
+    def generate_messages(self, user_params: dict) -> List[Dict]:
+        """
+        根据用户参数生成消息，模板中第一个参数之前的固定说明标记为可缓存的前缀
+        """
+        return cached_prompt(self.prompt, **user_params)
+
 
 @describe_class(
     "This agent is designed to generate comprehensive academic summary on research articles following a structured approach with multiple sections."
@@ -53,8 +62,16 @@ class SummaryRag(RAGAgent):
     """文章总结生成器"""
     
     def __init__(self, reasoning_llm: BaseLLM, writing_llm: BaseLLM, **kwargs):
-        """初始化总结生成器"""
+        """
+        初始化总结生成器
+
+        Args:
+            reasoning_llm: 选择模板使用的语言模型
+            writing_llm: 生成总结使用的语言模型
+            classifier: 向量分类器，有把握时不经过语言模型直接选择模板
+        """
         super().__init__(**kwargs)
+        self.classifier = kwargs.get("classifier")
         self.verbose = configuration.config.rbase_settings.get("verbose", False)
         self.reasoning_llm = reasoning_llm
         self.writing_llm = writing_llm
@@ -128,12 +145,12 @@ class SummaryRag(RAGAgent):
         params["query"] = query
         params["articles_info"] = articles_info
         params = self._format_user_params(params)
-        prompt = prompt_template.generate_prompt(user_params=params)
+        messages = prompt_template.generate_messages(user_params=params)
         if self.verbose:
-            debug(f"prompt: {prompt}")
+            debug(f"prompt: {message_text(messages[0])}")
         
         # 调用LLM生成总结
-        return self.writing_llm.stream_generator([{"role": "user", "content": prompt}])
+        return self.writing_llm.stream_generator(messages)
 
     def select_prompt_template(self, query: str, target_lang: str, purpose: str) -> SummaryPromptTemplate:
         """
@@ -160,6 +177,23 @@ class SummaryRag(RAGAgent):
 
             templates_info.append(f"Template ID: {template_id}\n{template.application_description()}\n")
 
+        # 先用向量分类器在目标语言的模板中选择，没有把握时再询问语言模型
+        vector = None
+        if self.classifier is not None:
+            lang = TEMPLATE_LANGS.get(target_lang)
+            labels = {
+                template_id: [template.target, template.application_description()]
+                for template_id, template in self.prompt_templates.items()
+                if template.lang == lang
+            } or {
+                template_id: [template.target, template.application_description()]
+                for template_id, template in self.prompt_templates.items()
+            }
+            vector = self.classifier.embed(query)
+            selected_template_id, _ = self.classifier.classify("summary_template", labels, query, vector)
+            if selected_template_id is not None:
+                return self.prompt_templates[selected_template_id]
+
         prompt = f"""请根据以下信息，选择最合适的提示词模板：
 
 用户查询内容：{query}
@@ -172,13 +206,17 @@ class SummaryRag(RAGAgent):
 """
         
         # 使用reasoning_llm选择模板
-        response = self.reasoning_llm.chat([{"role": "user", "content": prompt}])
+        response = self.reasoning_llm.cached_chat(
+            [{"role": "user", "content": prompt}], prompt_type="summary_template"
+        )
         selected_template_id = response.content.strip()
         
         # 验证选择的模板是否存在
         if selected_template_id not in self.prompt_templates:
             # 如果选择无效，默认使用第一个模板
             selected_template_id = list(self.prompt_templates.keys())[0]
+        elif self.classifier is not None:
+            self.classifier.record("summary_template", selected_template_id, query, vector)
             
         return self.prompt_templates[selected_template_id] 
 
@@ -199,7 +237,7 @@ def _prepare_prompt_templates() -> Dict[str, SummaryPromptTemplate]:
     templates = {}
     id = "channel_summary_01"
     templates[id] = SummaryPromptTemplate(id=id, target="channel summary or column summary", lang="Chinense", prompt="""
-请根据以下文章列表，生成一篇总结性文章，文章的目标是：{query}。要求内容包括：
+请根据最后给出的文章列表，按照文章的目标生成一篇总结性文章。要求内容包括：
 
 1. 栏目科研的主题都有哪些
 2. 核心文章所阐述的研究内容和科研成果
@@ -208,16 +246,18 @@ def _prepare_prompt_templates() -> Dict[str, SummaryPromptTemplate]:
 5. 引用文章时，使用格式[X]，X为文章列表中的article_id
 
 语言要求：中文
+请直接生成总结文本，不要包含任何额外的说明或格式。
+
+文章的目标：{query}
 字数要求：{min_words}-{max_words}字
 
 文章列表：
 {articles_info}
-
-请直接生成总结文本，不要包含任何额外的说明或格式。 """)
+""")
 
     id = "channel_summary_02"
     templates[id] = SummaryPromptTemplate(id=id, target="channel summary or column summary", lang="English", prompt="""
-Based on the following list of articles, please generate a summary article with the goal of: {query}. The content should include:
+Based on the list of articles given at the end, please generate a summary article with the given goal. The content should include:
 
 1. What are the main themes of scientific research in the column?
 2. What are the research contents and scientific achievements of the core articles?
@@ -226,46 +266,54 @@ Based on the following list of articles, please generate a summary article with
 5. When citing articles, use the format [X], where X is the article_id in the article list
 
 Language requirement: English
+Please generate the summary text directly, without any additional explanations or formats.
+
+Goal of the article: {query}
 Word count requirement: {min_words}-{max_words} words
 
 Article list:
 {articles_info}
-
-Please generate the summary text directly, without any additional explanations or formats. """)
+""")
 
     id = "channel_question_01"
     templates[id] = SummaryPromptTemplate(id=id, target="user cared questions about the channel", lang="Chinense", prompt="""
-本栏目是关于{query}的内容，并且包含了以下文章，请以一个思考并提出用户可能会关心的{question_count}个科普性问题。
+请根据最后给出的栏目主题和栏目包含的文章，思考并提出用户可能会关心的科普性问题。
 科普性问题不宜过长，10-20个字为宜。目标是让用户对栏目内容有一个初步的了解，不需要太深入。
 
+语言要求：中文
+
+请直接生成科研问题，问题内容的前面无需编写序号，不要包含任何额外的说明或格式。
+
+栏目主题：{query}
+问题数量：{question_count}个
+
 文章列表：
 {articles_info}
 
 {user_history}
-
-语言要求：中文
-
-请直接生成{question_count}个科研问题，问题内容的前面无需编写序号，不要包含任何额外的说明或格式。""")
+""")
 
     id = "channel_question_02"
     templates[id] = SummaryPromptTemplate(id=id, target="user cared questions about the channel", lang="English", prompt="""
-The column is about {query} content, and includes the following articles, please think of and propose {question_count} popular science questions that users might be interested in.
+Based on the column topic and the articles of the column given at the end, please think of and propose popular science questions that users might be interested in.
 The popular science questions should not be too long, 10-20 words is appropriate. The goal is to give users a preliminary understanding of the column content, not too deep.
 
+Language requirement: English
+
+Please generate the scientific research questions, without any additional explanations or formats.
+
+Column topic: {query}
+Number of questions: {question_count}
+
 Article list:
 {articles_info}
 
 {user_history}
-
-Language requirement: English
-
-Please generate {question_count} scientific research questions, without any additional explanations or formats. """)
+""")
 
     id = "popular_01"
     templates[id] = SummaryPromptTemplate(id=id, target="popular science short article", lang="Chinense", prompt="""
-你是一位专业的科普作家。请根据用户关注的"核心问题"和提供的"参考文章"，创作一篇"通俗易懂的科普短文"。
-
-核心问题: {query}
+你是一位专业的科普作家。请根据最后给出的用户关注的"核心问题"和"参考文章"，创作一篇"通俗易懂的科普短文"。
 
 文章要求:
 1. 深入浅出地解释核心问题的基础概念。
@@ -274,20 +322,20 @@ Please generate {question_count} scientific research questions, without any addi
 4. 准确引用参考文章，格式为：[X]（X为文章列表中的article_id），遇到参考文章ID请无论在任何位置都使用这种格式，不要直接陈列文章ID。
 
 语言要求：中文
+请直接生成科普性短文，不要包含任何额外的说明或格式。
+
+核心问题: {query}
 字数要求：{min_words}-{max_words}字
 
 参考文章列表：
 {articles_info}
-
-请直接生成科普性短文，不要包含任何额外的说明或格式。 """)
+""")
 
     id = "ppt_01"
     templates[id] = SummaryPromptTemplate(id=id, target="ppt outline", lang="Chinense", prompt="""
 你是一位专业的演示文稿设计师，擅长将复杂信息转化为清晰、有条理的PPT结构。
 
-请根据用户关注的"核心主题"和提供的"参考文章"，创作一份"详细的PPT提纲"。
-
-核心主题: {query}
+请根据最后给出的用户关注的"核心主题"和"参考文章"，创作一份"详细的PPT提纲"。
 
 提纲要求:
 1. 结构完整：提纲需包含PPT的标题和主要内容点。
@@ -296,19 +344,19 @@ Please generate {question_count} scientific research questions, without any addi
 4. 准确引用参考文章，格式为：[X]（X为文章列表中的article_id），遇到参考文章ID请无论在任何位置都使用这种格式，不要直接陈列文章ID。
 
 语言要求：中文
+请直接生成PPT提纲，不要包含任何额外的说明或格式。
+
+核心主题: {query}
 
 文章列表：
 {articles_info}
-
-请请直接生成PPT提纲，不要包含任何额外的说明或格式。 """)
+""")
 
     id = "footage_01"
     templates[id] = SummaryPromptTemplate(id=id, target="footage script", lang="Chinense", prompt="""
 你是一位经验丰富的短视频内容创作者，擅长将科普知识转化为生动有趣的视频脚本。
 
-请根据用户关注的"核心主题"和提供的"参考文章"，创作一份"详细的短视频脚本"。
-
-核心主题: {query}
+请根据最后给出的用户关注的"核心主题"和"参考文章"，创作一份"详细的短视频脚本"。
 
 脚本要求:
 1. 完整性：脚本需包含视频标题、开场白、主体内容（分段落或场景）、关键视觉建议和结尾呼吁/总结。
@@ -318,19 +366,19 @@ Please generate {question_count} scientific research questions, without any addi
 5. 准确引用参考文章，格式为：[X]（X为文章列表中的article_id），遇到参考文章ID请无论在任何位置都使用这种格式，不要直接陈列文章ID。
 
 语言要求：中文
+请直接生成短视频脚本，不要包含任何额外的说明或格式。
+
+核心主题: {query}
 
 文章列表：
 {articles_info}
-
-请直接生成短视频脚本，不要包含任何额外的说明或格式。 """)
+""")
 
     id = "opportunity_01"
     templates[id] = SummaryPromptTemplate(id=id, target="analyze business opportunity", lang="Chinense", prompt="""
 你是一位资深的商业分析师和市场洞察专家，擅长从科研发现中识别潜在的商业价值。
 
-请根据用户关注的"核心科研问题"和提供的"参考文章"，创作一篇"深入分析潜在商业机会的短文"。
-
-核心科研问题: {query}
+请根据最后给出的用户关注的"核心科研问题"和"参考文章"，创作一篇"深入分析潜在商业机会的短文"。
 
 分析要求:
 1. 洞察商机：详细分析文章中提及的科研问题可能催生哪些具体的商业机会（如产品、服务、技术解决方案、市场空白等）。
@@ -339,11 +387,13 @@ Please generate {question_count} scientific research questions, without any addi
 4. 准确引用参考文章，格式为：[X]（X为文章列表中的article_id），遇到参考文章ID请无论在任何位置都使用这种格式，不要直接陈列文章ID。
 
 语言要求：中文
+请直接生成分析短文，不要包含任何额外的说明或格式。
+
+核心科研问题: {query}
 字数要求：{min_words}-{max_words}字
 
 文章列表：
 {articles_info}
-
-请直接生成科普性短文，不要包含任何额外的说明或格式。 """)
+""")
 
     return templates
@@ -0,0 +1,198 @@
+"""
+Term dictionaries of the academic translator.
+
+Loading the user dictionaries is slow: jieba parses and adds every Chinese term, and the
+English terms are parsed and sorted in Python. The dictionaries are therefore loaded on
+first use, and what they add to jieba's prefix dict together with the sorted English terms
+is saved to a marshal snapshot, reused for as long as the dictionary files, jieba and the
+Python version are unchanged.
+"""
+
+import marshal
+import os
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from deepsearcher.tools.log import debug, error, warning
+
+SNAPSHOT_VERSION = 1
+
+
+def _file_signature(path: Optional[str]) -> Optional[Tuple[str, int, int]]:
+    if not path:
+        return None
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def parse_en_terms(path: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Parse the English dictionary.
+
+    Args:
+        path: Dictionary file, one `[phrase] [freq] [part-of-speech]` entry per line
+
+    Returns:
+        The part of speech of each term, and the terms with multi-word terms first
+        (longest first) followed by the single words in alphabetical order
+    """
+    en_terms = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.strip().split()
+            if len(parts) >= 3:
+                # The phrase might contain spaces
+                en_terms[" ".join(parts[:-2])] = parts[-1]
+    multi_word_terms = sorted((term for term in en_terms if " " in term), key=len, reverse=True)
+    single_word_terms = sorted(term for term in en_terms if " " not in term)
+    return en_terms, multi_word_terms + single_word_terms
+
+
+class TermDictionary:
+    """Chinese jieba user dictionary and English term list, loaded on first use."""
+
+    def __init__(
+        self,
+        cn_path: Optional[str] = None,
+        en_path: Optional[str] = None,
+        snapshot_path: Optional[str] = None,
+    ):
+        """
+        Initialize the dictionary without loading it.
+
+        Args:
+            cn_path: jieba user dictionary of Chinese terms
+            en_path: Dictionary of English terms
+            snapshot_path: Snapshot file of the loaded dictionaries, no snapshot if None
+        """
+        self.cn_path = cn_path
+        self.en_path = en_path
+        self.snapshot_path = snapshot_path
+        self.en_terms: Dict[str, str] = {}
+        self.sorted_en_terms: List[str] = []
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _snapshot_key(self) -> list:
+        import jieba
+
+        return [
+            SNAPSHOT_VERSION,
+            list(sys.version_info[:2]),
+            jieba.__version__,
+            jieba.dt.dictionary or "",
+            list(_file_signature(self.cn_path) or []),
+            list(_file_signature(self.en_path) or []),
+        ]
+
+    def _read_snapshot(self, key: list) -> Optional[dict]:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = marshal.load(f)
+        except Exception as e:
+            warning(f"Failed to read dictionary snapshot {self.snapshot_path}: {e}")
+            return None
+        return snapshot if snapshot.get("key") == key else None
+
+    def _write_snapshot(self, snapshot: dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump(snapshot, f)
+            os.replace(temp_path, self.snapshot_path)
+            debug(f"Saved dictionary snapshot: {self.snapshot_path}")
+        except Exception as e:
+            warning(f"Failed to save dictionary snapshot {self.snapshot_path}: {e}")
+
+    def _build_snapshot(self, key: list) -> dict:
+        import jieba
+
+        snapshot = {"key": key, "freq": None, "total": 0, "tags": {}, "force_split": []}
+        if self.cn_path:
+            tokenizer = jieba.dt
+            tokenizer.check_initialized()
+            freq_before, total_before = dict(tokenizer.FREQ), tokenizer.total
+            tokenizer.load_userdict(self.cn_path)
+            # Only the entries added by the user dictionary, the prefix dict of the main
+            # dictionary is restored from the jieba cache
+            snapshot["freq"] = {
+                word: freq for word, freq in tokenizer.FREQ.items() if freq_before.get(word) != freq
+            }
+            snapshot["total"] = tokenizer.total - total_before
+            snapshot["tags"] = dict(tokenizer.user_word_tag_tab)
+            snapshot["force_split"] = list(jieba.finalseg.Force_Split_Words)
+            debug(f"Loaded Chinese user dictionary: {self.cn_path}")
+        snapshot["en_terms"], snapshot["sorted_en_terms"] = (
+            parse_en_terms(self.en_path) if self.en_path else ({}, [])
+        )
+        return snapshot
+
+    def _restore_snapshot(self, snapshot: dict) -> None:
+        import jieba
+
+        if snapshot["freq"] is not None:
+            tokenizer = jieba.dt
+            tokenizer.check_initialized()
+            with tokenizer.lock:
+                tokenizer.FREQ.update(snapshot["freq"])
+                tokenizer.total += snapshot["total"]
+            tokenizer.user_word_tag_tab.update(snapshot["tags"])
+            for word in snapshot["force_split"]:
+                jieba.finalseg.add_force_split(word)
+            debug(f"Loaded Chinese user dictionary from snapshot: {self.snapshot_path}")
+
+    def load(self) -> None:
+        """Load the dictionaries, from the snapshot when it is up to date."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if not self.cn_path:
+                warning("Chinese user dictionary file rbase_dict_cn.txt not found")
+            if not self.en_path:
+                warning("English user dictionary file rbase_dict_en.txt not found")
+            try:
+                key = self._snapshot_key()
+                snapshot = self._read_snapshot(key)
+                if snapshot is None:
+                    snapshot = self._build_snapshot(key)
+                    if self.snapshot_path:
+                        self._write_snapshot(snapshot)
+                else:
+                    self._restore_snapshot(snapshot)
+                self.en_terms = snapshot["en_terms"]
+                self.sorted_en_terms = snapshot["sorted_en_terms"]
+                debug(f"Loaded {len(self.en_terms)} English terms")
+            except Exception as e:
+                error(f"Failed to load term dictionaries: {e}")
+            self._loaded = True
+
+    def segment(self, text: str) -> List[Tuple[str, str]]:
+        """Segment Chinese text into (word, POS tag) pairs with the user dictionary loaded."""
+        self.load()
+        import jieba.posseg as pseg
+
+        return [(word, flag) for word, flag in pseg.cut(text)]
+
+
+# Dictionaries by paths, jieba keeps one global tokenizer so they are loaded once per process
+_dictionaries: Dict[Tuple, TermDictionary] = {}
+_dictionaries_lock = threading.Lock()
+
+
+def get_term_dictionary(
+    cn_path: Optional[str], en_path: Optional[str], snapshot_path: Optional[str] = None
+) -> TermDictionary:
+    """Get the shared, not yet loaded, term dictionary of a set of dictionary files."""
+    key = (cn_path, en_path, snapshot_path)
+    with _dictionaries_lock:
+        if key not in _dictionaries:
+            _dictionaries[key] = TermDictionary(cn_path, en_path, snapshot_path)
+        return _dictionaries[key]
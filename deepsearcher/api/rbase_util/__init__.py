@@ -12,6 +12,7 @@ from .ai_content import (
 from .discuss import (
     update_ai_content_to_discuss,
     update_discuss_thread_depth,
+    update_discuss_thread_memory,
     get_discuss_thread_by_request_hash,
     is_thread_has_summary,
     get_discuss_thread_by_id,
@@ -39,6 +40,7 @@ __all__ = [
     # Discuss
     'update_ai_content_to_discuss',
     'update_discuss_thread_depth',
+    'update_discuss_thread_memory',
     'get_discuss_thread_by_request_hash',
     'is_thread_has_summary',
     'get_discuss_thread_by_id',
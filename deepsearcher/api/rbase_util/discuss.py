@@ -97,6 +97,30 @@ async def update_discuss_thread_depth(thread_uuid: str, depth: int, discuss_uuid
     except Exception as e:
         raise Exception(f"Failed to update discuss thread depth: {e}")
 
+async def update_discuss_thread_memory(thread_id: int, memory: dict):
+    """
+    Save the rolling conversation summary of a discuss thread into its params
+
+    Only the `memory` key of params is replaced, so other params are left untouched.
+
+    Args:
+        thread_id: Discussion topic ID
+        memory: Summary of the conversation, format as {"summary": "text", "discuss_id": id of the last summarized discussion}
+    """
+    try:
+        pool = await get_mysql_pool(configuration.config.rbase_settings.get("database"))
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                sql = """
+                UPDATE discuss_thread
+                SET params = JSON_SET(COALESCE(params, '{}'), '$.memory', CAST(%s AS JSON))
+                WHERE id = %s
+                """
+                await cursor.execute(sql, (json.dumps(memory, ensure_ascii=False), thread_id))
+                await conn.commit()
+    except Exception as e:
+        raise Exception(f"Failed to update discuss thread memory: {e}")
+
 async def get_discuss_thread_by_request_hash(request_hash: str, user_hash: str) -> DiscussThread:
     """
     Get discussion thread by request hash and user hash
@@ -423,12 +447,14 @@ async def get_discuss_thread_history(thread_id: int, reply_id: int, limit: int =
     Args:
         thread_id: Discussion topic ID
         reply_id: Current reply ID
-        limit: Limit on number of history records to retrieve
+        limit: Limit on number of history records to retrieve, the latest ones are kept, None for all
+        after_id: Only records after this discussion ID, e.g. those not yet in the thread summary
         
     Returns:
-        list: History records list, sorted by time in ascending order, format as [{"role": "user|assistant", "content": "content"}]
+        list: History records list, sorted by time in ascending order, format as [{"id": id, "role": "user|assistant", "content": "content"}]
     """
     role = kwargs.get("role", None)
+    after_id = kwargs.get("after_id", 0)
     try:
         pool = await get_mysql_pool(configuration.config.rbase_settings.get("database"))
         async with pool.acquire() as conn:
@@ -442,12 +468,18 @@ async def get_discuss_thread_history(thread_id: int, reply_id: int, limit: int =
                 if reply_id > 0:
                     sql += " AND id <= %s"
                     params.append(reply_id)
+                if after_id > 0:
+                    sql += " AND id > %s"
+                    params.append(after_id)
                 if role:
                     sql += " AND role = %s"
                     params.append(role.value)
 
-                sql += "\nORDER BY id DESC LIMIT %s"
-                params.append(limit)
+                if limit:
+                    sql += "\nORDER BY id DESC LIMIT %s"
+                    params.append(limit)
+                else:
+                    sql += "\nORDER BY id DESC"
                 await cursor.execute(sql, params)
                 results = await cursor.fetchall()
                 
@@ -455,6 +487,7 @@ async def get_discuss_thread_history(thread_id: int, reply_id: int, limit: int =
                 history = []
                 for result in sorted(results, key=lambda x: x["id"]):
                     history.append({
+                        "id": result["id"],
                         "role": result["role"],
                         "content": result["content"]
                     })
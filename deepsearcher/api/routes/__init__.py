@@ -8,6 +8,7 @@ from fastapi import APIRouter
 from .summary import router as summary_router
 from .questions import router as questions_router
 from .discuss import router as discuss_router
+from .query import router as query_router
 
 # Create main router
 router = APIRouter()
@@ -15,4 +16,5 @@ router = APIRouter()
 # Register all sub-routers
 router.include_router(summary_router, prefix="/generate", tags=["generate"])
 router.include_router(questions_router, prefix="/generate", tags=["generate"])
-router.include_router(discuss_router, prefix="/generate", tags=["generate"]) 
\ No newline at end of file
+router.include_router(discuss_router, prefix="/generate", tags=["generate"])
+router.include_router(query_router, tags=["query"]) 
\ No newline at end of file
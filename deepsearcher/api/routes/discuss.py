@@ -4,6 +4,7 @@ Discussion Routes
 This module contains routes and functions for handling discussions.
 """
 
+import asyncio
 import json
 import time
 from typing import AsyncGenerator
@@ -37,13 +38,14 @@ from deepsearcher.api.rbase_util import (
     get_discuss_in_thread,
     save_discuss,
     update_discuss_thread_depth,
+    update_discuss_thread_memory,
     get_discuss_thread_history,
     get_response_by_request_hash,
     list_discuss_in_thread,
     get_base_by_id,
     get_base_category_by_id,
 )
-from deepsearcher.agent.discuss_agent import DiscussAgent
+from deepsearcher.agent.discuss_agent import DiscussAgent, recent_history
 from deepsearcher.rbase.ai_models import (
     Discuss,
     DiscussThread,
@@ -54,9 +56,15 @@ from deepsearcher.rbase.ai_models import (
 )
 from .metadata import build_metadata
 from deepsearcher.rbase_db_loading import load_articles_by_article_ids
+from deepsearcher.tools import log
 
 router = APIRouter()
 
+# Thread summary updates running in the background, kept referenced until they finish
+_memory_tasks = set()
+# Turns merged into the thread summary per summarization call
+MEMORY_BATCH_TURNS = 10
+
 @router.post(
     "/discuss_create",
     summary="Discussion Topic Creation API",
@@ -373,6 +381,17 @@ async def generate_ai_reply_stream(ai_discuss: Discuss, thread: DiscussThread, r
         
         # Get history records (last 10)
         history = await get_discuss_thread_history(thread.id, reply_discuss.id, limit=10)
+
+        # With a thread summary, only the recent turns are sent verbatim
+        api_settings = configuration.config.rbase_settings.get("api", {})
+        use_summary = api_settings.get("discuss_summary", False)
+        memory = (thread.params or {}).get("memory") or {}
+        summary = ""
+        if use_summary and memory.get("summary"):
+            summary = memory["summary"]
+            history = recent_history(
+                history, memory.get("discuss_id", 0), api_settings.get("discuss_history_turns", 2)
+            )
         
         # Create DiscussAgent instance
         discuss_agent = DiscussAgent(
@@ -381,7 +400,13 @@ async def generate_ai_reply_stream(ai_discuss: Discuss, thread: DiscussThread, r
             translator=configuration.academic_translator,
             embedding_model=configuration.embedding_model,
             vector_db=configuration.vector_db,
-            verbose=configuration.config.rbase_settings.get("verbose", False)
+            verbose=configuration.config.rbase_settings.get("verbose", False),
+            intent_llm=getattr(configuration, api_settings.get("discuss_intent_llm", "reasoning_llm")),
+            speculative_search=api_settings.get("discuss_speculative_search", False),
+            speculation_threshold=api_settings.get("discuss_speculation_threshold", 0.85),
+            classifier=configuration.classifier,
+            summary_llm=getattr(configuration, api_settings.get("discuss_summary_llm", "writing_llm")),
+            summary_max_length=api_settings.get("discuss_summary_max_length", 500),
         )
         
         # Send role message
@@ -418,6 +443,7 @@ async def generate_ai_reply_stream(ai_discuss: Discuss, thread: DiscussThread, r
             user_action=user_action,
             background=background,
             history=history,
+            summary=summary,
             request_params=request_params,
             top_k_per_section=chunk_cnt,
         ):
@@ -458,6 +484,10 @@ async def generate_ai_reply_stream(ai_discuss: Discuss, thread: DiscussThread, r
 
         if ai_discuss.status == AIResponseStatus.FINISHED:
             await update_discuss_thread_depth(thread.uuid, ai_discuss.depth, ai_discuss.uuid)
+            if use_summary:
+                task = asyncio.create_task(update_thread_memory(discuss_agent, thread, memory, ai_discuss))
+                _memory_tasks.add(task)
+                task.add_done_callback(_memory_tasks.discard)
         
         # Send completion marker
         yield "data: [DONE]\n\n".encode('utf-8')
@@ -482,6 +512,35 @@ async def generate_ai_reply_stream(ai_discuss: Discuss, thread: DiscussThread, r
         yield f"data: {json.dumps(error_chunk)}\n\n".encode('utf-8')
         yield "data: [DONE]\n\n".encode('utf-8')
 
+async def update_thread_memory(discuss_agent: DiscussAgent, thread: DiscussThread, memory: dict, ai_discuss: Discuss):
+    """
+    Merge the turns after the thread summary, up to the new AI reply, into the summary.
+
+    Runs in the background after the reply is sent, so summarizing does not delay the reply.
+
+    Args:
+        discuss_agent: Agent that generated the reply
+        thread: Discussion thread object
+        memory: Thread summary the reply was generated with
+        ai_discuss: Finished AI reply
+    """
+    try:
+        # All the turns not in the summary yet, e.g. after a failed update, not only the latest
+        turns = await get_discuss_thread_history(
+            thread.id, ai_discuss.id, limit=None, after_id=memory.get("discuss_id", 0)
+        )
+        summary = memory.get("summary", "")
+        # Merge the oldest turns first and save after each batch, the summary then only
+        # claims to cover the turns actually summarized
+        for start in range(0, len(turns), MEMORY_BATCH_TURNS):
+            batch = turns[start : start + MEMORY_BATCH_TURNS]
+            summary, _ = await asyncio.to_thread(discuss_agent.summarize_history, summary, batch)
+            await update_discuss_thread_memory(
+                thread.id, {"summary": summary, "discuss_id": batch[-1]["id"]}
+            )
+    except Exception as e:
+        log.warning(f"Failed to update summary of discuss thread {thread.id}: {e}")
+
 async def get_thread_background(thread: DiscussThread) -> str:
     """
     Get background information for discussion thread.
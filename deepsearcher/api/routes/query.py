@@ -0,0 +1,86 @@
+"""
+Query Routes
+
+This module contains the routes for querying the knowledge base with the default searcher.
+"""
+
+import json
+from typing import Generator, List
+
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from deepsearcher import configuration
+from deepsearcher.api.models import ExceptionResponse
+from deepsearcher.online_query import query_stream
+from deepsearcher.tools import log
+from deepsearcher.vector_db import RetrievalResult
+
+router = APIRouter()
+
+
+def format_results(results: List[RetrievalResult]) -> List[dict]:
+    """将检索结果转换为可序列化的引用列表"""
+    return [
+        {"text": result.text, "reference": result.reference, "score": float(result.score)}
+        for result in results
+    ]
+
+
+def generate_query_events(original_query: str, max_iter: int) -> Generator[bytes, None, None]:
+    """
+    将 query_stream 的事件转换为 SSE 消息
+
+    Args:
+        original_query (str): 用户问题
+        max_iter (int): 最大迭代次数
+
+    Yields:
+        bytes: "event: <type>" 与 JSON 数据组成的 SSE 消息，出错时发送 error 事件
+    """
+    try:
+        for event in query_stream(original_query, max_iter=max_iter):
+            if "results" in event:
+                event = {**event, "results": format_results(event["results"])}
+            data = json.dumps(event, ensure_ascii=False)
+            yield f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+    except Exception as e:
+        log.error(f"流式查询失败: {e}")
+        data = json.dumps({"type": "error", "message": str(e)}, ensure_ascii=False)
+        yield f"event: error\ndata: {data}\n\n".encode("utf-8")
+
+
+@router.get(
+    "/query/stream",
+    summary="Streaming Query API",
+    description="""
+    Query the knowledge base and stream the answer as server-sent events.
+
+    - progress: retrieval steps, e.g. the selected agent, sub queries and search iterations
+    - retrieved: the retrieved references and the tokens used by the retrieval
+    - token: a piece of the final answer
+    - done: the complete answer, its references and the total tokens
+    """,
+)
+def api_query_stream(
+    original_query: str = Query(..., description="用户问题"),
+    max_iter: int = Query(3, ge=1, description="最大迭代次数"),
+):
+    """
+    流式查询知识库
+
+    Args:
+        original_query (str): 用户问题
+        max_iter (int): 最大迭代次数
+
+    Returns:
+        StreamingResponse: SSE 流式响应
+    """
+    if configuration.default_searcher is None:
+        return JSONResponse(
+            status_code=500,
+            content=ExceptionResponse(code=500, message="未配置检索组件").model_dump(),
+        )
+    return StreamingResponse(
+        generate_query_events(original_query, max_iter), media_type="text/event-stream"
+    )
@@ -144,6 +144,7 @@ async def generate_summary_stream(ai_request: AIContentRequest, related_type: Re
     summary_rag = SummaryRag(
         reasoning_llm=configuration.reasoning_llm,
         writing_llm=configuration.writing_llm,
+        classifier=configuration.classifier,
     )
 
     # Send role message
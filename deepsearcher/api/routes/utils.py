@@ -60,6 +60,7 @@ async def generate_ai_content(ai_request: AIContentRequest, related_type: Relate
     summary_rag = SummaryRag(
         reasoning_llm=configuration.reasoning_llm,
         writing_llm=configuration.writing_llm,
+        classifier=configuration.classifier,
     )
 
     params = {"min_words": 500, "max_words": 800, 
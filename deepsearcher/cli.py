@@ -5,7 +5,7 @@ import warnings
 
 from deepsearcher.configuration import Configuration, init_config
 from deepsearcher.offline_loading import load_from_local_files, load_from_website
-from deepsearcher.online_query import query
+from deepsearcher.online_query import query, query_stream
 from deepsearcher.tools import log
 
 httpx_logger = logging.getLogger("httpx")  # disable openai's logger output
@@ -40,6 +40,11 @@ def main():
         default=3,
         help="Max iterations of reflection. Default is 3.",
     )
+    query_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the final answer as it is generated.",
+    )
 
     ## Arguments of loading
     load_parser = subparsers.add_parser(
@@ -57,6 +62,19 @@ def main():
         default=256,
         help="Batch size for loading knowledge.",
     )
+    load_parser.add_argument(
+        "--split_workers",
+        type=int,
+        default=config.load_settings.get("split_workers", 0),
+        help="Number of processes used to split documents into chunks. Default is 0 (serial).",
+    )
+    load_parser.add_argument(
+        "--splitter",
+        type=str,
+        choices=["recursive", "markdown"],
+        default=config.load_settings.get("splitter", "recursive"),
+        help="Splitting strategy for local files: 'recursive' (character based) or 'markdown' (section aware).",
+    )
     load_parser.add_argument(
         "--collection_name",
         type=str,
@@ -78,9 +96,20 @@ def main():
 
     args = parser.parse_args()
     if args.subcommand == "query":
-        final_answer, refs, consumed_tokens = query(args.query, max_iter=args.max_iter)
-        log.color_print("\n==== FINAL ANSWER====\n")
-        log.color_print(final_answer)
+        if args.stream:
+            refs = []
+            for event in query_stream(args.query, max_iter=args.max_iter):
+                if event["type"] == "retrieved":
+                    log.color_print("\n==== FINAL ANSWER====\n")
+                elif event["type"] == "token":
+                    print(event["content"], end="", flush=True)
+                elif event["type"] == "done":
+                    refs = event["results"]
+                    print()
+        else:
+            final_answer, refs, consumed_tokens = query(args.query, max_iter=args.max_iter)
+            log.color_print("\n==== FINAL ANSWER====\n")
+            log.color_print(final_answer)
         log.color_print("\n### References\n")
         for i, ref in enumerate(refs):
             log.color_print(f"{i + 1}. {ref.text[:60]}… {ref.reference}")
@@ -96,10 +125,21 @@ def main():
             kwargs["force_new_collection"] = args.force_new_collection
         if args.batch_size:
             kwargs["batch_size"] = args.batch_size
+        if args.split_workers:
+            kwargs["split_workers"] = args.split_workers
         if len(urls) > 0:
             load_from_website(urls, **kwargs)
         if len(local_files) > 0:
-            load_from_local_files(local_files, **kwargs)
+            load_from_local_files(
+                local_files,
+                splitter=args.splitter,
+                chunk_tokens=config.load_settings.get("chunk_tokens", 512),
+                near_duplicates=config.load_settings.get("near_duplicates") or None,
+                near_duplicate_index_dir=config.load_settings.get(
+                    "near_duplicate_index_dir", "database/near_duplicates"
+                ),
+                **kwargs,
+            )
     else:
         print("Please provide a query or a load argument.")
 
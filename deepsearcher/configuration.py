@@ -1,18 +1,24 @@
 import os
-from typing import Literal
+import threading
+from typing import TYPE_CHECKING, Literal
 
 import yaml
 
-from deepsearcher.agent import ChainOfRAG, DeepSearch, NaiveRAG
-from deepsearcher.agent.academic_translator import AcademicTranslator
-from deepsearcher.agent.overview_rag import OverviewRAG
-from deepsearcher.agent.rag_router import RAGRouter
-from deepsearcher.embedding.base import BaseEmbedding
-from deepsearcher.llm.base import BaseLLM
-from deepsearcher.loader.file_loader.base import BaseLoader
-from deepsearcher.loader.web_crawler.base import BaseCrawler
 from deepsearcher.tools import log
-from deepsearcher.vector_db.base import BaseVectorDB
+
+if TYPE_CHECKING:
+    from deepsearcher.agent import NaiveRAG
+    from deepsearcher.agent.academic_translator import AcademicTranslator
+    from deepsearcher.agent.collection_router import CollectionRouter
+    from deepsearcher.agent.embedding_classifier import EmbeddingClassifier
+    from deepsearcher.agent.rag_router import RAGRouter
+    from deepsearcher.agent.retrieval_executor import RetrievalExecutor
+    from deepsearcher.embedding.base import BaseEmbedding
+    from deepsearcher.llm.base import BaseLLM
+    from deepsearcher.llm.cache import LLMResponseCache
+    from deepsearcher.loader.file_loader.base import BaseLoader
+    from deepsearcher.loader.web_crawler.base import BaseCrawler
+    from deepsearcher.vector_db.base import BaseVectorDB
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_CONFIG_YAML_PATH = os.path.join(current_dir, "..", "config.yaml")
@@ -79,122 +85,245 @@ class ModuleFactory:
         class_ = getattr(module, class_name)
         return class_(**self.config.provide_settings[feature]["config"])
 
-    def create_llm(self) -> BaseLLM:
+    def create_llm(self) -> "BaseLLM":
         return self._create_module_instance("llm", "deepsearcher.llm")
 
-    def create_reasoning_llm(self) -> BaseLLM:
+    def create_reasoning_llm(self) -> "BaseLLM":
         return self._create_module_instance("reasoning_llm", "deepsearcher.llm")
 
-    def create_writing_llm(self) -> BaseLLM:
+    def create_writing_llm(self) -> "BaseLLM":
         return self._create_module_instance("writing_llm", "deepsearcher.llm")
 
-    def create_embedding(self) -> BaseEmbedding:
+    def create_embedding(self) -> "BaseEmbedding":
         return self._create_module_instance("embedding", "deepsearcher.embedding")
 
-    def create_file_loader(self) -> BaseLoader:
+    def create_file_loader(self) -> "BaseLoader":
         return self._create_module_instance("file_loader", "deepsearcher.loader.file_loader")
 
-    def create_web_crawler(self) -> BaseCrawler:
+    def create_web_crawler(self) -> "BaseCrawler":
         return self._create_module_instance("web_crawler", "deepsearcher.loader.web_crawler")
 
-    def create_vector_db(self) -> BaseVectorDB:
+    def create_vector_db(self) -> "BaseVectorDB":
         return self._create_module_instance("vector_db", "deepsearcher.vector_db")
 
 
 config = Configuration()
 
 module_factory: ModuleFactory = None
-llm: BaseLLM = None
-reasoning_llm: BaseLLM = None
-writing_llm: BaseLLM = None
-embedding_model: BaseEmbedding = None
-file_loader: BaseLoader = None
-vector_db: BaseVectorDB = None
-web_crawler: BaseCrawler = None
-default_searcher: RAGRouter = None
-naive_rag: NaiveRAG = None
-academic_translator: AcademicTranslator = None
-
-
-def init_config(config: Configuration) -> bool:
+
+# Components are built on first access through the module __getattr__ once init_config has
+# been called, so a command only pays for the clients and agents it uses. Built components
+# are stored as module globals, the names below are only declared.
+llm: "BaseLLM"
+reasoning_llm: "BaseLLM"
+writing_llm: "BaseLLM"
+embedding_model: "BaseEmbedding"
+file_loader: "BaseLoader"
+vector_db: "BaseVectorDB"
+web_crawler: "BaseCrawler"
+default_searcher: "RAGRouter"
+naive_rag: "NaiveRAG"
+retrieval_executor: "RetrievalExecutor"
+collection_router: "CollectionRouter"
+classifier: "EmbeddingClassifier"
+llm_cache: "LLMResponseCache"
+academic_translator: "AcademicTranslator"
+
+_build_lock = threading.RLock()
+
+
+def _attach_llm_cache(model):
+    llm_cache = _component("llm_cache")
+    if model is not None and llm_cache is not None:
+        model.response_cache = llm_cache
+    return model
+
+
+def _build_llm():
+    return _attach_llm_cache(module_factory.create_llm())
+
+
+def _build_reasoning_llm():
+    if "reasoning_llm" in module_factory.config.provide_settings:
+        return _attach_llm_cache(module_factory.create_reasoning_llm())
+    return _component("llm")  # Fallback to the default LLM if not configured
+
+
+def _build_writing_llm():
+    if "writing_llm" in module_factory.config.provide_settings:
+        return _attach_llm_cache(module_factory.create_writing_llm())
+    return _component("llm")  # Fallback to the default LLM if not configured
+
+
+def _build_llm_cache():
+    llm_cache_settings = dict(module_factory.config.query_settings.get("llm_cache", {}))
+    if not llm_cache_settings.pop("enabled", False):
+        return None
+    from deepsearcher.llm.cache import LLMResponseCache
+
+    if llm_cache_settings.pop("semantic", False):
+        llm_cache_settings["embedding_model"] = _component("embedding_model")
+    return LLMResponseCache(**llm_cache_settings)
+
+
+def _has_retrieval() -> bool:
+    return bool(_component("embedding_model") and _component("vector_db"))
+
+
+def _build_retrieval_executor():
+    if not _has_retrieval():
+        return None
+    from deepsearcher.agent.retrieval_executor import RetrievalExecutor
+
+    return RetrievalExecutor(
+        _component("vector_db"),
+        **module_factory.config.query_settings.get("retrieval_executor", {}),
+    )
+
+
+def _build_collection_router():
+    if not _has_retrieval():
+        return None
+    from deepsearcher.agent.collection_router import CollectionRouter
+
+    return CollectionRouter(
+        llm=_component("llm"),
+        vector_db=_component("vector_db"),
+        embedding_model=_component("embedding_model"),
+        **module_factory.config.query_settings.get("collection_router", {}),
+    )
+
+
+def _build_classifier():
+    classifier_settings = dict(module_factory.config.query_settings.get("classifier", {}))
+    if not classifier_settings.pop("enabled", False) or not _component("embedding_model"):
+        return None
+    from deepsearcher.agent.embedding_classifier import EmbeddingClassifier
+
+    return EmbeddingClassifier(_component("embedding_model"), **classifier_settings)
+
+
+def _rag_agent_kwargs() -> dict:
+    return dict(
+        llm=_component("llm"),
+        embedding_model=_component("embedding_model"),
+        vector_db=_component("vector_db"),
+        route_collection=True,
+        text_window_splitter=True,
+        retrieval_executor=_component("retrieval_executor"),
+        collection_router=_component("collection_router"),
+    )
+
+
+def _build_default_searcher():
+    if not _has_retrieval():
+        return None
+    from deepsearcher.agent import ChainOfRAG, DeepSearch
+    from deepsearcher.agent.rag_router import RAGRouter
+    from deepsearcher.agent.stop_policy import build_stop_policies
+
+    query_settings = module_factory.config.query_settings
+    max_iter = query_settings["max_iter"]
+    chain_of_rag_settings = query_settings.get("chain_of_rag", {})
+    stop_policies = build_stop_policies(
+        chain_of_rag_settings.get("stop_policies", []), _component("llm")
+    )
+    return RAGRouter(
+        llm=_component("llm"),
+        rag_agents=[
+            DeepSearch(
+                max_iter=max_iter,
+                **query_settings.get("deep_search", {}),
+                **_rag_agent_kwargs(),
+            ),
+            ChainOfRAG(
+                max_iter=max_iter,
+                stop_policies=stop_policies,
+                fuse_supported_docs=chain_of_rag_settings.get("fuse_supported_docs", True),
+                **_rag_agent_kwargs(),
+            ),
+        ],
+        classifier=_component("classifier"),
+    )
+
+
+def _build_naive_rag():
+    if not _has_retrieval():
+        return None
+    from deepsearcher.agent import NaiveRAG
+
+    return NaiveRAG(top_k=10, **_rag_agent_kwargs())
+
+
+def _build_academic_translator():
+    from deepsearcher.agent.academic_translator import AcademicTranslator
+
+    return AcademicTranslator(
+        llm=_component("llm"), rbase_settings=module_factory.config.rbase_settings
+    )
+
+
+_BUILDERS = {
+    "llm": _build_llm,
+    "reasoning_llm": _build_reasoning_llm,
+    "writing_llm": _build_writing_llm,
+    "embedding_model": lambda: module_factory.create_embedding(),
+    "llm_cache": _build_llm_cache,
+    "file_loader": lambda: module_factory.create_file_loader(),
+    "web_crawler": lambda: module_factory.create_web_crawler(),
+    "vector_db": lambda: module_factory.create_vector_db(),
+    "retrieval_executor": _build_retrieval_executor,
+    "collection_router": _build_collection_router,
+    "classifier": _build_classifier,
+    "default_searcher": _build_default_searcher,
+    "naive_rag": _build_naive_rag,
+    "academic_translator": _build_academic_translator,
+}
+
+
+def _component(name: str):
+    """Get a component, building it on first access; None before init_config."""
+    if name in globals():
+        return globals()[name]
+    if module_factory is None:
+        return None
+    with _build_lock:
+        if name not in globals():
+            log.debug(f"initializing {name}")
+            globals()[name] = _BUILDERS[name]()
+        return globals()[name]
+
+
+def __getattr__(name: str):
+    if name in _BUILDERS:
+        return _component(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def init_config(config: Configuration, lazy: bool = True) -> bool:
+    """
+    Initialize the global components from a configuration.
+
+    Args:
+        config: The configuration
+        lazy: Build each component on first access instead of all of them now
+
+    Returns:
+        False if the configuration was already initialized, True otherwise
+    """
     if config.is_initialized:
         return False
 
-    global \
-        module_factory, \
-        llm, \
-        reasoning_llm, \
-        writing_llm, \
-        embedding_model, \
-        file_loader, \
-        vector_db, \
-        web_crawler, \
-        default_searcher, \
-        naive_rag, \
-        academic_translator
-    module_factory = ModuleFactory(config)
-    llm = module_factory.create_llm()
-
-    # Initialize reasoning and writing models if they are configured
-    log.debug("initializing reasoning_llm")
-    if "reasoning_llm" in config.provide_settings:
-        reasoning_llm = module_factory.create_reasoning_llm()
-    else:
-        reasoning_llm = llm  # Fallback to the default LLM if not configured
-
-    log.debug("initializing writing_llm")
-    if "writing_llm" in config.provide_settings:
-        writing_llm = module_factory.create_writing_llm()
-    else:
-        writing_llm = llm  # Fallback to the default LLM if not configured
-
-    log.debug("initializing embedding_model")
-    embedding_model = module_factory.create_embedding()
-
-    log.debug("initializing file_loader")
-    file_loader = module_factory.create_file_loader()
-
-    log.debug("initializing web_crawler")
-    web_crawler = module_factory.create_web_crawler()
-
-    log.debug("initializing vector_db")
-    vector_db = module_factory.create_vector_db()
-
-    if embedding_model and vector_db:
-        log.debug("initializing default_searcher")
-        default_searcher = RAGRouter(
-            llm=llm,
-            rag_agents=[
-                DeepSearch(
-                    llm=llm,
-                    embedding_model=embedding_model,
-                    vector_db=vector_db,
-                    max_iter=config.query_settings["max_iter"],
-                    route_collection=True,
-                    text_window_splitter=True,
-                ),
-                ChainOfRAG(
-                    llm=llm,
-                    embedding_model=embedding_model,
-                    vector_db=vector_db,
-                    max_iter=config.query_settings["max_iter"],
-                    route_collection=True,
-                    text_window_splitter=True,
-                ),
-            ],
-        )
-        naive_rag = NaiveRAG(
-            llm=llm,
-            embedding_model=embedding_model,
-            vector_db=vector_db,
-            top_k=10,
-            route_collection=True,
-            text_window_splitter=True,
-        )
-
-    log.debug("initializing academic_translator")
-    # Initialize AcademicTranslator
-    academic_translator = AcademicTranslator(llm=llm, rbase_settings=config.rbase_settings)
+    global module_factory
+    with _build_lock:
+        # Drop the components built from a previous configuration
+        for name in _BUILDERS:
+            globals().pop(name, None)
+        module_factory = ModuleFactory(config)
+
+    if not lazy:
+        for name in _BUILDERS:
+            _component(name)
 
     log.debug("initialization finished")
     config.is_initialized = True
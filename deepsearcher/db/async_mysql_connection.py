@@ -47,7 +47,7 @@ async def get_mysql_pool(rbase_db_config: dict) -> Pool:
             autocommit=True,
             cursorclass=aiomysql.DictCursor,
             minsize=1,
-            maxsize=10,
+            maxsize=int(rbase_db_config.get("config", {}).get("pool_size", 10)),
         )
         _active_pool = pool
         return pool
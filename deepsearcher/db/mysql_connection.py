@@ -1,19 +1,300 @@
 """
 MySQL connection management module.
 
-This module provides functions for managing MySQL database connections.
+This module provides a bounded, thread-safe pool of MySQL connections. Connections are
+borrowed with the `mysql_connection` context manager and returned to the pool when the
+block exits. Idle connections are health checked when they have not been used for
+`health_check_interval` seconds, instead of on every acquisition.
+
+`get_mysql_connection` is kept for existing callers: it pins one pooled connection to the
+calling thread until `close_mysql_connection` is called or the thread exits.
 """
 
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
 import pymysql
 from pymysql.connections import Connection
 
-# Global variable to store active database connection
-_active_connection = None
+from deepsearcher.tools import log
+
+
+class MySQLConnectionPool:
+    """Bounded pool of pymysql connections shared by threads."""
+
+    def __init__(
+        self,
+        rbase_db_config: dict,
+        max_size: int = 10,
+        health_check_interval: float = 30.0,
+        acquire_timeout: float = 30.0,
+    ):
+        """
+        Initialize the pool, connections are opened on demand.
+
+        Args:
+            rbase_db_config: Database configuration dictionary
+            max_size: Maximum number of open connections
+            health_check_interval: Idle seconds after which a connection is pinged before reuse
+            acquire_timeout: Seconds to wait for a free connection before failing
+        """
+        self.config = rbase_db_config.get("config", {})
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._condition = threading.Condition()
+        # (connection, time it was last known to be healthy)
+        self._idle: deque = deque()
+        # id(connection) -> (connection, borrowing thread)
+        self._in_use: Dict[int, Tuple[Connection, threading.Thread]] = {}
+        self._size = 0
+        self._closed = False
+        self.stats = {
+            "created": 0,
+            "closed": 0,
+            "acquired": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+            "reclaimed": 0,
+        }
+
+    def _connect(self) -> Connection:
+        try:
+            conn = pymysql.connect(
+                host=self.config.get("host", "localhost"),
+                port=int(self.config.get("port", 3306)),
+                user=self.config.get("username", ""),
+                password=self.config.get("password", ""),
+                database=self.config.get("database", ""),
+                charset="utf8mb4",
+                cursorclass=pymysql.cursors.DictCursor,
+            )
+        except Exception as e:
+            raise ConnectionError(f"Failed to connect to MySQL database: {e}")
+        with self._condition:
+            self.stats["created"] += 1
+        return conn
+
+    def _close_connection(self, conn: Connection) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._condition:
+            self.stats["closed"] += 1
+
+    def _is_healthy(self, conn: Connection, last_checked: float) -> bool:
+        if time.monotonic() - last_checked < self.health_check_interval:
+            return True
+        with self._condition:
+            self.stats["health_checks"] += 1
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._condition:
+                self.stats["health_check_failures"] += 1
+            return False
+
+    def _reclaim_dead_owners(self) -> List[Connection]:
+        """
+        Free the slots of the connections pinned by threads that exited without releasing them.
+
+        Called with the lock held, the returned connections must be closed after releasing it.
+        """
+        reclaimed = []
+        for conn_id, (conn, owner) in list(self._in_use.items()):
+            if not owner.is_alive():
+                del self._in_use[conn_id]
+                self._size -= 1
+                self.stats["reclaimed"] += 1
+                reclaimed.append(conn)
+        return reclaimed
+
+    def acquire(self, timeout: Optional[float] = None) -> Connection:
+        """
+        Borrow a connection, it must be given back with `release`.
+
+        Raises:
+            ConnectionError: If the pool is closed, no connection frees up within the
+                timeout or a new connection cannot be opened
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        while True:
+            reclaimed = []
+            with self._condition:
+                if self._closed:
+                    raise ConnectionError("MySQL connection pool is closed")
+                if self._idle:
+                    conn, last_checked = self._idle.pop()
+                elif self._size < self.max_size:
+                    conn, last_checked = None, 0.0
+                    self._size += 1
+                elif (reclaimed := self._reclaim_dead_owners()) and self._size < self.max_size:
+                    conn, last_checked = None, 0.0
+                    self._size += 1
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise ConnectionError(
+                            f"Timed out after {timeout}s waiting for a MySQL connection"
+                        )
+                    if not waited:
+                        self.stats["waits"] += 1
+                        waited = True
+                    started = time.monotonic()
+                    self._condition.wait(remaining)
+                    self.stats["wait_seconds"] += time.monotonic() - started
+                    continue
+
+            for dead_conn in reclaimed:
+                self._close_connection(dead_conn)
+            if conn is not None and not self._is_healthy(conn, last_checked):
+                self._close_connection(conn)
+                conn = None
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            with self._condition:
+                self._in_use[id(conn)] = (conn, threading.current_thread())
+                self.stats["acquired"] += 1
+            return conn
+
+    def release(self, conn: Connection, discard: bool = False) -> None:
+        """
+        Give a borrowed connection back to the pool.
+
+        Args:
+            conn: Connection returned by `acquire`
+            discard: Close the connection instead of reusing it, e.g. after a connection error
+        """
+        if not discard:
+            try:
+                # Ends the transaction, so the next borrower does not read a stale snapshot
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._condition:
+            if self._in_use.pop(id(conn), None) is None:
+                # Already reclaimed from a dead thread or released
+                return
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+        if discard or self._closed:
+            self._close_connection(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Connection]:
+        """Borrow a connection for the duration of a `with` block."""
+        conn = self.acquire(timeout)
+        discard = False
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def metrics(self) -> dict:
+        """Pool statistics together with the current number of idle and borrowed connections."""
+        with self._condition:
+            return {
+                **self.stats,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "max_size": self.max_size,
+            }
+
+    def close(self) -> None:
+        """Close the idle connections; borrowed connections are closed when released."""
+        with self._condition:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for conn in idle:
+            self._close_connection(conn)
+
+
+# Pools by connection settings
+_pools: Dict[Tuple, MySQLConnectionPool] = {}
+_pools_lock = threading.Lock()
+# Connections pinned to threads by get_mysql_connection
+_thread_connections = threading.local()
+
+
+def get_mysql_pool(rbase_db_config: dict) -> MySQLConnectionPool:
+    """
+    Get the shared connection pool of a database configuration, creating it on first use.
+
+    Pool settings are read from the `config` section: `pool_size`,
+    `health_check_interval` and `acquire_timeout`.
+
+    Raises:
+        ValueError: If the database provider is not MySQL
+    """
+    if rbase_db_config.get("provider", "").lower() != "mysql":
+        raise ValueError("Currently only MySQL database is supported")
+    config = rbase_db_config.get("config", {})
+    key = tuple(
+        str(config.get(name, "")) for name in ("host", "port", "username", "password", "database")
+    )
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = MySQLConnectionPool(
+                rbase_db_config,
+                max_size=int(config.get("pool_size", 10)),
+                health_check_interval=float(config.get("health_check_interval", 30.0)),
+                acquire_timeout=float(config.get("acquire_timeout", 30.0)),
+            )
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def mysql_connection(rbase_db_config: dict) -> Iterator[Connection]:
+    """
+    Borrow a pooled MySQL connection for the duration of a `with` block.
+
+    Args:
+        rbase_db_config: Database configuration dictionary
+
+    Raises:
+        ValueError: If the database provider is not MySQL
+        ConnectionError: If no connection can be obtained
+    """
+    with get_mysql_pool(rbase_db_config).connection() as conn:
+        yield conn
 
 
 def get_mysql_connection(rbase_db_config: dict) -> Connection:
     """
-    Get MySQL database connection, prioritizing reuse of existing active connection
+    Get a MySQL connection pinned to the calling thread.
+
+    Repeated calls from one thread return the same connection, which stays borrowed from
+    the pool until `close_mysql_connection` is called or the thread exits. Prefer
+    `mysql_connection`, which gives the connection back as soon as the block exits.
 
     Args:
         rbase_db_config: Database configuration dictionary
@@ -25,52 +306,50 @@ def get_mysql_connection(rbase_db_config: dict) -> Connection:
         ValueError: If the database provider is not MySQL
         ConnectionError: If connection to database fails
     """
-    global _active_connection
-
-    # Check database provider
-    if rbase_db_config.get("provider", "").lower() != "mysql":
-        raise ValueError("Currently only MySQL database is supported")
-
-    # If there is an active connection, try to reuse it
-    if _active_connection is not None:
+    pool = get_mysql_pool(rbase_db_config)
+    pinned = getattr(_thread_connections, "connections", None)
+    if pinned is None:
+        pinned = _thread_connections.connections = {}
+    conn, last_used = pinned.get(id(pool), (None, 0.0))
+    if conn is None:
+        conn = pool.acquire()
+    elif time.monotonic() - last_used >= pool.health_check_interval:
         try:
-            # Test if the connection is valid
-            _active_connection.ping(reconnect=True)
-            return _active_connection
+            conn.ping(reconnect=True)
         except Exception:
-            # Connection is invalid, close and create a new one
+            pool.release(conn, discard=True)
+            conn = pool.acquire()
+    pinned[id(pool)] = (conn, time.monotonic())
+    return conn
+
+
+def close_mysql_connection():
+    """
+    Close the MySQL connections pinned to the calling thread
+    """
+    pinned = getattr(_thread_connections, "connections", None) or {}
+    with _pools_lock:
+        pools = {id(pool): pool for pool in _pools.values()}
+    for pool_id, (conn, _) in list(pinned.items()):
+        pool = pools.get(pool_id)
+        if pool is not None:
+            pool.release(conn, discard=True)
+        else:
             try:
-                _active_connection.close()
+                conn.close()
             except Exception:
                 pass
-            _active_connection = None
-
-    # Create a new connection
-    try:
-        conn = pymysql.connect(
-            host=rbase_db_config.get("config", {}).get("host", "localhost"),
-            port=int(rbase_db_config.get("config", {}).get("port", 3306)),
-            user=rbase_db_config.get("config", {}).get("username", ""),
-            password=rbase_db_config.get("config", {}).get("password", ""),
-            database=rbase_db_config.get("config", {}).get("database", ""),
-            charset="utf8mb4",
-            cursorclass=pymysql.cursors.DictCursor,
-        )
-        _active_connection = conn
-        return conn
-    except Exception as e:
-        raise ConnectionError(f"Failed to connect to MySQL database: {e}")
+    pinned.clear()
 
 
-def close_mysql_connection():
+def close_mysql_pools():
     """
-    Close the current active MySQL connection
+    Close every MySQL connection pool
     """
-    global _active_connection
-    if _active_connection is not None:
-        try:
-            _active_connection.close()
-        except Exception:
-            pass
-        finally:
-            _active_connection = None
+    close_mysql_connection()
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+        log.debug(f"closed mysql connection pool, stats: {pool.metrics()}")
@@ -1,8 +1,6 @@
 import os
 from typing import List
 
-from openai._types import NOT_GIVEN
-
 from deepsearcher.embedding.base import BaseEmbedding
 
 OPENAI_MODEL_DIM_MAP = {
@@ -48,6 +46,8 @@ class OpenAIEmbedding(BaseEmbedding):
         self.client = OpenAI(api_key=api_key, base_url=base_url, **kwargs)
 
     def _get_dim(self):
+        from openai._types import NOT_GIVEN
+
         return self.dim if self.model != "text-embedding-ada-002" else NOT_GIVEN
 
     def embed_query(self, text: str) -> List[float]:
@@ -1,7 +1,8 @@
+import json
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.llm.base import BaseLLM, ChatResponse, cached_prompt_tokens
 
 
 class Anthropic(BaseLLM):
@@ -20,13 +21,58 @@ class Anthropic(BaseLLM):
             base_url = None
         self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, **kwargs)
 
+    def prepare_messages(self, messages: List[Dict]) -> List[Dict]:
+        """Map the cacheable segments of segmented messages to `cache_control` breakpoints."""
+        prepared = []
+        for message in messages:
+            if isinstance(message.get("content"), list):
+                blocks = []
+                for segment in message["content"]:
+                    block = {"type": "text", "text": segment["text"]}
+                    if segment.get("cache"):
+                        block["cache_control"] = {"type": "ephemeral"}
+                    blocks.append(block)
+                message = {**message, "content": blocks}
+            prepared.append(message)
+        return prepared
+
     def chat(self, messages: List[Dict]) -> ChatResponse:
         message = self.client.messages.create(
             model=self.model,
             max_tokens=self.max_tokens,
-            messages=messages,
+            messages=self.prepare_messages(messages),
+        )
+        return self._chat_response(message, message.content[0].text)
+
+    def structured_chat(
+        self, messages: List[Dict], schema: Dict, name: str
+    ) -> Optional[ChatResponse]:
+        """Force a tool call whose input schema is the expected object."""
+        message = self.client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            messages=self.prepare_messages(messages),
+            tools=[
+                {"name": name, "description": f"Respond with the {name}.", "input_schema": schema}
+            ],
+            tool_choice={"type": "tool", "name": name},
+        )
+        tool_input = next(block.input for block in message.content if block.type == "tool_use")
+        return self._chat_response(message, json.dumps(tool_input, ensure_ascii=False))
+
+    @staticmethod
+    def _chat_response(message, content: str) -> ChatResponse:
+        usage = message.usage
+        # input_tokens does not include the tokens written to or read from the prompt cache
+        prompt_tokens = (
+            usage.input_tokens
+            + (getattr(usage, "cache_creation_input_tokens", 0) or 0)
+            + (getattr(usage, "cache_read_input_tokens", 0) or 0)
         )
         return ChatResponse(
-            content=message.content[0].text,
-            total_tokens=message.usage.input_tokens + message.usage.output_tokens,
+            content=content,
+            total_tokens=prompt_tokens + usage.output_tokens,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=usage.output_tokens,
+            cached_tokens=cached_prompt_tokens(usage),
         )
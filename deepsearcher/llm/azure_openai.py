@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from deepsearcher.llm.base import BaseLLM, ChatResponse
 
@@ -31,7 +31,23 @@ class AzureOpenAI(BaseLLM):
     def chat(self, messages: List[Dict]) -> ChatResponse:
         completion = self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
+            messages=self.prepare_messages(messages),
+        )
+        return ChatResponse(
+            content=completion.choices[0].message.content,
+            total_tokens=completion.usage.total_tokens,
+        )
+
+    def structured_chat(
+        self, messages: List[Dict], schema: Dict, name: str
+    ) -> Optional[ChatResponse]:
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.prepare_messages(messages),
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": True},
+            },
         )
         return ChatResponse(
             content=completion.choices[0].message.content,
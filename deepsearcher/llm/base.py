@@ -1,7 +1,123 @@
 import ast
+import json
 import re
 from abc import ABC
-from typing import Dict, List, Generator
+from string import Formatter
+from typing import Dict, List, Generator, Optional
+
+from deepsearcher.tools import log
+
+
+def cached_messages(prefix: str, content: str, role: str = "user") -> List[Dict]:
+    """
+    Build a message made of a cacheable static prefix followed by the variable content.
+
+    The content of the message is a list of text segments, the prefix segment is marked
+    with `"cache": True`. Providers with explicit prompt caching mark the prefix as a cache
+    breakpoint, the other providers receive the segments joined in order, which keeps the
+    static prefix at the start of the prompt where automatic prefix caches can hit.
+
+    Args:
+        prefix: Static text that is identical across calls, e.g. the instructions of a template
+        content: Text that varies between calls
+        role: Role of the message
+
+    Returns:
+        A list with the single message
+    """
+    segments = []
+    if prefix:
+        segments.append({"type": "text", "text": prefix, "cache": True})
+    if content:
+        segments.append({"type": "text", "text": content})
+    return [{"role": role, "content": segments}]
+
+
+def cached_prompt(template: str, **kwargs) -> List[Dict]:
+    """
+    Format a prompt template into a message whose static prefix is cacheable.
+
+    The prefix is the text of the template before its first placeholder, so templates
+    should put their instructions first and the variable parts last.
+
+    Args:
+        template: `str.format` template
+        **kwargs: Values of the placeholders
+
+    Returns:
+        A list with the single message
+    """
+    prefix = ""
+    for literal_text, field_name, _, _ in Formatter().parse(template):
+        prefix += literal_text
+        if field_name is not None:
+            break
+    text = template.format(**kwargs)
+    return cached_messages(prefix, text[len(prefix) :])
+
+
+def message_text(message: Dict) -> str:
+    """Text of a message, with the segments of a segmented message joined in order."""
+    content = message.get("content", "")
+    if isinstance(content, list):
+        return "".join(segment.get("text", "") for segment in content)
+    return content if isinstance(content, str) else str(content)
+
+
+def cached_prompt_tokens(usage) -> int:
+    """
+    Number of prompt tokens read from the provider's prompt cache, 0 if not reported.
+
+    Reads `prompt_tokens_details.cached_tokens` (OpenAI compatible APIs),
+    `prompt_cache_hit_tokens` (DeepSeek) and `cache_read_input_tokens` (Anthropic).
+    """
+    if usage is None:
+        return 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is not None and getattr(details, "cached_tokens", None):
+        return details.cached_tokens
+    for name in ("prompt_cache_hit_tokens", "cache_read_input_tokens"):
+        if getattr(usage, name, None):
+            return getattr(usage, name)
+    return 0
+
+
+# Words of an error code, parameter or message that point at the structured output request
+STRUCTURED_OUTPUT_ERROR_MARKERS = (
+    "response_format",
+    "response format",
+    "json_schema",
+    "json_object",
+    "schema",
+    "structured",
+    "tool_choice",
+    "tools",
+)
+
+
+def structured_output_rejected(error: Exception) -> bool:
+    """
+    Whether an error of a structured output request means the provider does not support it.
+
+    A `TypeError` or `NotImplementedError` comes from a client library without the
+    parameters. A client error (HTTP 400, 404 or 422) is a rejection only when its code,
+    parameter or message names the response format, schema or tools; other client errors,
+    e.g. an exceeded context length or a content filter, and timeouts, rate limits or server
+    errors are not.
+    """
+    if isinstance(error, (TypeError, NotImplementedError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code not in (400, 404, 422):
+        return False
+    details = " ".join(
+        str(value)
+        for value in (getattr(error, "code", None), getattr(error, "param", None), error)
+        if value
+    ).lower()
+    return any(marker in details for marker in STRUCTURED_OUTPUT_ERROR_MARKERS)
 
 
 class ChatResponse(ABC):
@@ -10,6 +126,8 @@ class ChatResponse(ABC):
         self.total_tokens = total_tokens
         self.prompt_tokens = kwargs.get("prompt_tokens", 0)
         self.completion_tokens = kwargs.get("completion_tokens", 0)
+        # Prompt tokens served from the provider's prompt cache, part of prompt_tokens
+        self.cached_tokens = kwargs.get("cached_tokens", 0)
 
     def usage(self, offset: dict = {}) -> dict:
         if offset == {}:
@@ -17,12 +135,14 @@ class ChatResponse(ABC):
                 "prompt_tokens": self.prompt_tokens,
                 "completion_tokens": self.completion_tokens,
                 "total_tokens": self.total_tokens,
+                "cached_tokens": self.cached_tokens,
             }
         else:
             return {
                 "prompt_tokens": self.prompt_tokens + offset.get("prompt_tokens", 0),
                 "completion_tokens": self.completion_tokens + offset.get("completion_tokens", 0),
                 "total_tokens": self.total_tokens + offset.get("total_tokens", 0),
+                "cached_tokens": self.cached_tokens + offset.get("cached_tokens", 0),
             }
 
     def __repr__(self) -> str:
@@ -30,15 +150,160 @@ class ChatResponse(ABC):
 
 
 class BaseLLM(ABC):
+    # Shared LLMResponseCache, set by init_config when the cache is enabled
+    response_cache = None
+    # Whether chat_json asks the provider for structured output, cleared when it is rejected
+    structured_output = True
+
     def __init__(self):
         pass
 
     def chat(self, messages: List[Dict]) -> ChatResponse:
         pass
 
+    def prepare_messages(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Convert messages to the format sent to the provider.
+
+        Segmented messages, see `cached_messages`, are joined into plain text messages with
+        the segments in order. Providers with explicit prompt caching override this.
+        """
+        return [
+            {**message, "content": message_text(message)}
+            if isinstance(message.get("content"), list)
+            else message
+            for message in messages
+        ]
+
+    def cached_chat(self, messages: List[Dict], prompt_type: str) -> ChatResponse:
+        """
+        Chat through the response cache when it is enabled for the prompt type.
+
+        A cached response reports no token usage.
+
+        Args:
+            messages: Chat messages
+            prompt_type: Prompt type used for the per-type opt-in, e.g. "rerank"
+        """
+        cache = self.response_cache
+        if cache is None or not cache.enabled_for(prompt_type):
+            return self.chat(messages)
+        model = getattr(self, "model", self.__class__.__name__)
+        content = cache.get(model, messages, prompt_type)
+        if content is not None:
+            return ChatResponse(content=content, total_tokens=0)
+        chat_response = self.chat(messages)
+        if chat_response.content:
+            cache.put(model, messages, prompt_type, chat_response.content)
+        return chat_response
+
+    def chat_json(self, messages: List[Dict], schema: Dict, name: str = "response") -> ChatResponse:
+        """
+        Chat for a JSON object, with the provider's structured output when it supports it.
+
+        The prompt should still describe the expected JSON object: providers without
+        structured output, or rejecting it, receive a plain chat and the object is then
+        extracted from the text by `parse_json`.
+
+        Args:
+            messages: Chat messages
+            schema: JSON schema of the expected object
+            name: Name of the schema, used as the tool or schema name by the providers
+
+        Returns:
+            The response, its content is the JSON text of the object
+        """
+        if self.structured_output:
+            try:
+                chat_response = self.structured_chat(messages, schema, name)
+            except Exception as e:
+                # Timeouts, rate limits and server errors are not a rejection of the
+                # structured output, they are raised as they would be by a plain chat
+                if not structured_output_rejected(e):
+                    raise
+                log.warning(
+                    f"{self.__class__.__name__} rejected structured output, using plain chat: {e}"
+                )
+                self.structured_output = False
+            else:
+                if chat_response is not None:
+                    return chat_response
+        return self.chat(messages)
+
+    def structured_chat(
+        self, messages: List[Dict], schema: Dict, name: str
+    ) -> Optional[ChatResponse]:
+        """Chat with the provider's structured output, None when the provider has none."""
+        return None
+
     def stream_generator(self, messages: List[Dict]) -> Generator[object, None, None]:
         pass
 
+    def chat_stream(self, messages: List[Dict]) -> Generator[str, None, ChatResponse]:
+        """
+        Chat and yield the pieces of the answer as they are generated.
+
+        Built on `stream_generator`, whose chunks are in the OpenAI chat completion chunk
+        format. Providers without streaming yield the whole answer of `chat` at once.
+
+        Args:
+            messages: Chat messages
+
+        Returns:
+            The complete response, with the token usage reported by the stream
+        """
+        stream = self.stream_generator(messages)
+        if stream is None:
+            chat_response = self.chat(messages)
+            yield chat_response.content
+            return chat_response
+        content = ""
+        usage = None
+        for chunk in stream:
+            if chunk.choices:
+                piece = getattr(chunk.choices[0].delta, "content", None)
+                if piece:
+                    content += piece
+                    yield piece
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+        if usage is None:
+            return ChatResponse(content=content, total_tokens=0)
+        return ChatResponse(
+            content=content,
+            total_tokens=usage.total_tokens,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            cached_tokens=cached_prompt_tokens(usage),
+        )
+
+    @staticmethod
+    def parse_json(response_content: str) -> Dict:
+        """
+        Extract the JSON object of a response, tolerating reasoning text and code fences.
+
+        Raises:
+            ValueError: If the response contains no JSON object
+        """
+        response_content = response_content.strip()
+        if "<think>" in response_content and "</think>" in response_content:
+            end_of_think = response_content.find("</think>") + len("</think>")
+            response_content = response_content[end_of_think:]
+        start, end = response_content.find("{"), response_content.rfind("}")
+        if start == -1 or end < start:
+            raise ValueError(f"No JSON object in response content:\n{response_content}")
+        json_part = response_content[start : end + 1]
+        try:
+            result = json.loads(json_part)
+        except json.JSONDecodeError:
+            try:
+                result = ast.literal_eval(json_part)
+            except Exception:
+                raise ValueError(f"Invalid JSON object in response content:\n{response_content}")
+        if not isinstance(result, dict):
+            raise ValueError(f"Invalid JSON object in response content:\n{response_content}")
+        return result
+
     @staticmethod
     def literal_eval(response_content: str):
         response_content = response_content.strip()
@@ -0,0 +1,261 @@
+"""
+Persistent cache of LLM responses.
+
+Short classification prompts (reranking, language detection, routing, ...) are
+deterministic functions of small inputs, and repeated runs send the exact same prompts
+again. Responses are stored in a local SQLite file keyed by the model name and the
+normalized messages, and expire after a TTL. Each prompt type has to be enabled
+explicitly, prompts whose answers are expected to vary are never cached.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import message_text
+from deepsearcher.tools import log
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_messages(messages: List[Dict]) -> str:
+    """Serialize messages with whitespace runs collapsed, so formatting noise does not miss the cache."""
+    normalized = [
+        {
+            "role": message.get("role", ""),
+            "content": WHITESPACE_PATTERN.sub(" ", message_text(message)).strip(),
+        }
+        for message in messages
+    ]
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+
+
+def variable_text(messages: List[Dict]) -> str:
+    """
+    Text of the messages without their cacheable static segments, see `cached_messages`.
+
+    Prompts built from one template share its long static instructions, which would
+    dominate their embeddings, so only the variable parts are compared.
+    """
+    texts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            texts.extend(segment.get("text", "") for segment in content if not segment.get("cache"))
+        else:
+            texts.append(message_text(message))
+    return WHITESPACE_PATTERN.sub(" ", "\n".join(texts)).strip()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed cache of LLM responses with TTL and size based eviction.
+
+    When an embedding model is given, a prompt that misses the exact cache can still be
+    answered by a cached prompt of the same model and prompt type whose embedding is at
+    least `similarity_threshold` similar. Only the variable parts of the prompts are
+    embedded, so prompts should be built with `cached_prompt`.
+
+    Expired and least recently used responses are evicted every `evict_interval` stores,
+    expired responses are never returned in between.
+    """
+
+    def __init__(
+        self,
+        path: str = "database/llm_cache.sqlite",
+        ttl: float = 7 * 24 * 3600,
+        max_entries: int = 100_000,
+        prompt_types: Optional[Iterable[str]] = None,
+        embedding_model: Optional[BaseEmbedding] = None,
+        similarity_threshold: float = 0.98,
+        evict_interval: int = 100,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file the responses are stored in
+            ttl: Seconds a cached response stays valid, 0 disables expiry
+            max_entries: Maximum number of cached responses, the least recently used
+                responses are evicted beyond it
+            prompt_types: Prompt types that are cached, all prompt types when None
+            embedding_model: Model used for the similarity match, disabled when None
+            similarity_threshold: Minimum cosine similarity of a similarity match
+            evict_interval: Number of stores between two evictions
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prompt_types = set(prompt_types) if prompt_types is not None else None
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.evict_interval = max(1, evict_interval)
+        self._stores_since_evict = 0
+        self.stats = {"hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        # (model, prompt type) -> (keys, normalized embedding matrix)
+        self._vectors: Dict[tuple, tuple] = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_type TEXT NOT NULL,
+                content TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_lru ON llm_cache (last_used_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_ttl ON llm_cache (created_at)")
+        self._conn.commit()
+
+    def enabled_for(self, prompt_type: Optional[str]) -> bool:
+        if not prompt_type:
+            return False
+        return self.prompt_types is None or prompt_type in self.prompt_types
+
+    @staticmethod
+    def make_key(model: str, normalized_messages: str) -> str:
+        return hashlib.sha256(f"{model}\n{normalized_messages}".encode("utf-8")).hexdigest()
+
+    def _embed(self, messages: List[Dict]) -> np.ndarray:
+        vector = np.asarray(
+            self.embedding_model.embed_query(variable_text(messages)), dtype=np.float32
+        )
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl if self.ttl else 0.0
+
+    def get(self, model: str, messages: List[Dict], prompt_type: str) -> Optional[str]:
+        """
+        Look up the cached response of a prompt.
+
+        Args:
+            model: Model name
+            messages: Chat messages
+            prompt_type: Prompt type the messages belong to
+
+        Returns:
+            The cached response content, or None
+        """
+        normalized = normalize_messages(messages)
+        key = self.make_key(model, normalized)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, self._expired_before()),
+            ).fetchone()
+            if row is None and self.embedding_model is not None:
+                row = self._get_similar(model, prompt_type, messages)
+                if row is not None:
+                    self.stats["similar_hits"] += 1
+                    key = row[1]
+            elif row is not None:
+                self.stats["hits"] += 1
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def _get_similar(self, model: str, prompt_type: str, messages: List[Dict]) -> Optional[tuple]:
+        group = (model, prompt_type)
+        if group not in self._vectors:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM llm_cache WHERE model = ? AND prompt_type = ? "
+                "AND embedding IS NOT NULL",
+                (model, prompt_type),
+            ).fetchall()
+            keys = [key for key, _ in rows]
+            matrix = (
+                np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob in rows])
+                if rows
+                else None
+            )
+            self._vectors[group] = (keys, matrix)
+        keys, matrix = self._vectors[group]
+        if matrix is None:
+            return None
+        similarities = matrix @ self._embed(messages)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        row = self._conn.execute(
+            "SELECT content FROM llm_cache WHERE key = ? AND created_at >= ?",
+            (keys[best], self._expired_before()),
+        ).fetchone()
+        return (row[0], keys[best]) if row else None
+
+    def put(self, model: str, messages: List[Dict], prompt_type: str, content: str) -> None:
+        normalized = normalize_messages(messages)
+        key = self.make_key(model, normalized)
+        embedding = self._embed(messages) if self.embedding_model is not None else None
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    model,
+                    prompt_type,
+                    content,
+                    embedding.tobytes() if embedding is not None else None,
+                    now,
+                    now,
+                ),
+            )
+            self.stats["stores"] += 1
+            self._vectors.pop((model, prompt_type), None)
+            self._stores_since_evict += 1
+            if self._stores_since_evict >= self.evict_interval:
+                self._stores_since_evict = 0
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        evicted = 0
+        if self.ttl:
+            evicted += self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (self._expired_before(),)
+            ).rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            evicted += self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY last_used_at LIMIT ?)",
+                (count - self.max_entries,),
+            ).rowcount
+        if evicted:
+            self.stats["evictions"] += evicted
+            self._vectors.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self._vectors.clear()
+
+    def log_stats(self) -> None:
+        lookups = self.stats["hits"] + self.stats["similar_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["similar_hits"]) / lookups if lookups else 0.0
+        log.debug(f"llm cache stats: {self.stats}, hit rate: {hit_rate:.1%}")
+
+    def close(self) -> None:
+        self._conn.close()
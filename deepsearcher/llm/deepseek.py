@@ -1,7 +1,7 @@
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.llm.base import BaseLLM, ChatResponse, cached_prompt_tokens
 
 
 class DeepSeek(BaseLLM):
@@ -26,9 +26,29 @@ class DeepSeek(BaseLLM):
     def chat(self, messages: List[Dict]) -> ChatResponse:
         completion = self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
+            messages=self.prepare_messages(messages),
         )
         return ChatResponse(
             content=completion.choices[0].message.content,
             total_tokens=completion.usage.total_tokens,
+            prompt_tokens=completion.usage.prompt_tokens,
+            completion_tokens=completion.usage.completion_tokens,
+            cached_tokens=cached_prompt_tokens(completion.usage),
+        )
+
+    def structured_chat(
+        self, messages: List[Dict], schema: Dict, name: str
+    ) -> Optional[ChatResponse]:
+        """JSON output mode, the API takes no schema, the prompt describes the object."""
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.prepare_messages(messages),
+            response_format={"type": "json_object"},
+        )
+        return ChatResponse(
+            content=completion.choices[0].message.content,
+            total_tokens=completion.usage.total_tokens,
+            prompt_tokens=completion.usage.prompt_tokens,
+            completion_tokens=completion.usage.completion_tokens,
+            cached_tokens=cached_prompt_tokens(completion.usage),
         )
@@ -1,7 +1,7 @@
 import os
 from typing import Dict, List
 
-from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.llm.base import BaseLLM, ChatResponse, message_text
 
 
 class Gemini(BaseLLM):
@@ -20,7 +20,7 @@ class Gemini(BaseLLM):
     def chat(self, messages: List[Dict]) -> ChatResponse:
         response = self.client.models.generate_content(
             model=self.model,
-            contents="\n".join([m["content"] for m in messages]),
+            contents="\n".join([message_text(m) for m in messages]),
         )
         return ChatResponse(
             content=response.text,
@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from deepsearcher.llm.base import BaseLLM, ChatResponse
 
@@ -15,9 +15,20 @@ class Ollama(BaseLLM):
         self.client = Client(host=base_url)
 
     def chat(self, messages: List[Dict]) -> ChatResponse:
-        completion = self.client.chat(model=self.model, messages=messages)
+        completion = self.client.chat(model=self.model, messages=self.prepare_messages(messages))
 
         return ChatResponse(
             content=completion.message.content,
             total_tokens=completion.prompt_eval_count + completion.eval_count,
         )
+
+    def structured_chat(
+        self, messages: List[Dict], schema: Dict, name: str
+    ) -> Optional[ChatResponse]:
+        completion = self.client.chat(
+            model=self.model, messages=self.prepare_messages(messages), format=schema
+        )
+        return ChatResponse(
+            content=completion.message.content,
+            total_tokens=completion.prompt_eval_count + completion.eval_count,
+        )
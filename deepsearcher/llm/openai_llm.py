@@ -1,7 +1,7 @@
 import os
-from typing import Dict, List, Callable, Generator
+from typing import Dict, List, Callable, Generator, Optional
 
-from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.llm.base import BaseLLM, ChatResponse, cached_prompt_tokens
 from deepsearcher.tools import log
 
 
@@ -33,15 +33,36 @@ class OpenAI(BaseLLM):
             # 普通调用模式
             completion = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=self.prepare_messages(messages),
             )
             return ChatResponse(
                 content=completion.choices[0].message.content,
                 total_tokens=completion.usage.total_tokens,
                 prompt_tokens=completion.usage.prompt_tokens,
                 completion_tokens=completion.usage.completion_tokens,
+                cached_tokens=cached_prompt_tokens(completion.usage),
             )
 
+    def structured_chat(
+        self, messages: List[Dict], schema: Dict, name: str
+    ) -> Optional[ChatResponse]:
+        """使用 json_schema 结构化输出调用API，不使用流式模式"""
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=self.prepare_messages(messages),
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": True},
+            },
+        )
+        return ChatResponse(
+            content=completion.choices[0].message.content,
+            total_tokens=completion.usage.total_tokens,
+            prompt_tokens=completion.usage.prompt_tokens,
+            completion_tokens=completion.usage.completion_tokens,
+            cached_tokens=cached_prompt_tokens(completion.usage),
+        )
+
     def stream_generator(self, messages: List[Dict], ) -> Generator[object, None, None]:
         """
         使用流式模式调用API，直接返回原始的chunk对象
@@ -55,7 +76,7 @@ class OpenAI(BaseLLM):
         # 创建流式请求
         return self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
+            messages=self.prepare_messages(messages),
             stream=True,
             stream_options={"include_usage": True},
         )
@@ -77,6 +98,7 @@ class OpenAI(BaseLLM):
         total_tokens = 0
         prompt_tokens = 0
         completion_tokens = 0
+        cached_tokens = 0
         is_answering = False  # 标记是否已经从推理过程转为回答过程
         is_reasoning = False
 
@@ -110,6 +132,7 @@ class OpenAI(BaseLLM):
                 total_tokens += chunk.usage.total_tokens
                 prompt_tokens += chunk.usage.prompt_tokens
                 completion_tokens += chunk.usage.completion_tokens
+                cached_tokens += cached_prompt_tokens(chunk.usage)
 
         # 最终的回答内容
         final_content = collected_content
@@ -122,4 +145,5 @@ class OpenAI(BaseLLM):
             total_tokens=total_tokens,
             prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
+            cached_tokens=cached_tokens,
         )
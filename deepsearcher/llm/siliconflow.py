@@ -26,7 +26,7 @@ class SiliconFlow(BaseLLM):
     def chat(self, messages: List[Dict]) -> ChatResponse:
         completion = self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
+            messages=self.prepare_messages(messages),
         )
         return ChatResponse(
             content=completion.choices[0].message.content,
@@ -20,7 +20,7 @@ class TogetherAI(BaseLLM):
     def chat(self, messages: List[Dict]) -> ChatResponse:
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=messages,
+            messages=self.prepare_messages(messages),
         )
         return ChatResponse(
             content=response.choices[0].message.content,
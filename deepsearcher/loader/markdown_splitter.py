@@ -0,0 +1,294 @@
+"""
+Structure-aware markdown chunker for academic papers.
+
+Papers converted to markdown keep their section headings, tables and figure captions.
+This module splits a document along its heading hierarchy and packs the paragraphs of
+each section into chunks bounded by a token budget, so that no chunk straddles two
+sections and tables are never cut in half.
+"""
+
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from deepsearcher.loader.splitter import Chunk, parallel_split
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+CAPTION_PATTERN = re.compile(r"^\s*(?:\*\*|_)?(fig\.?|figure|table|图|表)\s*[\dS]", re.IGNORECASE)
+IMAGE_PATTERN = re.compile(r"^\s*!\[")
+
+# Sections dropped from the index, together with their subsections
+DEFAULT_DROP_SECTIONS = ("references", "bibliography", "参考文献")
+
+_token_counter: Optional[Callable[[str], int]] = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text.
+
+    Uses tiktoken's cl100k_base encoding when tiktoken is installed, otherwise estimates
+    one token per word or punctuation mark and one token per CJK character.
+    """
+    global _token_counter
+    if _token_counter is None:
+        try:
+            import tiktoken
+
+            encoding = tiktoken.get_encoding("cl100k_base")
+            _token_counter = lambda t: len(encoding.encode(t, disallowed_special=()))  # noqa: E731
+        except Exception:
+            pattern = re.compile(r"[一-鿿]|[A-Za-z0-9]+|[^\sA-Za-z0-9一-鿿]")
+            _token_counter = lambda t: len(pattern.findall(t))  # noqa: E731
+    return _token_counter(text)
+
+
+class _Block:
+    """A contiguous piece of a section: a paragraph, a table, a code block or a caption."""
+
+    def __init__(self, kind: str, text: str, start: int, end: int):
+        self.kind = kind
+        self.text = text
+        self.start = start
+        self.end = end
+        self.tokens = count_tokens(text)
+        self.has_caption = False
+
+
+def _parse_blocks(text: str) -> Iterator[Tuple[List[str], _Block]]:
+    """
+    Walk through a markdown text and yield (section path, block) pairs.
+
+    Heading lines only update the section path; blank lines close paragraphs; consecutive
+    table rows and fenced code blocks are kept together as a single block.
+    """
+    section_path: List[Tuple[int, str]] = []
+    lines = text.splitlines(keepends=True)
+    position = 0
+    current_kind = None
+    current_start = 0
+    current_lines: List[str] = []
+
+    def close_block():
+        if current_lines:
+            block_text = "".join(current_lines).strip()
+            if block_text:
+                kind = current_kind
+                if kind == "paragraph" and CAPTION_PATTERN.match(block_text):
+                    kind = "caption"
+                return [t for _, t in section_path], _Block(
+                    kind, block_text, current_start, current_start + len("".join(current_lines))
+                )
+        return None
+
+    in_fence = False
+    for line in lines:
+        stripped = line.strip()
+        if in_fence:
+            current_lines.append(line)
+            if stripped.startswith("```"):
+                in_fence = False
+                block = close_block()
+                if block:
+                    yield block
+                current_lines, current_kind = [], None
+            position += len(line)
+            continue
+
+        heading = HEADING_PATTERN.match(stripped)
+        is_table_row = stripped.startswith("|")
+        if (
+            heading
+            or not stripped
+            or stripped.startswith("```")
+            or (current_kind is not None and (current_kind == "table") != is_table_row)
+        ):
+            block = close_block()
+            if block:
+                yield block
+            current_lines, current_kind = [], None
+
+        if heading:
+            level = len(heading.group(1))
+            while section_path and section_path[-1][0] >= level:
+                section_path.pop()
+            section_path.append((level, heading.group(2).strip()))
+        elif stripped.startswith("```"):
+            in_fence = True
+            current_kind, current_start, current_lines = "code", position, [line]
+        elif stripped:
+            if current_kind is None:
+                current_kind = "table" if is_table_row else "paragraph"
+                current_start = position
+            current_lines.append(line)
+        position += len(line)
+
+    block = close_block()
+    if block:
+        yield block
+
+
+def _split_oversized(block: _Block, max_tokens: int) -> List[_Block]:
+    """Split a block that exceeds the token budget on its own."""
+    if block.kind == "table":
+        lines = block.text.splitlines()
+        # An attached caption precedes or follows the rows and is kept on every part
+        row_indexes = [i for i, line in enumerate(lines) if line.lstrip().startswith("|")]
+        first_row, last_row = row_indexes[0], row_indexes[-1] + 1
+        before, rows, after = lines[:first_row], lines[first_row:last_row], lines[last_row:]
+        # Keep the header row, and the delimiter row when present, on every part
+        has_delimiter = len(rows) > 2 and set(rows[1].replace("|", "").strip()) <= set("-: ")
+        header = before + (rows[:2] if has_delimiter else rows[:1])
+        body = rows[len(header) - len(before) :]
+        parts, current = [], []
+        for row in body:
+            if current and count_tokens("\n".join(header + current + [row] + after)) > max_tokens:
+                parts.append("\n".join(header + current + after))
+                current = []
+            current.append(row)
+        if current:
+            parts.append("\n".join(header + current + after))
+        return [_Block("table", part, block.start, block.end) for part in parts]
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=max_tokens,
+        chunk_overlap=0,
+        length_function=count_tokens,
+        separators=["\n", ". ", "。", "; ", ", ", " ", ""],
+        keep_separator="end",
+        add_start_index=True,
+    )
+    return [
+        _Block(
+            block.kind,
+            doc.page_content,
+            block.start + doc.metadata["start_index"],
+            block.start + doc.metadata["start_index"] + len(doc.page_content),
+        )
+        for doc in text_splitter.create_documents([block.text])
+    ]
+
+
+def _attach_captions(blocks: List[_Block]) -> List[_Block]:
+    """Merge figure and table captions into the table or figure they describe."""
+    merged: List[_Block] = []
+    pending_caption: Optional[_Block] = None
+    for block in blocks:
+        if block.kind == "caption":
+            previous = merged[-1] if merged else None
+            if (
+                previous is not None
+                and not previous.has_caption
+                and (
+                    previous.kind == "table" or IMAGE_PATTERN.match(previous.text.splitlines()[-1])
+                )
+            ):
+                merged[-1] = _Block(
+                    previous.kind, previous.text + "\n\n" + block.text, previous.start, block.end
+                )
+                merged[-1].has_caption = True
+            else:
+                pending_caption = block
+            continue
+        if pending_caption is not None:
+            block = _Block(
+                block.kind,
+                pending_caption.text + "\n\n" + block.text,
+                pending_caption.start,
+                block.end,
+            )
+            block.has_caption = True
+            pending_caption = None
+        merged.append(block)
+    if pending_caption is not None:
+        merged.append(pending_caption)
+    return merged
+
+
+def iter_markdown_docs_to_chunks(
+    documents: Iterable[Document],
+    max_tokens: int = 512,
+    offset: int = 300,
+    drop_sections: Iterable[str] = DEFAULT_DROP_SECTIONS,
+) -> Iterator[Chunk]:
+    """
+    Split markdown documents into section-aligned chunks.
+
+    Args:
+        documents: Markdown documents to split
+        max_tokens: Token budget of a chunk; a single table may exceed it only when it
+            cannot be split by rows
+        offset: Size of the context window stored as `wider_text`, in characters
+        drop_sections: Section titles (case-insensitive) skipped with their subsections
+
+    Yields:
+        Chunk objects with `section_path` and `wider_text` in their metadata
+    """
+    drop_sections = {title.lower() for title in drop_sections}
+    for doc in documents:
+        text = doc.page_content
+        reference = doc.metadata.get("reference", "")
+        base_metadata = {k: v for k, v in doc.metadata.items() if k != "reference"}
+
+        sections: List[Tuple[List[str], List[_Block]]] = []
+        for path, block in _parse_blocks(text):
+            if any(title.lower().strip(" *:.0123456789") in drop_sections for title in path):
+                continue
+            if not sections or sections[-1][0] != path:
+                sections.append((path, []))
+            sections[-1][1].append(block)
+
+        for path, blocks in sections:
+            packed: List[_Block] = []
+            packed_tokens = 0
+            for block in _attach_captions(blocks):
+                pieces = (
+                    [block] if block.tokens <= max_tokens else _split_oversized(block, max_tokens)
+                )
+                for piece in pieces:
+                    if packed and packed_tokens + piece.tokens > max_tokens:
+                        yield _make_chunk(text, packed, path, reference, base_metadata, offset)
+                        packed, packed_tokens = [], 0
+                    packed.append(piece)
+                    packed_tokens += piece.tokens
+            if packed:
+                yield _make_chunk(text, packed, path, reference, base_metadata, offset)
+
+
+def _make_chunk(
+    text: str,
+    blocks: List[_Block],
+    path: List[str],
+    reference: str,
+    base_metadata: dict,
+    offset: int,
+) -> Chunk:
+    start, end = blocks[0].start, blocks[-1].end
+    metadata = dict(base_metadata)
+    metadata["section_path"] = " > ".join(path)
+    metadata["wider_text"] = text[max(0, start - offset) : min(len(text), end + offset)]
+    return Chunk(
+        text="\n\n".join(block.text for block in blocks), reference=reference, metadata=metadata
+    )
+
+
+def split_markdown_docs_to_chunks(
+    documents: List[Document],
+    max_tokens: int = 512,
+    drop_sections: Iterable[str] = DEFAULT_DROP_SECTIONS,
+    num_workers: int = 0,
+) -> List[Chunk]:
+    if num_workers and num_workers > 1:
+        return parallel_split(
+            documents,
+            iter_markdown_docs_to_chunks,
+            num_workers=num_workers,
+            max_tokens=max_tokens,
+            drop_sections=tuple(drop_sections),
+        )
+    return list(
+        iter_markdown_docs_to_chunks(documents, max_tokens=max_tokens, drop_sections=drop_sections)
+    )
@@ -1,10 +1,12 @@
 ## Sentence Window splitting strategy, ref:
 #  https://github.com/milvus-io/bootcamp/blob/master/bootcamp/RAG/advanced_rag/sentence_window_with_langchain.ipynb
 
-from typing import List
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 from langchain_core.documents import Document
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 
 class Chunk:
@@ -22,33 +24,205 @@ class Chunk:
 
 
 def _sentence_window_split(
-    split_docs: List[Document], original_document: Document, offset: int = 200
-) -> List[Chunk]:
-    chunks = []
+    split_docs: Iterable[Document], original_document: Document, offset: int = 200
+) -> Iterator[Chunk]:
+    """
+    Attach a wider context window to each split document.
+
+    The start offset of every split comes from the `start_index` recorded by the text
+    splitter, so no search over the original text is needed and repeated passages are
+    mapped to their real position.
+
+    Args:
+        split_docs: Documents produced by a splitter created with `add_start_index=True`
+        original_document: The document the splits were taken from
+        offset: Number of characters added on both sides of a split
+
+    Yields:
+        Chunk objects with `wider_text` set in their metadata
+    """
     original_text = original_document.page_content
     for doc in split_docs:
         doc_text = doc.page_content
-        start_index = original_text.index(doc_text)
+        start_index = doc.metadata.pop("start_index", -1)
+        if start_index < 0:
+            # The splitter could not locate the split (e.g. it was modified after splitting)
+            start_index = original_text.find(doc_text)
         end_index = start_index + len(doc_text) - 1
         wider_text = original_text[
             max(0, start_index - offset) : min(len(original_text), end_index + offset)
         ]
         reference = doc.metadata.pop("reference", "")
         doc.metadata["wider_text"] = wider_text
-        chunk = Chunk(text=doc_text, reference=reference, metadata=doc.metadata)
-        chunks.append(chunk)
-    return chunks
+        yield Chunk(text=doc_text, reference=reference, metadata=doc.metadata)
 
 
-def split_docs_to_chunks(
-    documents: List[Document], chunk_size: int = 1500, chunk_overlap=100
-) -> List[Chunk]:
+def iter_docs_to_chunks(
+    documents: Iterable[Document], chunk_size: int = 1500, chunk_overlap=100, offset: int = 300
+) -> Iterator[Chunk]:
+    """
+    Split documents into chunks lazily, one document at a time.
+
+    Args:
+        documents: Documents to split
+        chunk_size: Maximum number of characters per chunk
+        chunk_overlap: Number of characters shared by neighbouring chunks
+        offset: Size of the sentence window added on both sides of a chunk
+
+    Yields:
+        Chunk objects in document order
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
     )
-    all_chunks = []
     for doc in documents:
         split_docs = text_splitter.split_documents([doc])
-        split_chunks = _sentence_window_split(split_docs, doc, offset=300)
-        all_chunks.extend(split_chunks)
+        yield from _sentence_window_split(split_docs, doc, offset=offset)
+
+
+# Documents handed to split workers. Under the "fork" start method the workers inherit
+# this list from the parent process, so large documents are never pickled.
+_shared_documents: Optional[List[Document]] = None
+_worker_split: Optional[Callable[..., Iterable[Chunk]]] = None
+_worker_options: dict = {}
+
+# Work units per worker, so that units of uneven cost still keep every worker busy
+UNITS_PER_WORKER = 4
+# Smallest work unit, below it the per-task overhead of the pool dominates
+MIN_WORK_UNIT_CHARS = 20_000
+
+
+def _init_split_worker(
+    split: Callable[..., Iterable[Chunk]], options: dict, documents: Optional[List[Document]] = None
+):
+    global _shared_documents, _worker_split, _worker_options
+    _worker_split = split
+    _worker_options = options
+    if documents is not None:
+        _shared_documents = documents
+
+
+def _split_document_range(doc_range: Tuple[int, int]) -> List[Chunk]:
+    start, end = doc_range
+    return list(_worker_split(_shared_documents[start:end], **_worker_options))
+
+
+def _plan_work_units(documents: List[Document], target_chars: int) -> List[Tuple[int, int]]:
+    """
+    Group consecutive documents into work units of roughly `target_chars` characters.
+
+    Large documents get a unit of their own, small ones are batched together so that
+    the per-task overhead of the pool stays negligible.
+    """
+    units = []
+    start = 0
+    unit_chars = 0
+    for i, doc in enumerate(documents):
+        unit_chars += len(doc.page_content)
+        if unit_chars >= target_chars:
+            units.append((start, i + 1))
+            start = i + 1
+            unit_chars = 0
+    if start < len(documents):
+        units.append((start, len(documents)))
+    return units
+
+
+def parallel_split(
+    documents: List[Document],
+    split: Callable[..., Iterable[Chunk]],
+    num_workers: Optional[int] = None,
+    work_unit_chars: Optional[int] = None,
+    **options,
+) -> List[Chunk]:
+    """
+    Split documents into chunks with a pool of worker processes.
+
+    Documents are grouped into contiguous work units and the results are merged in
+    the original document order, so the output is identical to a serial split.
+
+    Args:
+        documents: Documents to split
+        split: Module level function splitting a list of documents, e.g. `iter_docs_to_chunks`
+        num_workers: Number of worker processes, defaults to the CPU count
+        work_unit_chars: Approximate number of characters handled by one task, defaults to
+            an even share of `UNITS_PER_WORKER` units per worker
+        **options: Keyword arguments of `split`
+
+    Returns:
+        List of chunks in document order
+    """
+    global _shared_documents
+    documents = list(documents)
+    num_workers = num_workers or os.cpu_count() or 1
+    if work_unit_chars is None:
+        total_chars = sum(len(doc.page_content) for doc in documents)
+        work_unit_chars = max(MIN_WORK_UNIT_CHARS, total_chars // (num_workers * UNITS_PER_WORKER))
+    units = _plan_work_units(documents, work_unit_chars)
+    if num_workers <= 1 or len(units) <= 1:
+        return list(split(documents, **options))
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        _shared_documents = documents
+        initargs = (split, options)
+    else:
+        # Without fork every worker receives the documents once at start-up
+        context = multiprocessing.get_context()
+        initargs = (split, options, documents)
+
+    all_chunks = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(num_workers, len(units)),
+            mp_context=context,
+            initializer=_init_split_worker,
+            initargs=initargs,
+        ) as executor:
+            for chunks in executor.map(_split_document_range, units):
+                all_chunks.extend(chunks)
+    finally:
+        _shared_documents = None
     return all_chunks
+
+
+def parallel_split_docs_to_chunks(
+    documents: List[Document],
+    chunk_size: int = 1500,
+    chunk_overlap=100,
+    num_workers: Optional[int] = None,
+    work_unit_chars: Optional[int] = None,
+) -> List[Chunk]:
+    """
+    Split documents into chunks with a pool of worker processes, see `parallel_split`.
+
+    Args:
+        documents: Documents to split
+        chunk_size: Maximum number of characters per chunk
+        chunk_overlap: Number of characters shared by neighbouring chunks
+        num_workers: Number of worker processes, defaults to the CPU count
+        work_unit_chars: Approximate number of characters handled by one task
+
+    Returns:
+        List of chunks in document order, identical to `split_docs_to_chunks`
+    """
+    return parallel_split(
+        documents,
+        iter_docs_to_chunks,
+        num_workers=num_workers,
+        work_unit_chars=work_unit_chars,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+
+def split_docs_to_chunks(
+    documents: List[Document], chunk_size: int = 1500, chunk_overlap=100, num_workers: int = 0
+) -> List[Chunk]:
+    if num_workers and num_workers > 1:
+        return parallel_split_docs_to_chunks(
+            documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap, num_workers=num_workers
+        )
+    return list(iter_docs_to_chunks(documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap))
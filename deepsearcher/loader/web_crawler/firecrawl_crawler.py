@@ -1,7 +1,6 @@
 import os
 from typing import List, Optional
 
-from firecrawl import FirecrawlApp
 from langchain_core.documents import Document
 
 from deepsearcher.loader.web_crawler.base import BaseCrawler
@@ -36,6 +35,8 @@ class FireCrawlCrawler(BaseCrawler):
         """
 
         # Lazy init
+        from firecrawl import FirecrawlApp
+
         self.app = FirecrawlApp(api_key=os.getenv("FIRECRAWL_API_KEY"))
 
         # if user just inputs a single url as param
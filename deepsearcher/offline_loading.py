@@ -16,7 +16,19 @@ def load_from_local_files(
     chunk_size: int = 1500,
     chunk_overlap: int = 100,
     batch_size: int = 256,
+    split_workers: int = 0,
+    splitter: str = "recursive",
+    chunk_tokens: int = 512,
+    near_duplicates: str = None,
+    near_duplicate_index_dir: str = "database/near_duplicates",
 ):
+    # Imported here so that importing the CLI does not load the text splitters
+    from deepsearcher.loader.markdown_splitter import split_markdown_docs_to_chunks
+    from deepsearcher.vector_db.near_duplicate import (
+        filter_near_duplicate_chunks,
+        get_collection_index,
+    )
+
     vector_db = configuration.vector_db
     if collection_name is None:
         collection_name = vector_db.default_collection
@@ -41,14 +53,29 @@ def load_from_local_files(
             docs = file_loader.load_file(path)
         all_docs.extend(docs)
     # print("Splitting docs to chunks...")
-    chunks = split_docs_to_chunks(
-        all_docs,
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-    )
+    if splitter == "markdown":
+        chunks = split_markdown_docs_to_chunks(
+            all_docs, max_tokens=chunk_tokens, num_workers=split_workers
+        )
+    else:
+        chunks = split_docs_to_chunks(
+            all_docs,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            num_workers=split_workers,
+        )
+    if near_duplicates:
+        near_duplicate_index = get_collection_index(collection_name, near_duplicate_index_dir)
+        if force_new_collection:
+            near_duplicate_index.clear()
+        # The rows of a re-loaded file are not deleted, so its chunks stay indexed and
+        # the near duplicate mode applies to them like to any other stored chunk
+        chunks = filter_near_duplicate_chunks(chunks, near_duplicate_index, near_duplicates)
 
     chunks = embedding_model.embed_chunks(chunks, batch_size=batch_size)
     vector_db.insert_data(collection=collection_name, chunks=chunks)
+    if near_duplicates:
+        near_duplicate_index.save()
 
 
 def load_from_website(
@@ -57,6 +84,7 @@ def load_from_website(
     collection_description: str = None,
     force_new_collection: bool = False,
     batch_size: int = 256,
+    split_workers: int = 0,
     **crawl_kwargs,
 ):
     if isinstance(urls, str):
@@ -74,6 +102,6 @@ def load_from_website(
 
     all_docs = web_crawler.crawl_urls(urls, **crawl_kwargs)
 
-    chunks = split_docs_to_chunks(all_docs)
+    chunks = split_docs_to_chunks(all_docs, num_workers=split_workers)
     chunks = embedding_model.embed_chunks(chunks, batch_size=batch_size)
     vector_db.insert_data(collection=collection_name, chunks=chunks)
@@ -1,4 +1,4 @@
-from typing import List, Tuple
+from typing import Generator, List, Tuple
 
 # from deepsearcher.configuration import vector_db, embedding_model, llm
 from deepsearcher import configuration
@@ -10,6 +10,16 @@ def query(original_query: str, max_iter: int = 3) -> Tuple[str, List[RetrievalRe
     return default_searcher.query(original_query, max_iter=max_iter)
 
 
+def query_stream(original_query: str, max_iter: int = 3) -> Generator[dict, None, None]:
+    """
+    Query the default searcher, yielding the retrieval progress and then the answer tokens.
+
+    See `RAGAgent.query_stream` for the events.
+    """
+    default_searcher = configuration.default_searcher
+    return default_searcher.query_stream(original_query, max_iter=max_iter)
+
+
 def retrieve(
     original_query: str, max_iter: int = 3
 ) -> Tuple[List[RetrievalResult], List[str], int]:
@@ -5,7 +5,7 @@ from typing import List, Tuple
 
 from deepsearcher import configuration
 from deepsearcher.rbase.rbase_article import RbaseArticle, RbaseAuthor
-from deepsearcher.db.mysql_connection import get_mysql_connection, close_mysql_connection
+from deepsearcher.db.mysql_connection import mysql_connection
 from deepsearcher.db.async_mysql_connection import get_mysql_pool
 from deepsearcher.loader.splitter import split_docs_to_chunks
 from deepsearcher.tools.log import warning, error, debug
@@ -185,7 +185,12 @@ def insert_to_vector_db(rbase_config: dict,
                        chunk_overlap: int = 100,
                        batch_size: int = 256,
                        bypass_rbase_db: bool = False,
-                       save_downloaded_file: bool = False):
+                       save_downloaded_file: bool = False,
+                       split_workers: int = 0,
+                       splitter: str = "recursive",
+                       chunk_tokens: int = 512,
+                       near_duplicates: str = None,
+                       near_duplicate_index_dir: str = "database/near_duplicates"):
     """
     Load article data into vector database
     
@@ -198,7 +203,24 @@ def insert_to_vector_db(rbase_config: dict,
         chunk_size: Text chunk size
         chunk_overlap: Text chunk overlap size
         batch_size: Batch processing size
+        split_workers: Number of processes used to split documents, 0 splits serially
+        splitter: "recursive" for character-based splitting, "markdown" for the
+            structure-aware chunker that packs paper sections up to `chunk_tokens` tokens
+        chunk_tokens: Token budget of a chunk when the markdown splitter is used
+        near_duplicates: "skip" to drop chunks that nearly duplicate chunks already in the
+            collection, "tag" to keep them with a `near_duplicate_of` marker, None to disable
+        near_duplicate_index_dir: Directory of the persistent per-collection SimHash indexes
+
+    Returns:
+        The insert count and ids of all chunks, and under `article_ids` the ids of the
+        chunks of each article keyed by article id
     """
+    from deepsearcher.loader.markdown_splitter import split_markdown_docs_to_chunks
+    from deepsearcher.vector_db.near_duplicate import (
+        filter_near_duplicate_chunks,
+        get_collection_index,
+    )
+
     # Check OSS configuration
     rbase_oss_config = rbase_config.get('oss', {})
     
@@ -221,133 +243,162 @@ def insert_to_vector_db(rbase_config: dict,
     # Initialize vector database collection
     init_vector_db(collection_name, collection_description, force_new_collection)
 
+    near_duplicate_index = None
+    if near_duplicates:
+        near_duplicate_index = get_collection_index(collection_name, near_duplicate_index_dir)
+        if force_new_collection:
+            near_duplicate_index.clear()
+
     if not force_new_collection:
         for article in articles:
             delete_article_in_vector_db(collection_name, article.article_id)
+            if near_duplicate_index is not None:
+                near_duplicate_index.discard_group(str(article.article_id))
 
     # Get MySQL connection
-    conn = get_mysql_connection(rbase_db_config)
     
     all_docs = []
     
     try:
-        with conn.cursor() as cursor:
-            # Process each article
-            for article in articles:
-                txt_file_path = article.txt_file
-                
-                # Additional check if txt_file_path is empty or not ending with .md
-                if not txt_file_path or not txt_file_path.endswith('.md'):
-                    warning(f"Skipping invalid file path: {txt_file_path}")
-                    continue
-                
-                # Process author information
+        # Process each article
+        for article in articles:
+            txt_file_path = article.txt_file
+            
+            # Additional check if txt_file_path is empty or not ending with .md
+            if not txt_file_path or not txt_file_path.endswith('.md'):
+                warning(f"Skipping invalid file path: {txt_file_path}")
+                continue
+            
+            # Process author information, the connection is only held for the author lookup,
+            # not for the download and parsing of the file
+            with mysql_connection(rbase_db_config) as conn, conn.cursor() as cursor:
                 _process_authors(cursor, article, bypass_rbase_db)
+            
+            # Process keywords
+            keywords_list = _process_keywords(article, bypass_rbase_db) 
+            
+            # Create temporary file to save markdown content
+            with tempfile.NamedTemporaryFile(suffix='.md', delete=False) as temp_file:
+                temp_path = temp_file.name
                 
-                # Process keywords
-                keywords_list = _process_keywords(article, bypass_rbase_db) 
-                
-                # Create temporary file to save markdown content
-                with tempfile.NamedTemporaryFile(suffix='.md', delete=False) as temp_file:
-                    temp_path = temp_file.name
+                # Download file content from OSS server to temporary file
+                # Ensure both host and txt_file_path are not empty
+                host = rbase_oss_config.get('host', '')
+                if not host or not txt_file_path:
+                    warning(f"Skipping download: OSS host address or file path is empty - host: {host}, path: {txt_file_path}")
+                    continue
                     
-                    # Download file content from OSS server to temporary file
-                    # Ensure both host and txt_file_path are not empty
-                    host = rbase_oss_config.get('host', '')
-                    if not host or not txt_file_path:
-                        warning(f"Skipping download: OSS host address or file path is empty - host: {host}, path: {txt_file_path}")
-                        continue
-                        
-                    full_url = host + txt_file_path
+                full_url = host + txt_file_path
+                
+                try:
+                    content = _download_file_content(full_url)
                     
-                    try:
-                        content = _download_file_content(full_url)
-                        
-                        # Remove content after "# REFERENCES" (case-insensitive)
+                    # Remove content after "# REFERENCES" (case-insensitive), the markdown
+                    # splitter drops the references section by itself
+                    if splitter != "markdown":
                         references_pattern = re.compile(r'#\s*references.*$', re.IGNORECASE | re.DOTALL)
                         content = re.sub(references_pattern, '', content)
-                        
-                        temp_file.write(content.encode('utf-8'))
-                        
-                        # 在database/markdown/目录下存储备份文件
-                        if save_downloaded_file:
-                            current_dir = os.path.dirname(os.path.abspath(__file__))
-                            backup_dir = os.path.join(current_dir, '..', 'database', 'markdown')
-                            os.makedirs(backup_dir, exist_ok=True)
-                            backup_filename = os.path.basename(txt_file_path)
-                            backup_path = os.path.join(backup_dir, backup_filename)
-                            with open(backup_path, 'w', encoding='utf-8') as backup_file:
-                                backup_file.write(content)
-                    except Exception as e:
-                        error(f"Failed to download file: {e}, URL: {full_url}")
-                        continue
-                
-                # Load temporary file
-                docs = file_loader.load_file(temp_path)
-                
-                # Add metadata to each document
-                for doc in docs:
-                    # Get author information
-                    if not bypass_rbase_db:
-                        author_names = [author.name for author in article.author_objects]
-                        author_ids = []
-                        corresponding_author_names = []
-                        corresponding_author_ids = []
-                        
-                        for author in article.author_objects:
-                            if hasattr(author, 'author_ids'):
-                                author_ids.extend(author.author_ids)
-                                if author.is_corresponding:
-                                    corresponding_author_names.append(author.name)
-                                    corresponding_author_ids.extend(author.author_ids)
-                    else:
-                        author_names = list(set(article.authors + article.corresponding_authors))
-                        author_ids = list(set(article.author_ids + article.corresponding_author_ids))
-                        corresponding_author_names = article.corresponding_authors
-                        corresponding_author_ids = article.corresponding_author_ids
                     
-                    author_names = author_names[:200] if len(author_names) > 200 else author_names
-                    author_ids = author_ids[:500] if len(author_ids) > 500 else author_ids
-                    corresponding_author_names = corresponding_author_names[:40] if len(corresponding_author_names) > 40 else corresponding_author_names
-                    corresponding_author_ids = corresponding_author_ids[:100] if len(corresponding_author_ids) > 100 else corresponding_author_ids
-                    base_ids = article.base_ids.split(",")
-                    base_ids = [int(base_id) for base_id in base_ids]
-
-                    doc.metadata.update({
-                        'title': article.title,
-                        'authors': author_names,
-                        'author_ids': author_ids,
-                        'corresponding_authors': corresponding_author_names,
-                        'corresponding_author_ids': corresponding_author_ids,
-                        'base_ids': base_ids,
-                        'keywords': keywords_list,
-                        'pubdate': article.pubdate,
-                        'article_id': article.article_id,
-                        'impact_factor': article.impact_factor,
-                        'rbase_factor': article.rbase_factor,
-                        'reference': f"Article ID: {article.article_id}"
-                    })
-                
-                all_docs.extend(docs)
+                    temp_file.write(content.encode('utf-8'))
+                    
+                    # 在database/markdown/目录下存储备份文件
+                    if save_downloaded_file:
+                        current_dir = os.path.dirname(os.path.abspath(__file__))
+                        backup_dir = os.path.join(current_dir, '..', 'database', 'markdown')
+                        os.makedirs(backup_dir, exist_ok=True)
+                        backup_filename = os.path.basename(txt_file_path)
+                        backup_path = os.path.join(backup_dir, backup_filename)
+                        with open(backup_path, 'w', encoding='utf-8') as backup_file:
+                            backup_file.write(content)
+                except Exception as e:
+                    error(f"Failed to download file: {e}, URL: {full_url}")
+                    continue
+            
+            # Load temporary file
+            docs = file_loader.load_file(temp_path)
+            
+            # Add metadata to each document
+            for doc in docs:
+                # Get author information
+                if not bypass_rbase_db:
+                    author_names = [author.name for author in article.author_objects]
+                    author_ids = []
+                    corresponding_author_names = []
+                    corresponding_author_ids = []
+                    
+                    for author in article.author_objects:
+                        if hasattr(author, 'author_ids'):
+                            author_ids.extend(author.author_ids)
+                            if author.is_corresponding:
+                                corresponding_author_names.append(author.name)
+                                corresponding_author_ids.extend(author.author_ids)
+                else:
+                    author_names = list(set(article.authors + article.corresponding_authors))
+                    author_ids = list(set(article.author_ids + article.corresponding_author_ids))
+                    corresponding_author_names = article.corresponding_authors
+                    corresponding_author_ids = article.corresponding_author_ids
                 
-                # Delete temporary file
-                os.unlink(temp_path)
+                author_names = author_names[:200] if len(author_names) > 200 else author_names
+                author_ids = author_ids[:500] if len(author_ids) > 500 else author_ids
+                corresponding_author_names = corresponding_author_names[:40] if len(corresponding_author_names) > 40 else corresponding_author_names
+                corresponding_author_ids = corresponding_author_ids[:100] if len(corresponding_author_ids) > 100 else corresponding_author_ids
+                base_ids = article.base_ids.split(",")
+                base_ids = [int(base_id) for base_id in base_ids]
+
+                doc.metadata.update({
+                    'title': article.title,
+                    'authors': author_names,
+                    'author_ids': author_ids,
+                    'corresponding_authors': corresponding_author_names,
+                    'corresponding_author_ids': corresponding_author_ids,
+                    'base_ids': base_ids,
+                    'keywords': keywords_list,
+                    'pubdate': article.pubdate,
+                    'article_id': article.article_id,
+                    'impact_factor': article.impact_factor,
+                    'rbase_factor': article.rbase_factor,
+                    'reference': f"Article ID: {article.article_id}"
+                })
             
-            # Split documents into chunks
+            all_docs.extend(docs)
+            
+            # Delete temporary file
+            os.unlink(temp_path)
+        
+        # Split documents into chunks
+        if splitter == "markdown":
+            chunks = split_markdown_docs_to_chunks(
+                all_docs, max_tokens=chunk_tokens, num_workers=split_workers
+            )
+        else:
             chunks = split_docs_to_chunks(
                 all_docs,
                 chunk_size=chunk_size,
                 chunk_overlap=chunk_overlap,
+                num_workers=split_workers,
             )
-            
-            # Embed vectors
-            chunks = embedding_model.embed_chunks(chunks, batch_size=batch_size)
-            
-            # Insert into vector database
-            return vector_db.insert_data(collection=collection_name, chunks=chunks)
+        
+        if near_duplicate_index is not None:
+            chunks = filter_near_duplicate_chunks(chunks, near_duplicate_index, near_duplicates)
+
+        # Embed vectors
+        chunks = embedding_model.embed_chunks(chunks, batch_size=batch_size)
+        
+        # Insert into vector database, the chunks of each article in their own call so that
+        # the ids of every article are known
+        chunks_by_article = {}
+        for chunk in chunks:
+            chunks_by_article.setdefault(chunk.metadata.get('article_id'), []).append(chunk)
+        result = {'insert_count': 0, 'ids': [], 'article_ids': {}}
+        for article_id, article_chunks in chunks_by_article.items():
+            article_result = vector_db.insert_data(collection=collection_name, chunks=article_chunks) or {}
+            result['insert_count'] += article_result.get('insert_count', 0)
+            result['ids'].extend(article_result.get('ids', []))
+            result['article_ids'][article_id] = article_result.get('ids', [])
+        if near_duplicate_index is not None:
+            near_duplicate_index.save()
+        return result
     except Exception as e:
-        # Close connection when exception occurs
-        close_mysql_connection()
         raise Exception(f"Failed to process article data: {e}")
 
 
@@ -370,11 +421,10 @@ def load_markdown_articles(rbase_config: dict, offset: int = 0, limit: int = 10,
 
     # Get MySQL connection
     rbase_db_config = rbase_config.get('database', {})
-    conn = get_mysql_connection(rbase_db_config)
     
     pdf_files = []
     try:
-        with conn.cursor() as cursor:
+        with mysql_connection(rbase_db_config) as conn, conn.cursor() as cursor:
             sql = """
             SELECT ra.id as raw_article_id, ra.txt_file, 
                    ra.title, ra.authors, ra.corresponding_authors,
@@ -398,8 +448,6 @@ def load_markdown_articles(rbase_config: dict, offset: int = 0, limit: int = 10,
             cursor.execute(sql, (limit, offset))
             pdf_files = cursor.fetchall()
     except Exception as e:
-        # Close connection when exception occurs
-        close_mysql_connection()
         raise Exception(f"Failed to process database data: {e}")
     
     return [RbaseArticle(pdf) for pdf in pdf_files]
@@ -607,16 +655,16 @@ def log_raw_article_deleted(rbase_config: dict, raw_article_id: int, collection_
     Delete raw article from vector database
     """
     rbase_db_config = rbase_config.get('database', {})
-    conn = get_mysql_connection(rbase_db_config)
     try:
-        with conn.cursor() as cursor:
+        with mysql_connection(rbase_db_config) as conn, conn.cursor() as cursor:
             sql = "SELECT id_from, id_to FROM vector_db_data_log WHERE raw_article_id=%s AND collection=%s AND operation=1 AND status=1 ORDER BY id DESC"
             cursor.execute(sql, (raw_article_id, collection_name))
             result = cursor.fetchone()
-            if result:
-                id_from = result["id_from"]
-                id_to = result["id_to"]
-                save_vector_db_log(rbase_config, raw_article_id, collection_name, operation='delete', id_from=id_from, id_to=id_to)
+        # Logged after giving the connection back, save_vector_db_log borrows its own
+        if result:
+            id_from = result["id_from"]
+            id_to = result["id_to"]
+            save_vector_db_log(rbase_config, raw_article_id, collection_name, operation='delete', id_from=id_from, id_to=id_to)
     except Exception as e:
         raise Exception(f"Failed to delete raw article in vector database: {e}")
 
@@ -634,7 +682,6 @@ def save_vector_db_log(rbase_config: dict, raw_article_id: int, collection_name:
         int: Save result
     """
     rbase_db_config = rbase_config.get('database', {})
-    conn = get_mysql_connection(rbase_db_config)
     id_from = kwargs.get('id_from', 0)
     id_to = kwargs.get('id_to', 0)
     chunks = id_to - id_from + 1 if id_to > 0 and id_from > 0 else 0
@@ -650,7 +697,7 @@ def save_vector_db_log(rbase_config: dict, raw_article_id: int, collection_name:
     
     rt = 0
     try:
-        with conn.cursor() as cursor:
+        with mysql_connection(rbase_db_config) as conn, conn.cursor() as cursor:
             sql = """
             INSERT INTO vector_db_data_log (raw_article_id, collection, id_from, id_to, chunks, operation, status)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
@@ -663,8 +710,6 @@ def save_vector_db_log(rbase_config: dict, raw_article_id: int, collection_name:
                 cursor.execute(sql, (raw_article_id, collection_name, operation_val, rt))
             conn.commit()
     except Exception as e:
-        # Close connection when exception occurs
-        close_mysql_connection()
         raise Exception(f"Failed to process database data: {e}")
     
     return rt
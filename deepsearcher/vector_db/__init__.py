@@ -1,4 +1,24 @@
-from .milvus import Milvus, RetrievalResult
-from .oracle import OracleDB
+import importlib
 
-__all__ = ["Milvus", "RetrievalResult", "OracleDB"]
+# Providers are imported on first access, so that importing a vector_db module does not
+# load pymilvus unless Milvus is used
+_LAZY_EXPORTS = {
+    "LocalVectorDB": ".local_store",
+    "Milvus": ".milvus",
+    "OracleDB": ".oracle",
+    "RetrievalResult": ".base",
+}
+
+__all__ = ["Milvus", "RetrievalResult", "OracleDB", "LocalVectorDB"]
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,15 @@
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Union
+from typing import List, Optional, Union
 
 import numpy as np
 
 from deepsearcher.loader.splitter import Chunk
+from deepsearcher.vector_db.near_duplicate import DEFAULT_MAX_DISTANCE, hamming_distance, simhash
+
+# Chunk metadata keys kept in the JSON `metadata` field of a collection
+STORED_METADATA_KEYS = ("section_path", "near_duplicate_of")
 
 
 class RetrievalResult:
@@ -25,13 +31,29 @@ class RetrievalResult:
         return f"RetrievalResult(score={self.score}, embedding={self.embedding}, text={self.text}, reference={self.reference}), metadata={self.metadata}"
 
 
-def deduplicate_results(results: List[RetrievalResult]) -> List[RetrievalResult]:
+def deduplicate_results(
+    results: List[RetrievalResult], max_hamming_distance: int = DEFAULT_MAX_DISTANCE
+) -> List[RetrievalResult]:
+    """
+    Remove duplicated results, keeping the first occurrence.
+
+    Results with identical text are always collapsed. When `max_hamming_distance` is
+    positive, results whose SimHash fingerprints differ in at most that many bits, such as
+    a preprint and its published version, are collapsed as well.
+    """
     all_text_set = set()
+    fingerprints = []
     deduplicated_results = []
     for result in results:
-        if result.text not in all_text_set:
-            all_text_set.add(result.text)
-            deduplicated_results.append(result)
+        if result.text in all_text_set:
+            continue
+        if max_hamming_distance > 0:
+            fingerprint = simhash(result.text)
+            if any(hamming_distance(fingerprint, f) <= max_hamming_distance for f in fingerprints):
+                continue
+            fingerprints.append(fingerprint)
+        all_text_set.add(result.text)
+        deduplicated_results.append(result)
     return deduplicated_results
 
 
@@ -45,10 +67,15 @@ class BaseVectorDB(ABC):
     def __init__(
         self,
         default_collection: str = "deepsearcher",
+        catalog_ttl: float = 300.0,
         *args,
         **kwargs,
     ):
         self.default_collection = default_collection
+        self.catalog_ttl = catalog_ttl
+        self._catalog: Optional[List[CollectionInfo]] = None
+        self._catalog_loaded_at = 0.0
+        self._catalog_lock = threading.Lock()
 
     @abstractmethod
     def init_collection(
@@ -72,9 +99,52 @@ class BaseVectorDB(ABC):
     ) -> List[RetrievalResult]:
         pass
 
+    def search_data_batch(
+        self,
+        collection: str,
+        vectors: List[Union[np.array, List[float]]],
+        top_k: int = 5,
+        *args,
+        **kwargs,
+    ) -> List[List[RetrievalResult]]:
+        """
+        Search several query vectors in one collection.
+
+        Implementations that can share a round trip or a session between queries override
+        this, the default runs the queries one by one.
+
+        Returns:
+            One result list per query vector, in the order of the vectors
+        """
+        return [
+            self.search_data(collection, vector, top_k, *args, **kwargs) for vector in vectors
+        ]
+
     def list_collections(self, *args, **kwargs) -> List[CollectionInfo]:
         pass
 
+    def get_collection_infos(self, refresh: bool = False) -> List[CollectionInfo]:
+        """
+        List the collections through a cache that expires after `catalog_ttl` seconds.
+
+        `list_collections` describes every collection on each call, the cached catalog is
+        meant for the query path. Implementations invalidate it when they create or drop
+        a collection.
+
+        Args:
+            refresh: Reload the catalog even if the cached one has not expired
+        """
+        with self._catalog_lock:
+            expired = time.monotonic() - self._catalog_loaded_at > self.catalog_ttl
+            if refresh or self._catalog is None or expired:
+                self._catalog = self.list_collections() or []
+                self._catalog_loaded_at = time.monotonic()
+            return list(self._catalog)
+
+    def invalidate_collection_infos(self):
+        with self._catalog_lock:
+            self._catalog = None
+
     @abstractmethod
     def clear_db(self, *args, **kwargs):
         pass
@@ -0,0 +1,271 @@
+"""
+On-disk BM25 index used for hybrid lexical and vector retrieval.
+
+Dense embeddings match gene names, strain identifiers and acronyms poorly. A lexical
+index over the same chunks, keyed by the vector database row ids, catches these exact
+matches; its ranking is fused with the vector ranking by reciprocal rank fusion.
+"""
+
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Identifiers such as "IL-6", "BRCA1", "K-12" or "v2.1" are kept whole, their parts are
+# indexed as well
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+CJK_PATTERN = re.compile(r"[一-鿿]+")
+PART_PATTERN = re.compile(r"[-_./]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into index terms.
+
+    Latin text is lowercased and split into identifiers; CJK text is segmented with jieba
+    when it is installed, otherwise indexed by character bigrams.
+    """
+    text = text.lower()
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text):
+        tokens.append(token)
+        parts = PART_PATTERN.split(token)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+    for run in CJK_PATTERN.findall(text):
+        try:
+            import jieba
+
+            tokens.extend(word for word in jieba.lcut_for_search(run) if word.strip())
+        except ImportError:
+            tokens.extend(run[i : i + 2] for i in range(max(len(run) - 1, 1)))
+    return tokens
+
+
+class BM25Index:
+    """
+    BM25 inverted index stored in a SQLite file.
+
+    Documents are identified by integer ids, the primary keys of the rows they were
+    inserted as in the vector database. The document count, total length and document
+    frequency of every term are kept up to date on writes, so that a search only reads
+    postings. Query terms are scored rarest first; once the top_k documents are known to
+    outscore any document that only matches the remaining, more common terms, those terms
+    are looked up for the remaining candidates only (MaxScore pruning).
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize the index.
+
+        Args:
+            path: SQLite file of the index, created if missing
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS documents (doc_id INTEGER PRIMARY KEY, length INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, doc_id INTEGER NOT NULL, tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT PRIMARY KEY, df INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS corpus (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                num_docs INTEGER NOT NULL, total_length INTEGER NOT NULL
+            );
+            """
+        )
+        if self._conn.execute("SELECT 1 FROM corpus").fetchone() is None:
+            # Index files written before the statistics were kept
+            self._conn.execute(
+                "INSERT OR IGNORE INTO terms SELECT term, COUNT(*) FROM postings GROUP BY term"
+            )
+            self._conn.execute(
+                "INSERT INTO corpus SELECT 0, COUNT(*), COALESCE(SUM(length), 0) FROM documents"
+            )
+        self._conn.commit()
+
+    def add(self, doc_ids: Sequence[int], texts: Sequence[str]) -> None:
+        """Index texts under the given document ids, replacing documents that already exist."""
+        documents = []
+        postings = []
+        for doc_id, text in zip(doc_ids, texts):
+            term_counts = Counter(tokenize(text))
+            documents.append((int(doc_id), sum(term_counts.values())))
+            postings.extend((term, int(doc_id), tf) for term, tf in term_counts.items())
+        document_frequencies = Counter(term for term, _, _ in postings)
+        with self._lock:
+            self._delete(list(dict.fromkeys(doc_id for doc_id, _ in documents)))
+            self._conn.executemany("INSERT INTO documents VALUES (?, ?)", documents)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+            self._conn.executemany(
+                "INSERT INTO terms VALUES (?, ?) "
+                "ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+                document_frequencies.items(),
+            )
+            self._conn.execute(
+                "UPDATE corpus SET num_docs = num_docs + ?, total_length = total_length + ?",
+                (len(documents), sum(length for _, length in documents)),
+            )
+            self._conn.commit()
+
+    def delete(self, doc_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._delete([int(doc_id) for doc_id in doc_ids])
+            self._conn.commit()
+
+    def _delete(self, doc_ids: List[int]) -> None:
+        for i in range(0, len(doc_ids), 500):
+            batch = doc_ids[i : i + 500]
+            placeholders = ",".join("?" * len(batch))
+            num_docs, total_length = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents "
+                f"WHERE doc_id IN ({placeholders})",
+                batch,
+            ).fetchone()
+            if not num_docs:
+                continue
+            document_frequencies = self._conn.execute(
+                "SELECT COUNT(*), term FROM postings "
+                f"WHERE doc_id IN ({placeholders}) GROUP BY term",
+                batch,
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE terms SET df = df - ? WHERE term = ?", document_frequencies
+            )
+            self._conn.executemany(
+                "DELETE FROM terms WHERE term = ? AND df <= 0",
+                [(term,) for _, term in document_frequencies],
+            )
+            self._conn.execute(
+                "UPDATE corpus SET num_docs = num_docs - ?, total_length = total_length - ?",
+                (num_docs, total_length),
+            )
+            self._conn.execute(f"DELETE FROM postings WHERE doc_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM documents WHERE doc_id IN ({placeholders})", batch)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM documents")
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("UPDATE corpus SET num_docs = 0, total_length = 0")
+            self._conn.commit()
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        """
+        Rank the indexed documents against a query.
+
+        Args:
+            query: Query text
+            top_k: Maximum number of documents returned
+
+        Returns:
+            (document id, BM25 score) pairs, best match first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or top_k <= 0:
+            return []
+        with self._lock:
+            num_docs, total_length = self._conn.execute(
+                "SELECT num_docs, total_length FROM corpus"
+            ).fetchone()
+            if not num_docs:
+                return []
+            average_length = total_length / num_docs
+            placeholders = ",".join("?" * len(terms))
+            document_frequencies = dict(
+                self._conn.execute(
+                    f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms
+                ).fetchall()
+            )
+            # Rarest terms first, a term contributes less than idf * (k1 + 1) to any score
+            terms = sorted(document_frequencies, key=document_frequencies.get)
+            idfs = [idf(num_docs, document_frequencies[term]) for term in terms]
+            remaining_bounds = [sum(idfs[i:]) * (self.k1 + 1) for i in range(len(idfs))]
+            scores: Dict[int, float] = {}
+            for term, term_idf, remaining_bound in zip(terms, idfs, remaining_bounds):
+                threshold = heapq.nlargest(top_k, scores.values())[-1] if scores else 0.0
+                if len(scores) >= top_k and threshold >= remaining_bound:
+                    # No unseen document can enter the top_k, score the candidates only
+                    candidates = [
+                        doc_id
+                        for doc_id, score in scores.items()
+                        if score + remaining_bound > threshold
+                    ]
+                    rows = self._postings(term, candidates)
+                else:
+                    rows = self._postings(term)
+                for doc_id, tf, length in rows:
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + term_idf * tf * (self.k1 + 1) / (
+                        tf + norm
+                    )
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def _postings(
+        self, term: str, doc_ids: Optional[List[int]] = None
+    ) -> List[Tuple[int, int, int]]:
+        """(document id, term frequency, document length) of a term, in the given documents."""
+        query = (
+            "SELECT p.doc_id, p.tf, d.length FROM postings p "
+            "JOIN documents d ON d.doc_id = p.doc_id WHERE p.term = ?"
+        )
+        if doc_ids is None:
+            return self._conn.execute(query, (term,)).fetchall()
+        rows = []
+        for i in range(0, len(doc_ids), 500):
+            batch = doc_ids[i : i + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows.extend(
+                self._conn.execute(
+                    f"{query} AND p.doc_id IN ({placeholders})", (term, *batch)
+                ).fetchall()
+            )
+        return rows
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT num_docs FROM corpus").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def idf(num_docs: int, document_frequency: int) -> float:
+    """BM25 inverse document frequency, kept positive for terms in most documents."""
+    return math.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence], k: int = 60) -> List[Tuple[object, float]]:
+    """
+    Fuse several rankings of ids by reciprocal rank.
+
+    Args:
+        rankings: Id lists, each ordered best match first
+        k: Damping constant, larger values flatten the contribution of the top ranks
+
+    Returns:
+        (id, fused score) pairs, best match first
+    """
+    scores: Dict[object, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
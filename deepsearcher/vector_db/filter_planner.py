@@ -0,0 +1,811 @@
+"""
+Parser and planner for scalar filter expressions.
+
+Filter expressions are written by the LLM (see the conditions of `OverviewRAG`), so they
+may use unknown fields, field aliases, dates instead of timestamps or scalar operators on
+array fields. This module parses them, keeps only clauses on indexed scalar fields and
+renders them back in Milvus syntax.
+
+The planner estimates the selectivity of a filter from sampled field histograms. When a
+filter keeps few enough rows, scanning the candidates exactly is both faster and more
+complete than a filtered ANN search, which may return fewer than top_k results.
+"""
+
+import datetime
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from deepsearcher.tools import log
+
+# Indexed scalar fields of a collection and their types
+INDEXED_FIELDS = {
+    "pubdate": "int",
+    "impact_factor": "float",
+    "rbase_factor": "float",
+    "reference_id": "int",
+    "keywords": "varchar_array",
+    "authors": "varchar_array",
+    "corresponding_authors": "varchar_array",
+    "author_ids": "int_array",
+    "corresponding_author_ids": "int_array",
+    "base_ids": "int_array",
+}
+
+FIELD_ALIASES = {
+    "pub_date": "pubdate",
+    "publish_date": "pubdate",
+    "publication_date": "pubdate",
+    "date": "pubdate",
+    "if": "impact_factor",
+    "impactfactor": "impact_factor",
+    "journal_impact_factor": "impact_factor",
+    "keyword": "keywords",
+    "author": "authors",
+    "author_id": "author_ids",
+    "corresponding_author": "corresponding_authors",
+    "corresponding_author_id": "corresponding_author_ids",
+    "base_id": "base_ids",
+    "article_id": "reference_id",
+}
+
+# Pseudo field converted to pubdate ranges
+YEAR_FIELDS = ("year", "pub_year", "publication_year")
+
+COMPARISON_OPERATORS = ("==", "!=", ">=", "<=", ">", "<")
+ARRAY_FUNCTIONS = ("ARRAY_CONTAINS", "ARRAY_CONTAINS_ANY", "ARRAY_CONTAINS_ALL")
+FLIPPED_OPERATORS = {">": "<", "<": ">", ">=": "<=", "<=": ">=", "==": "==", "!=": "!="}
+
+TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+(?:\.\d+)?(?![\w-]))
+        |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<operator>==|!=|>=|<=|=|>|<|&&|\|\|)
+        |(?P<punct>[()\[\],])
+        |(?P<name>[A-Za-z_][\w.]*)
+    )""",
+    re.VERBOSE,
+)
+DATE_PATTERN = re.compile(r"^\d{4}-\d{1,2}(?:-\d{1,2})?$")
+CONNECTIVE_PATTERN = re.compile(r"(?<![\w.])(and|or)(?![\w.])|&&|\|\|", re.IGNORECASE)
+
+
+class FilterSyntaxError(ValueError):
+    pass
+
+
+class Node:
+    """A node of a parsed filter expression."""
+
+    def render(self) -> str:
+        raise NotImplementedError
+
+    def fields(self) -> List[str]:
+        raise NotImplementedError
+
+    def evaluate(self, row: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+
+class Comparison(Node):
+    def __init__(self, field: str, operator: str, value: Any):
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def render(self) -> str:
+        return f"{self.field} {self.operator} {_render_value(self.value)}"
+
+    def fields(self) -> List[str]:
+        return [self.field]
+
+    def evaluate(self, row: Dict[str, Any]) -> bool:
+        value = row.get(self.field)
+        if value is None:
+            return False
+        return {
+            "==": lambda a, b: a == b,
+            "!=": lambda a, b: a != b,
+            ">=": lambda a, b: a >= b,
+            "<=": lambda a, b: a <= b,
+            ">": lambda a, b: a > b,
+            "<": lambda a, b: a < b,
+        }[self.operator](value, self.value)
+
+
+class InList(Node):
+    def __init__(self, field: str, values: List[Any], negated: bool = False):
+        self.field = field
+        self.values = values
+        self.negated = negated
+
+    def render(self) -> str:
+        operator = "not in" if self.negated else "in"
+        return f"{self.field} {operator} {_render_value(self.values)}"
+
+    def fields(self) -> List[str]:
+        return [self.field]
+
+    def evaluate(self, row: Dict[str, Any]) -> bool:
+        return (row.get(self.field) in self.values) != self.negated
+
+
+class ArrayContains(Node):
+    def __init__(self, function: str, field: str, values: List[Any]):
+        self.function = function
+        self.field = field
+        self.values = values
+
+    def render(self) -> str:
+        if self.function == "ARRAY_CONTAINS":
+            return f"ARRAY_CONTAINS({self.field}, {_render_value(self.values[0])})"
+        return f"{self.function}({self.field}, {_render_value(self.values)})"
+
+    def fields(self) -> List[str]:
+        return [self.field]
+
+    def evaluate(self, row: Dict[str, Any]) -> bool:
+        elements = set(row.get(self.field) or [])
+        if self.function == "ARRAY_CONTAINS_ALL":
+            return all(value in elements for value in self.values)
+        return any(value in elements for value in self.values)
+
+
+class BoolOp(Node):
+    def __init__(self, operator: str, children: List[Node]):
+        self.operator = operator
+        self.children = children
+
+    def render(self) -> str:
+        parts = [
+            f"({child.render()})" if isinstance(child, BoolOp) else child.render()
+            for child in self.children
+        ]
+        return f" {self.operator} ".join(parts)
+
+    def fields(self) -> List[str]:
+        return [field for child in self.children for field in child.fields()]
+
+    def evaluate(self, row: Dict[str, Any]) -> bool:
+        if self.operator == "and":
+            return all(child.evaluate(row) for child in self.children)
+        return any(child.evaluate(row) for child in self.children)
+
+
+class Not(Node):
+    def __init__(self, child: Node):
+        self.child = child
+
+    def render(self) -> str:
+        return f"not ({self.child.render()})"
+
+    def fields(self) -> List[str]:
+        return self.child.fields()
+
+    def evaluate(self, row: Dict[str, Any]) -> bool:
+        return not self.child.evaluate(row)
+
+
+def _render_value(value: Any) -> str:
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_render_value(v) for v in value) + "]"
+    return repr(value)
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise FilterSyntaxError(
+                f"Unexpected character at {position}: {expression[position:]!r}"
+            )
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "operator":
+            text = {"=": "==", "&&": "and", "||": "or"}.get(text, text)
+            if text in ("and", "or"):
+                kind = "name"
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser producing an unvalidated expression tree."""
+
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def next(self) -> Tuple[Optional[str], Optional[str]]:
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        kind, value = self.next()
+        if value is None or value.lower() != text:
+            raise FilterSyntaxError(f"Expected {text!r}, got {value!r}")
+
+    def keyword(self, *words: str) -> bool:
+        kind, value = self.peek()
+        return kind == "name" and value.lower() in words
+
+    def parse(self) -> Node:
+        node = self.parse_or()
+        if self.position != len(self.tokens):
+            raise FilterSyntaxError(f"Unexpected token {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self) -> Node:
+        children = [self.parse_and()]
+        while self.keyword("or"):
+            self.next()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else BoolOp("or", children)
+
+    def parse_and(self) -> Node:
+        children = [self.parse_not()]
+        while self.keyword("and"):
+            self.next()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else BoolOp("and", children)
+
+    def parse_not(self) -> Node:
+        if self.keyword("not"):
+            self.next()
+            return Not(self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self) -> Node:
+        kind, value = self.peek()
+        if value == "(":
+            self.next()
+            node = self.parse_or()
+            self.expect(")")
+            return node
+        if kind == "name" and value.upper() in ARRAY_FUNCTIONS and self.peek(1)[1] == "(":
+            self.next()
+            self.expect("(")
+            field_kind, field = self.next()
+            if field_kind != "name":
+                raise FilterSyntaxError(f"Expected a field name, got {field!r}")
+            self.expect(",")
+            values = self.parse_literal()
+            self.expect(")")
+            values = values if isinstance(values, list) else [values]
+            return ArrayContains(value.upper(), field, values)
+        return self.parse_comparison()
+
+    def parse_operand(self) -> Tuple[str, Any]:
+        kind, value = self.peek()
+        if kind == "name" and value.lower() not in ("true", "false"):
+            self.next()
+            return "field", value
+        return "value", self.parse_literal()
+
+    def parse_literal(self) -> Any:
+        kind, value = self.next()
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "string":
+            return re.sub(r"\\(.)", r"\1", value[1:-1])
+        if kind == "name" and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        if value == "[":
+            values = []
+            while self.peek()[1] != "]":
+                values.append(self.parse_literal())
+                if self.peek()[1] == ",":
+                    self.next()
+                elif self.peek()[1] != "]":
+                    raise FilterSyntaxError(f"Unexpected token {self.peek()[1]!r} in list")
+            self.next()
+            return values
+        raise FilterSyntaxError(f"Expected a value, got {value!r}")
+
+    def parse_comparison(self) -> Node:
+        left_kind, left = self.parse_operand()
+        if left_kind == "field" and self.keyword("in", "not"):
+            negated = self.next()[1].lower() == "not"
+            if negated:
+                self.expect("in")
+            values = self.parse_literal()
+            return InList(left, values if isinstance(values, list) else [values], negated)
+        kind, operator = self.next()
+        if kind != "operator" or operator not in COMPARISON_OPERATORS:
+            raise FilterSyntaxError(f"Expected a comparison operator, got {operator!r}")
+        right_kind, right = self.parse_operand()
+        # Chained range such as `1 <= pubdate <= 2`
+        if self.peek()[0] == "operator" and self.peek()[1] in COMPARISON_OPERATORS:
+            _, second_operator = self.next()
+            third_kind, third = self.parse_operand()
+            if left_kind != "value" or right_kind != "field" or third_kind != "value":
+                raise FilterSyntaxError("A chained comparison must be `value op field op value`")
+            return BoolOp(
+                "and",
+                [
+                    Comparison(right, FLIPPED_OPERATORS[operator], left),
+                    Comparison(right, second_operator, third),
+                ],
+            )
+        if left_kind == "field" and right_kind == "value":
+            return Comparison(left, operator, right)
+        if left_kind == "value" and right_kind == "field":
+            return Comparison(right, FLIPPED_OPERATORS[operator], left)
+        raise FilterSyntaxError("A comparison needs exactly one field")
+
+
+def parse_filter(expression: str) -> Node:
+    """
+    Parse a filter expression without validating its fields.
+
+    Raises:
+        FilterSyntaxError: If the expression cannot be parsed
+    """
+    return _Parser(expression).parse()
+
+
+def _year_start(year: int) -> int:
+    return int(datetime.datetime(year, 1, 1, tzinfo=datetime.timezone.utc).timestamp())
+
+
+def _to_timestamp(value: Any) -> Any:
+    if isinstance(value, str) and DATE_PATTERN.match(value.strip()):
+        parts = [int(part) for part in value.strip().split("-")] + [1]
+        date = datetime.datetime(parts[0], parts[1], parts[2], tzinfo=datetime.timezone.utc)
+        return int(date.timestamp())
+    return value
+
+
+def _coerce(value: Any, field_type: str) -> Any:
+    if field_type in ("int", "int_array"):
+        if isinstance(value, str) and re.fullmatch(r"-?\d+", value.strip()):
+            return int(value)
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f"{value!r} is not an integer")
+    elif field_type == "float":
+        if isinstance(value, str):
+            value = float(value)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"{value!r} is not a number")
+    elif field_type in ("varchar", "varchar_array") and not isinstance(value, str):
+        value = str(value)
+    return value
+
+
+def _normalize_year(node: Comparison) -> Node:
+    year = int(node.value)
+    operator = node.operator
+    if operator == ">=":
+        return Comparison("pubdate", ">=", _year_start(year))
+    if operator == ">":
+        return Comparison("pubdate", ">=", _year_start(year + 1))
+    if operator == "<=":
+        return Comparison("pubdate", "<", _year_start(year + 1))
+    if operator == "<":
+        return Comparison("pubdate", "<", _year_start(year))
+    in_year = BoolOp(
+        "and",
+        [
+            Comparison("pubdate", ">=", _year_start(year)),
+            Comparison("pubdate", "<", _year_start(year + 1)),
+        ],
+    )
+    return in_year if operator == "==" else Not(in_year)
+
+
+def normalize(
+    node: Node, fields: Optional[Dict[str, str]] = None, strict: bool = False
+) -> Optional[Node]:
+    """
+    Resolve field aliases, coerce values and drop clauses on unsupported fields.
+
+    A dropped clause widens an AND; an OR or a NOT containing a dropped clause cannot be
+    kept without changing its meaning and is dropped as a whole.
+
+    Args:
+        node: Parsed filter expression
+        fields: Supported fields and their types, `INDEXED_FIELDS` when None
+        strict: Raise instead of dropping a clause, for callers that must not widen a filter
+
+    Returns:
+        The normalized node, or None when nothing can be kept
+
+    Raises:
+        FilterSyntaxError: If `strict` and a clause would be dropped
+    """
+    fields = INDEXED_FIELDS if fields is None else fields
+    if isinstance(node, BoolOp):
+        children = [normalize(child, fields, strict) for child in node.children]
+        if node.operator == "or" and any(child is None for child in children):
+            return None
+        children = [child for child in children if child is not None]
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else BoolOp(node.operator, children)
+    if isinstance(node, Not):
+        # Dropping a clause under a NOT would narrow the filter instead of widening it
+        try:
+            child = normalize(node.child, fields, strict=True)
+        except FilterSyntaxError as e:
+            if strict:
+                raise
+            log.warning(f"drop negated filter clause {node.render()}: {e}")
+            return None
+        return Not(child) if child is not None else None
+
+    def drop(message: str) -> None:
+        if strict:
+            raise FilterSyntaxError(message)
+        log.warning(message)
+
+    field = node.field.lower()
+    try:
+        if field in YEAR_FIELDS and isinstance(node, Comparison):
+            return _normalize_year(node)
+        field = FIELD_ALIASES.get(field, field)
+        field_type = fields.get(field)
+        if field_type is None:
+            return drop(f"drop filter clause on unsupported field: {node.render()}")
+        if isinstance(node, Comparison):
+            value = _to_timestamp(node.value) if field == "pubdate" else node.value
+            value = _coerce(value, field_type)
+            if field_type.endswith("_array"):
+                # A scalar comparison on an array field means membership
+                if node.operator == "==":
+                    return ArrayContains("ARRAY_CONTAINS", field, [value])
+                if node.operator == "!=":
+                    return Not(ArrayContains("ARRAY_CONTAINS", field, [value]))
+                raise ValueError(f"operator {node.operator} is not supported on arrays")
+            return Comparison(field, node.operator, value)
+        if isinstance(node, ArrayContains):
+            if not field_type.endswith("_array"):
+                # ARRAY_CONTAINS on a scalar field means equality
+                return InList(field, [_coerce(value, field_type) for value in node.values])
+            values = [_coerce(value, field_type) for value in node.values]
+            if not values:
+                return drop(f"drop empty filter clause: {node.render()}")
+            return ArrayContains(node.function, field, values)
+        if isinstance(node, InList):
+            if field_type.endswith("_array"):
+                contains = ArrayContains(
+                    "ARRAY_CONTAINS_ANY",
+                    field,
+                    [_coerce(value, field_type) for value in node.values],
+                )
+                return Not(contains) if node.negated else contains
+            return InList(
+                field, [_coerce(value, field_type) for value in node.values], node.negated
+            )
+    except (ValueError, TypeError, OverflowError) as e:
+        if isinstance(e, FilterSyntaxError):
+            raise
+        return drop(f"drop invalid filter clause {node.render()}: {e}")
+    return drop(f"drop unsupported filter clause: {node.render()}")
+
+
+def normalize_filter(expression: Union[str, Sequence[str], None]) -> str:
+    """
+    Validate a filter expression and render it on indexed fields only.
+
+    Args:
+        expression: Filter expression, or a list of expressions combined with AND
+
+    Returns:
+        The normalized expression in Milvus syntax, empty when nothing can be kept
+    """
+    node = parse_and_normalize(expression)
+    return node.render() if node is not None else ""
+
+
+def _split_conjuncts(expression: str) -> List[str]:
+    """
+    Split an expression on its top level AND operators, outer parentheses removed.
+
+    An expression with a top level OR is returned whole, since AND binds tighter.
+    """
+    expression = expression.strip()
+    while True:
+        parts, depth, quote, start, position = [], 0, None, 0, 0
+        wrapped = expression.startswith("(")
+        while position < len(expression):
+            char = expression[position]
+            if quote:
+                if char == "\\":
+                    position += 1
+                elif char == quote:
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char in "([":
+                depth += 1
+            elif char in ")]":
+                depth -= 1
+                if depth == 0 and position < len(expression) - 1:
+                    wrapped = False
+            elif depth == 0:
+                match = CONNECTIVE_PATTERN.match(expression, position)
+                if match and match.group().lower() in ("or", "||"):
+                    return [expression]
+                if match:
+                    parts.append(expression[start:position])
+                    start = position = match.end()
+                    continue
+            position += 1
+        parts.append(expression[start:])
+        if wrapped and len(parts) == 1 and expression.endswith(")"):
+            expression = expression[1:-1].strip()
+            continue
+        return [part.strip() for part in parts if part.strip()]
+
+
+def _parse_conjuncts(expression: str) -> List[Node]:
+    """Parse an expression, or the top level conjuncts of it that can be parsed."""
+    try:
+        return [parse_filter(expression)]
+    except FilterSyntaxError as e:
+        parts = _split_conjuncts(expression)
+        if len(parts) == 1:
+            log.warning(f"ignore unparsable filter clause {expression!r}: {e}")
+            return []
+    # Dropping an unparsable conjunct only widens the filter
+    return [node for part in parts for node in _parse_conjuncts(part)]
+
+
+def parse_and_normalize(expression: Union[str, Sequence[str], None]) -> Optional[Node]:
+    if not expression:
+        return None
+    if not isinstance(expression, str):
+        expression = " and ".join(f"({part})" for part in expression if part)
+        if not expression:
+            return None
+    nodes = _parse_conjuncts(expression)
+    if not nodes:
+        return None
+    return normalize(nodes[0] if len(nodes) == 1 else BoolOp("and", nodes))
+
+
+def required_array_values(
+    expression: Union[str, Sequence[str], None], field: str
+) -> Optional[List[Any]]:
+    """
+    Find values of an array field that every row matching a filter must contain one of.
+
+    Only ARRAY_CONTAINS* clauses that are top level conjuncts of the filter are considered.
+
+    Args:
+        expression: Filter expression, or a list of expressions combined with AND
+        field: Array field name
+
+    Returns:
+        The smallest such value list, or None when the filter does not constrain the field
+    """
+    node = parse_and_normalize(expression)
+    if node is None:
+        return None
+    conjuncts = node.children if isinstance(node, BoolOp) and node.operator == "and" else [node]
+    candidates = []
+    for conjunct in conjuncts:
+        if not isinstance(conjunct, ArrayContains) or conjunct.field != field:
+            continue
+        if conjunct.function == "ARRAY_CONTAINS_ALL":
+            # A row has to contain every value, so any single one is enough
+            candidates.append(conjunct.values[:1])
+        else:
+            candidates.append(list(conjunct.values))
+    return min(candidates, key=len) if candidates else None
+
+
+class FieldHistogram:
+    """Sampled distribution of a scalar or array field."""
+
+    def __init__(self, values: List[Any], is_array: bool, num_buckets: int = 64):
+        self.is_array = is_array
+        self.sample_size = len(values)
+        if is_array:
+            self.element_counts = Counter(
+                element for elements in values for element in set(elements or [])
+            )
+            self.boundaries = None
+        else:
+            numbers = np.asarray([v for v in values if v is not None], dtype=np.float64)
+            self.boundaries = (
+                np.quantile(numbers, np.linspace(0, 1, num_buckets + 1)) if len(numbers) else None
+            )
+            self.sorted_values = np.sort(numbers)
+
+    def fraction(self, node: Node) -> float:
+        """Estimate the fraction of rows a leaf clause keeps."""
+        if not self.sample_size:
+            return 1.0
+        if isinstance(node, ArrayContains):
+            fractions = [
+                self.element_counts.get(value, 0) / self.sample_size for value in node.values
+            ]
+            if node.function == "ARRAY_CONTAINS_ALL":
+                return float(np.prod(fractions)) if fractions else 1.0
+            return min(1.0, sum(fractions))
+        values = self.sorted_values
+        if not len(values):
+            return 0.0
+        if isinstance(node, InList):
+            matched = sum(
+                np.searchsorted(values, v, side="right") - np.searchsorted(values, v, side="left")
+                for v in node.values
+                if isinstance(v, (int, float))
+            )
+            fraction = matched / len(values)
+            return 1.0 - fraction if node.negated else fraction
+        if isinstance(node, Comparison):
+            value = node.value
+            below = np.searchsorted(values, value, side="left") / len(values)
+            below_or_equal = np.searchsorted(values, value, side="right") / len(values)
+            return float(
+                {
+                    "<": below,
+                    "<=": below_or_equal,
+                    ">": 1.0 - below_or_equal,
+                    ">=": 1.0 - below,
+                    "==": below_or_equal - below,
+                    "!=": 1.0 - (below_or_equal - below),
+                }[node.operator]
+            )
+        return 1.0
+
+
+def estimate_selectivity(
+    node: Optional[Node], histogram_of: Callable[[str], FieldHistogram]
+) -> float:
+    """
+    Estimate the fraction of rows a filter keeps, assuming independent clauses.
+
+    Args:
+        node: Normalized filter
+        histogram_of: Returns the histogram of a field
+    """
+    if node is None:
+        return 1.0
+    if isinstance(node, BoolOp):
+        fractions = [estimate_selectivity(child, histogram_of) for child in node.children]
+        if node.operator == "and":
+            return float(np.prod(fractions))
+        return float(1.0 - np.prod([1.0 - f for f in fractions]))
+    if isinstance(node, Not):
+        return 1.0 - estimate_selectivity(node.child, histogram_of)
+    return histogram_of(node.fields()[0]).fraction(node)
+
+
+class FilterPlan:
+    def __init__(self, filter: str, strategy: str, selectivity: float, estimated_rows: int):
+        """
+        Args:
+            filter: Normalized filter expression
+            strategy: "ann" for a filtered ANN search, "brute_force" for an exact scan of
+                the rows kept by the filter
+            selectivity: Estimated fraction of rows kept by the filter
+            estimated_rows: Estimated number of rows kept by the filter
+        """
+        self.filter = filter
+        self.strategy = strategy
+        self.selectivity = selectivity
+        self.estimated_rows = estimated_rows
+
+    def __repr__(self) -> str:
+        return (
+            f"FilterPlan(filter={self.filter!r}, strategy={self.strategy}, "
+            f"selectivity={self.selectivity:.4f}, estimated_rows={self.estimated_rows})"
+        )
+
+
+class FilterPlanner:
+    """
+    Choose how to run a filtered vector search on a collection.
+
+    Field histograms and row counts are sampled from the collection and cached for
+    `stats_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        sample_rows: Callable[[str, str, int], List[Any]],
+        count_rows: Callable[[str], int],
+        sample_size: int = 20_000,
+        brute_force_max_rows: int = 20_000,
+        brute_force_max_selectivity: float = 0.05,
+        stats_ttl: float = 3600.0,
+    ):
+        """
+        Initialize the planner.
+
+        Args:
+            sample_rows: Returns up to n values of a field, called as (collection, field, n)
+            count_rows: Returns the number of rows of a collection
+            sample_size: Number of rows sampled per field histogram
+            brute_force_max_rows: Maximum estimated number of candidates scanned exactly
+            brute_force_max_selectivity: Maximum estimated selectivity scanned exactly
+            stats_ttl: Seconds the sampled statistics stay valid
+        """
+        self.sample_rows = sample_rows
+        self.count_rows = count_rows
+        self.sample_size = sample_size
+        self.brute_force_max_rows = brute_force_max_rows
+        self.brute_force_max_selectivity = brute_force_max_selectivity
+        self.stats_ttl = stats_ttl
+        self._histograms: Dict[Tuple[str, str], Tuple[float, FieldHistogram]] = {}
+        self._row_counts: Dict[str, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, collection: str, field: str) -> FieldHistogram:
+        key = (collection, field)
+        with self._lock:
+            cached = self._histograms.get(key)
+            if cached is None or time.monotonic() - cached[0] > self.stats_ttl:
+                values = self.sample_rows(collection, field, self.sample_size)
+                cached = (
+                    time.monotonic(),
+                    FieldHistogram(values, INDEXED_FIELDS[field].endswith("_array")),
+                )
+                self._histograms[key] = cached
+            return cached[1]
+
+    def row_count(self, collection: str) -> int:
+        with self._lock:
+            cached = self._row_counts.get(collection)
+            if cached is None or time.monotonic() - cached[0] > self.stats_ttl:
+                cached = (time.monotonic(), self.count_rows(collection))
+                self._row_counts[collection] = cached
+            return cached[1]
+
+    def invalidate(self, collection: Optional[str] = None) -> None:
+        with self._lock:
+            if collection is None:
+                self._histograms.clear()
+                self._row_counts.clear()
+                return
+            self._row_counts.pop(collection, None)
+            for key in [key for key in self._histograms if key[0] == collection]:
+                self._histograms.pop(key)
+
+    def plan(self, collection: str, expression: Union[str, Sequence[str], None]) -> FilterPlan:
+        """
+        Normalize a filter and choose a search strategy for it.
+
+        Args:
+            collection: Collection name
+            expression: Filter expression, or a list of expressions combined with AND
+        """
+        node = parse_and_normalize(expression)
+        if node is None:
+            return FilterPlan("", "ann", 1.0, 0)
+        try:
+            selectivity = estimate_selectivity(node, lambda f: self.histogram(collection, f))
+            estimated_rows = int(round(selectivity * self.row_count(collection)))
+        except Exception as e:
+            log.warning(f"fail to estimate filter selectivity, error info: {e}")
+            return FilterPlan(node.render(), "ann", 1.0, 0)
+        strategy = (
+            "brute_force"
+            if selectivity <= self.brute_force_max_selectivity
+            and estimated_rows <= self.brute_force_max_rows
+            else "ann"
+        )
+        return FilterPlan(node.render(), strategy, selectivity, estimated_rows)
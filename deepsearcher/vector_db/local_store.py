@@ -0,0 +1,779 @@
+"""
+In-process vector database stored in local files.
+
+Collections are kept in a directory each: embeddings in a memory mapped float32 matrix,
+numeric scalar fields in one column file per field, array fields and texts in JSON lines
+files. Rows are only ever appended; deletes are recorded as tombstones and dropped by
+`compact`. Filters use the same expression subset as the Milvus filter planner, plus the
+id, reference and text fields, and an HNSW index (hnswlib) can replace the exact scan of
+large collections.
+
+Meant for tests, benchmarks and edge deployments without a vector database server, and as
+a local cache of hot collections.
+"""
+
+import json
+import os
+import shutil
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from deepsearcher.loader.splitter import Chunk
+from deepsearcher.tools import log
+from deepsearcher.vector_db.base import (
+    STORED_METADATA_KEYS,
+    BaseVectorDB,
+    CollectionInfo,
+    RetrievalResult,
+)
+from deepsearcher.vector_db.filter_planner import (
+    INDEXED_FIELDS,
+    ArrayContains,
+    BoolOp,
+    Comparison,
+    FilterSyntaxError,
+    InList,
+    Node,
+    Not,
+    normalize,
+    parse_filter,
+)
+
+# Numeric columns and their on-disk dtypes
+NUMERIC_COLUMNS = {
+    "id": np.int64,
+    "reference_id": np.int64,
+    "pubdate": np.int64,
+    "impact_factor": np.float32,
+    "rbase_factor": np.float32,
+}
+ARRAY_COLUMNS = (
+    "keywords",
+    "authors",
+    "author_ids",
+    "corresponding_authors",
+    "corresponding_author_ids",
+    "base_ids",
+)
+# Fields kept only in the JSON lines rows, loaded when a filter uses them
+STRING_COLUMNS = ("reference", "text")
+FILTER_FIELDS = {**INDEXED_FIELDS, "id": "int", "reference": "varchar", "text": "varchar"}
+COMPARISONS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    ">": np.greater,
+    "<": np.less,
+}
+
+
+class _LocalCollection:
+    """Files and in-memory columns of one collection."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        with open(self._file("meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self._load()
+
+    @classmethod
+    def create(cls, path: str, dim: int, description: str) -> "_LocalCollection":
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dim": dim,
+                    "description": description,
+                    "count": 0,
+                    "next_id": 1,
+                    "rows_bytes": 0,
+                    "arrays_bytes": 0,
+                },
+                f,
+            )
+        return cls(path)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def dim(self) -> int:
+        return self.meta["dim"]
+
+    @property
+    def count(self) -> int:
+        return self.meta["count"]
+
+    def _load(self) -> None:
+        count = self.count
+        self._truncate()
+        self.columns = {
+            name: np.fromfile(self._file(f"{name}.col"), dtype=dtype, count=count)
+            if count
+            else np.empty(0, dtype=dtype)
+            for name, dtype in NUMERIC_COLUMNS.items()
+        }
+        self.deleted = np.zeros(count, dtype=bool)
+        if os.path.exists(self._file("tombstones.col")):
+            tombstones = np.fromfile(self._file("tombstones.col"), dtype=np.int64)
+            self.deleted[tombstones[tombstones < count]] = True
+        self.row_offsets = (
+            np.fromfile(self._file("rows.offsets"), dtype=np.int64, count=count)
+            if count
+            else np.empty(0, dtype=np.int64)
+        )
+        self.embeddings = (
+            np.memmap(
+                self._file("embeddings.f32"), dtype=np.float32, mode="r", shape=(count, self.dim)
+            )
+            if count
+            else np.empty((0, self.dim), dtype=np.float32)
+        )
+        self._arrays: Optional[Dict[str, List[list]]] = None
+        self._strings: Optional[Dict[str, List[str]]] = None
+
+    def _committed_sizes(self) -> Dict[str, int]:
+        """Byte size of every appended file up to the committed row count."""
+        count = self.count
+        if "rows_bytes" not in self.meta:
+            # Collections written before the sizes were kept in meta.json.
+            rows_bytes = arrays_bytes = 0
+            if count:
+                offsets = np.fromfile(self._file("rows.offsets"), dtype=np.int64, count=count)
+                with open(self._file("rows.jsonl"), "rb") as f:
+                    f.seek(int(offsets[-1]))
+                    f.readline()
+                    rows_bytes = f.tell()
+                with open(self._file("arrays.jsonl"), "rb") as f:
+                    for _ in range(count):
+                        f.readline()
+                    arrays_bytes = f.tell()
+            self.meta["rows_bytes"] = rows_bytes
+            self.meta["arrays_bytes"] = arrays_bytes
+        sizes = {
+            f"{name}.col": count * np.dtype(dtype).itemsize
+            for name, dtype in NUMERIC_COLUMNS.items()
+        }
+        sizes["rows.offsets"] = count * np.dtype(np.int64).itemsize
+        sizes["embeddings.f32"] = count * self.dim * np.dtype(np.float32).itemsize
+        sizes["rows.jsonl"] = self.meta["rows_bytes"]
+        sizes["arrays.jsonl"] = self.meta["arrays_bytes"]
+        return sizes
+
+    def _truncate(self) -> None:
+        """Drop bytes left behind by an append that failed before its row count was saved."""
+        for name, size in self._committed_sizes().items():
+            path = self._file(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                log.warning(f"Truncating {path} to the {self.count} committed rows")
+                os.truncate(path, size)
+
+    def arrays(self) -> Dict[str, List[list]]:
+        """Array columns, loaded on first use by an array filter."""
+        if self._arrays is None:
+            arrays = {name: [] for name in ARRAY_COLUMNS}
+            if self.count:
+                with open(self._file("arrays.jsonl"), encoding="utf-8") as f:
+                    for _, line in zip(range(self.count), f):
+                        record = json.loads(line)
+                        for name in ARRAY_COLUMNS:
+                            arrays[name].append(record.get(name) or [])
+            self._arrays = arrays
+        return self._arrays
+
+    def strings(self) -> Dict[str, List[str]]:
+        """Reference and text columns, loaded on first use by a filter on them."""
+        if self._strings is None:
+            strings = {name: [] for name in STRING_COLUMNS}
+            for row in self.read_rows(range(self.count)):
+                for name in STRING_COLUMNS:
+                    strings[name].append(row[name])
+            self._strings = strings
+        return self._strings
+
+    def append(self, rows: List[Dict[str, Any]], embeddings: np.ndarray) -> List[int]:
+        """Append rows and return their ids; the row count is committed last."""
+        self._truncate()
+        ids = list(range(self.meta["next_id"], self.meta["next_id"] + len(rows)))
+        with open(self._file("rows.jsonl"), "ab") as f:
+            offsets = []
+            for row in rows:
+                offsets.append(f.tell())
+                record = {key: row[key] for key in ("text", "reference", "metadata")}
+                f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            rows_bytes = f.tell()
+        with open(self._file("rows.offsets"), "ab") as f:
+            f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+        with open(self._file("arrays.jsonl"), "ab") as f:
+            for row in rows:
+                record = {name: row[name] for name in ARRAY_COLUMNS}
+                f.write(json.dumps(record).encode("utf-8") + b"\n")
+            arrays_bytes = f.tell()
+        for name, dtype in NUMERIC_COLUMNS.items():
+            values = ids if name == "id" else [row[name] for row in rows]
+            with open(self._file(f"{name}.col"), "ab") as f:
+                f.write(np.asarray(values, dtype=dtype).tobytes())
+        with open(self._file("embeddings.f32"), "ab") as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        meta = dict(
+            self.meta,
+            count=self.count + len(rows),
+            next_id=self.meta["next_id"] + len(rows),
+            rows_bytes=rows_bytes,
+            arrays_bytes=arrays_bytes,
+        )
+        self._save_meta(meta)
+        self.meta = meta
+        self._extend(rows, ids, offsets)
+        return ids
+
+    def _extend(self, rows: List[Dict[str, Any]], ids: List[int], offsets: List[int]) -> None:
+        """Add appended rows to the in-memory columns instead of reloading every file."""
+        for name, dtype in NUMERIC_COLUMNS.items():
+            values = ids if name == "id" else [row[name] for row in rows]
+            self.columns[name] = np.concatenate([self.columns[name], np.asarray(values, dtype)])
+        self.deleted = np.concatenate([self.deleted, np.zeros(len(rows), dtype=bool)])
+        self.row_offsets = np.concatenate([self.row_offsets, np.asarray(offsets, np.int64)])
+        self.embeddings = np.memmap(
+            self._file("embeddings.f32"), dtype=np.float32, mode="r", shape=(self.count, self.dim)
+        )
+        if self._arrays is not None:
+            for name in ARRAY_COLUMNS:
+                self._arrays[name].extend(row[name] for row in rows)
+        if self._strings is not None:
+            for name in STRING_COLUMNS:
+                self._strings[name].extend(row[name] for row in rows)
+
+    def delete(self, positions: np.ndarray) -> int:
+        positions = positions[~self.deleted[positions]]
+        if len(positions):
+            with open(self._file("tombstones.col"), "ab") as f:
+                f.write(positions.astype(np.int64).tobytes())
+            self.deleted[positions] = True
+        return len(positions)
+
+    def _save_meta(self, meta: Optional[Dict[str, Any]] = None) -> None:
+        tmp_path = self._file("meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta if meta is None else meta, f)
+        os.replace(tmp_path, self._file("meta.json"))
+
+    def read_rows(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        rows = []
+        with open(self._file("rows.jsonl"), "rb") as f:
+            for position in positions:
+                f.seek(int(self.row_offsets[position]))
+                rows.append(json.loads(f.readline()))
+        return rows
+
+    def mask(self, node: Optional[Node]) -> np.ndarray:
+        """Evaluate a filter over the columns, tombstoned rows excluded."""
+        alive = ~self.deleted
+        return alive if node is None else alive & self._evaluate(node)
+
+    def _evaluate(self, node: Node) -> np.ndarray:
+        if isinstance(node, BoolOp):
+            masks = [self._evaluate(child) for child in node.children]
+            reduce = np.logical_and if node.operator == "and" else np.logical_or
+            return reduce.reduce(masks)
+        if isinstance(node, Not):
+            return ~self._evaluate(node.child)
+        if isinstance(node, Comparison) and node.field in self.columns:
+            return COMPARISONS[node.operator](self.columns[node.field], node.value)
+        if isinstance(node, InList) and node.field in self.columns:
+            return np.isin(self.columns[node.field], node.values) != node.negated
+        if isinstance(node, (Comparison, InList)) and node.field in STRING_COLUMNS:
+            column = self.strings()[node.field]
+            return np.fromiter(
+                (node.evaluate({node.field: value}) for value in column),
+                dtype=bool,
+                count=self.count,
+            )
+        if isinstance(node, ArrayContains) and node.field in ARRAY_COLUMNS:
+            column = self.arrays()[node.field]
+            return np.fromiter(
+                (node.evaluate({node.field: values}) for values in column),
+                dtype=bool,
+                count=self.count,
+            )
+        # Comparisons on array fields and other rare shapes are evaluated row by row
+        arrays = self.arrays()
+        return np.fromiter(
+            (
+                node.evaluate(
+                    {
+                        **{name: column[i].item() for name, column in self.columns.items()},
+                        **{name: arrays[name][i] for name in ARRAY_COLUMNS},
+                    }
+                )
+                for i in range(self.count)
+            ),
+            dtype=bool,
+            count=self.count,
+        )
+
+
+class LocalVectorDB(BaseVectorDB):
+    """
+    Vector database kept in local files, without a server.
+
+    Searches are exact scans of the filtered rows, or HNSW searches when `index_type` is
+    "hnsw", hnswlib is installed and more rows than `brute_force_max_rows` pass the filter.
+    Distances are squared L2 like the Milvus backend.
+    """
+
+    def __init__(
+        self,
+        default_collection: str = "deepsearcher",
+        path: str = "database/local_vector_db",
+        index_type: str = "flat",
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 200,
+        hnsw_ef: int = 64,
+        brute_force_max_rows: int = 20_000,
+        catalog_ttl: float = 300.0,
+    ):
+        """
+        Initialize the database.
+
+        Args:
+            default_collection: Name of the default collection
+            path: Directory holding one sub-directory per collection
+            index_type: "flat" for exact search only, or "hnsw"
+            hnsw_m: Graph degree of the HNSW index
+            hnsw_ef_construction: Candidate list size while building the HNSW index
+            hnsw_ef: Candidate list size of HNSW searches, raised to top_k when smaller
+            brute_force_max_rows: Maximum number of filtered rows scanned exactly when an
+                HNSW index is available
+            catalog_ttl: Seconds the cached collection catalog stays valid
+        """
+        if index_type not in ("flat", "hnsw"):
+            raise ValueError(f"Unsupported index type: {index_type}, choose from flat, hnsw")
+        super().__init__(default_collection, catalog_ttl=catalog_ttl)
+        self.default_collection = default_collection
+        self.path = path
+        self.index_type = index_type
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef = hnsw_ef
+        self.brute_force_max_rows = brute_force_max_rows
+        self._collections: Dict[str, _LocalCollection] = {}
+        self._hnsw_indexes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _collection_path(self, collection: str) -> str:
+        return os.path.join(self.path, collection)
+
+    def _get_collection(self, collection: str) -> Optional[_LocalCollection]:
+        with self._lock:
+            if collection not in self._collections:
+                if not os.path.exists(os.path.join(self._collection_path(collection), "meta.json")):
+                    return None
+                self._collections[collection] = _LocalCollection(self._collection_path(collection))
+            return self._collections[collection]
+
+    def init_collection(
+        self,
+        dim: int,
+        collection: Optional[str] = "deepsearcher",
+        description: Optional[str] = "",
+        force_new_collection: bool = False,
+        *args,
+        **kwargs,
+    ):
+        """
+        Initialize a new collection.
+
+        Args:
+            dim: Dimension of the vector embeddings
+            collection: Collection name
+            description: Collection description
+            force_new_collection: Whether to drop existing collection
+        """
+        if not collection:
+            collection = self.default_collection
+        if description is None:
+            description = ""
+        try:
+            has_collection = self._get_collection(collection) is not None
+            if force_new_collection and has_collection:
+                self.clear_db(collection)
+            elif has_collection:
+                return
+            with self._lock:
+                self._collections[collection] = _LocalCollection.create(
+                    self._collection_path(collection), dim, description
+                )
+            self.invalidate_collection_infos()
+            log.color_print(f"create collection [{collection}] successfully")
+        except Exception as e:
+            log.critical(f"fail to init db for local vector db, error info: {e}")
+
+    def insert_data(
+        self,
+        collection: Optional[str],
+        chunks: List[Chunk],
+        batch_size: int = 256,
+        *args,
+        **kwargs,
+    ):
+        """
+        Append chunks to a collection.
+
+        Args:
+            collection: Collection name
+            chunks: List of data chunks to insert
+            batch_size: Number of rows appended per write
+
+        Returns:
+            Dictionary containing total insert count and list of inserted IDs
+        """
+        if not collection:
+            collection = self.default_collection
+        total_result = {"insert_count": 0, "ids": []}
+        local_collection = self._get_collection(collection)
+        if local_collection is None:
+            log.critical(f"fail to insert data, collection '{collection}' does not exist")
+            return total_result
+        try:
+            for start in range(0, len(chunks), batch_size):
+                batch = chunks[start : start + batch_size]
+                rows = [self._to_row(chunk) for chunk in batch]
+                embeddings = np.asarray([chunk.embedding for chunk in batch], dtype=np.float32)
+                with local_collection.lock:
+                    first_position = local_collection.count
+                    ids = local_collection.append(rows, embeddings)
+                    index = self._hnsw_indexes.get(collection)
+                    if index is not None:
+                        self._add_to_hnsw(index, embeddings, first_position)
+                total_result["insert_count"] += len(ids)
+                total_result["ids"].extend(ids)
+            return total_result
+        except Exception as e:
+            log.critical(f"fail to insert data, error info: {e}")
+            return total_result
+
+    @staticmethod
+    def _to_row(chunk: Chunk) -> Dict[str, Any]:
+        metadata = chunk.metadata
+        return {
+            "text": chunk.text,
+            "reference": metadata.get("title", ""),
+            "reference_id": metadata.get("article_id", 0),
+            "pubdate": int(metadata.get("pubdate", 0)),
+            "impact_factor": metadata.get("impact_factor", 0),
+            "rbase_factor": metadata.get("rbase_factor", 0),
+            "metadata": {key: metadata[key] for key in STORED_METADATA_KEYS if key in metadata},
+            **{name: list(metadata.get(name, [])) for name in ARRAY_COLUMNS},
+        }
+
+    def search_data(
+        self,
+        collection: Optional[str],
+        vector: Union[np.array, List[float]],
+        top_k: int = 5,
+        filter: Optional[str] = "",
+        *args,
+        **kwargs,
+    ) -> List[RetrievalResult]:
+        """
+        Search for the most similar vectors in a collection.
+
+        Args:
+            collection: Collection name
+            vector: Query vector
+            top_k: Number of most similar results to return
+            filter: Filter expression on id, reference, text, pubdate, impact_factor,
+                rbase_factor, reference_id and the array fields, in Milvus syntax
+
+        Returns:
+            List of RetrievalResult objects containing search results, empty when the
+            filter has clauses that cannot be evaluated
+        """
+        if not collection:
+            collection = self.default_collection
+        local_collection = self._get_collection(collection)
+        if local_collection is None:
+            log.critical(f"fail to search data, collection '{collection}' does not exist")
+            return []
+        try:
+            node = parse_filter(filter) if filter else None
+        except FilterSyntaxError as e:
+            log.critical(f"fail to search data, invalid filter {filter!r}: {e}")
+            return []
+        try:
+            # Dropping a clause would return rows the filter excludes
+            node = normalize(node, FILTER_FIELDS, strict=True) if node else None
+        except FilterSyntaxError as e:
+            log.warning(f"skip search, filter {filter!r} cannot be evaluated: {e}")
+            return []
+        query_vector = np.asarray(vector, dtype=np.float32)
+        with local_collection.lock:
+            mask = local_collection.mask(node)
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return []
+            index = None
+            if len(candidates) > self.brute_force_max_rows:
+                index = self._get_hnsw_index(collection, local_collection)
+            positions = None
+            if index is not None:
+                try:
+                    positions, distances = self._hnsw_search(
+                        index, query_vector, top_k, mask, len(candidates) == local_collection.count
+                    )
+                except RuntimeError as e:
+                    # hnswlib fails when a filter leaves fewer reachable rows than top_k
+                    log.warning(f"fail to search the HNSW index, fall back to exact search: {e}")
+            if positions is None:
+                positions, distances = self._exact_search(
+                    local_collection.embeddings, candidates, query_vector, top_k
+                )
+            return self._to_retrieval_results(local_collection, positions, distances)
+
+    @staticmethod
+    def _exact_search(
+        embeddings: np.ndarray, candidates: np.ndarray, query_vector: np.ndarray, top_k: int
+    ):
+        distances = np.empty(len(candidates), dtype=np.float32)
+        # Bounded blocks keep the memory mapped scan out of a full copy of the matrix
+        for start in range(0, len(candidates), 65_536):
+            block = embeddings[candidates[start : start + 65_536]]
+            distances[start : start + 65_536] = np.sum((block - query_vector) ** 2, axis=1)
+        k = min(top_k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return candidates[nearest], distances[nearest]
+
+    def _hnsw_search(
+        self, index, query_vector: np.ndarray, top_k: int, mask: np.ndarray, unfiltered: bool
+    ):
+        k = min(top_k, int(mask.sum()))
+        index.set_ef(max(self.hnsw_ef, k))
+        labels, distances = index.knn_query(
+            query_vector, k=k, filter=None if unfiltered else lambda label: bool(mask[label])
+        )
+        return labels[0].astype(np.int64), distances[0]
+
+    @staticmethod
+    def _to_retrieval_results(
+        local_collection: _LocalCollection, positions: np.ndarray, distances: np.ndarray
+    ) -> List[RetrievalResult]:
+        rows = local_collection.read_rows(positions.tolist())
+        columns = local_collection.columns
+        return [
+            RetrievalResult(
+                embedding=local_collection.embeddings[position].tolist(),
+                text=row["text"],
+                reference=row["reference"],
+                score=float(distance),
+                metadata={
+                    **(row.get("metadata") or {}),
+                    "id": int(columns["id"][position]),
+                    "reference_id": int(columns["reference_id"][position]),
+                    "pubdate": int(columns["pubdate"][position]),
+                    "impact_factor": float(columns["impact_factor"][position]),
+                },
+            )
+            for position, row, distance in zip(positions, rows, distances)
+        ]
+
+    def _hnsw_path(self, collection: str) -> str:
+        return os.path.join(self._collection_path(collection), "hnsw.bin")
+
+    def _get_hnsw_index(self, collection: str, local_collection: _LocalCollection):
+        """Load or build the HNSW index of a collection, None when it is disabled."""
+        if self.index_type != "hnsw":
+            return None
+        if collection in self._hnsw_indexes:
+            return self._hnsw_indexes[collection]
+        try:
+            import hnswlib
+        except ImportError:
+            log.warning("hnswlib is not installed, fall back to exact search")
+            self.index_type = "flat"
+            return None
+        index = hnswlib.Index(space="l2", dim=local_collection.dim)
+        if os.path.exists(self._hnsw_path(collection)):
+            index.load_index(self._hnsw_path(collection), max_elements=local_collection.count)
+            if index.get_current_count() < local_collection.count:
+                # Rows appended by another process since the index was saved
+                first_position = index.get_current_count()
+                self._add_to_hnsw(
+                    index, local_collection.embeddings[first_position:], first_position
+                )
+        else:
+            index.init_index(
+                max_elements=max(local_collection.count, 1),
+                M=self.hnsw_m,
+                ef_construction=self.hnsw_ef_construction,
+            )
+            self._add_to_hnsw(index, local_collection.embeddings, 0)
+        self._hnsw_indexes[collection] = index
+        return index
+
+    @staticmethod
+    def _add_to_hnsw(index, embeddings: np.ndarray, first_position: int) -> None:
+        if not len(embeddings):
+            return
+        required = first_position + len(embeddings)
+        if required > index.get_max_elements():
+            index.resize_index(max(required, index.get_max_elements() * 2))
+        index.add_items(
+            np.asarray(embeddings, dtype=np.float32),
+            np.arange(first_position, required),
+        )
+
+    def list_collections(self, *args, **kwargs) -> List[CollectionInfo]:
+        """
+        List all collections in the database.
+
+        Returns:
+            List of CollectionInfo objects containing collection details
+        """
+        collection_infos = []
+        try:
+            for name in sorted(os.listdir(self.path)):
+                local_collection = self._get_collection(name)
+                if local_collection is not None:
+                    collection_infos.append(
+                        CollectionInfo(
+                            collection_name=name,
+                            description=local_collection.meta.get("description", ""),
+                        )
+                    )
+        except Exception as e:
+            log.critical(f"fail to list collections, error info: {e}")
+        return collection_infos
+
+    def clear_db(self, collection: str = "deepsearcher", *args, **kwargs):
+        """
+        Remove a collection and its files.
+
+        Args:
+            collection: Name of the collection to clear
+        """
+        if not collection:
+            collection = self.default_collection
+        try:
+            with self._lock:
+                self._collections.pop(collection, None)
+                self._hnsw_indexes.pop(collection, None)
+            shutil.rmtree(self._collection_path(collection), ignore_errors=True)
+        except Exception as e:
+            log.warning(f"fail to clear db, error info: {e}")
+        finally:
+            self.invalidate_collection_infos()
+
+    def delete_data(
+        self,
+        collection: str,
+        ids: Optional[List[int]] = None,
+        filter: Optional[str] = None,
+        reference_ids: Optional[List[int]] = None,
+        *args,
+        **kwargs,
+    ) -> int:
+        """
+        Delete rows of a collection by id, by reference id or by filter.
+
+        Args:
+            collection: Collection name
+            ids: Row ids to delete
+            filter: Filter expression in Milvus syntax, combined with the ids when both given
+            reference_ids: Reference (article) ids whose rows are deleted
+
+        Returns:
+            Number of deleted rows
+        """
+        if not ids and not filter and not reference_ids:
+            log.warning("no ids, reference ids or filter provided, skip delete")
+            return 0
+        if not collection:
+            collection = self.default_collection
+        local_collection = self._get_collection(collection)
+        if local_collection is None:
+            return 0
+        try:
+            # Dropping a clause would delete rows the filter excludes
+            node = normalize(parse_filter(filter), FILTER_FIELDS, strict=True) if filter else None
+        except FilterSyntaxError as e:
+            log.warning(f"skip delete, filter {filter!r} cannot be evaluated: {e}")
+            return 0
+        try:
+            with local_collection.lock:
+                mask = local_collection.mask(node)
+                if ids:
+                    mask &= np.isin(local_collection.columns["id"], ids)
+                if reference_ids:
+                    mask &= np.isin(local_collection.columns["reference_id"], reference_ids)
+                positions = np.flatnonzero(mask)
+                index = self._hnsw_indexes.get(collection)
+                if index is not None:
+                    for position in positions:
+                        index.mark_deleted(int(position))
+                return local_collection.delete(positions)
+        except Exception as e:
+            log.critical(f"fail to delete data, error info: {e}")
+            return 0
+
+    def compact(self, collection: str) -> int:
+        """
+        Rewrite a collection without its deleted rows, keeping the ids of the others.
+
+        Returns:
+            Number of rows left
+        """
+        local_collection = self._get_collection(collection)
+        if local_collection is None:
+            return 0
+        with local_collection.lock:
+            keep = np.flatnonzero(~local_collection.deleted)
+            arrays = local_collection.arrays()
+            rows = [
+                {
+                    **row,
+                    **{name: arrays[name][position] for name in ARRAY_COLUMNS},
+                    **{
+                        name: column[position].item()
+                        for name, column in local_collection.columns.items()
+                        if name != "id"
+                    },
+                }
+                for position, row in zip(keep, local_collection.read_rows(keep.tolist()))
+            ]
+            embeddings = np.array(local_collection.embeddings[keep])
+            ids = local_collection.columns["id"][keep].copy()
+            meta = dict(local_collection.meta)
+
+            tmp_path = self._collection_path(collection) + ".compact"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            compacted = _LocalCollection.create(tmp_path, meta["dim"], meta["description"])
+            if rows:
+                compacted.append(rows, embeddings)
+            # Keep the original ids and id sequence
+            ids.tofile(compacted._file("id.col"))
+            compacted.meta["next_id"] = meta["next_id"]
+            compacted._save_meta()
+
+            with self._lock:
+                self._collections.pop(collection, None)
+                self._hnsw_indexes.pop(collection, None)
+                shutil.rmtree(self._collection_path(collection))
+                os.replace(tmp_path, self._collection_path(collection))
+        return len(keep)
+
+    def flush(self, collection_name: str, **kwargs):
+        """Save the HNSW index of a collection, rows are written on insert."""
+        index = self._hnsw_indexes.get(collection_name)
+        if index is not None:
+            index.save_index(self._hnsw_path(collection_name))
+
+    def close(self):
+        for collection in list(self._hnsw_indexes):
+            self.flush(collection)
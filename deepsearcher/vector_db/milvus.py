@@ -1,11 +1,123 @@
-from typing import List, Optional, Union
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import numpy as np
 from pymilvus import DataType, MilvusClient
 
 from deepsearcher.loader.splitter import Chunk
 from deepsearcher.tools import log
-from deepsearcher.vector_db.base import BaseVectorDB, CollectionInfo, RetrievalResult
+from deepsearcher.vector_db.base import (
+    STORED_METADATA_KEYS,
+    BaseVectorDB,
+    CollectionInfo,
+    RetrievalResult,
+)
+from deepsearcher.vector_db.bm25 import BM25Index, reciprocal_rank_fusion
+from deepsearcher.vector_db.filter_planner import FilterPlanner, required_array_values
+from deepsearcher.vector_db.quantization import (
+    FullVectorStore,
+    check_vector_dtype,
+    decode_vector,
+    encode_query,
+    encode_vectors,
+    truncate_vectors,
+)
+
+SEARCH_OUTPUT_FIELDS = [
+    "embedding",
+    "text",
+    "reference",
+    "reference_id",
+    "pubdate",
+    "impact_factor",
+    "metadata",
+]
+# Lexical candidates fetched per requested result, so that a filter still leaves enough
+LEXICAL_CANDIDATE_FACTOR = 4
+
+# Layouts of collections sharded by `base_ids`: rows are replicated into one partition per
+# base, or carry one base id per replica in a partition key field
+PARTITION_LAYOUTS = ("", "partitions", "partition_key")
+PARTITION_KEY_FIELD = "primary_base_id"
+BASE_PARTITION_PREFIX = "base_"
+# Base id of the rows that belong to no base
+NO_BASE_ID = 0
+# Marks the replica of a row in its first base, searched when no base is required
+PRIMARY_REPLICA_FIELD = "primary_replica"
+
+# Field types of the `embedding` field by vector dtype
+VECTOR_FIELD_TYPES = {
+    "float32": DataType.FLOAT_VECTOR,
+    "float16": DataType.FLOAT16_VECTOR,
+    "bfloat16": DataType.BFLOAT16_VECTOR,
+}
+
+# ANN index profiles of the `embedding` field: build params and default search params
+INDEX_PROFILES = {
+    "AUTOINDEX": {"index_type": "AUTOINDEX", "params": {}, "search_params": {}},
+    "FLAT": {"index_type": "FLAT", "params": {}, "search_params": {}},
+    "HNSW": {
+        "index_type": "HNSW",
+        "params": {"M": 16, "efConstruction": 200},
+        "search_params": {"ef": 64},
+    },
+    "IVF_FLAT": {
+        "index_type": "IVF_FLAT",
+        "params": {"nlist": 1024},
+        "search_params": {"nprobe": 16},
+    },
+    "IVF_SQ8": {
+        "index_type": "IVF_SQ8",
+        "params": {"nlist": 1024},
+        "search_params": {"nprobe": 16},
+    },
+    "HNSW_SQ": {
+        "index_type": "HNSW_SQ",
+        "params": {"M": 16, "efConstruction": 200, "sq_type": "SQ8"},
+        "search_params": {"ef": 64},
+    },
+    "IVF_PQ": {
+        "index_type": "IVF_PQ",
+        "params": {"nlist": 1024, "m": 16, "nbits": 8},
+        "search_params": {"nprobe": 32},
+    },
+    "DISKANN": {"index_type": "DISKANN", "params": {}, "search_params": {"search_list": 100}},
+    "SCANN": {
+        "index_type": "SCANN",
+        "params": {"nlist": 1024, "with_raw_data": True},
+        "search_params": {"nprobe": 16, "reorder_k": 100},
+    },
+}
+
+
+def resolve_index_profile(
+    index_profile: str, index_params: Optional[dict] = None
+) -> Tuple[str, dict, dict]:
+    """
+    Resolve an index profile name into its index type, build params and search params.
+
+    Args:
+        index_profile: One of INDEX_PROFILES
+        index_params: Build params overriding the profile defaults
+
+    Returns:
+        (index type, build params, default search params)
+    """
+    profile = INDEX_PROFILES.get(index_profile.upper())
+    if profile is None:
+        raise ValueError(
+            f"Unsupported index profile: {index_profile}, choose from {list(INDEX_PROFILES)}"
+        )
+    return (
+        profile["index_type"],
+        {**profile["params"], **(index_params or {})},
+        dict(profile["search_params"]),
+    )
+
+
+def base_partition_name(base_id: int) -> str:
+    return f"{BASE_PARTITION_PREFIX}{int(base_id)}"
 
 
 class Milvus(BaseVectorDB):
@@ -19,6 +131,19 @@ class Milvus(BaseVectorDB):
         uri: str = "http://localhost:19530",
         token: str = "root:Milvus",
         db: str = "default",
+        catalog_ttl: float = 300.0,
+        lexical_index_dir: Optional[str] = None,
+        rrf_k: int = 60,
+        brute_force_max_rows: int = 20_000,
+        index_profile: str = "AUTOINDEX",
+        index_params: Optional[dict] = None,
+        search_params: Optional[dict] = None,
+        partition_layout: str = "",
+        num_partitions: int = 64,
+        vector_dtype: str = "float32",
+        vector_dim: Optional[int] = None,
+        full_vector_dir: Optional[str] = None,
+        rescore_factor: int = 4,
     ):
         """
         Initialize Milvus client with connection parameters.
@@ -28,10 +153,274 @@ class Milvus(BaseVectorDB):
             uri: Milvus server URI
             token: Authentication token
             db: Database name
+            catalog_ttl: Seconds the cached collection catalog stays valid
+            lexical_index_dir: Directory of the BM25 indexes kept next to the collections,
+                hybrid retrieval is disabled when empty
+            rrf_k: Damping constant of the reciprocal rank fusion of hybrid retrieval
+            brute_force_max_rows: Maximum number of filtered rows scanned exactly instead of
+                running a filtered ANN search
+            index_profile: Default ANN index profile of new collections, see INDEX_PROFILES
+            index_params: Build params overriding the defaults of the index profile
+            search_params: Search params (e.g. ef, nprobe) used instead of the defaults of
+                the index profile of each collection
+            partition_layout: Default partition layout of new collections, one of
+                PARTITION_LAYOUTS; empty keeps every row in the default partition
+            num_partitions: Number of physical partitions of the "partition_key" layout
+            vector_dtype: Default element type of the vectors of new collections, one of
+                VECTOR_DTYPES; bfloat16 requires the ml_dtypes package
+            vector_dim: Default number of dimensions stored by new collections, embeddings
+                of a Matryoshka model are truncated to it; all dimensions when None
+            full_vector_dir: Directory of the full precision vectors of compressed
+                collections, used to re-score search results; disabled when empty
+            rescore_factor: Candidates fetched per requested result before re-scoring
         """
-        super().__init__(default_collection)
+        if partition_layout not in PARTITION_LAYOUTS:
+            raise ValueError(
+                f"Unsupported partition layout: {partition_layout}, choose from {PARTITION_LAYOUTS}"
+            )
+        check_vector_dtype(vector_dtype)
+        super().__init__(default_collection, catalog_ttl=catalog_ttl)
         self.default_collection = default_collection
         self.client = MilvusClient(uri=uri, token=token, db_name=db, timeout=30)
+        self.lexical_index_dir = lexical_index_dir
+        self.rrf_k = rrf_k
+        self._lexical_indexes: Dict[str, BM25Index] = {}
+        self._lexical_pool: Optional[ThreadPoolExecutor] = None
+        self.filter_planner = FilterPlanner(
+            sample_rows=self._sample_field,
+            count_rows=self._count_rows,
+            brute_force_max_rows=brute_force_max_rows,
+        )
+        self.index_profile = index_profile
+        self.index_params = index_params
+        self.search_params = search_params
+        self._collection_search_params: Dict[str, dict] = {}
+        self.partition_layout = partition_layout
+        self.num_partitions = num_partitions
+        self._partition_layouts: Dict[str, str] = {}
+        self._partitions: Dict[str, Set[str]] = {}
+        self.vector_dtype = vector_dtype
+        self.vector_dim = vector_dim
+        self.full_vector_dir = full_vector_dir
+        self.rescore_factor = rescore_factor
+        self._full_vector_stores: Dict[str, FullVectorStore] = {}
+        # collection -> (vector dtype, stored dimension)
+        self._vector_formats: Dict[str, Tuple[str, int]] = {}
+
+    def get_lexical_index(self, collection: str) -> Optional[BM25Index]:
+        """Get the BM25 index of a collection, or None when hybrid retrieval is disabled."""
+        if not self.lexical_index_dir:
+            return None
+        if collection not in self._lexical_indexes:
+            self._lexical_indexes[collection] = BM25Index(
+                os.path.join(self.lexical_index_dir, f"{collection}.sqlite")
+            )
+        return self._lexical_indexes[collection]
+
+    def get_full_vector_store(self, collection: str) -> Optional[FullVectorStore]:
+        """Get the full precision vector store of a collection, or None when re-scoring is disabled."""
+        if not self.full_vector_dir:
+            return None
+        if collection not in self._full_vector_stores:
+            self._full_vector_stores[collection] = FullVectorStore(
+                os.path.join(self.full_vector_dir, collection)
+            )
+        return self._full_vector_stores[collection]
+
+    def get_vector_format(self, collection: str) -> Tuple[str, int]:
+        """
+        Get the vector dtype and the stored dimension of a collection.
+
+        Returns:
+            (vector dtype, dimension), the dimension being 0 when it is unknown
+        """
+        if collection not in self._vector_formats:
+            try:
+                fields = self.client.describe_collection(collection).get("fields", [])
+            except Exception as e:
+                log.warning(f"fail to describe collection '{collection}', error info: {e}")
+                return "float32", 0
+            vector_format = ("float32", 0)
+            for field in fields:
+                if field.get("name") == "embedding":
+                    dtype = next(
+                        (
+                            dtype
+                            for dtype, field_type in VECTOR_FIELD_TYPES.items()
+                            if field.get("type") == field_type
+                        ),
+                        "float32",
+                    )
+                    vector_format = (dtype, int(field.get("params", {}).get("dim", 0)))
+            self._vector_formats[collection] = vector_format
+        return self._vector_formats[collection]
+
+    def _stored_query(self, collection: str, vector: Union[np.array, List[float]]) -> np.ndarray:
+        """Bring a query vector to the dimension stored in a collection."""
+        _, dim = self.get_vector_format(collection)
+        query_vector = np.asarray(vector, dtype=np.float32)
+        if 0 < dim < len(query_vector):
+            query_vector = truncate_vectors(query_vector[None, :], dim)[0]
+        return query_vector
+
+    def _rescore(
+        self,
+        collection: str,
+        vector: Union[np.array, List[float]],
+        results: List[RetrievalResult],
+        reorder: bool = True,
+    ) -> List[RetrievalResult]:
+        """
+        Replace the scores and embeddings of results with their full precision values.
+
+        Results whose full vector is missing keep their compressed score and are ranked after
+        the re-scored results.
+        """
+        store = self.get_full_vector_store(collection)
+        if store is None or not results:
+            return results
+        query_vector = np.asarray(vector, dtype=np.float32)
+        found, full_vectors = store.get([result.metadata["id"] for result in results])
+        if not found.any() or full_vectors.shape[1] != len(query_vector):
+            return results
+        distances = np.sum((full_vectors - query_vector) ** 2, axis=1)
+        for result, is_found, full_vector, distance in zip(results, found, full_vectors, distances):
+            if is_found:
+                result.score = float(distance)
+                result.embedding = full_vector.tolist()
+        if not reorder:
+            return results
+        rescored = sorted(
+            (result for result, is_found in zip(results, found) if is_found),
+            key=lambda result: result.score,
+        )
+        return rescored + [result for result, is_found in zip(results, found) if not is_found]
+
+    def _is_compressed(self, collection: str, vector: Union[np.array, List[float]]) -> bool:
+        dtype, dim = self.get_vector_format(collection)
+        return dtype != "float32" or 0 < dim < len(vector)
+
+    def rebuild_lexical_index(self, collection: str, batch_size: int = 1000) -> int:
+        """
+        Rebuild the BM25 index of an existing collection from the rows stored in it.
+
+        Args:
+            collection: Collection name
+            batch_size: Number of rows read per request
+
+        Returns:
+            Number of indexed rows
+        """
+        lexical_index = self.get_lexical_index(collection)
+        if lexical_index is None:
+            log.warning("lexical_index_dir is not configured, skip rebuilding the lexical index")
+            return 0
+        lexical_index.clear()
+        count = 0
+        iterator = self.client.query_iterator(
+            collection_name=collection, batch_size=batch_size, output_fields=["id", "text"]
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                lexical_index.add([row["id"] for row in rows], [row["text"] for row in rows])
+                count += len(rows)
+        finally:
+            iterator.close()
+        return count
+
+    def _query_ids(
+        self,
+        collection: str,
+        filter: str,
+        ids: Optional[List[int]] = None,
+        batch_size: int = 1000,
+    ) -> List[int]:
+        """Ids of the rows matching a filter, among the given ids when some are given."""
+        if ids:
+            filter = f"id in {[int(doc_id) for doc_id in ids]} and ({filter})"
+        matched = []
+        iterator = self.client.query_iterator(
+            collection_name=collection, batch_size=batch_size, filter=filter, output_fields=["id"]
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                matched.extend(row["id"] for row in rows)
+        finally:
+            iterator.close()
+        return matched
+
+    def get_partition_layout(self, collection: str) -> str:
+        """Detect the partition layout of a collection from its schema and partitions."""
+        if collection not in self._partition_layouts:
+            try:
+                fields = self.client.describe_collection(collection).get("fields", [])
+                if any(field.get("is_partition_key") for field in fields):
+                    layout = "partition_key"
+                elif any(
+                    name.startswith(BASE_PARTITION_PREFIX)
+                    for name in self._list_partitions(collection)
+                ):
+                    layout = "partitions"
+                else:
+                    layout = ""
+            except Exception as e:
+                log.warning(
+                    f"fail to detect the partition layout of '{collection}', error info: {e}"
+                )
+                return ""
+            self._partition_layouts[collection] = layout
+        return self._partition_layouts[collection]
+
+    def _list_partitions(self, collection: str, refresh: bool = False) -> Set[str]:
+        if refresh or collection not in self._partitions:
+            self._partitions[collection] = set(self.client.list_partitions(collection))
+        return self._partitions[collection]
+
+    def _ensure_partition(self, collection: str, partition: str) -> None:
+        if partition in self._list_partitions(collection):
+            return
+        if not self.client.has_partition(collection, partition):
+            self.client.create_partition(collection, partition)
+        self._partitions[collection].add(partition)
+
+    def _forget_collection(self, collection: str) -> None:
+        """Drop the cached properties of a collection that is dropped or recreated."""
+        self._collection_search_params.pop(collection, None)
+        self._partition_layouts.pop(collection, None)
+        self._partitions.pop(collection, None)
+        self._vector_formats.pop(collection, None)
+
+    def _route_rows(self, collection: str, datas: List[dict]) -> Dict[str, List[dict]]:
+        """
+        Group rows by the partition they are inserted into.
+
+        In a sharded collection a row is replicated once per base it belongs to, rows
+        without a base are kept under NO_BASE_ID. The replica of the first base is marked
+        as the primary one.
+
+        Returns:
+            Rows by partition name, the empty name being the default partition
+        """
+        layout = self.get_partition_layout(collection)
+        routed: Dict[str, List[dict]] = {}
+        for data in datas:
+            if not layout:
+                routed.setdefault("", []).append(data)
+                continue
+            for i, base_id in enumerate(dict.fromkeys(data["base_ids"] or [NO_BASE_ID])):
+                replica = {**data, PRIMARY_REPLICA_FIELD: i == 0}
+                if layout == "partition_key":
+                    replica[PARTITION_KEY_FIELD] = int(base_id)
+                    routed.setdefault("", []).append(replica)
+                else:
+                    routed.setdefault(base_partition_name(base_id), []).append(replica)
+        return routed
 
     def init_collection(
         self,
@@ -42,6 +431,11 @@ class Milvus(BaseVectorDB):
         text_max_length: int = 65_535,
         reference_max_length: int = 2048,
         metric_type: str = "L2",
+        index_profile: Optional[str] = None,
+        index_params: Optional[dict] = None,
+        partition_layout: Optional[str] = None,
+        vector_dtype: Optional[str] = None,
+        vector_dim: Optional[int] = None,
         *args,
         **kwargs,
     ):
@@ -56,22 +450,46 @@ class Milvus(BaseVectorDB):
             text_max_length: Maximum length for text field
             reference_max_length: Maximum length for reference field
             metric_type: Distance metric type for vector similarity
+            index_profile: ANN index profile of the embedding field, see INDEX_PROFILES,
+                defaults to the profile the client was configured with
+            index_params: Build params overriding the defaults of the index profile
+            partition_layout: How rows are sharded by `base_ids`, see PARTITION_LAYOUTS,
+                defaults to the layout the client was configured with
+            vector_dtype: Element type of the stored vectors, see VECTOR_DTYPES, defaults to
+                the dtype the client was configured with
+            vector_dim: Number of leading dimensions stored, below `dim` only for Matryoshka
+                embedding models; defaults to the dimension the client was configured with
         """
         if not collection:
             collection = self.default_collection
         if description is None:
             description = ""
+        if partition_layout is None:
+            partition_layout = self.partition_layout
+        if partition_layout not in PARTITION_LAYOUTS:
+            raise ValueError(
+                f"Unsupported partition layout: {partition_layout}, choose from {PARTITION_LAYOUTS}"
+            )
+        vector_dtype = vector_dtype or self.vector_dtype
+        check_vector_dtype(vector_dtype)
+        stored_dim = min(vector_dim or self.vector_dim or dim, dim)
         try:
             has_collection = self.client.has_collection(collection, timeout=5)
             if force_new_collection and has_collection:
                 self.client.drop_collection(collection)
+                if self.get_lexical_index(collection) is not None:
+                    self.get_lexical_index(collection).clear()
+                self.filter_planner.invalidate(collection)
+                if self.get_full_vector_store(collection) is not None:
+                    self.get_full_vector_store(collection).clear()
+                self._forget_collection(collection)
             elif has_collection:
                 return
             schema = self.client.create_schema(
                 enable_dynamic_field=False, auto_id=True, description=description
             )
             schema.add_field("id", DataType.INT64, is_primary=True)
-            schema.add_field("embedding", DataType.FLOAT_VECTOR, dim=dim)
+            schema.add_field("embedding", VECTOR_FIELD_TYPES[vector_dtype], dim=stored_dim)
             schema.add_field("text", DataType.VARCHAR, max_length=text_max_length)
             schema.add_field("reference", DataType.VARCHAR, max_length=reference_max_length)
             schema.add_field("reference_id", DataType.INT64)
@@ -105,13 +523,30 @@ class Milvus(BaseVectorDB):
                 element_type=DataType.INT64,
                 max_capacity=100,
             )
-            schema.add_field("base_ids", DataType.ARRAY, element_type=DataType.INT64, max_capacity=100)
+            schema.add_field(
+                "base_ids", DataType.ARRAY, element_type=DataType.INT64, max_capacity=100
+            )
             schema.add_field("impact_factor", DataType.FLOAT)
             schema.add_field("rbase_factor", DataType.FLOAT)
             schema.add_field("pubdate", DataType.INT64)
             schema.add_field("metadata", DataType.JSON, nullable=True)
+            partition_options = {}
+            if partition_layout:
+                schema.add_field(PRIMARY_REPLICA_FIELD, DataType.BOOL)
+            if partition_layout == "partition_key":
+                schema.add_field(PARTITION_KEY_FIELD, DataType.INT64, is_partition_key=True)
+                partition_options["num_partitions"] = self.num_partitions
+            index_type, build_params, _ = resolve_index_profile(
+                index_profile or self.index_profile,
+                index_params if index_params is not None else self.index_params,
+            )
             index_params = self.client.prepare_index_params()
-            index_params.add_index(field_name="embedding", metric_type=metric_type)
+            index_params.add_index(
+                field_name="embedding",
+                index_type=index_type,
+                metric_type=metric_type,
+                params=build_params,
+            )
             index_params.add_index(field_name="keywords", index_type="", index_name="keywords_idx")
             index_params.add_index(field_name="authors", index_type="", index_name="authors_idx")
             index_params.add_index(
@@ -127,9 +562,7 @@ class Milvus(BaseVectorDB):
                 index_type="",
                 index_name="corresponding_author_ids_idx",
             )
-            index_params.add_index(
-                field_name="base_ids", index_type="", index_name="base_ids_idx"
-            )
+            index_params.add_index(field_name="base_ids", index_type="", index_name="base_ids_idx")
             index_params.add_index(
                 field_name="impact_factor", index_type="", index_name="impact_factor_idx"
             )
@@ -137,12 +570,24 @@ class Milvus(BaseVectorDB):
                 field_name="rbase_factor", index_type="", index_name="rbase_factor_idx"
             )
             index_params.add_index(field_name="pubdate", index_type="", index_name="pubdate_idx")
+            if partition_layout:
+                index_params.add_index(
+                    field_name=PRIMARY_REPLICA_FIELD,
+                    index_type="",
+                    index_name=f"{PRIMARY_REPLICA_FIELD}_idx",
+                )
             self.client.create_collection(
                 collection,
                 schema=schema,
                 index_params=index_params,
                 consistency_level="Strong",
+                **partition_options,
             )
+            if partition_layout == "partitions":
+                # Also marks the layout for detection before any row is inserted
+                self.client.create_partition(collection, base_partition_name(NO_BASE_ID))
+            self._forget_collection(collection)
+            self.invalidate_collection_infos()
             log.color_print(f"create collection [{collection}] successfully")
         except Exception as e:
             log.critical(f"fail to init db for milvus, error info: {e}")
@@ -158,6 +603,11 @@ class Milvus(BaseVectorDB):
         """
         Insert data into the vector database.
 
+        In a collection sharded by `base_ids` a chunk is inserted once per base it belongs to,
+        the returned ids include every replica. Embeddings are truncated and converted to the
+        vector format of the collection, their full precision copies go to the full vector
+        store when one is configured.
+
         Args:
             collection: Collection name
             chunks: List of data chunks to insert
@@ -185,6 +635,10 @@ class Milvus(BaseVectorDB):
         impact_factor_list = [chunk.metadata.get("impact_factor", 0) for chunk in chunks]
         rbase_factor_list = [chunk.metadata.get("rbase_factor", 0) for chunk in chunks]
         pubdate_list = [int(chunk.metadata.get("pubdate", 0)) for chunk in chunks]
+        metadata_list = [
+            {key: chunk.metadata[key] for key in STORED_METADATA_KEYS if key in chunk.metadata}
+            for chunk in chunks
+        ]
 
         datas = [
             {
@@ -201,8 +655,9 @@ class Milvus(BaseVectorDB):
                 "pubdate": pubdate,
                 "rbase_factor": rbase_factor,
                 "base_ids": base_ids,
+                "metadata": metadata,
             }
-            for embedding, text, reference, reference_id, keywords, authors, author_ids, corresponding_authors, corresponding_author_ids, impact_factor, pubdate, rbase_factor, base_ids in zip(
+            for embedding, text, reference, reference_id, keywords, authors, author_ids, corresponding_authors, corresponding_author_ids, impact_factor, pubdate, rbase_factor, base_ids, metadata in zip(
                 embeddings,
                 texts,
                 references_list,
@@ -216,22 +671,53 @@ class Milvus(BaseVectorDB):
                 pubdate_list,
                 rbase_factor_list,
                 base_ids_list,
+                metadata_list,
             )
         ]
-        batch_datas = [datas[i : i + batch_size] for i in range(0, len(datas), batch_size)]
-
         # Initialize result summary
         total_result = {"insert_count": 0, "ids": []}
+        lexical_index = self.get_lexical_index(collection)
+        vector_dtype, stored_dim = self.get_vector_format(collection)
+        full_vector_store = (
+            self.get_full_vector_store(collection)
+            if chunks and self._is_compressed(collection, embeddings[0])
+            else None
+        )
 
         try:
-            for batch_data in batch_datas:
-                res = self.client.insert(collection_name=collection, data=batch_data)
-                # Aggregate results
-                if res:
-                    total_result["insert_count"] += res.get("insert_count", 0)
-                    if "ids" in res:
-                        # Check and process IDs appropriately
-                        total_result["ids"].extend(list(res["ids"]))
+            for partition, rows in self._route_rows(collection, datas).items():
+                if partition:
+                    self._ensure_partition(collection, partition)
+                for i in range(0, len(rows), batch_size):
+                    batch_data = rows[i : i + batch_size]
+                    full_vectors = np.asarray(
+                        [data["embedding"] for data in batch_data], dtype=np.float32
+                    )
+                    stored_vectors = full_vectors
+                    if 0 < stored_dim < full_vectors.shape[1]:
+                        stored_vectors = truncate_vectors(full_vectors, stored_dim)
+                    res = self.client.insert(
+                        collection_name=collection,
+                        data=[
+                            {**data, "embedding": vector}
+                            for data, vector in zip(
+                                batch_data, encode_vectors(stored_vectors, vector_dtype)
+                            )
+                        ],
+                        partition_name=partition,
+                    )
+                    # Aggregate results
+                    if res:
+                        total_result["insert_count"] += res.get("insert_count", 0)
+                        if "ids" in res:
+                            # Check and process IDs appropriately
+                            total_result["ids"].extend(list(res["ids"]))
+                            if lexical_index is not None:
+                                lexical_index.add(
+                                    list(res["ids"]), [data["text"] for data in batch_data]
+                                )
+                            if full_vector_store is not None:
+                                full_vector_store.add(list(res["ids"]), full_vectors)
             # Return aggregated results
             return total_result
         except Exception as e:
@@ -244,51 +730,344 @@ class Milvus(BaseVectorDB):
         vector: Union[np.array, List[float]],
         top_k: int = 5,
         filter: Optional[str] = "",
+        query_text: Optional[str] = None,
+        plan_filter: bool = False,
+        brute_force: Optional[bool] = None,
+        search_params: Optional[dict] = None,
         *args,
         **kwargs,
     ) -> List[RetrievalResult]:
         """
         Search for most similar vectors in the database.
 
+        When the collection has a lexical index and `query_text` is given, the BM25 search
+        runs concurrently with the vector search and both rankings are fused by reciprocal
+        rank. Results keep their vector distance as score and are returned in fused order.
+
+        In a collection sharded by `base_ids`, a filter requiring some bases (e.g.
+        `ARRAY_CONTAINS(base_ids, 3)`) only searches their partitions, and replicas of a row
+        that belongs to several searched bases are returned once. Without such a filter only
+        the primary replicas are searched.
+
         Args:
             collection: Collection name
             vector: Query vector
             top_k: Number of most similar results to return
             filter: Query filter expression in Milvus syntax
+            query_text: Query text for the lexical leg of hybrid retrieval
+            plan_filter: Normalize the filter to indexed fields and scan the filtered rows
+                exactly when the planner estimates that few rows pass it
+            brute_force: Force (True) or forbid (False) the exact scan of the filtered rows.
+                By default the planner chooses, and rescans a filtered ANN search that
+                returns fewer than top_k rows; without `plan_filter` the scan is forbidden
+            search_params: Per-query ANN search params such as {"ef": 128} for HNSW or
+                {"nprobe": 32} for IVF indexes, overriding the collection defaults
 
         Returns:
             List of RetrievalResult objects containing search results
         """
         if not collection:
             collection = self.default_collection
+        if plan_filter and filter:
+            plan = self.filter_planner.plan(collection, filter)
+            log.debug(f"filter plan for collection '{collection}': {plan}")
+            filter = plan.filter
+            if brute_force is None and plan.strategy == "brute_force":
+                brute_force = True
+            # Otherwise left as None, so that short filtered ANN results are rescanned
+        elif brute_force is None:
+            # The exact rescan of short filtered results is part of the planner
+            brute_force = False
+
+        layout = self.get_partition_layout(collection)
+        if not layout:
+            return self._search(
+                collection, vector, top_k, filter, query_text, brute_force, search_params
+            )
+        # Prune the search to the bases the filter requires, a row then matches once per base
+        partition_names = None
+        base_ids = required_array_values(filter, "base_ids")
+        if base_ids is None:
+            primary = f"{PRIMARY_REPLICA_FIELD} == true"
+            filter = f"{primary} and ({filter})" if filter else primary
+        elif layout == "partition_key":
+            filter = f"{PARTITION_KEY_FIELD} in {sorted(set(base_ids))} and ({filter})"
+        else:
+            names = [base_partition_name(base_id) for base_id in dict.fromkeys(base_ids)]
+            if not set(names) <= self._list_partitions(collection):
+                self._list_partitions(collection, refresh=True)
+            partition_names = [name for name in names if name in self._list_partitions(collection)]
+            if not partition_names:
+                return []
+        if base_ids is None or len(set(base_ids)) == 1:
+            return self._search(
+                collection,
+                vector,
+                top_k,
+                filter,
+                query_text,
+                brute_force,
+                search_params,
+                partition_names,
+            )
+
+        # A row has at most one replica per searched base
+        results = self._search(
+            collection,
+            vector,
+            top_k * len(set(base_ids)),
+            filter,
+            query_text,
+            brute_force,
+            search_params,
+            partition_names,
+        )
+        unique_results, seen = [], set()
+        for result in results:
+            key = (result.metadata["reference_id"], result.text)
+            if key not in seen:
+                seen.add(key)
+                unique_results.append(result)
+        return unique_results[:top_k]
+
+    def _search(
+        self,
+        collection: str,
+        vector: Union[np.array, List[float]],
+        top_k: int,
+        filter: Optional[str],
+        query_text: Optional[str],
+        brute_force: Optional[bool],
+        search_params: Optional[dict],
+        partition_names: Optional[List[str]] = None,
+    ) -> List[RetrievalResult]:
+        lexical_index = self.get_lexical_index(collection) if query_text else None
+        if lexical_index is None:
+            return self._dense_search(
+                collection, vector, top_k, filter, brute_force, search_params, partition_names
+            )
+
+        if self._lexical_pool is None:
+            self._lexical_pool = ThreadPoolExecutor(thread_name_prefix="lexical_search")
+        lexical_future = self._lexical_pool.submit(
+            lexical_index.search, query_text, top_k * LEXICAL_CANDIDATE_FACTOR
+        )
+        vector_results = self._dense_search(
+            collection, vector, top_k, filter, brute_force, search_params, partition_names
+        )
+        try:
+            lexical_hits = lexical_future.result(timeout=10)
+            lexical_results = self._get_by_ids(
+                collection,
+                [doc_id for doc_id, _ in lexical_hits],
+                vector,
+                filter,
+                partition_names,
+            )
+        except Exception as e:
+            log.warning(f"fail to search lexical index, error info: {e}")
+            return vector_results
+        if self._is_compressed(collection, vector):
+            lexical_results = self._rescore(collection, vector, lexical_results, reorder=False)
+        if not filter and not partition_names:
+            # Rows deleted outside of delete_data are pruned from the lexical index lazily
+            found = {result.metadata["id"] for result in lexical_results}
+            stale = [doc_id for doc_id, _ in lexical_hits if doc_id not in found]
+            if stale:
+                lexical_index.delete(stale)
+
+        results_by_id = {result.metadata["id"]: result for result in lexical_results}
+        results_by_id.update({result.metadata["id"]: result for result in vector_results})
+        fused = reciprocal_rank_fusion(
+            [
+                [result.metadata["id"] for result in vector_results],
+                [result.metadata["id"] for result in lexical_results][:top_k],
+            ],
+            k=self.rrf_k,
+        )
+        hybrid_results = []
+        for doc_id, rrf_score in fused[:top_k]:
+            result = results_by_id[doc_id]
+            result.metadata["rrf_score"] = rrf_score
+            hybrid_results.append(result)
+        return hybrid_results
+
+    @staticmethod
+    def _to_retrieval_result(
+        entity: dict, score: float, vector_dtype: str = "float32"
+    ) -> RetrievalResult:
+        embedding = entity["embedding"]
+        if vector_dtype != "float32":
+            embedding = decode_vector(embedding, vector_dtype).tolist()
+        return RetrievalResult(
+            embedding=embedding,
+            text=entity["text"],
+            reference=entity["reference"],
+            score=score,
+            metadata={
+                **(entity.get("metadata") or {}),
+                "id": entity["id"],
+                "reference_id": entity["reference_id"],
+                "pubdate": entity["pubdate"],
+                "impact_factor": entity["impact_factor"],
+            },
+        )
+
+    def _dense_search(
+        self,
+        collection: str,
+        vector: Union[np.array, List[float]],
+        top_k: int,
+        filter: Optional[str],
+        brute_force: Optional[bool],
+        search_params: Optional[dict] = None,
+        partition_names: Optional[List[str]] = None,
+    ) -> List[RetrievalResult]:
+        """
+        Run the filtered ANN search or the exact scan, whichever the plan chose.
+
+        On a compressed collection with a full vector store, `rescore_factor` times more
+        candidates are fetched and re-ranked by their full precision distance.
+        """
+        rescore = (
+            self._is_compressed(collection, vector)
+            and self.get_full_vector_store(collection) is not None
+        )
+        fetch_k = top_k * self.rescore_factor if rescore else top_k
+        results = None
+        if filter and brute_force:
+            results = self._brute_force_search(collection, vector, fetch_k, filter, partition_names)
+        if results is None:
+            results = self._vector_search(
+                collection, vector, fetch_k, filter, search_params, partition_names
+            )
+            if filter and brute_force is None and len(results) < fetch_k:
+                # Filtered ANN search may miss rows under a selective filter
+                results = (
+                    self._brute_force_search(collection, vector, fetch_k, filter, partition_names)
+                    or results
+                )
+        if rescore:
+            results = self._rescore(collection, vector, results)[:top_k]
+        return results
+
+    def _brute_force_search(
+        self,
+        collection: str,
+        vector: Union[np.array, List[float]],
+        top_k: int,
+        filter: str,
+        partition_names: Optional[List[str]] = None,
+    ) -> Optional[List[RetrievalResult]]:
+        """
+        Prefetch the ids and vectors of the filtered rows and rank them exactly.
+
+        Returns:
+            The results, or None when more rows than `brute_force_max_rows` pass the filter
+        """
+        max_rows = self.filter_planner.brute_force_max_rows
+        ids, embeddings = [], []
+        try:
+            iterator = self.client.query_iterator(
+                collection_name=collection,
+                batch_size=min(max_rows + 1, 4096),
+                filter=filter,
+                output_fields=["id", "embedding"],
+                partition_names=partition_names,
+            )
+            try:
+                while True:
+                    rows = iterator.next()
+                    if not rows:
+                        break
+                    ids.extend(row["id"] for row in rows)
+                    embeddings.extend(row["embedding"] for row in rows)
+                    if len(ids) > max_rows:
+                        return None
+            finally:
+                iterator.close()
+            if not ids:
+                return []
+            vector_dtype, _ = self.get_vector_format(collection)
+            matrix = np.stack([decode_vector(embedding, vector_dtype) for embedding in embeddings])
+            query_vector = self._stored_query(collection, vector)
+            distances = np.sum((matrix - query_vector) ** 2, axis=1)
+            k = min(top_k, len(ids))
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest])]
+            return self._get_by_ids(
+                collection, [ids[i] for i in nearest], vector, "", partition_names
+            )
+        except Exception as e:
+            log.warning(f"fail to scan filtered rows, fall back to ANN search, error info: {e}")
+            return None
+
+    def get_search_params(self, collection: str) -> dict:
+        """
+        Get the default search params of a collection.
+
+        The configured `search_params` take precedence, otherwise the defaults of the index
+        profile the collection was built with are used.
+        """
+        if self.search_params is not None:
+            return dict(self.search_params)
+        if collection not in self._collection_search_params:
+            search_params = {}
+            try:
+                index = self.client.describe_index(collection, index_name="embedding")
+                index_type = (index or {}).get("index_type", "AUTOINDEX")
+                if index_type.upper() in INDEX_PROFILES:
+                    search_params = resolve_index_profile(index_type)[2]
+            except Exception as e:
+                log.warning(f"fail to describe the index of '{collection}', error info: {e}")
+            self._collection_search_params[collection] = search_params
+        return dict(self._collection_search_params[collection])
+
+    def _sample_field(self, collection: str, field: str, sample_size: int) -> List:
+        """Sample the values of a field from rows spread over the whole collection."""
+        stride = max(1, self._count_rows(collection) // sample_size)
+        rows = self.client.query(
+            collection_name=collection,
+            filter=f"id % {stride} == 0" if stride > 1 else "",
+            output_fields=[field],
+            limit=min(sample_size, 16_384),
+        )
+        return [row[field] for row in rows]
+
+    def _count_rows(self, collection: str) -> int:
+        return int(self.client.get_collection_stats(collection).get("row_count", 0))
+
+    def _vector_search(
+        self,
+        collection: str,
+        vector: Union[np.array, List[float]],
+        top_k: int,
+        filter: Optional[str],
+        search_params: Optional[dict] = None,
+        partition_names: Optional[List[str]] = None,
+    ) -> List[RetrievalResult]:
+        if search_params is None:
+            search_params = self.get_search_params(collection)
+        # HNSW and DiskANN reject candidate lists shorter than the number of results
+        for key in ("ef", "search_list"):
+            if key in search_params and search_params[key] < top_k:
+                search_params = {**search_params, key: top_k}
+        vector_dtype, _ = self.get_vector_format(collection)
         try:
             search_results = self.client.search(
                 collection_name=collection,
-                data=[vector],
+                data=[encode_query(self._stored_query(collection, vector), vector_dtype)],
                 limit=top_k,
                 filter=filter,
-                output_fields=[
-                    "embedding",
-                    "text",
-                    "reference",
-                    "reference_id",
-                    "pubdate",
-                    "impact_factor",
-                ],
+                output_fields=SEARCH_OUTPUT_FIELDS,
+                search_params={"params": search_params},
+                partition_names=partition_names,
                 timeout=10,
             )
 
             return [
-                RetrievalResult(
-                    embedding=b["entity"]["embedding"],
-                    text=b["entity"]["text"],
-                    reference=b["entity"]["reference"],
-                    score=b["distance"],
-                    metadata={
-                        "reference_id": b["entity"]["reference_id"],
-                        "pubdate": b["entity"]["pubdate"],
-                        "impact_factor": b["entity"]["impact_factor"],
-                    },
+                self._to_retrieval_result(
+                    {**b["entity"], "id": b["id"]}, b["distance"], vector_dtype
                 )
                 for a in search_results
                 for b in a
@@ -297,6 +1076,40 @@ class Milvus(BaseVectorDB):
             log.critical(f"fail to search data, error info: {e}")
             return []
 
+    def _get_by_ids(
+        self,
+        collection: str,
+        ids: List[int],
+        vector: Union[np.array, List[float]],
+        filter: Optional[str],
+        partition_names: Optional[List[str]] = None,
+    ) -> List[RetrievalResult]:
+        """Fetch rows by id in the given order, scored by their squared L2 distance to the vector."""
+        if not ids:
+            return []
+        expr = f"id in {list(ids)}"
+        if filter:
+            expr = f"({expr}) and ({filter})"
+        rows = self.client.query(
+            collection_name=collection,
+            filter=expr,
+            output_fields=["id"] + SEARCH_OUTPUT_FIELDS,
+            partition_names=partition_names,
+            timeout=10,
+        )
+        rows_by_id = {row["id"]: row for row in rows}
+        vector_dtype, _ = self.get_vector_format(collection)
+        query_vector = self._stored_query(collection, vector)
+        results = []
+        for doc_id in ids:
+            row = rows_by_id.get(doc_id)
+            if row is None:
+                continue
+            embedding = decode_vector(row["embedding"], vector_dtype)
+            distance = float(np.sum((embedding - query_vector) ** 2))
+            results.append(self._to_retrieval_result(row, distance, vector_dtype))
+        return results
+
     def list_collections(self, *args, **kwargs) -> List[CollectionInfo]:
         """
         List all collections in the database.
@@ -330,10 +1143,24 @@ class Milvus(BaseVectorDB):
             collection = self.default_collection
         try:
             self.client.drop_collection(collection)
+            if self.get_lexical_index(collection) is not None:
+                self.get_lexical_index(collection).clear()
+            if self.get_full_vector_store(collection) is not None:
+                self.get_full_vector_store(collection).clear()
+            self._forget_collection(collection)
         except Exception as e:
             log.warning(f"fail to clear db, error info: {e}")
+        finally:
+            self.invalidate_collection_infos()
 
-    def delete_data(self, collection: str, ids: Optional[List[int]] = None, filter: Optional[str] = None, *args, **kwargs) -> int:
+    def delete_data(
+        self,
+        collection: str,
+        ids: Optional[List[int]] = None,
+        filter: Optional[str] = None,
+        *args,
+        **kwargs,
+    ) -> int:
         """
         Delete data from the specified collection based on the filter.
 
@@ -350,17 +1177,24 @@ class Milvus(BaseVectorDB):
             return 0
 
         try:
+            lexical_index = self.get_lexical_index(collection)
+            deleted_ids = ids
+            if filter and lexical_index is not None:
+                # Rows matched by a filter are looked up first to prune them from the index
+                deleted_ids = self._query_ids(collection, filter, ids)
             if ids:
                 rt = self.client.delete(collection_name=collection, filter=filter, ids=ids)
             else:
                 rt = self.client.delete(collection_name=collection, filter=filter)
+            if lexical_index is not None and deleted_ids:
+                lexical_index.delete(deleted_ids)
             return rt.get("delete_count", 0)
         except Exception as e:
             log.critical(f"fail to delete data, error info: {e}")
-    
+
     def flush(self, collection_name: str, **kwargs):
         timeout = kwargs.get("timeout", None)
         self.client.flush(collection_name, timeout)
-        
+
     def close(self):
-        self.client.close()
\ No newline at end of file
+        self.client.close()
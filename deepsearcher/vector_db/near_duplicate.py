@@ -0,0 +1,205 @@
+"""
+Near-duplicate detection for text chunks.
+
+Chunks are fingerprinted with a 64-bit SimHash over word shingles. Two chunks whose
+fingerprints differ in at most `max_distance` bits are treated as near-duplicates.
+Candidates are found with banded LSH: the fingerprint is cut into `max_distance + 1`
+bands, and by the pigeonhole principle two near-duplicates share at least one band.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+FINGERPRINT_BITS = 64
+# A 2% token edit of a 250-token chunk typically moves 3-11 bits, unrelated chunks
+# differ in about 32 bits
+DEFAULT_MAX_DISTANCE = 6
+TOKEN_PATTERN = re.compile(r"[一-鿿]|[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """
+    Compute the 64-bit SimHash fingerprint of a text.
+
+    Args:
+        text: Text to fingerprint
+        shingle_size: Number of consecutive tokens in a shingle
+
+    Returns:
+        Fingerprint as an unsigned integer
+    """
+    tokens = _tokens(text)
+    if len(tokens) >= shingle_size:
+        shingles = Counter(
+            " ".join(tokens[i : i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)
+        )
+    else:
+        shingles = Counter([" ".join(tokens)])
+    digests = b"".join(
+        hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest() for shingle in shingles
+    )
+    # One row of 64 bits per shingle, bit 0 being the least significant bit of the hash
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+    bits = bits[:, ::-1]
+    counts = np.fromiter(shingles.values(), dtype=np.int64, count=len(shingles))
+    weights = counts @ (2 * bits.astype(np.int64) - 1)
+    return int(np.packbits((weights > 0)[::-1]).view(">u8")[0])
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    In-memory SimHash index with optional JSON persistence.
+
+    Entries are identified by a key and belong to a group (typically the article or file
+    the chunk came from), so that all fingerprints of a re-ingested article can be
+    discarded at once.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, path: Optional[str] = None):
+        """
+        Initialize the index.
+
+        Args:
+            max_distance: Maximum Hamming distance between near-duplicate fingerprints
+            path: JSON file the index is loaded from and saved to
+        """
+        self.max_distance = max_distance
+        self.path = path
+        self.num_bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.num_bands
+        self.fingerprints: Dict[str, int] = {}
+        self.groups: Dict[str, List[str]] = defaultdict(list)
+        self.bands: Dict[Tuple[int, int], List[str]] = defaultdict(list)
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def _band_values(self, fingerprint: int) -> Iterable[Tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.num_bands):
+            yield band, fingerprint >> (band * self.band_bits) & mask
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """Return the key of an indexed near-duplicate of the fingerprint, if any."""
+        for band_value in self._band_values(fingerprint):
+            for key in self.bands.get(band_value, []):
+                if hamming_distance(self.fingerprints[key], fingerprint) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key: str, fingerprint: int, group: str = "") -> None:
+        if key in self.fingerprints:
+            return
+        self.fingerprints[key] = fingerprint
+        self.groups[group].append(key)
+        for band_value in self._band_values(fingerprint):
+            self.bands[band_value].append(key)
+
+    def discard_group(self, group: str) -> int:
+        """Remove every fingerprint of a group and return how many were removed."""
+        keys = self.groups.pop(group, [])
+        for key in keys:
+            fingerprint = self.fingerprints.pop(key)
+            for band_value in self._band_values(fingerprint):
+                self.bands[band_value].remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self.fingerprints.clear()
+        self.groups.clear()
+        self.bands.clear()
+
+    def save(self, path: Optional[str] = None) -> None:
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {
+            "max_distance": self.max_distance,
+            "groups": {
+                group: [[key, self.fingerprints[key]] for key in keys]
+                for group, keys in self.groups.items()
+            },
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def _load(self, path: str) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for group, entries in data.get("groups", {}).items():
+            for key, fingerprint in entries:
+                self.add(key, fingerprint, group)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+
+_collection_indexes: Dict[str, NearDuplicateIndex] = {}
+
+
+def get_collection_index(
+    collection: str, index_dir: str, max_distance: int = DEFAULT_MAX_DISTANCE
+) -> NearDuplicateIndex:
+    """
+    Get the persistent near-duplicate index of a collection, loading it once per process.
+
+    Args:
+        collection: Vector database collection name
+        index_dir: Directory holding one `<collection>.json` index per collection
+        max_distance: Maximum Hamming distance between near-duplicate fingerprints
+    """
+    path = os.path.join(index_dir, f"{collection}.json")
+    if path not in _collection_indexes:
+        _collection_indexes[path] = NearDuplicateIndex(max_distance=max_distance, path=path)
+    return _collection_indexes[path]
+
+
+def filter_near_duplicate_chunks(
+    chunks: List, index: NearDuplicateIndex, mode: str = "skip"
+) -> List:
+    """
+    Check chunks against a near-duplicate index before they are embedded and inserted.
+
+    Every chunk that is kept is added to the index. The group of a chunk is its
+    `article_id` metadata, falling back to its reference.
+
+    Args:
+        chunks: Chunks produced by a splitter
+        index: Index of the chunks already stored in the collection
+        mode: "skip" drops near-duplicates, "tag" keeps them and records the key of the
+            original chunk as `near_duplicate_of` in their metadata
+
+    Returns:
+        The chunks to embed and insert
+    """
+    if mode not in ("skip", "tag"):
+        raise ValueError(f"Unsupported near duplicate mode: {mode}")
+    kept = []
+    ordinals: Dict[str, int] = defaultdict(int)
+    for chunk in chunks:
+        group = str(chunk.metadata.get("article_id") or chunk.reference)
+        key = f"{group}#{ordinals[group]}"
+        ordinals[group] += 1
+        fingerprint = simhash(chunk.text)
+        original = index.find(fingerprint)
+        if original is not None:
+            if mode == "skip":
+                continue
+            chunk.metadata["near_duplicate_of"] = original
+        index.add(key, fingerprint, group)
+        kept.append(chunk)
+    return kept
@@ -23,17 +23,43 @@ class OracleDB(BaseVectorDB):
         wallet_location: str,
         wallet_password: str,
         min: int = 1,
-        max: int = 10,
+        max: int = 16,
         increment: int = 1,
         default_collection: str = "deepsearcher",
+        catalog_ttl: float = 300.0,
+        insert_batch_size: int = 500,
+        pool_timeout: float = 10.0,
+        stmtcachesize: int = 50,
     ):
-        super().__init__(default_collection)
+        """
+        Initialize the session pool.
+
+        Args:
+            user: Database user
+            password: Database password
+            dsn: Data source name
+            config_dir: Directory of tnsnames.ora
+            wallet_location: Directory of the wallet
+            wallet_password: Password of the wallet
+            min: Number of sessions opened up front
+            max: Maximum number of sessions, at least the number of concurrent searches,
+                e.g. the workers of the retrieval executor times the concurrent requests
+            increment: Sessions opened at once when the pool grows
+            default_collection: Name of the default collection
+            catalog_ttl: Seconds the cached collection catalog stays valid
+            insert_batch_size: Rows bound per `executemany` call and commit on insert
+            pool_timeout: Seconds to wait for a free session before failing
+            stmtcachesize: Statements cached per session, so repeated searches skip parsing
+        """
+        super().__init__(default_collection, catalog_ttl=catalog_ttl)
         self.default_collection = default_collection
+        self.insert_batch_size = insert_batch_size
 
         import oracledb
 
         oracledb.defaults.fetch_lobs = False
         self.DB_TYPE_VECTOR = oracledb.DB_TYPE_VECTOR
+        self.DB_TYPE_LONG = oracledb.DB_TYPE_LONG
 
         try:
             self.client = oracledb.create_pool(
@@ -46,6 +72,10 @@ class OracleDB(BaseVectorDB):
                 min=min,
                 max=max,
                 increment=increment,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=int(pool_timeout * 1000),
+                stmtcachesize=stmtcachesize,
+                session_callback=self._init_session,
             )
             log.color_print(f"Connected to Oracle database at {dsn}")
             self.check_table()
@@ -54,6 +84,11 @@ class OracleDB(BaseVectorDB):
             log.critical(f"Oracle database error in init: {e}")
             raise
 
+    def _init_session(self, connection, requested_tag):
+        """Install the vector type handlers once per pooled session."""
+        connection.inputtypehandler = self.input_type_handler
+        connection.outputtypehandler = self.output_type_handler
+
     def numpy_converter_in(self, value):
         """Convert numpy array to array.array"""
         if value.dtype == np.float64:
@@ -92,10 +127,13 @@ class OracleDB(BaseVectorDB):
                 outconverter=self.numpy_converter_out,
             )
 
+    @staticmethod
+    def _fetch_dicts(cursor) -> List[dict]:
+        columns = [column[0].lower() for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
     def query(self, sql: str, params: dict = None) -> Union[dict, None]:
         with self.client.acquire() as connection:
-            connection.inputtypehandler = self.input_type_handler
-            connection.outputtypehandler = self.output_type_handler
             with connection.cursor() as cursor:
                 try:
                     if log.dev_mode:
@@ -107,12 +145,7 @@ class OracleDB(BaseVectorDB):
                 except Exception as e:
                     log.critical(f"Oracle database error in query: {e}")
                     raise
-                columns = [column[0].lower() for column in cursor.description]
-                rows = cursor.fetchall()
-                if rows:
-                    data = [dict(zip(columns, row)) for row in rows]
-                else:
-                    data = []
+                data = self._fetch_dicts(cursor)
                 if log.dev_mode:
                     print("data:\n", data)
                 return data
@@ -121,8 +154,6 @@ class OracleDB(BaseVectorDB):
     def execute(self, sql: str, data: Union[list, dict] = None):
         try:
             with self.client.acquire() as connection:
-                connection.inputtypehandler = self.input_type_handler
-                connection.outputtypehandler = self.output_type_handler
                 with connection.cursor() as cursor:
                     # print("sql:\n",sql)
                     # print("data:\n",data)
@@ -134,7 +165,42 @@ class OracleDB(BaseVectorDB):
         except Exception as e:
             log.critical(f"Oracle database error in execute: {e}")
             log.error("ERROR sql:\n" + sql)
-            log.error("ERROR data:\n" + data)
+            log.error(f"ERROR data:\n{data}")
+            raise
+
+    def execute_many(self, sql: str, rows: List[dict], batch_size: Optional[int] = None) -> int:
+        """
+        Execute a statement for many rows with array binding.
+
+        Args:
+            sql: Statement with named binds
+            rows: Bind values, one dict per row
+            batch_size: Rows bound per round trip and commit, defaults to `insert_batch_size`
+
+        Returns:
+            Number of rows the statement affected, summed over the batches
+        """
+        batch_size = batch_size or self.insert_batch_size
+        affected = 0
+        try:
+            with self.client.acquire() as connection:
+                with connection.cursor() as cursor:
+                    # Texts can exceed the default string bind size of the first batch
+                    long_binds = {
+                        key: self.DB_TYPE_LONG
+                        for key in ("text", "metadata")
+                        if rows and key in rows[0]
+                    }
+                    for i in range(0, len(rows), batch_size):
+                        if long_binds:
+                            cursor.setinputsizes(**long_binds)
+                        cursor.executemany(sql, rows[i : i + batch_size])
+                        affected += cursor.rowcount
+                        connection.commit()
+            return affected
+        except Exception as e:
+            log.critical(f"Oracle database error in execute_many: {e}")
+            log.error("ERROR sql:\n" + sql)
             raise
 
     def has_collection(self, collection: str = "deepsearcher"):
@@ -183,6 +249,12 @@ class OracleDB(BaseVectorDB):
             log.critical(f"fail to drop collection, error info: {e}")
             raise
 
+    def insertmany(self, datas: List[dict], batch_size: Optional[int] = None) -> int:
+        SQL = SQL_TEMPLATES["insert"]
+        count = self.execute_many(SQL, datas, batch_size)
+        log.debug(f"insert {count} rows done!")
+        return count
+
     def insertone(self, data):
         SQL = SQL_TEMPLATES["insert"]
         self.execute(SQL, data)
@@ -193,20 +265,8 @@ class OracleDB(BaseVectorDB):
     ):
         log.debug("def searchone:" + collection)
         try:
-            if isinstance(vector, List):
-                vector = np.array(vector)
-            embedding_string = "[" + ", ".join(map(str, vector.tolist())) + "]"
-            dimension = vector.shape[0]
-            dtype = str(vector.dtype).upper()
-
-            SQL = SQL_TEMPLATES["search"].format(dimension=dimension, dtype=dtype)
-            max_distance = 0.8
-            params = {
-                "collection": collection,
-                "embedding_string": embedding_string,
-                "top_k": top_k,
-                "max_distance": max_distance,
-            }
+            SQL = SQL_TEMPLATES["search"]
+            params = self._search_params(collection, vector, top_k)
             res = self.query(SQL, params)
             if res:
                 return res
@@ -216,6 +276,16 @@ class OracleDB(BaseVectorDB):
             log.critical(f"fail to search data, error info: {e}")
             raise
 
+    @staticmethod
+    def _search_params(collection: str, vector: Union[np.array, List[float]], top_k: int) -> dict:
+        # The numpy array is bound as a native VECTOR by the input type handler
+        return {
+            "collection": collection,
+            "embedding": np.asarray(vector, dtype=np.float32),
+            "top_k": top_k,
+            "max_distance": SEARCH_MAX_DISTANCE,
+        }
+
     def init_collection(
         self,
         dim: int,
@@ -242,6 +312,7 @@ class OracleDB(BaseVectorDB):
             SQL = SQL_TEMPLATES["insert_collection"]
             params = {"collection": collection, "description": description}
             self.execute(SQL, params)
+            self.invalidate_collection_infos()
         except Exception as e:
             log.critical(f"fail to init_collection for oracle, error info: {e}")
 
@@ -249,7 +320,7 @@ class OracleDB(BaseVectorDB):
         self,
         collection: Optional[str],
         chunks: List[Chunk],
-        batch_size: int = 256,
+        batch_size: Optional[int] = None,
         *args,
         **kwargs,
     ):
@@ -259,7 +330,7 @@ class OracleDB(BaseVectorDB):
         datas = []
         for chunk in chunks:
             _data = {
-                "embedding": self.numpy_converter_in(np.array(chunk.embedding)),
+                "embedding": np.asarray(chunk.embedding, dtype=np.float32),
                 "text": chunk.text,
                 "reference": chunk.reference,
                 "metadata": json.dumps(chunk.metadata),
@@ -267,11 +338,8 @@ class OracleDB(BaseVectorDB):
             }
             datas.append(_data)
 
-        batch_datas = [datas[i : i + batch_size] for i in range(0, len(datas), batch_size)]
         try:
-            for batch_data in batch_datas:
-                for _data in batch_data:
-                    self.insertone(data=_data)
+            self.insertmany(datas, batch_size=batch_size)
             log.color_print(f"Successfully insert {len(datas)} data")
         except Exception as e:
             log.critical(f"fail to insert data, error info: {e}")
@@ -293,21 +361,57 @@ class OracleDB(BaseVectorDB):
             search_results = self.searchone(collection=collection, vector=vector, top_k=top_k)
             # print("def search_data: search_results",search_results)
 
-            return [
-                RetrievalResult(
-                    embedding=b["embedding"],
-                    text=b["text"],
-                    reference=b["reference"],
-                    score=b["distance"],
-                    metadata=json.loads(b["metadata"]),
-                )
-                for b in search_results
-            ]
+            return self._to_retrieval_results(search_results)
         except Exception as e:
             log.critical(f"fail to search data, error info: {e}")
             raise
             # return []
 
+    def search_data_batch(
+        self,
+        collection: Optional[str],
+        vectors: List[Union[np.array, List[float]]],
+        top_k: int = 5,
+        *args,
+        **kwargs,
+    ) -> List[List[RetrievalResult]]:
+        """
+        Search several query vectors on one pooled session.
+
+        The search statement is parsed once and re-executed from the statement cache, which
+        saves a session acquisition and a parse per query.
+
+        Returns:
+            One result list per query vector, in the order of the vectors
+        """
+        if not collection:
+            collection = self.default_collection
+        SQL = SQL_TEMPLATES["search"]
+        try:
+            results = []
+            with self.client.acquire() as connection:
+                with connection.cursor() as cursor:
+                    for vector in vectors:
+                        cursor.execute(SQL, self._search_params(collection, vector, top_k))
+                        results.append(self._to_retrieval_results(self._fetch_dicts(cursor)))
+            return results
+        except Exception as e:
+            log.critical(f"fail to search data, error info: {e}")
+            raise
+
+    @staticmethod
+    def _to_retrieval_results(rows: List[dict]) -> List[RetrievalResult]:
+        return [
+            RetrievalResult(
+                embedding=b["embedding"],
+                text=b["text"],
+                reference=b["reference"],
+                score=b["distance"],
+                metadata=json.loads(b["metadata"]),
+            )
+            for b in rows
+        ]
+
     def list_collections(self, *args, **kwargs) -> List[CollectionInfo]:
         collection_infos = []
         try:
@@ -335,6 +439,44 @@ class OracleDB(BaseVectorDB):
         except Exception as e:
             log.warning(f"fail to clear db, error info: {e}")
             raise
+        finally:
+            self.invalidate_collection_infos()
+
+    def delete_data(
+        self,
+        collection: str,
+        ids: Optional[List[int]] = None,
+        filter: Optional[str] = None,
+        *args,
+        **kwargs,
+    ) -> int:
+        """
+        Mark rows of a collection as deleted.
+
+        Args:
+            collection: Collection name
+            ids: Row ids to delete
+            filter: Not supported by this backend
+
+        Returns:
+            Number of deleted rows
+        """
+        if filter:
+            log.warning("filter expressions are not supported by OracleDB, skip delete")
+            return 0
+        if not ids:
+            log.warning("no ids provided, skip delete")
+            return 0
+        collection = collection or self.default_collection
+        rows = [{"collection": collection, "id": doc_id} for doc_id in ids]
+        return self.execute_many(SQL_TEMPLATES["delete_item"], rows)
+
+    def flush(self, collection_name: str, **kwargs):
+        # Every write is committed before it returns
+        pass
+
+    def close(self):
+        self.client.close()
 
 
 TABLES = {
@@ -357,6 +499,9 @@ TABLES = {
         updatetime TIMESTAMP DEFAULT NULL)""",
 }
 
+# Cosine distance above which rows are not returned by a search
+SEARCH_MAX_DISTANCE = 0.8
+
 SQL_TEMPLATES = {
     "has_table": f"""SELECT table_name FROM all_tables 
         WHERE table_name in ({",".join([f"'{k}'" for k in TABLES.keys()])})""",
@@ -368,9 +513,10 @@ SQL_TEMPLATES = {
         values (:collection,:description)""",
     "insert": """INSERT INTO DEEPSEARCHER_COLLECTION_ITEM (collection,embedding,text,reference,metadata) 
         values (:collection,:embedding,:text,:reference,:metadata)""",
+    "delete_item": "update DEEPSEARCHER_COLLECTION_ITEM set status=0 where collection=:collection and id=:id and status=1",
     "search": """SELECT * FROM 
         (SELECT t.*,
-            VECTOR_DISTANCE(t.embedding,vector(:embedding_string,{dimension},{dtype}),COSINE) as distance
+            VECTOR_DISTANCE(t.embedding,:embedding,COSINE) as distance
         FROM DEEPSEARCHER_COLLECTION_ITEM t 
         JOIN DEEPSEARCHER_COLLECTION_INFO c ON t.collection=c.collection 
         WHERE t.collection=:collection AND t.status=1 AND c.status=1)
@@ -0,0 +1,229 @@
+"""
+Compressed storage of embeddings.
+
+Large collections are memory bound on the vector database nodes. Embeddings can be
+stored as float16 or bfloat16 vectors and, for Matryoshka embedding models such as the
+OpenAI text-embedding-3 models, truncated to a prefix of their dimensions. The full
+precision vectors can be kept in a local side store, from which the candidates of a
+compressed search are re-scored exactly.
+"""
+
+import json
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+VECTOR_DTYPES = ("float32", "float16", "bfloat16")
+BYTES_PER_ELEMENT = {"float32": 4, "float16": 2, "bfloat16": 2}
+
+
+def check_vector_dtype(dtype: str) -> None:
+    """
+    Raise a ValueError if vectors of `dtype` cannot be stored and searched here.
+
+    Searching a bfloat16 field takes a query of the `ml_dtypes` bfloat16 numpy type, so the
+    dtype is only accepted when that package is installed.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}, choose from {VECTOR_DTYPES}")
+    if dtype == "bfloat16":
+        try:
+            import ml_dtypes  # noqa: F401
+        except ImportError:
+            raise ValueError(
+                "The bfloat16 vector dtype requires the ml_dtypes package, "
+                "install it with `pip install ml_dtypes` or choose float16"
+            )
+
+
+def truncate_vectors(vectors: Union[np.ndarray, Sequence], dim: int) -> np.ndarray:
+    """
+    Keep the first `dim` dimensions of Matryoshka embeddings and renormalize them.
+
+    Args:
+        vectors: Embedding matrix, one vector per row
+        dim: Number of dimensions kept
+
+    Returns:
+        The truncated float32 matrix with unit-length rows
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if dim >= matrix.shape[1]:
+        return matrix
+    matrix = matrix[:, :dim]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _to_bfloat16_bits(matrix: np.ndarray) -> np.ndarray:
+    """Round float32 values to the upper 16 bits, to nearest even."""
+    bits = np.ascontiguousarray(matrix, dtype=np.float32).view(np.uint32)
+    rounding = ((bits >> 16) & 1) + 0x7FFF
+    return ((bits + rounding) >> 16).astype(np.uint16)
+
+
+def encode_vectors(vectors: np.ndarray, dtype: str) -> List:
+    """Convert a float32 matrix to the row values inserted into a vector field of `dtype`."""
+    if dtype == "float32":
+        return np.asarray(vectors, dtype=np.float32).tolist()
+    if dtype == "float16":
+        return [row.tobytes() for row in np.asarray(vectors, dtype=np.float16)]
+    if dtype == "bfloat16":
+        return [row.tobytes() for row in _to_bfloat16_bits(vectors)]
+    raise ValueError(f"Unsupported vector dtype: {dtype}, choose from {VECTOR_DTYPES}")
+
+
+def encode_query(vector: np.ndarray, dtype: str):
+    """Convert a float32 query vector to the type a search on a vector field of `dtype` takes."""
+    if dtype == "float32":
+        return np.asarray(vector, dtype=np.float32).tolist()
+    if dtype == "float16":
+        return np.asarray(vector, dtype=np.float16)
+    if dtype == "bfloat16":
+        # The client infers the vector type of a query from the numpy dtype
+        check_vector_dtype(dtype)
+        import ml_dtypes
+
+        return np.asarray(vector, dtype=np.float32).astype(ml_dtypes.bfloat16)
+    raise ValueError(f"Unsupported vector dtype: {dtype}, choose from {VECTOR_DTYPES}")
+
+
+def decode_vector(value, dtype: str) -> np.ndarray:
+    """Convert a vector returned by the database back to float32."""
+    if isinstance(value, list) and len(value) == 1 and isinstance(value[0], bytes):
+        value = value[0]
+    if isinstance(value, bytes):
+        if dtype == "bfloat16":
+            bits = np.frombuffer(value, dtype=np.uint16).astype(np.uint32) << 16
+            return bits.view(np.float32)
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+class FullVectorStore:
+    """
+    Append-only file store of full precision vectors keyed by row id.
+
+    Ids and vectors are appended to two raw files and memory mapped on lookup, so the store
+    costs disk space instead of memory on the vector database nodes. The vector dimension is
+    kept in a `.meta` file and the ids are written last, so the id count is the number of
+    complete rows and bytes left behind by an interrupted write are trimmed off.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store.
+
+        Args:
+            path: Path prefix of the `.ids`, `.vectors` and `.meta` files, created if missing
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._order: Optional[np.ndarray] = None
+        self._sorted_ids: Optional[np.ndarray] = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @property
+    def ids_path(self) -> str:
+        return f"{self.path}.ids"
+
+    @property
+    def vectors_path(self) -> str:
+        return f"{self.path}.vectors"
+
+    @property
+    def meta_path(self) -> str:
+        return f"{self.path}.meta"
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(ids) != len(vectors):
+            raise ValueError(f"got {len(ids)} ids for {len(vectors)} vectors")
+        with self._lock:
+            dim = self._dim()
+            if dim is None:
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": vectors.shape[1]}, f)
+            elif vectors.shape[1] != dim:
+                raise ValueError(f"vector dimension {vectors.shape[1]} does not match {dim}")
+            self._trim()
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(ids.tobytes())
+            self._ids = self._vectors = self._order = None
+
+    def _count(self) -> int:
+        return os.path.getsize(self.ids_path) // 8 if os.path.exists(self.ids_path) else 0
+
+    def _dim(self) -> Optional[int]:
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)["dim"]
+        # Stores written before the dimension was kept in the meta file
+        count = self._count()
+        if count == 0:
+            return None
+        return os.path.getsize(self.vectors_path) // (4 * count)
+
+    def _trim(self) -> None:
+        """Truncate both files to the rows whose id was written."""
+        count, dim = self._count(), self._dim()
+        sizes = {self.ids_path: count * 8}
+        if dim is not None:
+            sizes[self.vectors_path] = count * dim * 4
+        for path, size in sizes.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _load(self) -> None:
+        self._trim()
+        count, dim = self._count(), self._dim()
+        if count == 0:
+            self._ids = np.empty(0, dtype=np.int64)
+            self._vectors = np.empty((0, dim or 0), dtype=np.float32)
+        else:
+            self._ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(count,))
+            self._vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r", shape=(count, dim)
+            )
+        self._order = np.argsort(self._ids, kind="stable")
+        self._sorted_ids = self._ids[self._order]
+
+    def get(self, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up the vectors of row ids.
+
+        Returns:
+            A mask of the ids found and the matrix of their vectors, zero rows where missing
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        with self._lock:
+            if self._ids is None:
+                self._load()
+            sorted_ids = self._sorted_ids
+            positions = np.searchsorted(sorted_ids, ids)
+            positions = np.minimum(positions, max(len(sorted_ids) - 1, 0))
+            found = sorted_ids[positions] == ids if len(sorted_ids) else np.zeros(len(ids), bool)
+            vectors = np.zeros((len(ids), self._vectors.shape[1]), dtype=np.float32)
+            if found.any():
+                vectors[found] = self._vectors[self._order[positions[found]]]
+        return found, vectors
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in (self.ids_path, self.vectors_path, self.meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._ids = self._vectors = self._order = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count()
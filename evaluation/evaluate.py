@@ -15,9 +15,10 @@ from typing import List, Tuple
 
 import pandas as pd
 
+from deepsearcher import configuration
 from deepsearcher.configuration import Configuration, init_config
 from deepsearcher.offline_loading import load_from_local_files
-from deepsearcher.online_query import naive_retrieve, retrieve
+from deepsearcher.online_query import naive_retrieve
 
 httpx_logger = logging.getLogger("httpx")  # disable openai's logger output
 httpx_logger.setLevel(logging.WARNING)
@@ -36,12 +37,15 @@ def _deepsearch_retrieve_titles(
     retry_num: int = 4,
     base_wait_time: int = 4,
     max_iter: int = 3,
-) -> Tuple[List[str], int, bool]:
+) -> Tuple[List[str], int, bool, dict]:
     retrieved_results = []
     consume_tokens = 0
+    metadata = {}
     for i in range(retry_num):
         try:
-            retrieved_results, _, consume_tokens = retrieve(question, max_iter=max_iter)
+            retrieved_results, consume_tokens, metadata = configuration.default_searcher.retrieve(
+                question, max_iter=max_iter
+            )
             break
         except Exception:
             wait_time = base_wait_time * (2**i)
@@ -56,7 +60,7 @@ def _deepsearch_retrieve_titles(
         print("Pipeline error, no retrieved results.")
         retrieved_titles = []
         fail = True
-    return retrieved_titles, consume_tokens, fail
+    return retrieved_titles, consume_tokens, fail, metadata
 
 
 def _naive_retrieve_titles(question: str) -> List[str]:
@@ -142,7 +146,7 @@ def evaluate(
         global_idx = sample_idx + start_ind
         question = sample["question"]
 
-        retrieved_titles, consume_tokens, fail = _deepsearch_retrieve_titles(
+        retrieved_titles, consume_tokens, fail, metadata = _deepsearch_retrieve_titles(
             question, max_iter=max_iter
         )
         retrieved_titles_naive = _naive_retrieve_titles(question)
@@ -165,6 +169,10 @@ def evaluate(
                 "gold_titles": [item[0] for item in sample["supporting_facts"]],
                 "retrieved_titles": retrieved_titles,
                 "retrieved_titles_naive": retrieved_titles_naive,
+                "token_usage": consume_tokens,
+                # Rounds run and why the retrieval stopped, for tuning the stop policies
+                "iterations": metadata.get("iterations", max_iter),
+                "stop_reason": metadata.get("stop_reason", ""),
             }
         ]
         current_df = pd.DataFrame(current_result)
@@ -197,6 +205,18 @@ def evaluate(
         existing_statistics["deepsearcher"]["token_usage_per_sample"] = (
             existing_token_usage / existing_sample_num
         )
+        existing_statistics["deepsearcher"]["average_iterations"] = float(
+            existing_df["iterations"].mean()
+        )
+        stop_reasons = (
+            existing_df["stop_reason"]
+            .fillna("")
+            .map(lambda reason: str(reason).split(":")[0] or "unknown")
+            .value_counts()
+        )
+        existing_statistics["deepsearcher"]["stop_reasons"] = {
+            reason: int(count) for reason, count in stop_reasons.items()
+        }
         existing_statistics["naive_rag"]["average_recall"] = average_recall_naive
         json.dump(existing_statistics, open(statistics_file_path, "w"), indent=4)
         print("")
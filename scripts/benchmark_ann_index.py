@@ -0,0 +1,287 @@
+"""
+ANN索引选型基准测试脚本
+
+从已有集合中采样向量（或生成随机向量），为每种索引配置建立临时集合，
+以暴力检索结果为基准，统计不同搜索参数下的recall@k、查询延迟与索引内存估算，
+用于按集合规模选择召回率与延迟的折中方案。
+
+可通过--vector_dtype与--stored_dim测试float16/bfloat16向量与Matryoshka截断维度的压缩存储，
+通过--rescore_factor测试用全精度向量对候选结果重排序后的召回率。
+"""
+
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymilvus import DataType
+
+from deepsearcher import configuration
+from deepsearcher.configuration import Configuration, init_config
+from deepsearcher.vector_db.milvus import VECTOR_FIELD_TYPES, resolve_index_profile
+from deepsearcher.vector_db.quantization import (
+    BYTES_PER_ELEMENT,
+    VECTOR_DTYPES,
+    encode_query,
+    encode_vectors,
+    truncate_vectors,
+)
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# 每种索引需要扫描的搜索参数
+SEARCH_PARAM_SWEEPS = {
+    "HNSW": [{"ef": ef} for ef in (16, 32, 64, 128, 256)],
+    "IVF_FLAT": [{"nprobe": nprobe} for nprobe in (8, 16, 32, 64, 128)],
+    "IVF_PQ": [{"nprobe": nprobe} for nprobe in (8, 16, 32, 64, 128)],
+    "IVF_SQ8": [{"nprobe": nprobe} for nprobe in (8, 16, 32, 64, 128)],
+    "HNSW_SQ": [{"ef": ef} for ef in (16, 32, 64, 128, 256)],
+    "DISKANN": [{"search_list": search_list} for search_list in (20, 50, 100, 200)],
+    "SCANN": [{"nprobe": nprobe, "reorder_k": 100} for nprobe in (8, 16, 32, 64)],
+    "AUTOINDEX": [{}],
+    "FLAT": [{}],
+}
+
+
+def load_vectors(client, collection: str, count: int) -> np.ndarray:
+    """从集合中读取最多count个向量"""
+    vectors = []
+    iterator = client.query_iterator(
+        collection_name=collection, batch_size=1000, output_fields=["embedding"]
+    )
+    try:
+        while len(vectors) < count:
+            rows = iterator.next()
+            if not rows:
+                break
+            vectors.extend(row["embedding"] for row in rows)
+    finally:
+        iterator.close()
+    return np.asarray(vectors[:count], dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dim: int, num_clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """生成带聚类结构的随机向量，比均匀分布更接近真实的嵌入分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, num_clusters, size=count)
+    return centers[labels] + 0.3 * rng.normal(size=(count, dim)).astype(np.float32)
+
+
+def exact_neighbors(data: np.ndarray, queries: np.ndarray, top_k: int) -> np.ndarray:
+    """暴力计算每个查询的L2近邻"""
+    data_norms = np.sum(data**2, axis=1)
+    neighbors = []
+    for start in range(0, len(queries), 256):
+        batch = queries[start : start + 256]
+        distances = data_norms[None, :] - 2 * batch @ data.T
+        nearest = np.argpartition(distances, top_k - 1, axis=1)[:, :top_k]
+        order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1)
+        neighbors.append(np.take_along_axis(nearest, order, axis=1))
+    return np.concatenate(neighbors)
+
+
+def estimate_index_memory(
+    profile: str, num_vectors: int, dim: int, vector_dtype: str
+) -> Optional[float]:
+    """粗略估算索引常驻内存（MB），无法估算的索引返回None"""
+    _, params, _ = resolve_index_profile(profile)
+    raw = num_vectors * dim * BYTES_PER_ELEMENT[vector_dtype]
+    # HNSW第0层每个节点约2*M条邻接边，每条4字节
+    graph = num_vectors * params.get("M", 16) * 2 * 4
+    estimates = {
+        "FLAT": raw,
+        "IVF_FLAT": raw,
+        "IVF_SQ8": num_vectors * dim,
+        "IVF_PQ": num_vectors * params.get("m", 16) * params.get("nbits", 8) / 8,
+        "HNSW": raw + graph,
+        "HNSW_SQ": num_vectors * dim + graph,
+        "SCANN": num_vectors * dim / 2 + (raw if params.get("with_raw_data") else 0),
+    }
+    memory = estimates.get(profile.upper())
+    return memory / 1024**2 if memory is not None else None
+
+
+def build_collection(
+    client, name: str, data: np.ndarray, profile: str, vector_dtype: str = "float32"
+) -> float:
+    """以指定索引配置建立临时集合并写入数据，返回建库耗时（秒）"""
+    if client.has_collection(name):
+        client.drop_collection(name)
+    schema = client.create_schema(enable_dynamic_field=False, auto_id=False)
+    schema.add_field("id", DataType.INT64, is_primary=True)
+    schema.add_field("embedding", VECTOR_FIELD_TYPES[vector_dtype], dim=data.shape[1])
+    index_type, build_params, _ = resolve_index_profile(profile)
+    index_params = client.prepare_index_params()
+    index_params.add_index(
+        field_name="embedding", index_type=index_type, metric_type="L2", params=build_params
+    )
+    start = time.perf_counter()
+    client.create_collection(name, schema=schema, index_params=index_params)
+    for offset in range(0, len(data), 5000):
+        batch = encode_vectors(data[offset : offset + 5000], vector_dtype)
+        client.insert(
+            collection_name=name,
+            data=[{"id": offset + i, "embedding": vector} for i, vector in enumerate(batch)],
+        )
+    client.flush(name)
+    client.load_collection(name)
+    return time.perf_counter() - start
+
+
+def run_queries(
+    client,
+    name: str,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    top_k: int,
+    search_params: dict,
+    vector_dtype: str = "float32",
+    stored_queries: Optional[np.ndarray] = None,
+    full_data: Optional[np.ndarray] = None,
+    rescore_factor: int = 0,
+) -> Dict[str, float]:
+    """逐条执行查询，统计recall@k与延迟；给定rescore_factor时用全精度向量重排序候选结果"""
+    if stored_queries is None:
+        stored_queries = queries
+    limit = top_k * rescore_factor if rescore_factor else top_k
+    latencies, recalls = [], []
+    for query, stored_query, expected in zip(queries, stored_queries, truth):
+        start = time.perf_counter()
+        results = client.search(
+            collection_name=name,
+            data=[encode_query(stored_query, vector_dtype)],
+            limit=limit,
+            search_params={"params": search_params},
+        )
+        ids = np.asarray([hit["id"] for hit in results[0]], dtype=np.int64)
+        if rescore_factor and len(ids):
+            distances = np.sum((full_data[ids] - query) ** 2, axis=1)
+            ids = ids[np.argsort(distances)[:top_k]]
+        latencies.append(time.perf_counter() - start)
+        found = set(ids.tolist())
+        recalls.append(len(found & set(expected.tolist())) / top_k)
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "recall": float(np.mean(recalls)),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "qps": float(len(queries) / np.sum(latencies)),
+    }
+
+
+def main(args: argparse.Namespace):
+    config = Configuration(args.config) if args.config else Configuration()
+    init_config(config)
+    client = configuration.vector_db.client
+
+    total = args.num_vectors + args.num_queries
+    if args.collection:
+        vectors = load_vectors(client, args.collection, total)
+        if len(vectors) < total:
+            raise ValueError(f"集合 {args.collection} 只有 {len(vectors)} 个向量，少于 {total}")
+    else:
+        vectors = synthetic_vectors(total, args.dim)
+    # 查询向量不写入集合
+    data, queries = vectors[: args.num_vectors], vectors[args.num_vectors :]
+    print(f"数据量: {len(data)}，查询数: {len(queries)}，维度: {data.shape[1]}")
+    truth = exact_neighbors(data, queries, args.top_k)
+    # 召回率始终以全精度、全维度的近邻为基准
+    stored_dim = args.stored_dim or data.shape[1]
+    stored_data = truncate_vectors(data, stored_dim)
+    stored_queries = truncate_vectors(queries, stored_dim)
+    print(f"存储类型: {args.vector_dtype}，存储维度: {stored_dim}")
+    if args.rescore_factor:
+        print(
+            f"重排序候选倍数: {args.rescore_factor}，"
+            f"全精度向量占用磁盘: {data.nbytes / 1024**2:.1f} MB"
+        )
+
+    rows: List[List[str]] = []
+    for profile in args.profiles:
+        name = f"ann_benchmark_{profile.lower()}"
+        try:
+            build_seconds = build_collection(client, name, stored_data, profile, args.vector_dtype)
+        except Exception as e:
+            print(f"索引 {profile} 建立失败: {e}")
+            continue
+        for search_params in SEARCH_PARAM_SWEEPS.get(profile.upper(), [{}]):
+            search_params = {
+                key: max(value, args.top_k) if key in ("ef", "search_list") else value
+                for key, value in search_params.items()
+            }
+            stats = run_queries(
+                client,
+                name,
+                queries,
+                truth,
+                args.top_k,
+                search_params,
+                args.vector_dtype,
+                stored_queries,
+                data,
+                args.rescore_factor,
+            )
+            memory = estimate_index_memory(profile, len(data), stored_dim, args.vector_dtype)
+            rows.append(
+                [
+                    profile,
+                    str(search_params),
+                    f"{stats['recall']:.4f}",
+                    f"{stats['p50_ms']:.2f}",
+                    f"{stats['p95_ms']:.2f}",
+                    f"{stats['qps']:.0f}",
+                    f"{memory:.1f}" if memory is not None else "-",
+                    f"{build_seconds:.1f}",
+                ]
+            )
+        if not args.keep:
+            client.drop_collection(name)
+
+    headers = [
+        "profile",
+        "search_params",
+        f"recall@{args.top_k}",
+        "p50_ms",
+        "p95_ms",
+        "qps",
+        "mem_mb(est)",
+        "build_s",
+    ]
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    for row in [headers] + rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ANN索引recall@k与延迟基准测试")
+    parser.add_argument("--config", type=str, default=None, help="配置文件路径，默认为config.yaml")
+    parser.add_argument(
+        "--collection", "-c", type=str, default=None, help="采样向量的集合，默认生成随机向量"
+    )
+    parser.add_argument("--num_vectors", "-n", type=int, default=100_000, help="写入的向量数")
+    parser.add_argument("--num_queries", "-q", type=int, default=200, help="查询数")
+    parser.add_argument("--dim", type=int, default=1024, help="随机向量的维度")
+    parser.add_argument("--top_k", "-k", type=int, default=10, help="recall@k中的k")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=["HNSW", "IVF_FLAT", "IVF_PQ", "DISKANN", "SCANN"],
+        help="待测试的索引配置",
+    )
+    parser.add_argument(
+        "--vector_dtype", choices=VECTOR_DTYPES, default="float32", help="集合中向量的存储类型"
+    )
+    parser.add_argument(
+        "--stored_dim", type=int, default=0, help="Matryoshka截断后存储的维度，0表示不截断"
+    )
+    parser.add_argument(
+        "--rescore_factor", type=int, default=0, help="用全精度向量重排序的候选倍数，0表示不重排序"
+    )
+    parser.add_argument("--keep", action="store_true", help="保留临时集合")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,131 @@
+"""
+启动耗时基准测试脚本
+
+分别在新的Python进程中测量各模块的冷导入耗时，并在同一进程中按依赖顺序逐个构建
+configuration中的组件，统计每个组件的初始化耗时，用于定位CLI与API进程启动慢的原因。
+"""
+
+import argparse
+import logging
+import subprocess
+import sys
+import time
+from typing import List
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# 需要测量冷导入耗时的模块
+IMPORT_MODULES = [
+    "deepsearcher.configuration",
+    "deepsearcher.agent",
+    "deepsearcher.llm",
+    "deepsearcher.embedding",
+    "deepsearcher.vector_db.milvus",
+    "deepsearcher.loader.splitter",
+    "deepsearcher.api.main",
+    "pymilvus",
+    "openai",
+    "langchain_text_splitters",
+    "jieba",
+    "jieba.posseg",
+]
+
+# 按依赖顺序构建的组件，先构建被依赖的组件，使每一项只统计自身的初始化耗时
+COMPONENTS = [
+    "embedding_model",
+    "llm_cache",
+    "llm",
+    "reasoning_llm",
+    "writing_llm",
+    "vector_db",
+    "file_loader",
+    "web_crawler",
+    "retrieval_executor",
+    "collection_router",
+    "classifier",
+    "default_searcher",
+    "naive_rag",
+    "academic_translator",
+]
+
+
+def measure_import(module: str, repeat: int) -> float:
+    """在新进程中导入模块，返回多次测量中最短的耗时（秒），导入失败返回-1"""
+    code = (
+        "import time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if result.returncode != 0:
+            return -1
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def print_table(headers: List[str], rows: List[List[str]]):
+    widths = [max(len(row[i]) for row in rows + [headers]) for i in range(len(headers))]
+    for row in [headers] + rows:
+        print("  ".join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def main(args: argparse.Namespace):
+    rows = []
+    for module in args.modules:
+        seconds = measure_import(module, args.repeat)
+        rows.append([module, f"{seconds * 1000:.0f}" if seconds >= 0 else "导入失败"])
+    print("冷导入耗时（新进程，取最短）")
+    print_table(["module", "import_ms"], rows)
+    print()
+
+    start = time.perf_counter()
+    from deepsearcher import configuration
+    from deepsearcher.configuration import Configuration, init_config
+
+    import_seconds = time.perf_counter() - start
+    config = Configuration(args.config) if args.config else Configuration()
+    start = time.perf_counter()
+    init_config(config, lazy=not args.eager)
+    init_seconds = time.perf_counter() - start
+    print(f"导入configuration: {import_seconds * 1000:.0f} ms")
+    print(f"init_config({'eager' if args.eager else 'lazy'}): {init_seconds * 1000:.0f} ms")
+    print()
+
+    rows = []
+    for name in COMPONENTS:
+        start = time.perf_counter()
+        try:
+            component = getattr(configuration, name)
+            status = type(component).__name__ if component is not None else "None"
+        except Exception as e:
+            status = f"失败: {e}"[:60]
+        rows.append([name, f"{(time.perf_counter() - start) * 1000:.0f}", status])
+    translator = getattr(configuration, "academic_translator", None)
+    if translator is not None:
+        start = time.perf_counter()
+        translator.term_dictionary.load()
+        rows.append(
+            ["term_dictionary", f"{(time.perf_counter() - start) * 1000:.0f}", "首次使用时加载"]
+        )
+    print("组件初始化耗时（首次访问）")
+    print_table(["component", "init_ms", "result"], rows)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="导入与初始化耗时基准测试")
+    parser.add_argument("--config", type=str, default=None, help="配置文件路径，默认为config.yaml")
+    parser.add_argument(
+        "--modules", nargs="+", default=IMPORT_MODULES, help="需要测量冷导入耗时的模块"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="每个模块的导入测量次数")
+    parser.add_argument(
+        "--eager", action="store_true", help="init_config时立即构建全部组件，用于与惰性初始化对比"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,36 @@
+"""
+重建向量数据库集合的BM25词法索引
+
+新插入的数据会在写入Milvus时同步写入词法索引，本脚本用于为已有的集合补建索引，
+需要先在config.yaml的vector_db配置中设置lexical_index_dir。
+"""
+
+import argparse
+import logging
+
+from deepsearcher import configuration
+from deepsearcher.configuration import Configuration, init_config
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the BM25 index of Milvus collections")
+    parser.add_argument("collections", nargs="*", help="集合名称，默认处理所有集合")
+    parser.add_argument("--batch_size", type=int, default=1000, help="每次读取的行数")
+    args = parser.parse_args()
+
+    config = Configuration()
+    init_config(config)
+    vector_db = configuration.vector_db
+
+    collections = args.collections or [
+        collection_info.collection_name for collection_info in vector_db.list_collections()
+    ]
+    for collection in collections:
+        count = vector_db.rebuild_lexical_index(collection, batch_size=args.batch_size)
+        print(f"集合 {collection} 的词法索引已重建，共 {count} 条")
+
+
+if __name__ == "__main__":
+    main()
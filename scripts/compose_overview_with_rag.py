@@ -61,6 +61,8 @@ def main(
         translator=configuration.academic_translator,
         embedding_model=configuration.embedding_model,
         vector_db=configuration.vector_db,
+        retrieval_executor=configuration.retrieval_executor,
+        collection_router=configuration.collection_router,
         text_window_splitter=config.rbase_settings.get("overview_rag", {}).get(
             "text_window_splitter", True
         ),
@@ -62,6 +62,8 @@ def main(
         translator=configuration.academic_translator,
         embedding_model=configuration.embedding_model,
         vector_db=configuration.vector_db,
+        retrieval_executor=configuration.retrieval_executor,
+        collection_router=configuration.collection_router,
         route_collection=True,
         rbase_settings=config.rbase_settings,
     )
@@ -65,20 +65,30 @@ def main(ver: int, env: str, collection_name: str, offset: int = 0, limit: int =
     insert_count = 0
     insert_min_id = 0
     insert_max_id = 0
-    # 步骤3：将文章数据插入到向量数据库
-    for article in tqdm(articles, desc="Processing articles"):
+    # 步骤3：将文章数据分批插入到向量数据库，每批文章一起切分和向量化
+    batch_articles = max(1, kwargs.get("batch_articles", 16))
+    for start in tqdm(range(0, len(articles), batch_articles), desc="Processing articles"):
+        batch = articles[start:start + batch_articles]
         insert_result = insert_to_vector_db(
             rbase_config=config.rbase_settings,  # Rbase配置，包含数据库和OSS配置
-            articles=[article],  # 要插入的文章列表
+            articles=batch,  # 要插入的文章列表
             collection_name=collection_name,  # 向量数据库集合名称
             collection_description=collection_description,  # 集合描述
-            force_new_collection=force_new_collection,  # 是否强制创建新集合（首次运行时设置为True，之后可设为False）
+            force_new_collection=force_new_collection and start == 0,  # 是否强制创建新集合，只在第一批生效
+            splitter=config.load_settings.get("splitter", "recursive"),  # 文本切分方式
+            chunk_tokens=config.load_settings.get("chunk_tokens", 512),  # markdown切分时每个块的token上限
+            split_workers=config.load_settings.get("split_workers", 0),  # 并行切分文档的进程数
+            near_duplicates=config.load_settings.get("near_duplicates") or None,  # 近似重复块的处理方式
+            near_duplicate_index_dir=config.load_settings.get("near_duplicate_index_dir", "database/near_duplicates"),
         )
 
-        # 打印插入结果统计
-        if insert_result:
+        # 按文章记录插入结果
+        article_ids = insert_result.get("article_ids", {}) if insert_result else {}
+        for article in batch:
+            if article.article_id not in article_ids:
+                continue
             log_raw_article_deleted(config.rbase_settings, article.raw_article_id, collection_name)
-            ids = insert_result.get("ids", [])
+            ids = article_ids[article.article_id]
             min_id = min(ids) if ids else 0
             max_id = max(ids) if ids else 0
             save_vector_db_log(config.rbase_settings, 
@@ -87,7 +97,7 @@ def main(ver: int, env: str, collection_name: str, offset: int = 0, limit: int =
                                operation='insert',
                                id_from=min_id,
                                id_to=max_id)
-            insert_count += insert_result.get('insert_count', 0)
+            insert_count += len(ids)
             insert_min_id = min(insert_min_id, min_id) if insert_min_id else min_id
             insert_max_id = max(insert_max_id, max_id) if insert_max_id else max_id
 
@@ -113,6 +123,7 @@ def parse_args():
     parser.add_argument('--collection_name', '-n', type=str, help='集合名称，默认为None')
     parser.add_argument('--collection_description', '-d', type=str, default='Academic Research Literature Dataset', 
                         help='集合描述')
+    parser.add_argument('--batch_articles', type=int, default=16, help='每次切分、向量化和插入的文章数，默认为16')
     parser.add_argument('-f', '--force_new_collection', action='store_true', help='是否强制创建新集合，默认为False')
     parser.add_argument('-v', '--verbose', action='store_true', help='是否打印详细信息，默认为False')
     
@@ -127,4 +138,5 @@ if __name__ == "__main__":
         collection_description=args.collection_description,
         force_new_collection=args.force_new_collection, 
         doc_rebuild=args.doc_rebuild, 
-        base_id=args.base_id)
+        base_id=args.base_id,
+        batch_articles=args.batch_articles)
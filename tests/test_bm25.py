@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from deepsearcher.vector_db.bm25 import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.index = BM25Index(os.path.join(self.tmp_dir.name, "index.sqlite"))
+        self.index.add(
+            [1, 2, 3],
+            [
+                "IL-6 signalling drives inflammation in the gut.",
+                "Escherichia coli K-12 strains were grown overnight.",
+                "Inflammation of the gut is common in patients with colitis.",
+            ],
+        )
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp_dir.cleanup()
+
+    def test_tokenize_identifiers(self):
+        tokens = tokenize("The BRCA1 gene and IL-6")
+        self.assertIn("brca1", tokens)
+        self.assertIn("il-6", tokens)
+        self.assertIn("il", tokens)
+
+    def test_search(self):
+        self.assertEqual(self.index.search("K-12", top_k=1)[0][0], 2)
+        ranking = [doc_id for doc_id, _ in self.index.search("IL-6 inflammation")]
+        self.assertEqual(ranking, [1, 3])
+        self.assertEqual(self.index.search("unrelated words"), [])
+
+    def test_delete_and_replace(self):
+        self.index.delete([2])
+        self.assertEqual(self.index.search("K-12"), [])
+        self.index.add([1], ["K-12 strain"])
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual([doc_id for doc_id, _ in self.index.search("K-12 IL-6")], [1])
+
+    def test_corpus_statistics(self):
+        self.index.add([3], ["Colitis"])
+        self.index.delete([1, 4])
+        self.assertEqual(len(self.index), 2)
+        stats = self.index._conn.execute("SELECT num_docs, total_length FROM corpus").fetchone()
+        lengths = self.index._conn.execute("SELECT COUNT(*), SUM(length) FROM documents").fetchone()
+        self.assertEqual(stats, lengths)
+        document_frequencies = dict(self.index._conn.execute("SELECT term, df FROM terms"))
+        self.assertEqual(document_frequencies["colitis"], 1)
+        self.assertNotIn("inflammation", document_frequencies)
+
+    def test_pruned_search_matches_exhaustive(self):
+        texts = [f"the soil sample {i} was sequenced" for i in range(60)]
+        texts[7] += " rhizobium rhizobium"
+        texts[42] += " rhizobium"
+        self.index.add(range(100, 160), texts)
+        exhaustive = self.index.search("rhizobium soil sample the", top_k=100)
+        pruned = self.index.search("rhizobium soil sample the", top_k=2)
+        self.assertEqual(pruned, exhaustive[:2])
+        self.assertEqual([doc_id for doc_id, _ in pruned], [107, 142])
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+        self.assertEqual([item for item, _ in fused], [1, 3, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
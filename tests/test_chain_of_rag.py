@@ -0,0 +1,94 @@
+import json
+import unittest
+
+from deepsearcher.agent.chain_of_rag import ChainOfRAG
+from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.vector_db.base import RetrievalResult
+
+
+def results(*texts):
+    return [RetrievalResult([0.0], text, "ref", {}) for text in texts]
+
+
+class APIError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, json_content, error=None):
+        self.json_content = json_content
+        self.error = error
+        self.prompts = []
+
+    def chat(self, messages):
+        self.prompts.append(messages[0]["content"])
+        if "python list of indices" in messages[0]["content"]:
+            return ChatResponse(content="[1]", total_tokens=3)
+        return ChatResponse(content=self.json_content, total_tokens=5)
+
+    def structured_chat(self, messages, schema, name):
+        if self.error:
+            raise self.error
+        self.prompts.append(messages[0]["content"])
+        return ChatResponse(content=self.json_content, total_tokens=5)
+
+
+def make_agent(llm):
+    return ChainOfRAG(
+        llm=llm,
+        embedding_model=None,
+        vector_db=None,
+        collection_router=object(),
+        retrieval_executor=object(),
+    )
+
+
+class TestAnswerWithSupportedDocs(unittest.TestCase):
+    def test_one_call_per_hop(self):
+        llm = FakeLLM(json.dumps({"answer": "Paris", "supporting_docs": [2, 0, 2, 7]}))
+        answer, supported, tokens = make_agent(llm)._answer_with_supported_docs(
+            "capital of France?", results("a", "b", "c")
+        )
+        self.assertEqual(answer, "Paris")
+        self.assertEqual([result.text for result in supported], ["c", "a"])
+        self.assertEqual((tokens, len(llm.prompts)), (5, 1))
+
+    def test_no_answer_has_no_supporting_docs(self):
+        llm = FakeLLM('{"answer": "No relevant information found", "supporting_docs": [0]}')
+        _, supported, _ = make_agent(llm)._answer_with_supported_docs("q", results("a"))
+        self.assertEqual(supported, [])
+
+    def test_plain_chat_fallbacks(self):
+        # The provider rejects structured output, the object is parsed from a code block
+        llm = FakeLLM(
+            '```json\n{"answer": "Paris", "supporting_docs": [1]}\n```',
+            APIError("response_format is not supported", 400),
+        )
+        agent = make_agent(llm)
+        answer, supported, _ = agent._answer_with_supported_docs("q", results("a", "b"))
+        self.assertEqual((answer, supported[0].text), ("Paris", "b"))
+        self.assertFalse(llm.structured_output)
+
+        # Unparsable responses are taken as the answer, the documents are selected apart
+        llm.json_content = "Paris"
+        answer, supported, tokens = agent._answer_with_supported_docs("q", results("a", "b"))
+        self.assertEqual((answer, supported[0].text, tokens), ("Paris", "b", 8))
+
+    def test_transient_errors_keep_structured_output(self):
+        llm = FakeLLM("{}", APIError("rate limited", 429))
+        with self.assertRaises(APIError):
+            make_agent(llm)._answer_with_supported_docs("q", results("a"))
+        self.assertTrue(llm.structured_output)
+
+    def test_other_client_errors_keep_structured_output(self):
+        for message in ("maximum context length exceeded", "content filtered"):
+            llm = FakeLLM("{}", APIError(message, 400))
+            with self.assertRaises(APIError):
+                make_agent(llm)._answer_with_supported_docs("q", results("a"))
+            self.assertTrue(llm.structured_output)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import datetime
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from deepsearcher.agent import citation_resolver
+from deepsearcher.agent.citation_resolver import CitationResolver, renumber_citations
+
+ARTICLES = {
+    123: {
+        "id": 123,
+        "title": "Gut microbiome and immunity",
+        "journal_name": "Nature",
+        "authors": "A, B, C, D, E, F",
+        "doi": "10.1/x",
+        "pubdate": datetime.date(2020, 1, 1),
+    },
+    456: {
+        "id": 456,
+        "title": "Soil metagenomics",
+        "journal_name": "Cell",
+        "authors": "G",
+        "doi": "10.1/y",
+        "pubdate": datetime.date(2021, 1, 1),
+    },
+}
+
+
+class TestCitationResolver(unittest.TestCase):
+    def setUp(self):
+        self.queries = []
+
+        def execute(sql, params):
+            self.queries.append(list(params))
+            cursor.rows = [ARTICLES[i] for i in params if i in ARTICLES]
+
+        cursor = MagicMock()
+        cursor.execute.side_effect = execute
+        cursor.fetchall.side_effect = lambda: cursor.rows
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+
+        @contextmanager
+        def fake_connection(config):
+            yield conn
+
+        patcher = patch.object(citation_resolver, "mysql_connection", fake_connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_renumber_citations(self):
+        text, cited = renumber_citations("A [456]. B [123, 456,789]. C [456].")
+        self.assertEqual(text, "A [1]. B [2][1][3]. C [1].")
+        self.assertEqual(cited, [456, 123, 789])
+
+    def test_reorganize_batches_and_caches(self):
+        resolver = CitationResolver({}, batch_size=2)
+        text, references = resolver.reorganize("X [123][456] Y [789]")
+        self.assertEqual(text, "X [1][2] Y [3]")
+        self.assertEqual(self.queries, [[123, 456], [789]])
+        lines = references.split("\n\n")
+        self.assertEqual(
+            lines[0], "[1] A, B, C, D, E, et al. Gut microbiome and immunity. Nature. 2020;10.1/x"
+        )
+        self.assertTrue(lines[2].startswith("[3] some authors"))
+
+        resolver.reorganize("[456] and [123]")
+        # Found articles come from the cache, missing ones are queried again
+        self.assertEqual(self.queries[2:], [])
+        resolver.fetch_articles([789])
+        self.assertEqual(self.queries[2:], [[789]])
+
+    def test_cache_is_bounded(self):
+        resolver = CitationResolver({}, cache_size=1)
+        resolver.fetch_articles([123, 456])
+        resolver.fetch_articles([123])
+        self.assertEqual(self.queries[-1], [123])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+
+from deepsearcher.agent.collection_router import CollectionRouter
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.vector_db.base import BaseVectorDB, CollectionInfo
+
+VECTORS = {
+    "genomics": [1.0, 0.0, 0.0],
+    "oncology": [0.0, 1.0, 0.0],
+    "cancer genomics": [0.7, 0.7, 0.1],
+    "finance": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbedding(BaseEmbedding):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return VECTORS[text]
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, answer):
+        self.answer = answer
+        self.calls = 0
+
+    def chat(self, messages):
+        self.calls += 1
+        return ChatResponse(content=str(self.answer), total_tokens=10)
+
+
+class FakeVectorDB(BaseVectorDB):
+    def __init__(self):
+        super().__init__(default_collection="default")
+        self.list_calls = 0
+
+    def list_collections(self, *args, **kwargs):
+        self.list_calls += 1
+        return [
+            CollectionInfo("default", "the default collection"),
+            CollectionInfo("genes", "genomics"),
+            CollectionInfo("tumors", "oncology"),
+            CollectionInfo("misc", ""),
+        ]
+
+    def init_collection(
+        self, dim, collection, description, force_new_collection=False, *args, **kwargs
+    ):
+        self.invalidate_collection_infos()
+
+    def insert_data(self, collection, chunks, *args, **kwargs):
+        pass
+
+    def search_data(self, collection, vector, *args, **kwargs):
+        return []
+
+    def clear_db(self, *args, **kwargs):
+        self.invalidate_collection_infos()
+
+    def delete_data(self, collection, *args, **kwargs):
+        return 0
+
+    def flush(self, collection_name, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestCollectionRouter(unittest.TestCase):
+    def test_confident_match_skips_llm(self):
+        llm, embedding, vector_db = FakeLLM([]), FakeEmbedding(), FakeVectorDB()
+        router = CollectionRouter(llm, vector_db, embedding_model=embedding)
+        collections, tokens = router.invoke("genomics")
+        self.assertEqual(sorted(collections), ["default", "genes", "misc"])
+        self.assertEqual((tokens, llm.calls), (0, 0))
+
+        # Description vectors and the catalog are reused by the next query
+        embedding.calls = 0
+        router.invoke("finance", query_vector=VECTORS["finance"])
+        self.assertEqual((embedding.calls, vector_db.list_calls), (0, 1))
+
+    def test_ambiguous_match_asks_llm(self):
+        llm = FakeLLM(["tumors", "unknown"])
+        router = CollectionRouter(
+            llm, FakeVectorDB(), embedding_model=FakeEmbedding(), select_threshold=0.8
+        )
+        collections, tokens = router.invoke("cancer genomics")
+        self.assertEqual(sorted(collections), ["default", "misc", "tumors"])
+        self.assertEqual((tokens, llm.calls), (10, 1))
+
+    def test_catalog_invalidation(self):
+        vector_db = FakeVectorDB()
+        vector_db.get_collection_infos()
+        vector_db.get_collection_infos()
+        self.assertEqual(vector_db.list_calls, 1)
+        vector_db.init_collection(dim=3, collection="new", description="")
+        vector_db.get_collection_infos()
+        self.assertEqual(vector_db.list_calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
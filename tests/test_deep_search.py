@@ -0,0 +1,110 @@
+import unittest
+
+from deepsearcher.agent.deep_search import DeepSearch, RetrievalState, chunk_key
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, ChatResponse, message_text
+from deepsearcher.vector_db.base import RetrievalResult
+
+
+def chunk(chunk_id, text=None):
+    return RetrievalResult([0.0], text or f"chunk {chunk_id}", "ref", {"id": chunk_id})
+
+
+class FakeEmbedding(BaseEmbedding):
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+class FakeLLM(BaseLLM):
+    """Decomposes into two sub-queries, always proposes gap queries and accepts every chunk."""
+
+    def __init__(self):
+        self.rerank_calls = 0
+
+    def chat(self, messages):
+        content = message_text(messages[0])
+        if content.startswith("Based on the query questions"):
+            self.rerank_calls += 1
+            return ChatResponse(content="YES", total_tokens=1)
+        if content.startswith("To answer this question"):
+            return ChatResponse(content='["q1", "q2"]', total_tokens=10)
+        return ChatResponse(content='["gap1", "gap2"]', total_tokens=10)
+
+
+class FakeRouter:
+    def invoke(self, query, query_vector):
+        return ["collection"], 0
+
+
+class FakeExecutor:
+    """Returns the same chunks for every query, and one new chunk per query on request."""
+
+    def __init__(self, chunks, new_chunk_per_query=False):
+        self.chunks = chunks
+        self.new_chunk_per_query = new_chunk_per_query
+        self.searches = 0
+
+    def search_collections(self, collections, vector, query_text=""):
+        self.searches += 1
+        results = list(self.chunks)
+        if self.new_chunk_per_query:
+            results.append(chunk(1000 + self.searches))
+        return {"collection": results}
+
+
+def make_agent(executor, **kwargs):
+    return DeepSearch(
+        llm=FakeLLM(),
+        embedding_model=FakeEmbedding(),
+        vector_db=None,
+        collection_router=FakeRouter(),
+        retrieval_executor=executor,
+        **kwargs,
+    )
+
+
+class TestRetrievalState(unittest.TestCase):
+    def test_novelty_per_query(self):
+        state = RetrievalState()
+        state.observe([chunk(1), chunk(2)])
+        state.observe([chunk(2), chunk(3)])
+        self.assertEqual(state.end_iteration(2), 1.5)
+        state.observe([chunk(1), chunk(3)])
+        self.assertEqual(state.end_iteration(2), 0.0)
+
+    def test_chunk_key(self):
+        self.assertEqual(chunk_key(chunk(1)), chunk_key(chunk(1, "other text")))
+        self.assertEqual(chunk_key(RetrievalResult([0.0], "text", "ref", {})), "text")
+
+
+class TestDeepSearchRetrievalState(unittest.TestCase):
+    def test_known_chunks_are_not_reranked(self):
+        agent = make_agent(FakeExecutor([chunk(1), chunk(2)], new_chunk_per_query=True))
+        results, _, info = agent.retrieve("query", max_iter=2)
+        # 2 shared chunks and 2 new chunks in the first iteration, 2 new in the second
+        self.assertEqual(agent.llm.rerank_calls, 6)
+        self.assertEqual(info["rerank_calls"], 6)
+        self.assertEqual(info["reused_verdicts"], 6)
+        self.assertEqual(len(results), 6)
+        self.assertEqual((info["iterations"], info["stop_reason"]), (2, "max_iter"))
+
+    def test_stops_on_low_novelty(self):
+        agent = make_agent(FakeExecutor([chunk(1), chunk(2)]), min_novelty=1.0)
+        _, _, info = agent.retrieve("query", max_iter=5)
+        self.assertEqual(info["iterations"], 2)
+        self.assertTrue(info["stop_reason"].startswith("novelty"))
+        self.assertEqual(info["novelty"], [1.0, 0.0])
+
+    def test_rerank_budget(self):
+        chunks = [chunk(i) for i in range(5)]
+        agent = make_agent(FakeExecutor(chunks), max_rerank_calls=3)
+        results, _, info = agent.retrieve("query", max_iter=3)
+        self.assertEqual(agent.llm.rerank_calls, 3)
+        self.assertEqual(len(results), 3)
+        # The two chunks left over are skipped for both sub-queries
+        self.assertEqual(info["unranked_chunks"], 4)
+        self.assertTrue(info["stop_reason"].startswith("rerank_budget"))
+
+
+if __name__ == "__main__":
+    unittest.main()
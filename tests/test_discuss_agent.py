@@ -0,0 +1,184 @@
+import json
+import unittest
+
+from deepsearcher.agent.discuss_agent import DiscussAgent, format_history, recent_history
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, ChatResponse, message_text
+from deepsearcher.vector_db.base import BaseVectorDB, RetrievalResult
+
+VECTORS = {
+    "肠道菌群如何影响免疫": [1.0, 0.0, 0.0],
+    "肠道菌群对免疫系统的影响": [0.95, 0.3, 0.0],
+    "土壤微生物的干旱响应": [0.0, 0.0, 1.0],
+}
+
+
+class FakeEmbedding(BaseEmbedding):
+    def embed_query(self, text):
+        return VECTORS[text]
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, action=None):
+        self.action = action
+        self.prompts = []
+
+    def chat(self, messages):
+        self.prompts.append(message_text(messages[0]))
+        return ChatResponse(content=json.dumps(self.action, ensure_ascii=False), total_tokens=10)
+
+    def stream_generator(self, messages):
+        return iter(())
+
+
+class FakeVectorDB(BaseVectorDB):
+    def __init__(self):
+        super().__init__(default_collection="default")
+        self.searches = []
+
+    def search_data(self, collection, vector, top_k=5, **kwargs):
+        self.searches.append(vector)
+        return [RetrievalResult(vector, "text", "ref", {"reference_id": 1})]
+
+    def init_collection(self, *args, **kwargs):
+        pass
+
+    def insert_data(self, *args, **kwargs):
+        pass
+
+    def clear_db(self, *args, **kwargs):
+        pass
+
+    def delete_data(self, collection, *args, **kwargs):
+        return 0
+
+    def flush(self, collection_name, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestDiscussAgentSpeculation(unittest.TestCase):
+    def run_agent(self, search_query, need_search=True):
+        vector_db = FakeVectorDB()
+        action = {"intention": "提问", "need_search": need_search, "search_query": search_query}
+        agent = DiscussAgent(
+            llm=FakeLLM(),
+            reasoning_llm=FakeLLM(action),
+            translator=None,
+            embedding_model=FakeEmbedding(),
+            vector_db=vector_db,
+            speculative_search=True,
+            verbose=False,
+        )
+        agent.query_generator("肠道菌群如何影响免疫")
+        return agent, vector_db
+
+    def test_similar_query_uses_speculative_results(self):
+        agent, vector_db = self.run_agent("肠道菌群对免疫系统的影响")
+        self.assertEqual(agent.speculation_status, "hit")
+        self.assertEqual(len(vector_db.searches), 1)
+
+    def test_dissimilar_query_searches_again(self):
+        agent, vector_db = self.run_agent("土壤微生物的干旱响应")
+        self.assertEqual(agent.speculation_status, "miss")
+        self.assertEqual(vector_db.searches[-1], VECTORS["土壤微生物的干旱响应"])
+
+    def test_no_search_discards_speculation(self):
+        agent, _ = self.run_agent("", need_search=False)
+        self.assertEqual(agent.speculation_status, "unused")
+
+
+class FakeClassifier:
+    def __init__(self, label):
+        self.label = label
+        self.recorded = []
+
+    def embed(self, text):
+        return [1.0, 0.0, 0.0]
+
+    def classify(self, task, labels, text, vector=None):
+        return self.label, 0.9
+
+    def record(self, task, label, text, vector=None):
+        self.recorded.append(label)
+
+
+class TestDiscussAgentClassifier(unittest.TestCase):
+    def run_agent(self, classified_label):
+        intent_llm = FakeLLM({"intention": "提问", "need_search": False, "search_query": ""})
+        classifier = FakeClassifier(classified_label)
+        agent = DiscussAgent(
+            llm=FakeLLM(),
+            reasoning_llm=intent_llm,
+            translator=None,
+            embedding_model=FakeEmbedding(),
+            vector_db=FakeVectorDB(),
+            classifier=classifier,
+            verbose=False,
+        )
+        result = agent.query_generator("哈哈")
+        return result, intent_llm, classifier
+
+    def test_no_reply_skips_intent_llm(self):
+        result, intent_llm, _ = self.run_agent("无需回复")
+        self.assertEqual(result, ())
+        self.assertEqual(intent_llm.prompts, [])
+
+    def test_uncertain_escalates_and_records(self):
+        _, intent_llm, classifier = self.run_agent(None)
+        self.assertEqual(len(intent_llm.prompts), 1)
+        self.assertEqual(classifier.recorded, ["提问"])
+
+
+HISTORY = [
+    {"id": 1, "role": "user", "content": "第一个问题"},
+    {"id": 2, "role": "assistant", "content": "第一个回答"},
+    {"id": 3, "role": "user", "content": "第二个问题"},
+    {"id": 4, "role": "assistant", "content": "第二个回答"},
+    {"id": 5, "role": "user", "content": "第三个问题"},
+]
+
+
+class TestDiscussAgentSummary(unittest.TestCase):
+    def test_recent_history(self):
+        self.assertEqual([item["id"] for item in recent_history(HISTORY, 4, 1)], [4, 5])
+        # Turns the summary does not cover yet are kept
+        self.assertEqual([item["id"] for item in recent_history(HISTORY, 1, 1)], [2, 3, 4, 5])
+
+    def test_prompt_contains_summary_and_recent_turns(self):
+        action = {"intention": "提问", "need_search": False, "search_query": ""}
+        intent_llm = FakeLLM(action)
+        agent = DiscussAgent(
+            llm=FakeLLM(),
+            reasoning_llm=intent_llm,
+            translator=None,
+            embedding_model=FakeEmbedding(),
+            vector_db=FakeVectorDB(),
+            verbose=False,
+        )
+        agent.query_generator("第三个问题", history=HISTORY[-1:], summary="讨论了第一个问题")
+        self.assertIn("讨论了第一个问题", intent_llm.prompts[0])
+        self.assertNotIn("第一个回答", intent_llm.prompts[0])
+        self.assertIn(format_history(HISTORY[-1:]), intent_llm.prompts[0])
+
+    def test_summarize_history(self):
+        summary_llm = FakeLLM("新的摘要")
+        agent = DiscussAgent(
+            llm=FakeLLM(),
+            reasoning_llm=FakeLLM(),
+            translator=None,
+            embedding_model=FakeEmbedding(),
+            vector_db=FakeVectorDB(),
+            summary_llm=summary_llm,
+        )
+        self.assertEqual(agent.summarize_history("旧的摘要", [])[0], "旧的摘要")
+        summary, _ = agent.summarize_history("旧的摘要", HISTORY[:2])
+        self.assertEqual(summary, json.dumps("新的摘要", ensure_ascii=False))
+        self.assertIn("旧的摘要", summary_llm.prompts[0])
+        self.assertIn("第一个回答", summary_llm.prompts[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from deepsearcher.agent.embedding_classifier import EmbeddingClassifier
+from deepsearcher.agent.rag_router import RAGRouter
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, ChatResponse
+
+VECTORS = {
+    "deep search agent": [1.0, 0.0, 0.0],
+    "chain of rag agent": [0.0, 1.0, 0.0],
+    "compare the two papers": [0.9, 0.1, 0.0],
+    "which year was it published": [0.5, 0.5, 0.7],
+}
+
+
+class FakeEmbedding(BaseEmbedding):
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return VECTORS[text]
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def chat(self, messages):
+        self.calls += 1
+        return ChatResponse(content=self.content, total_tokens=10)
+
+
+class FakeAgent:
+    def __init__(self, description):
+        self.description = description
+
+
+LABELS = {"deep": ["deep search agent"], "chain": ["chain of rag agent"]}
+
+
+class TestEmbeddingClassifier(unittest.TestCase):
+    def test_confident_and_escalated(self):
+        classifier = EmbeddingClassifier(FakeEmbedding(), min_similarity=0.6, margin=0.05)
+        label, similarity = classifier.classify("route", LABELS, "compare the two papers")
+        self.assertEqual(label, "deep")
+        self.assertGreater(similarity, 0.9)
+        label, _ = classifier.classify("route", LABELS, "which year was it published")
+        self.assertIsNone(label)
+        self.assertEqual(classifier.stats["escalated"], 1)
+
+    def test_recorded_decisions_move_centroids_and_persist(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "decisions.jsonl")
+            classifier = EmbeddingClassifier(FakeEmbedding(), decisions_path=path)
+            classifier.record("route", "chain", "which year was it published")
+            classifier.record("route", "chain", "which year was it published")
+
+            restored = EmbeddingClassifier(FakeEmbedding(), decisions_path=path)
+            label, _ = restored.classify("route", LABELS, "which year was it published")
+            self.assertEqual(label, "chain")
+            # Decisions of another task are not used
+            label, _ = restored.classify("other", LABELS, "which year was it published")
+            self.assertIsNone(label)
+
+    def test_router_skips_llm_when_confident(self):
+        classifier = EmbeddingClassifier(FakeEmbedding())
+        llm = FakeLLM("2")
+        agents = [FakeAgent("deep search agent"), FakeAgent("chain of rag agent")]
+        router = RAGRouter(
+            llm, agents, [agent.description for agent in agents], classifier=classifier
+        )
+        agent, tokens = router._route("compare the two papers")
+        self.assertIs(agent, agents[0])
+        self.assertEqual((tokens, llm.calls), (0, 0))
+
+        agent, tokens = router._route("which year was it published")
+        self.assertIs(agent, agents[1])
+        self.assertEqual(llm.calls, 1)
+        self.assertEqual(classifier.stats["recorded"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
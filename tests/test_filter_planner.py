@@ -0,0 +1,112 @@
+import random
+import unittest
+
+from deepsearcher.vector_db.filter_planner import (
+    FilterPlanner,
+    FilterSyntaxError,
+    normalize_filter,
+    parse_and_normalize,
+    parse_filter,
+    required_array_values,
+)
+
+
+class TestFilterNormalization(unittest.TestCase):
+    def test_valid_expressions(self):
+        cases = {
+            "pubdate >= 1577836800 AND impact_factor >= 10": "pubdate >= 1577836800 and impact_factor >= 10",
+            "1741996800 <= pubdate <= 1742083200": "pubdate >= 1741996800 and pubdate <= 1742083200",
+            'ARRAY_CONTAINS_ANY(keywords, ["bacteria", "virus"])': 'ARRAY_CONTAINS_ANY(keywords, ["bacteria", "virus"])',
+            "IF > 5 or not (rbase_factor < 1)": "impact_factor > 5 or not (rbase_factor < 1)",
+            'keyword == "soil"': 'ARRAY_CONTAINS(keywords, "soil")',
+            "pubdate >= '2020-01-01'": "pubdate >= 1577836800",
+            "year >= 2020": "pubdate >= 1577836800",
+        }
+        for expression, expected in cases.items():
+            self.assertEqual(normalize_filter(expression), expected, expression)
+
+    def test_unsupported_clauses(self):
+        self.assertEqual(normalize_filter("journal == 'Nature' and pubdate > 0"), "pubdate > 0")
+        self.assertEqual(normalize_filter("journal == 'Nature' or pubdate > 0"), "")
+        self.assertEqual(normalize_filter("impact_factor >= 'high'"), "")
+        self.assertEqual(
+            normalize_filter(["pubdate > 0", "impact_factor > 1"]),
+            "pubdate > 0 and impact_factor > 1",
+        )
+        self.assertEqual(normalize_filter("pubdate >>= 3"), "")
+        self.assertEqual(normalize_filter([]), "")
+        with self.assertRaises(FilterSyntaxError):
+            parse_filter("pubdate >")
+
+    def test_negated_clause_is_not_narrowed(self):
+        self.assertEqual(normalize_filter("not (impact_factor > 3 and journal == 'x')"), "")
+        self.assertEqual(
+            normalize_filter("not (impact_factor > 3 and journal == 'x') and pubdate > 0"),
+            "pubdate > 0",
+        )
+
+    def test_parsable_conjuncts_are_kept(self):
+        self.assertEqual(
+            normalize_filter('pubdate >= 2020-01-01 and impact_factor > 3 and title like "x%"'),
+            "impact_factor > 3",
+        )
+        self.assertEqual(
+            normalize_filter(["(impact_factor > 1e3) and pubdate > 5", 'keywords == "a and b"']),
+            'pubdate > 5 and ARRAY_CONTAINS(keywords, "a and b")',
+        )
+        self.assertEqual(normalize_filter("impact_factor > 3 and b > 1e3 or pubdate > 5"), "")
+
+    def test_evaluate(self):
+        node = parse_and_normalize('pubdate >= 10 and ARRAY_CONTAINS_ALL(keywords, ["a", "b"])')
+        self.assertTrue(node.evaluate({"pubdate": 10, "keywords": ["b", "a", "c"]}))
+        self.assertFalse(node.evaluate({"pubdate": 10, "keywords": ["a"]}))
+        self.assertFalse(node.evaluate({"pubdate": 9, "keywords": ["a", "b"]}))
+
+    def test_required_array_values(self):
+        self.assertEqual(
+            required_array_values("pubdate >= 10 AND ARRAY_CONTAINS(base_ids, 3)", "base_ids"), [3]
+        )
+        self.assertEqual(
+            required_array_values(
+                "ARRAY_CONTAINS_ANY(base_ids, [1, 2]) and ARRAY_CONTAINS_ALL(base_ids, [5, 6])",
+                "base_ids",
+            ),
+            [5],
+        )
+        self.assertIsNone(required_array_values("pubdate >= 10", "base_ids"))
+        self.assertIsNone(
+            required_array_values("ARRAY_CONTAINS(base_ids, 3) or pubdate >= 10", "base_ids")
+        )
+
+
+class TestFilterPlanner(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rows = [
+            {
+                "pubdate": rng.randint(0, 999),
+                "impact_factor": rng.random() * 20,
+                "keywords": ["common"] + (["rare"] if i % 500 == 0 else []),
+            }
+            for i in range(10_000)
+        ]
+        self.planner = FilterPlanner(
+            sample_rows=lambda collection, field, n: [row[field] for row in self.rows[:n]],
+            count_rows=lambda collection: 1_000_000,
+            brute_force_max_rows=20_000,
+        )
+
+    def test_selective_filter_is_scanned(self):
+        plan = self.planner.plan("c", 'ARRAY_CONTAINS(keywords, "rare") and pubdate >= 500')
+        self.assertEqual(plan.strategy, "brute_force")
+        self.assertAlmostEqual(plan.selectivity, 0.001, delta=0.0005)
+
+    def test_broad_filter_uses_ann(self):
+        plan = self.planner.plan("c", "pubdate >= 500 or impact_factor > 10")
+        self.assertEqual(plan.strategy, "ann")
+        self.assertAlmostEqual(plan.selectivity, 0.75, delta=0.05)
+        self.assertEqual(self.planner.plan("c", "").filter, "")
+
+
+if __name__ == "__main__":
+    unittest.main()
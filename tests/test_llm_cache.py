@@ -0,0 +1,100 @@
+import os
+import tempfile
+import time
+import unittest
+
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, ChatResponse, cached_prompt
+from deepsearcher.llm.cache import LLMResponseCache
+
+
+class CountingLLM(BaseLLM):
+    model = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, messages):
+        self.calls += 1
+        return ChatResponse(content=f"answer {self.calls}", total_tokens=10)
+
+
+class CharEmbedding(BaseEmbedding):
+    def embed_query(self, text):
+        return [text.count(c) for c in "abcdefghijklmnopqrstuvwxyz"]
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cached_chat(self):
+        llm = CountingLLM()
+        llm.response_cache = LLMResponseCache(self.path, prompt_types=["rerank"])
+        messages = [{"role": "user", "content": "Is this   relevant?"}]
+        first = llm.cached_chat(messages, prompt_type="rerank")
+        second = llm.cached_chat([{"role": "user", "content": "Is this relevant? "}], "rerank")
+        self.assertEqual((first.content, second.content), ("answer 1", "answer 1"))
+        self.assertEqual((second.total_tokens, llm.calls), (0, 1))
+        self.assertEqual(llm.response_cache.stats["hits"], 1)
+
+        # Prompt types that are not enabled always reach the model
+        llm.cached_chat(messages, prompt_type="answer")
+        self.assertEqual(llm.calls, 2)
+
+        # The cache persists across instances
+        llm.response_cache.close()
+        llm.response_cache = LLMResponseCache(self.path, prompt_types=["rerank"])
+        self.assertEqual(llm.cached_chat(messages, "rerank").content, "answer 1")
+        llm.response_cache.close()
+
+    def test_ttl_and_eviction(self):
+        cache = LLMResponseCache(self.path, ttl=0.05, max_entries=2, evict_interval=1)
+        for i in range(3):
+            cache.put("m", [{"role": "user", "content": str(i)}], "rerank", f"r{i}")
+        self.assertIsNone(cache.get("m", [{"role": "user", "content": "0"}], "rerank"))
+        self.assertEqual(cache.get("m", [{"role": "user", "content": "2"}], "rerank"), "r2")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("m", [{"role": "user", "content": "2"}], "rerank"))
+        cache.close()
+
+    def test_similar_prompt(self):
+        cache = LLMResponseCache(
+            self.path, embedding_model=CharEmbedding(), similarity_threshold=0.99
+        )
+        cache.put("m", [{"role": "user", "content": "detect the language of hello"}], "lang", "en")
+        similar = [{"role": "user", "content": "detect the language of hello!"}]
+        different = [{"role": "user", "content": "zzz"}]
+        self.assertEqual(cache.get("m", similar, "lang"), "en")
+        self.assertIsNone(cache.get("m", similar, "rerank"))
+        self.assertIsNone(cache.get("m", different, "lang"))
+        self.assertEqual(cache.stats["similar_hits"], 1)
+        cache.close()
+
+    def test_eviction_interval(self):
+        cache = LLMResponseCache(self.path, max_entries=1, evict_interval=3)
+        for i in range(2):
+            cache.put("m", [{"role": "user", "content": str(i)}], "rerank", f"r{i}")
+        self.assertEqual(cache.get("m", [{"role": "user", "content": "0"}], "rerank"), "r0")
+        cache.put("m", [{"role": "user", "content": "2"}], "rerank", "r2")
+        self.assertIsNone(cache.get("m", [{"role": "user", "content": "1"}], "rerank"))
+        self.assertEqual(cache.stats["evictions"], 2)
+        cache.close()
+
+    def test_similar_prompt_ignores_template(self):
+        cache = LLMResponseCache(
+            self.path, embedding_model=CharEmbedding(), similarity_threshold=0.99
+        )
+        template = "Detect the language of the text below, " * 20 + "text: {text}"
+        cache.put("m", cached_prompt(template, text="hello"), "lang", "en")
+        self.assertEqual(cache.get("m", cached_prompt(template, text="hello!"), "lang"), "en")
+        self.assertIsNone(cache.get("m", cached_prompt(template, text="bonjour"), "lang"))
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from types import SimpleNamespace
+
+from deepsearcher.llm.anthropic_llm import Anthropic
+from deepsearcher.llm.base import (
+    BaseLLM,
+    ChatResponse,
+    cached_prompt,
+    cached_prompt_tokens,
+    message_text,
+)
+
+TEMPLATE = """Instructions with a JSON example {{"key": "value"}}.
+
+Topic: {topic}
+Content: {content}
+"""
+
+
+class TestCachedMessages(unittest.TestCase):
+    def test_prefix_ends_at_first_placeholder(self):
+        messages = cached_prompt(TEMPLATE, topic="microbiome", content="text")
+        prefix, content = messages[0]["content"]
+        self.assertTrue(prefix["cache"])
+        self.assertEqual(
+            prefix["text"], 'Instructions with a JSON example {"key": "value"}.\n\nTopic: '
+        )
+        self.assertNotIn("cache", content)
+        self.assertEqual(
+            message_text(messages[0]), TEMPLATE.format(topic="microbiome", content="text")
+        )
+
+    def test_flattened_for_other_providers(self):
+        messages = cached_prompt(TEMPLATE, topic="microbiome", content="text")
+        plain = [{"role": "system", "content": "system"}]
+        prepared = BaseLLM().prepare_messages(plain + messages)
+        self.assertEqual(prepared[0], plain[0])
+        self.assertEqual(prepared[1]["content"], message_text(messages[0]))
+
+    def test_anthropic_cache_control(self):
+        messages = cached_prompt(TEMPLATE, topic="microbiome", content="text")
+        blocks = Anthropic.prepare_messages(object.__new__(Anthropic), messages)[0]["content"]
+        self.assertEqual(blocks[0]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(blocks[1], {"type": "text", "text": messages[0]["content"][1]["text"]})
+
+    def test_cached_tokens_in_usage(self):
+        openai_usage = SimpleNamespace(prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+        self.assertEqual(cached_prompt_tokens(openai_usage), 1024)
+        self.assertEqual(cached_prompt_tokens(SimpleNamespace(prompt_cache_hit_tokens=64)), 64)
+        self.assertEqual(cached_prompt_tokens(SimpleNamespace(cache_read_input_tokens=32)), 32)
+        self.assertEqual(cached_prompt_tokens(None), 0)
+
+        response = ChatResponse(
+            "answer", 30, prompt_tokens=20, completion_tokens=10, cached_tokens=16
+        )
+        self.assertEqual(response.usage()["cached_tokens"], 16)
+        self.assertEqual(response.usage({"cached_tokens": 4})["cached_tokens"], 20)
+
+
+class TestParseJson(unittest.TestCase):
+    def test_parse_json(self):
+        content = '<think>{"draft": 1}</think>\n```json\n{"answer": "a {b}", "ids": [1]}\n```'
+        self.assertEqual(BaseLLM.parse_json(content), {"answer": "a {b}", "ids": [1]})
+        self.assertEqual(BaseLLM.parse_json("{'answer': 'a'}"), {"answer": "a"})
+        with self.assertRaises(ValueError):
+            BaseLLM.parse_json("no object")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from deepsearcher.loader.splitter import Chunk
+from deepsearcher.vector_db import LocalVectorDB
+
+
+class TestLocalVectorDB(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = LocalVectorDB(path=self.tmp_dir.name)
+        self.db.init_collection(dim=8, collection="papers", description="test papers")
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(40, 8)).astype(np.float32)
+        chunks = [
+            Chunk(
+                text=f"chunk {i}",
+                reference="ref",
+                metadata={
+                    "title": f"paper {i // 2}",
+                    "article_id": i // 2,
+                    "pubdate": 1_600_000_000 + i,
+                    "impact_factor": float(i % 10),
+                    "base_ids": [i % 3],
+                    "keywords": ["soil"] if i % 4 == 0 else ["virus"],
+                },
+                embedding=vector.tolist(),
+            )
+            for i, vector in enumerate(self.vectors)
+        ]
+        self.result = self.db.insert_data("papers", chunks, batch_size=16)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_exact_search(self):
+        self.assertEqual(self.result["insert_count"], 40)
+        results = self.db.search_data("papers", self.vectors[5], top_k=3)
+        self.assertEqual(results[0].text, "chunk 5")
+        self.assertAlmostEqual(results[0].score, 0.0, places=5)
+        self.assertEqual(results[0].metadata["reference_id"], 2)
+        self.assertLessEqual(results[1].score, results[2].score)
+
+    def test_filtered_search(self):
+        results = self.db.search_data(
+            "papers",
+            self.vectors[5],
+            top_k=40,
+            filter='impact_factor >= 5 and ARRAY_CONTAINS(keywords, "soil")',
+        )
+        self.assertTrue(results)
+        for result in results:
+            index = int(result.text.split()[1])
+            self.assertGreaterEqual(index % 10, 5)
+            self.assertEqual(index % 4, 0)
+        with self.assertRaises(RuntimeError):
+            self.db.search_data("papers", self.vectors[0], filter="pubdate >>= 3")
+
+    def test_delete_and_persist(self):
+        deleted = self.db.delete_data("papers", reference_ids=[2])
+        self.assertEqual(deleted, 2)
+        reopened = LocalVectorDB(path=self.tmp_dir.name)
+        results = reopened.search_data("papers", self.vectors[5], top_k=40)
+        self.assertEqual(len(results), 38)
+        self.assertNotIn("chunk 5", [result.text for result in results])
+        self.assertEqual([info.collection_name for info in reopened.list_collections()], ["papers"])
+
+        self.assertEqual(reopened.compact("papers"), 38)
+        results = reopened.search_data("papers", self.vectors[6], top_k=1)
+        self.assertEqual(results[0].text, "chunk 6")
+        self.assertEqual(results[0].metadata["id"], self.result["ids"][6])
+
+    def test_filter_on_row_fields(self):
+        ids = self.result["ids"]
+        self.assertEqual(self.db.delete_data("papers", filter=f"id in [{ids[0]}, {ids[1]}]"), 2)
+        self.assertEqual(self.db.delete_data("papers", filter='text == "chunk 7"'), 1)
+        self.assertEqual(self.db.delete_data("papers", filter='reference == "paper 9"'), 2)
+        results = self.db.search_data("papers", self.vectors[0], top_k=40, filter="id > 0")
+        self.assertEqual(len(results), 35)
+
+    def test_unsupported_filter_is_not_widened(self):
+        self.assertEqual(self.db.delete_data("papers", filter='journal == "x"'), 0)
+        self.assertEqual(self.db.delete_data("papers", filter='pubdate > 0 and journal == "x"'), 0)
+        self.assertEqual(
+            self.db.search_data("papers", self.vectors[0], filter='journal == "x"'), []
+        )
+        self.assertEqual(len(self.db.search_data("papers", self.vectors[0], top_k=40)), 40)
+
+    def test_append_keeps_loaded_columns(self):
+        collection = self.db._get_collection("papers")
+        self.assertEqual(len(collection.arrays()["keywords"]), 40)
+        self.assertEqual(len(collection.strings()["text"]), 40)
+        chunk = Chunk("new chunk", "ref", {"title": "new", "keywords": ["soil"]}, [0.0] * 8)
+        self.db.insert_data("papers", [chunk])
+        self.assertEqual(collection.strings()["text"][-1], "new chunk")
+        results = self.db.search_data(
+            "papers", [0.0] * 8, top_k=1, filter='ARRAY_CONTAINS(keywords, "soil")'
+        )
+        self.assertEqual(results[0].text, "new chunk")
+
+    def test_interrupted_append_is_truncated(self):
+        collection = self.db._get_collection("papers")
+        chunk = Chunk("new chunk", "ref", {"title": "new", "keywords": ["soil"]}, [0.0] * 8)
+        with mock.patch.object(collection, "_save_meta", side_effect=OSError("disk full")):
+            with self.assertRaises(RuntimeError):
+                self.db.insert_data("papers", [chunk])
+        self.assertEqual(collection.count, 40)
+        vector = np.full(8, 5.0, dtype=np.float32)
+        self.db.insert_data("papers", [Chunk("after", "ref", {"title": "after"}, vector.tolist())])
+        for db in (self.db, LocalVectorDB(path=self.tmp_dir.name)):
+            results = db.search_data("papers", vector, top_k=1)
+            self.assertEqual(results[0].text, "after")
+            collection = db._get_collection("papers")
+            self.assertEqual(len(collection.arrays()["keywords"]), 41)
+            self.assertEqual(collection.strings()["text"][-1], "after")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from langchain_core.documents import Document
+
+from deepsearcher.loader.markdown_splitter import count_tokens, split_markdown_docs_to_chunks
+
+PAPER = """# Soil microbes
+
+## Introduction
+Soil microbes drive nutrient cycles.
+
+They also shape plant health.
+
+## Methods
+Samples were sequenced.
+
+| site | reads |
+|------|-------|
+| A    | 100   |
+| B    | 200   |
+Table 1. Reads per site.
+
+## References
+1. Doe J. A paper about soil. 2020.
+
+## Supplementary
+Extra tables.
+"""
+
+
+class TestMarkdownSplitter(unittest.TestCase):
+    def setUp(self):
+        doc = Document(page_content=PAPER, metadata={"reference": "paper.md", "title": "Soil"})
+        self.chunks = split_markdown_docs_to_chunks([doc], max_tokens=80)
+
+    def test_chunks_follow_sections(self):
+        paths = [chunk.metadata["section_path"] for chunk in self.chunks]
+        self.assertIn("Soil microbes > Introduction", paths)
+        self.assertIn("Soil microbes > Supplementary", paths)
+        for chunk in self.chunks:
+            self.assertEqual(chunk.reference, "paper.md")
+            self.assertEqual(chunk.metadata["title"], "Soil")
+
+    def test_references_are_dropped(self):
+        self.assertFalse(any("Doe J." in chunk.text for chunk in self.chunks))
+
+    def test_table_kept_with_caption(self):
+        tables = [chunk.text for chunk in self.chunks if "| site | reads |" in chunk.text]
+        self.assertEqual(len(tables), 1)
+        self.assertIn("| B    | 200   |", tables[0])
+        self.assertIn("Table 1. Reads per site.", tables[0])
+
+    def test_oversized_table_after_caption(self):
+        rows = "\n".join(f"| sample {i} | {i * 10} |" for i in range(40))
+        text = f"## Results\nTable 2. Reads per sample.\n\n| sample | reads |\n|---|---|\n{rows}\n"
+        chunks = split_markdown_docs_to_chunks([Document(page_content=text)], max_tokens=80)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertTrue(
+                chunk.text.startswith("Table 2. Reads per sample.\n\n| sample | reads |")
+            )
+            self.assertIn("|---|---|", chunk.text)
+            self.assertLessEqual(count_tokens(chunk.text), 80)
+
+    def test_token_budget(self):
+        long_doc = Document(page_content="## Results\n" + "Growth was fast. " * 200, metadata={})
+        for chunk in split_markdown_docs_to_chunks([long_doc], max_tokens=50):
+            self.assertLessEqual(count_tokens(chunk.text), 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
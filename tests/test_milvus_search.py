@@ -0,0 +1,76 @@
+import unittest
+
+from deepsearcher.vector_db import Milvus, RetrievalResult
+from deepsearcher.vector_db.filter_planner import FilterPlan
+
+
+def result(doc_id):
+    return RetrievalResult([0.0], f"chunk {doc_id}", "ref", {"id": doc_id})
+
+
+class FakePlanner:
+    def __init__(self, strategy):
+        self.strategy = strategy
+
+    def plan(self, collection, expression):
+        return FilterPlan(expression, self.strategy, 0.5, 100)
+
+
+class FakeMilvus(Milvus):
+    """Milvus without a server: the ANN search finds one row, the exact scan three."""
+
+    def __init__(self, strategy="ann"):
+        self.default_collection = "papers"
+        self.filter_planner = FakePlanner(strategy)
+        self.brute_force_calls = 0
+
+    def get_partition_layout(self, collection):
+        return ""
+
+    def get_lexical_index(self, collection):
+        return None
+
+    def _is_compressed(self, collection, vector):
+        return False
+
+    def _vector_search(self, collection, vector, top_k, filter, search_params, partition_names):
+        return [result(1)]
+
+    def _brute_force_search(self, collection, vector, top_k, filter, partition_names=None):
+        self.brute_force_calls += 1
+        return [result(1), result(2), result(3)]
+
+
+class TestMilvusFilteredSearch(unittest.TestCase):
+    def test_short_ann_results_are_rescanned_by_the_planner(self):
+        milvus = FakeMilvus()
+        results = milvus.search_data(
+            "papers", [0.0], top_k=3, filter="pubdate > 0", plan_filter=True
+        )
+        self.assertEqual(len(results), 3)
+        self.assertEqual(milvus.brute_force_calls, 1)
+
+    def test_no_rescan_without_the_planner(self):
+        milvus = FakeMilvus()
+        results = milvus.search_data("papers", [0.0], top_k=3, filter="pubdate > 0")
+        self.assertEqual(len(results), 1)
+        self.assertEqual(milvus.brute_force_calls, 0)
+
+    def test_forbidden_rescan(self):
+        milvus = FakeMilvus()
+        milvus.search_data(
+            "papers", [0.0], top_k=3, filter="pubdate > 0", plan_filter=True, brute_force=False
+        )
+        self.assertEqual(milvus.brute_force_calls, 0)
+
+    def test_planned_scan(self):
+        milvus = FakeMilvus(strategy="brute_force")
+        results = milvus.search_data(
+            "papers", [0.0], top_k=3, filter="pubdate > 0", plan_filter=True
+        )
+        self.assertEqual(len(results), 3)
+        self.assertEqual(milvus.brute_force_calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
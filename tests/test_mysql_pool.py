@@ -0,0 +1,82 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import pymysql
+
+from deepsearcher.db import mysql_connection as mysql_module
+from deepsearcher.db.mysql_connection import MySQLConnectionPool
+
+DB_CONFIG = {"provider": "mysql", "config": {"host": "db.test", "pool_size": 2}}
+
+
+class TestMySQLConnectionPool(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(
+            mysql_module.pymysql, "connect", side_effect=lambda **kwargs: MagicMock()
+        )
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(mysql_module.close_mysql_pools)
+
+    def test_reuse_and_bound(self):
+        pool = MySQLConnectionPool(DB_CONFIG, max_size=2, acquire_timeout=0.05)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            self.assertIs(first, second)
+        self.assertEqual(self.connect.call_count, 1)
+
+        pool.acquire()
+        pool.acquire()
+        with self.assertRaises(ConnectionError):
+            pool.acquire()
+        metrics = pool.metrics()
+        self.assertEqual(metrics["in_use"], 2)
+        self.assertEqual(metrics["timeouts"], 1)
+
+    def test_health_check_only_after_interval(self):
+        pool = MySQLConnectionPool(DB_CONFIG, health_check_interval=3600)
+        with pool.connection() as conn:
+            pass
+        with pool.connection():
+            pass
+        conn.ping.assert_not_called()
+
+        pool.health_check_interval = 0
+        conn.ping.side_effect = pymysql.err.OperationalError(2006, "gone away")
+        with pool.connection() as replacement:
+            self.assertIsNot(replacement, conn)
+        self.assertEqual(pool.metrics()["health_check_failures"], 1)
+        conn.close.assert_called_once()
+
+    def test_connection_error_discards(self):
+        pool = MySQLConnectionPool(DB_CONFIG)
+        with self.assertRaises(pymysql.err.OperationalError):
+            with pool.connection() as conn:
+                raise pymysql.err.OperationalError(2013, "lost connection")
+        conn.close.assert_called_once()
+        self.assertEqual(pool.metrics()["size"], 0)
+
+    def test_reclaims_connections_of_exited_threads(self):
+        pool = MySQLConnectionPool(DB_CONFIG, max_size=1, acquire_timeout=0.05)
+        leaked = []
+        thread = threading.Thread(target=lambda: leaked.append(pool.acquire()))
+        thread.start()
+        thread.join()
+        pool.acquire()
+        self.assertEqual(pool.metrics()["reclaimed"], 1)
+        leaked[0].close.assert_called_once()
+
+    def test_thread_pinned_connection(self):
+        conn = mysql_module.get_mysql_connection(DB_CONFIG)
+        self.assertIs(mysql_module.get_mysql_connection(DB_CONFIG), conn)
+        pool = mysql_module.get_mysql_pool(DB_CONFIG)
+        self.assertEqual(pool.max_size, 2)
+        mysql_module.close_mysql_connection()
+        self.assertEqual(pool.metrics()["size"], 0)
+        self.assertIsNot(mysql_module.get_mysql_connection(DB_CONFIG), conn)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from deepsearcher.loader.splitter import Chunk
+from deepsearcher.vector_db.base import RetrievalResult, deduplicate_results
+from deepsearcher.vector_db.near_duplicate import (
+    NearDuplicateIndex,
+    filter_near_duplicate_chunks,
+    hamming_distance,
+    simhash,
+)
+
+TEXT = (
+    "Soil microbial communities respond rapidly to drought. In all sampled plots the relative "
+    "abundance of Actinobacteria increased while Proteobacteria declined, and the shift "
+    "persisted for several weeks after rewetting. Fungal communities were more stable, which "
+    "suggests that fungal networks buffer the soil food web against short water deficits. "
+    "These observations were consistent across three sites and two consecutive years, and "
+    "they agree with earlier incubation experiments that reported similar trends in "
+    "laboratory microcosms exposed to repeated drying and rewetting cycles."
+)
+EDITED = TEXT.replace("three sites", "four sites")
+OTHER = (
+    "Large language models are trained on web-scale corpora and evaluated on reasoning "
+    "benchmarks that measure multi-step arithmetic, code generation and reading comprehension."
+)
+
+
+class TestNearDuplicate(unittest.TestCase):
+    def test_simhash_distance(self):
+        self.assertEqual(simhash(TEXT), simhash(TEXT))
+        self.assertLessEqual(hamming_distance(simhash(TEXT), simhash(EDITED)), 6)
+        self.assertGreater(hamming_distance(simhash(TEXT), simhash(OTHER)), 8)
+
+    def test_deduplicate_results(self):
+        results = [
+            RetrievalResult(embedding=None, text=text, reference="", metadata={})
+            for text in [TEXT, TEXT, EDITED, OTHER]
+        ]
+        self.assertEqual([r.text for r in deduplicate_results(results)], [TEXT, OTHER])
+        exact_only = deduplicate_results(results, max_hamming_distance=0)
+        self.assertEqual([r.text for r in exact_only], [TEXT, EDITED, OTHER])
+
+    def test_ingest_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "collection.json")
+            index = NearDuplicateIndex(path=path)
+            first = [Chunk(text=TEXT, reference="a.md", metadata={"article_id": 1})]
+            self.assertEqual(len(filter_near_duplicate_chunks(first, index)), 1)
+            index.save()
+
+            reloaded = NearDuplicateIndex(path=path)
+            second = [
+                Chunk(text=EDITED, reference="b.md", metadata={"article_id": 2}),
+                Chunk(text=OTHER, reference="b.md", metadata={"article_id": 2}),
+            ]
+            tagged = filter_near_duplicate_chunks(second, reloaded, mode="tag")
+            self.assertEqual(tagged[0].metadata["near_duplicate_of"], "1#0")
+            self.assertNotIn("near_duplicate_of", tagged[1].metadata)
+
+            reloaded.discard_group("1")
+            self.assertEqual(len(reloaded), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
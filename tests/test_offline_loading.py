@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from deepsearcher import configuration
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.loader.file_loader.text_loader import TextLoader
+from deepsearcher.offline_loading import load_from_local_files
+from deepsearcher.vector_db import LocalVectorDB
+
+
+class FakeEmbedding(BaseEmbedding):
+    def embed_query(self, text):
+        return [float(text.count(c)) for c in "abcdefgh"]
+
+    @property
+    def dimension(self):
+        return 8
+
+
+class TestLoadFromLocalFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "paper.txt")
+        with open(self.path, "w") as f:
+            f.write(
+                "\n\n".join(f"Paragraph {i} about soil bacteria and fungi." * 8 for i in range(6))
+            )
+        self.vector_db = LocalVectorDB(path=os.path.join(self.tmp_dir.name, "db"))
+        patcher = mock.patch.multiple(
+            configuration,
+            create=True,
+            vector_db=self.vector_db,
+            embedding_model=FakeEmbedding(),
+            file_loader=TextLoader(),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load(self, **kwargs):
+        load_from_local_files(
+            self.path,
+            collection_name="papers",
+            chunk_size=400,
+            chunk_overlap=0,
+            near_duplicates="skip",
+            near_duplicate_index_dir=os.path.join(self.tmp_dir.name, "near_duplicates"),
+            **kwargs,
+        )
+        return self.vector_db._get_collection("papers").count
+
+    def test_reload_is_deduplicated(self):
+        first_count = self.load()
+        self.assertGreater(first_count, 0)
+        self.assertEqual(self.load(), first_count)
+        self.assertEqual(self.load(force_new_collection=True), first_count)
+
+    def test_cli_import_defers_text_splitters(self):
+        code = "import deepsearcher.cli, sys; print('langchain_text_splitters' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.strip(), "False")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from deepsearcher.vector_db.quantization import (
+    FullVectorStore,
+    check_vector_dtype,
+    decode_vector,
+    encode_vectors,
+    truncate_vectors,
+)
+
+
+class TestQuantization(unittest.TestCase):
+    def setUp(self):
+        self.vectors = np.random.default_rng(0).normal(size=(8, 16)).astype(np.float32)
+
+    def test_truncate_vectors(self):
+        truncated = truncate_vectors(self.vectors, 4)
+        self.assertEqual(truncated.shape, (8, 4))
+        np.testing.assert_allclose(np.linalg.norm(truncated, axis=1), 1.0, rtol=1e-5)
+        np.testing.assert_array_equal(truncate_vectors(self.vectors, 16), self.vectors)
+
+    def test_encode_decode(self):
+        for dtype, tolerance in (("float16", 1e-2), ("bfloat16", 1e-1)):
+            encoded = encode_vectors(self.vectors, dtype)
+            self.assertIsInstance(encoded[0], bytes)
+            self.assertEqual(len(encoded[0]), 16 * 2)
+            decoded = np.stack([decode_vector(value, dtype) for value in encoded])
+            np.testing.assert_allclose(decoded, self.vectors, atol=tolerance)
+        self.assertEqual(encode_vectors(self.vectors, "float32"), self.vectors.tolist())
+
+    def test_full_vector_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FullVectorStore(os.path.join(directory, "collection"))
+            store.add([30, 10], self.vectors[:2])
+            store.add([20], self.vectors[2:3])
+            found, vectors = store.get([10, 99, 20])
+            self.assertEqual(found.tolist(), [True, False, True])
+            np.testing.assert_array_equal(vectors[0], self.vectors[1])
+            np.testing.assert_array_equal(vectors[2], self.vectors[2])
+            self.assertEqual(len(store), 3)
+            with self.assertRaises(ValueError):
+                store.add([40], self.vectors[:1, :8])
+            store.clear()
+            self.assertEqual(len(store), 0)
+            self.assertFalse(store.get([10])[0].any())
+
+    def test_full_vector_store_trims_interrupted_add(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = FullVectorStore(os.path.join(directory, "collection"))
+            store.add([10], self.vectors[:1])
+            # An add interrupted after its vectors but before its ids were written
+            with open(store.vectors_path, "ab") as f:
+                f.write(self.vectors[1:3].tobytes())
+            with open(store.ids_path, "ab") as f:
+                f.write(b"\x01\x02")
+            store.add([20], self.vectors[3:4])
+            store = FullVectorStore(store.path)
+            self.assertEqual(len(store), 2)
+            found, vectors = store.get([10, 20])
+            self.assertEqual(found.tolist(), [True, True])
+            np.testing.assert_array_equal(vectors, self.vectors[[0, 3]])
+
+    def test_check_vector_dtype(self):
+        check_vector_dtype("float16")
+        with self.assertRaises(ValueError):
+            check_vector_dtype("int8")
+        try:
+            import ml_dtypes  # noqa: F401
+        except ImportError:
+            with self.assertRaises(ValueError):
+                check_vector_dtype("bfloat16")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from types import SimpleNamespace
+
+from deepsearcher.agent.naive_rag import NaiveRAG
+from deepsearcher.agent.rag_router import RAGRouter
+from deepsearcher.embedding.base import BaseEmbedding
+from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.vector_db.base import RetrievalResult
+
+
+def chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeEmbedding(BaseEmbedding):
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, stream=True):
+        self.stream = stream
+
+    def chat(self, messages):
+        return ChatResponse(content="Paris is the capital.", total_tokens=7)
+
+    def stream_generator(self, messages):
+        if not self.stream:
+            return None
+        usage = SimpleNamespace(total_tokens=9, prompt_tokens=6, completion_tokens=3)
+        return iter([chunk("Paris "), chunk("is the capital."), chunk(usage=usage)])
+
+
+class RouteLLM(BaseLLM):
+    def chat(self, messages):
+        return ChatResponse(content="1", total_tokens=4)
+
+
+class FakeRouter:
+    def invoke(self, query, query_vector):
+        return ["collection"], 2
+
+
+class FakeExecutor:
+    def search(self, collections, vector, top_k=5, query_text=""):
+        return [RetrievalResult([0.0], "Paris is in France", "ref", {})]
+
+
+def make_agent(llm):
+    return NaiveRAG(
+        llm=llm,
+        embedding_model=FakeEmbedding(),
+        vector_db=None,
+        collection_router=FakeRouter(),
+        retrieval_executor=FakeExecutor(),
+    )
+
+
+class TestQueryStream(unittest.TestCase):
+    def test_progress_then_tokens(self):
+        events = list(make_agent(FakeLLM()).query_stream("capital of France?"))
+        self.assertEqual(
+            [event["type"] for event in events],
+            ["progress", "retrieved", "token", "token", "done"],
+        )
+        self.assertEqual(events[0]["stage"], "search")
+        self.assertEqual(events[1]["tokens"], 2)
+        done = events[-1]
+        self.assertEqual(done["answer"], "Paris is the capital.")
+        self.assertEqual((done["tokens"], len(done["results"])), (11, 1))
+
+    def test_provider_without_streaming(self):
+        events = list(make_agent(FakeLLM(stream=False)).query_stream("capital of France?"))
+        tokens = [event["content"] for event in events if event["type"] == "token"]
+        self.assertEqual(tokens, ["Paris is the capital."])
+        self.assertEqual(events[-1]["tokens"], 9)
+
+    def test_router_adds_route_tokens(self):
+        agent = make_agent(FakeLLM())
+        router = RAGRouter(RouteLLM(), [agent], ["naive"])
+        events = list(router.query_stream("capital of France?"))
+        self.assertEqual((events[0]["stage"], events[0]["agent"]), ("route", "NaiveRAG"))
+        self.assertEqual(events[-1]["tokens"], 15)
+
+    def test_retrieval_error_is_raised(self):
+        agent = make_agent(FakeLLM())
+        agent.retrieve = lambda query, **kwargs: 1 / 0
+        with self.assertRaises(ZeroDivisionError):
+            list(agent.query_stream("capital of France?"))
+
+
+if __name__ == "__main__":
+    unittest.main()
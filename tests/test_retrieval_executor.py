@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from deepsearcher.agent.retrieval_executor import RetrievalExecutor
+from deepsearcher.vector_db.base import BaseVectorDB, RetrievalResult
+
+
+class FakeVectorDB(BaseVectorDB):
+    def __init__(self, collections, delays=None):
+        super().__init__()
+        self.collections = collections
+        self.delays = delays or {}
+
+    def init_collection(
+        self, dim, collection, description, force_new_collection=False, *args, **kwargs
+    ):
+        pass
+
+    def insert_data(self, collection, chunks, *args, **kwargs):
+        pass
+
+    def search_data(self, collection, vector, top_k=5, *args, **kwargs):
+        time.sleep(self.delays.get(collection, 0))
+        return [
+            RetrievalResult(
+                embedding=None, text=text, reference=collection, metadata={}, score=score
+            )
+            for text, score in self.collections[collection][:top_k]
+        ]
+
+    def clear_db(self, *args, **kwargs):
+        pass
+
+    def delete_data(self, collection, *args, **kwargs):
+        return 0
+
+    def flush(self, collection_name, **kwargs):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestRetrievalExecutor(unittest.TestCase):
+    def test_merge_by_score(self):
+        vector_db = FakeVectorDB(
+            {
+                "a": [("alpha one", 0.1), ("shared text", 0.5)],
+                "b": [("shared text", 0.3), ("beta one", 0.2)],
+            }
+        )
+        executor = RetrievalExecutor(vector_db)
+        results = executor.search(["a", "b"], vector=[0.0], top_k=2)
+        self.assertEqual([r.text for r in results], ["alpha one", "beta one", "shared text"])
+        self.assertEqual(results[2].reference, "b")
+
+    def test_slow_collection_times_out(self):
+        vector_db = FakeVectorDB(
+            {"fast": [("fast result", 0.1)], "slow": [("slow result", 0.1)]},
+            delays={"slow": 0.5},
+        )
+        executor = RetrievalExecutor(vector_db, collection_timeout=0.1)
+        results = executor.search_collections(["fast", "slow"], vector=[0.0])
+        self.assertEqual(len(results["fast"]), 1)
+        self.assertEqual(results["slow"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
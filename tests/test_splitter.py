@@ -0,0 +1,71 @@
+import unittest
+
+from langchain_core.documents import Document
+
+from deepsearcher.loader.markdown_splitter import split_markdown_docs_to_chunks
+from deepsearcher.loader.splitter import (
+    MIN_WORK_UNIT_CHARS,
+    UNITS_PER_WORKER,
+    _plan_work_units,
+    iter_docs_to_chunks,
+    parallel_split_docs_to_chunks,
+    split_docs_to_chunks,
+)
+
+
+class TestSplitter(unittest.TestCase):
+    def test_window_uses_real_offsets(self):
+        paragraph = "The same sentence appears in every section of this paper."
+        sections = [f"Section {i}.\n\n{paragraph}\n\n" for i in range(20)]
+        text = "".join(sections)
+        doc = Document(page_content=text, metadata={"reference": "local file: paper.md"})
+        chunks = split_docs_to_chunks([doc], chunk_size=80, chunk_overlap=0)
+
+        cursor = 0
+        for chunk in chunks:
+            start = text.index(chunk.text, cursor)
+            cursor = start + 1
+            expected = text[max(0, start - 300) : min(len(text), start + len(chunk.text) - 1 + 300)]
+            self.assertEqual(chunk.metadata["wider_text"], expected)
+            self.assertEqual(chunk.reference, "local file: paper.md")
+            self.assertNotIn("start_index", chunk.metadata)
+
+    def test_iter_is_lazy(self):
+        def documents():
+            yield Document(page_content="first document", metadata={})
+            raise AssertionError("second document should not be read")
+
+        chunk = next(iter_docs_to_chunks(documents()))
+        self.assertEqual(chunk.text, "first document")
+
+    def test_parallel_split_keeps_order(self):
+        docs = [
+            Document(page_content=f"Document {i}. " + "word " * (50 * (i % 7 + 1)), metadata={})
+            for i in range(30)
+        ]
+        serial = split_docs_to_chunks(docs, chunk_size=120, chunk_overlap=10)
+        parallel = parallel_split_docs_to_chunks(
+            docs, chunk_size=120, chunk_overlap=10, num_workers=3, work_unit_chars=1000
+        )
+        self.assertEqual([c.text for c in serial], [c.text for c in parallel])
+        self.assertEqual(
+            [c.metadata["wider_text"] for c in serial], [c.metadata["wider_text"] for c in parallel]
+        )
+
+    def test_work_units_follow_worker_count(self):
+        docs = [Document(page_content="x" * 10_000, metadata={}) for i in range(64)]
+        self.assertEqual(len(_plan_work_units(docs, 640_000 // (4 * UNITS_PER_WORKER))), 16)
+        self.assertEqual(len(_plan_work_units(docs, MIN_WORK_UNIT_CHARS)), 32)
+
+    def test_parallel_markdown_split(self):
+        docs = [
+            Document(page_content=f"# Paper {i}\n\n## Results\n" + "Cells grew. " * 300)
+            for i in range(12)
+        ]
+        serial = split_markdown_docs_to_chunks(docs, max_tokens=100)
+        parallel = split_markdown_docs_to_chunks(docs, max_tokens=100, num_workers=3)
+        self.assertEqual([c.text for c in serial], [c.text for c in parallel])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from deepsearcher.agent.chain_of_rag import ChainOfRAG
+from deepsearcher.agent.stop_policy import (
+    AnswerConfidencePolicy,
+    BudgetPolicy,
+    ChainState,
+    LLMSufficiencyPolicy,
+    RetrievalNoveltyPolicy,
+    build_stop_policies,
+)
+from deepsearcher.llm.base import BaseLLM, ChatResponse
+from deepsearcher.vector_db.base import RetrievalResult
+
+
+def results(*texts):
+    return [RetrievalResult([0.0], text, "ref", {}) for text in texts]
+
+
+class FakeLLM(BaseLLM):
+    def __init__(self, content):
+        self.content = content
+
+    def chat(self, messages):
+        return ChatResponse(content=self.content, total_tokens=5)
+
+
+class TestStopPolicies(unittest.TestCase):
+    def test_novelty(self):
+        state = ChainState(query="q")
+        policy = RetrievalNoveltyPolicy(min_novelty=0.5)
+        state.add_round("a", results("x", "y"), [], 10)
+        self.assertEqual(policy.should_stop(state), (None, 0))
+        state.add_round("a", results("x", "y", "z"), [], 10)
+        reason, _ = policy.should_stop(state)
+        self.assertTrue(reason.startswith("novelty"))
+
+    def test_confidence_and_budget(self):
+        state = ChainState(query="q")
+        state.add_round("No relevant information found", results("x"), results("x"), 10)
+        self.assertIsNone(AnswerConfidencePolicy(0.5).should_stop(state)[0])
+        state.add_round("answer", results("y", "z"), results("y"), 10)
+        self.assertIsNotNone(AnswerConfidencePolicy(0.5).should_stop(state)[0])
+        self.assertIsNone(BudgetPolicy(max_tokens=30).should_stop(state)[0])
+        self.assertIsNotNone(BudgetPolicy(max_tokens=20).should_stop(state)[0])
+
+    def test_llm_sufficiency(self):
+        state = ChainState(query="q", intermediate_contexts=["Intermediate query1: q"])
+        self.assertEqual(LLMSufficiencyPolicy(FakeLLM("Yes")).should_stop(state)[1], 5)
+        self.assertIsNotNone(LLMSufficiencyPolicy(FakeLLM("“Yes”")).should_stop(state)[0])
+        self.assertIsNone(LLMSufficiencyPolicy(FakeLLM("No")).should_stop(state)[0])
+
+    def test_build_from_config(self):
+        policies = build_stop_policies(
+            [{"type": "novelty", "min_novelty": 0.2}, {"type": "unknown"}, {"type": "llm"}],
+            FakeLLM("No"),
+        )
+        self.assertEqual([policy.name for policy in policies], ["novelty", "llm"])
+        self.assertEqual(policies[0].min_novelty, 0.2)
+
+
+class TestChainOfRAGEarlyStop(unittest.TestCase):
+    def make_agent(self, stop_policies):
+        agent = ChainOfRAG(
+            llm=FakeLLM("No"),
+            embedding_model=None,
+            vector_db=None,
+            max_iter=4,
+            stop_policies=stop_policies,
+            fuse_supported_docs=False,
+            collection_router=object(),
+            retrieval_executor=object(),
+        )
+        agent._reflect_get_subquery = lambda query, contexts: ("sub query", 1)
+        agent._retrieve_and_answer = lambda query: ("answer", results("same chunk"), 1)
+        agent._get_supported_docs = lambda retrieved, query, answer: (retrieved, 1)
+        return agent
+
+    def test_stops_when_policy_fires(self):
+        agent = self.make_agent([RetrievalNoveltyPolicy(min_novelty=0.5)])
+        retrieved, tokens, info = agent.retrieve("main query")
+        self.assertEqual(info["iterations"], 2)
+        self.assertTrue(info["stop_reason"].startswith("novelty"))
+        self.assertEqual(tokens, 6)
+        self.assertEqual(len(retrieved), 1)
+
+    def test_runs_max_iter_without_policies(self):
+        _, _, info = self.make_agent([]).retrieve("main query")
+        self.assertEqual((info["iterations"], info["stop_reason"]), (4, "max_iter"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from deepsearcher.agent.term_dictionary import TermDictionary, parse_en_terms
+
+
+class TestTermDictionary(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.cn_path = os.path.join(self.temp_dir.name, "rbase_dict_cn.txt")
+        self.en_path = os.path.join(self.temp_dir.name, "rbase_dict_en.txt")
+        self.snapshot_path = os.path.join(self.temp_dir.name, "rbase_dict.snapshot")
+        with open(self.cn_path, "w", encoding="utf-8") as f:
+            f.write("菌群移植术 1000 nz\n")
+        with open(self.en_path, "w", encoding="utf-8") as f:
+            f.write(
+                "gut microbiome 1000 n\nmicrobiome 1000 n\nfecal microbiota transplant 1000 n\n"
+            )
+
+    def test_parse_en_terms(self):
+        en_terms, sorted_terms = parse_en_terms(self.en_path)
+        self.assertEqual(en_terms["gut microbiome"], "n")
+        self.assertEqual(
+            sorted_terms, ["fecal microbiota transplant", "gut microbiome", "microbiome"]
+        )
+
+    def test_loads_on_first_use_and_from_snapshot(self):
+        dictionary = TermDictionary(self.cn_path, self.en_path, self.snapshot_path)
+        self.assertEqual(dictionary.sorted_en_terms, [])
+        self.assertIn(("菌群移植术", "nz"), dictionary.segment("患者接受菌群移植术治疗"))
+        self.assertTrue(os.path.exists(self.snapshot_path))
+
+        restored = TermDictionary(self.cn_path, self.en_path, self.snapshot_path)
+        key = restored._snapshot_key()
+        snapshot = restored._read_snapshot(key)
+        self.assertIsNotNone(snapshot)
+        self.assertIn("菌群移植术", snapshot["freq"])
+        restored.load()
+        self.assertEqual(restored.en_terms, dictionary.en_terms)
+
+        # The snapshot is rebuilt when a dictionary changes
+        with open(self.en_path, "a", encoding="utf-8") as f:
+            f.write("metagenomics 1000 n\n")
+        os.utime(self.en_path, ns=(0, 0))
+        self.assertIsNone(restored._read_snapshot(restored._snapshot_key()))
+        changed = TermDictionary(self.cn_path, self.en_path, self.snapshot_path)
+        changed.load()
+        self.assertIn("metagenomics", changed.en_terms)
+
+
+if __name__ == "__main__":
+    unittest.main()